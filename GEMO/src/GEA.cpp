@@ -118,7 +118,8 @@ void saveAsTiff(const cv::Mat& mne_min_max, const std::string& filename)
 */
 
 void GEA(const cv::Mat& TTIma_MNE, const cv::Mat& TTIma_Masque, const cv::Mat& TTIma_Solut_Init, 
-         cv::Mat& TTIma_MNT, const std::string& NOM_norme, float sigma, float lambda, float no_data_ext) 
+         cv::Mat& TTIma_MNT, const std::string& NOM_norme, float sigma, float lambda, float no_data_ext,
+         GEAStats* stats, const GEASolverParams& solver) 
 {
 	//std::cout << "Type of TTIma_MNE: " << TTIma_MNE.type() << std::endl;
 	
@@ -142,7 +143,7 @@ void GEA(const cv::Mat& TTIma_MNE, const cv::Mat& TTIma_Masque, const cv::Mat& T
     cv::Mat TTIma_Solut_Init_Norm = (TTIma_Solut_Init - min_val) / (max_val - min_val);
 	//saveAsTiff(mne_min_max, "normalized_mne.tif");
 	//saveAsTiff(mne_min_max, "normalized_Solut_Init_Norm .tif");
-    TTIma_MNT = cv::Mat(tailleY, tailleX, CV_64F); // Image de sortie
+    TTIma_MNT.create(tailleY, tailleX, CV_64F); // Image de sortie (tampon fourni conservé)
 
     //// Processing image data into vectors...
     //for (int y = 0; y < 5; ++y)
@@ -204,24 +205,46 @@ void GEA(const cv::Mat& TTIma_MNE, const cv::Mat& TTIma_Masque, const cv::Mat& T
 
     const gsl_multimin_fdfminimizer_type* T = gsl_multimin_fdfminimizer_conjugate_fr;
     gsl_multimin_fdfminimizer* s = gsl_multimin_fdfminimizer_alloc(T, tailleX * tailleY);
-    gsl_multimin_fdfminimizer_set(s, &my_func, x, 0.01, 1e-4);
+    gsl_multimin_fdfminimizer_set(s, &my_func, x, solver.step, solver.tol_line);
 
     //std::cout << "GEMO ** avant GSL " << std::endl;
 
     size_t iter = 0;
     int status;
+    bool interrupted = false;
     do {
         iter++;
         //if (iter % 1000 == 0) std::cout << " iter - " << iter << std::endl ;
         status = gsl_multimin_fdfminimizer_iterate(s);
         if (status) break;
-        status = gsl_multimin_test_gradient(s->gradient, 1e-3);
+        status = gsl_multimin_test_gradient(s->gradient, solver.tol_grad);
         if (status == GSL_SUCCESS) {
             //std::cout << "Minimum trouvé ! " << status << std::endl;
             break;
         } 
         
-    } while (status == GSL_CONTINUE && iter < 30000);
+        if (solver.interrupt && iter % solver.interrupt_period == 0 && solver.interrupt()) {
+            interrupted = true;
+            break;
+        }
+
+    } while (status == GSL_CONTINUE && iter < solver.max_iter);
+
+    // Statistiques de convergence (énergie et gradient au point final)
+    if (stats != nullptr) {
+        stats->iterations = iter;
+        stats->gsl_status = status;
+        if (interrupted)
+            stats->stop = "interrupted";
+        else if (status == GSL_SUCCESS)
+            stats->stop = "gradient";
+        else if (status == GSL_CONTINUE)
+            stats->stop = "max_iter";
+        else
+            stats->stop = "gsl_error";
+        stats->energy = s->f;
+        stats->gradient_norm = gsl_blas_dnrm2(s->gradient);
+    }
 
     // Sauvegarde des résultats
     for (int j = 0; j < tailleY; ++j) {
@@ -7,6 +7,9 @@
 #include <gsl/gsl_multimin.h>
 #include <gsl/gsl_blas.h>
 
+#include <functional>
+#include <string>
+
 #include "Attache_Donnees.h"
 #include "Terme_Regularisation.h"
 
@@ -32,7 +35,41 @@ http://www.gnu.org/software/gsl/manual/html_node/Providing-a-function-to-minimiz
 */
 void my_fdf (const gsl_vector *x, void *vparams , double *f, gsl_vector *df);
 
-void GEA(const cv::Mat& TTIma_MNE, const cv::Mat& TTIma_Masque, const cv::Mat& TTIma_Solut_Init, cv::Mat& TTIma_MNT, const std::string& NOM_norme, float sigma, float lambda, float no_data_ext);
+/**
+Statistiques de convergence de la minimisation, renseignées par GEA si demandées.
+stop : "gradient" (test du gradient vérifié), "max_iter" (plafond d'itérations atteint),
+"gsl_error" (itération GSL en échec, par exemple absence de progression) ou "interrupted"
+(arrêt demandé par GEASolverParams::interrupt).
+*/
+struct GEAStats {
+    size_t iterations = 0;
+    int gsl_status = 0;
+    std::string stop = "";
+    double energy = 0.;
+    double gradient_norm = 0.;
+};
+
+/**
+Budget de la minimisation (gradient conjugué Fletcher-Reeves de GSL).
+max_iter : plafond d'itérations ; tol_grad : seuil du test de gradient (norme euclidienne) ;
+step : pas initial de la recherche linéaire ; tol_line : tolérance de la recherche linéaire.
+interrupt : si défini, appelé toutes les interrupt_period itérations ; la minimisation s'arrête
+dès qu'il renvoie true (timeout, annulation : module Python _gemo).
+*/
+struct GEASolverParams {
+    size_t max_iter = 30000;
+    double tol_grad = 1e-3;
+    double step = 0.01;
+    double tol_line = 1e-4;
+    std::function<bool()> interrupt;
+    size_t interrupt_period = 50;
+};
+
+/**
+TTIma_MNT est alloué par GEA (CV_64F), sauf s'il a déjà la taille de TTIma_MNE et le type
+CV_64F : GEA écrit alors dans ce tampon (tableau NumPy du module Python, sans copie).
+*/
+void GEA(const cv::Mat& TTIma_MNE, const cv::Mat& TTIma_Masque, const cv::Mat& TTIma_Solut_Init, cv::Mat& TTIma_MNT, const std::string& NOM_norme, float sigma, float lambda, float no_data_ext, GEAStats* stats = nullptr, const GEASolverParams& solver = GEASolverParams());
 
 #endif
 
@@ -0,0 +1,96 @@
+// Module Python _gemo : GEA() appelé directement sur des tableaux NumPy
+//
+// Même minimisation que main_GEMAUT_unit, sans lancement de processus ni lecture/écriture
+// GeoTIFF : les tableaux d'entrée sont vus par OpenCV sans copie, le MNT est écrit dans un
+// tableau NumPy float64 alloué ici, et le GIL est relâché pendant la minimisation (plusieurs
+// tuiles peuvent être traitées en parallèle par des threads du même processus).
+
+#include <chrono>
+#include <filesystem>
+#include <string>
+
+#include <opencv2/opencv.hpp>
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+#include "GEA.h"
+
+namespace py = pybind11;
+
+using FloatArray = py::array_t<float, py::array::c_style | py::array::forcecast>;
+using MaskArray = py::array_t<unsigned char, py::array::c_style | py::array::forcecast>;
+
+// En-tête OpenCV sur le tampon d'un tableau NumPy 2D contigu (pas de copie)
+template <typename T>
+static cv::Mat view(const py::array_t<T, py::array::c_style | py::array::forcecast>& array, int type,
+                    const char* name)
+{
+    if (array.ndim() != 2)
+        throw py::value_error(std::string(name) + " : tableau 2D attendu");
+    return cv::Mat(static_cast<int>(array.shape(0)), static_cast<int>(array.shape(1)), type,
+                   const_cast<T*>(array.data()));
+}
+
+static py::tuple gea(const FloatArray& mne, const MaskArray& masque, const FloatArray& init,
+                     const std::string& norme, float sigma, float lambda, float no_data_ext,
+                     size_t max_iter, double tol_grad, double step, double tol_line,
+                     double timeout, const std::string& cancel_file)
+{
+    cv::Mat ima_mne = view(mne, CV_32F, "mne");
+    cv::Mat ima_masque = view(masque, CV_8U, "masque");
+    cv::Mat ima_init = view(init, CV_32F, "init");
+    if (ima_masque.size() != ima_mne.size() || ima_init.size() != ima_mne.size())
+        throw py::value_error("mne, masque et init doivent avoir la même taille");
+
+    // Sortie : GEA écrit directement dans le tableau renvoyé
+    py::array_t<double> mnt({ima_mne.rows, ima_mne.cols});
+    cv::Mat ima_mnt(ima_mne.rows, ima_mne.cols, CV_64F, mnt.mutable_data());
+
+    GEASolverParams solver;
+    solver.max_iter = max_iter;
+    solver.tol_grad = tol_grad;
+    solver.step = step;
+    solver.tol_line = tol_line;
+
+    // Timeout et annulation vérifiés par GEA, sans le GIL
+    std::string reason;
+    const auto start = std::chrono::steady_clock::now();
+    if (timeout > 0 || !cancel_file.empty()) {
+        solver.interrupt = [&]() {
+            std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+            if (timeout > 0 && elapsed.count() > timeout)
+                reason = "timeout";
+            else if (!cancel_file.empty() && std::filesystem::exists(cancel_file))
+                reason = "annulée";
+            return !reason.empty();
+        };
+    }
+
+    GEAStats stats;
+    {
+        py::gil_scoped_release release;
+        GEA(ima_mne, ima_masque, ima_init, ima_mnt, norme, sigma, lambda, no_data_ext, &stats, solver);
+    }
+
+    py::dict result;
+    result["iterations"] = stats.iterations;
+    result["stop"] = stats.stop;
+    result["gsl_status"] = stats.gsl_status;
+    result["energy"] = stats.energy;
+    result["gradient_norm"] = stats.gradient_norm;
+    result["size"] = py::make_tuple(ima_mne.cols, ima_mne.rows);
+    if (!reason.empty())
+        result["reason"] = reason;
+    return py::make_tuple(mnt, result);
+}
+
+PYBIND11_MODULE(_gemo, m)
+{
+    m.doc() = "GEA() de GEMO sur tableaux NumPy (MNS float32, masque uint8, init float32)";
+    m.def("gea", &gea,
+          "Minimise l'énergie GEMO d'une tuile ; renvoie (MNT float64, statistiques GEMO_STATS)",
+          py::arg("mne"), py::arg("masque"), py::arg("init"), py::arg("norme") = "hubertukey",
+          py::arg("sigma") = 0.5f, py::arg("lambda") = 0.01f, py::arg("no_data_ext") = -32768.f,
+          py::arg("max_iter") = 30000, py::arg("tol_grad") = 1e-3, py::arg("step") = 0.01,
+          py::arg("tol_line") = 1e-4, py::arg("timeout") = 0., py::arg("cancel_file") = "");
+}
@@ -1,4 +1,5 @@
 #include <iostream>
+#include <iomanip>
 #include <opencv2/opencv.hpp>
 # include "GEA.h"
 #include <opencv2/opencv.hpp>
@@ -122,7 +123,7 @@ void saveWithGeoReference(const std::string& inputFilename, cv::Mat& image, cons
 
 int main(int argc, char *argv[]) 
 {
-    if ( (argc < 8) || (argc > 9) )
+    if ( (argc < 8) || (argc > 13) )
         {
             std::cout << " -*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*- " << std::endl;        
             std::cout << " -*-*-*-*-*-*     USAGE     *-*-*-*-*-*-*- " << std::endl;        
@@ -137,6 +138,10 @@ int main(int argc, char *argv[])
 	        std::cout << "          lambda              [0.02] " <<std::endl ;  
 	        std::cout << "          no data ext         [no data ext]" <<std::endl ; 
 	        std::cout << "          norme               [hubertukey]" <<std::endl ;  	        
+	        std::cout << "          max itérations      [30000]" <<std::endl ;
+	        std::cout << "          tolérance gradient  [1e-3]" <<std::endl ;
+	        std::cout << "          pas initial         [0.01]" <<std::endl ;
+	        std::cout << "          tolérance linéaire  [1e-4]" <<std::endl ;
             return 1 ;
         }
 
@@ -147,7 +152,14 @@ int main(int argc, char *argv[])
     float sigma = std::stof(argv[5]);
     float lambda = std::stof(argv[6]);
     float no_data_ext = std::stof(argv[7]);
-    std::string Nom_norme = (argc == 9) ? argv[8] : "hubertukey";
+    std::string Nom_norme = (argc >= 9) ? argv[8] : "hubertukey";
+
+    // Budget du solveur (optionnel, dans l'ordre)
+    GEASolverParams solver;
+    if (argc >= 10) solver.max_iter = std::stoul(argv[9]);
+    if (argc >= 11) solver.tol_grad = std::stod(argv[10]);
+    if (argc >= 12) solver.step = std::stod(argv[11]);
+    if (argc >= 13) solver.tol_line = std::stod(argv[12]);
 
     // Lire les images
     cv::Mat TTIma_MNE = cv::imread(Nom_MNE, cv::IMREAD_UNCHANGED);
@@ -165,11 +177,21 @@ int main(int argc, char *argv[])
     //std::cout << "lambda: " << lambda << std::endl;
 
     // Appeler GEA pour traiter les données    
-    GEA(TTIma_MNE, TTIma_Masque, TTIma_Solut_Init, TTIma_MNT, Nom_norme, sigma, lambda, no_data_ext);
+    GEAStats stats;
+    GEA(TTIma_MNE, TTIma_Masque, TTIma_Solut_Init, TTIma_MNT, Nom_norme, sigma, lambda, no_data_ext, &stats, solver);
     
     // Sauvegarder le résultat
     //cv::imwrite(Nom_MNT, TTIma_MNT);
 	saveWithGeoReference(Nom_MNE, TTIma_MNT, Nom_MNT);
 	
+    // Ligne de télémétrie lue par GEMOExecutor (seule sortie standard en fonctionnement normal)
+    std::cout << std::setprecision(10)
+              << "GEMO_STATS {\"iterations\": " << stats.iterations
+              << ", \"stop\": \"" << stats.stop << "\""
+              << ", \"gsl_status\": " << stats.gsl_status
+              << ", \"energy\": " << stats.energy
+              << ", \"gradient_norm\": " << stats.gradient_norm
+              << ", \"size\": [" << TTIma_MNE.cols << ", " << TTIma_MNE.rows << "]}" << std::endl;
+	
     return 0;
 }
@@ -2,21 +2,21 @@
 # -*- coding: utf-8 -*-
 ###
 #****!/usr/local/bin/python3 
+# Les commandes saga_cmd sont lancées par gemaut.process_runner : le paquet gemaut doit être
+# importable (installé avec GEMAUT, qui fournit aussi ce paquet SAGA). Depuis le dépôt, lancer
+# le script en module : python -m SAGA.script_saga_ground_extraction --mns ...
 import rasterio
 from rasterio.windows import Window
-import subprocess
 import numpy as np
-from scipy.ndimage import generic_filter
-import os, time, shutil, math
+import os, time, math, warnings
 from tqdm import tqdm
 import signal
 import sys
 from multiprocessing import Process,Pool,cpu_count
 import argparse
-from concurrent.futures import ProcessPoolExecutor
-from osgeo import gdal, osr
-gdal.UseExceptions()
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from loguru import logger
+from gemaut.process_runner import ProcessRunner
 
 # Fixer la variable d'environnement OMP_NUM_THREADS pour limiter les threads OpenMP
 os.environ['OMP_NUM_THREADS'] = '1'
@@ -24,30 +24,33 @@ os.environ['OMP_NUM_THREADS'] = '1'
 #chem_exe_saga="/home/nchampion/DEV/SAGA/saga-9.5.1/saga-gis/build/src/saga_core/saga_cmd/saga_cmd"
 chem_exe_saga="saga_cmd"
 
+# Extension des dalles de travail écrites selon le format (GDAL écrit le .sdat et son en-tête .sgrd)
+EXTENSIONS_DALLAGE = {'GTiff': '.tif', 'SAGA': '.sdat'}
+# Fichiers donnés à saga_cmd en entrée (pour une grille SAGA, c'est l'en-tête .sgrd)
+EXTENSIONS_ENTREE_SAGA = ('.tif', '.sgrd')
+
 #################################################################################################### 
 def init_worker():
 	signal.signal(signal.SIGINT, signal.SIG_IGN)
 
 ####################################################################################################
-def contient_donnees(chem_mns, no_data_value=-9999):
-    # Ouvrir l'image raster
-    with rasterio.open(chem_mns) as src:
-        # Lire les données du raster dans un tableau numpy
-        data = src.read(1)  # Lecture de la première bande (ou unique bande)
-        return not np.all(data == no_data_value)
-    
-####################################################################################################
-# Fonction pour exécuter gdal_translate via subprocess
-def run_task_sans_SORTIEMESSAGE(cmd):
-    subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def lister_dalles_saga(RepIN):
+    """Liste les dalles d'entrée de SAGA (nom sans extension, chemin) : GeoTIFF ou grille SAGA (.sgrd)"""
+    dalles = []
+    for f in sorted(os.listdir(RepIN)):
+        nom, ext = os.path.splitext(f)
+        if ext.lower() in EXTENSIONS_ENTREE_SAGA:
+            dalles.append((nom, os.path.join(RepIN, f)))
+    return dalles
 
-####################################################################################################
-def run_task(cmd):
-    try:
-        subprocess.run(cmd, shell=True, check=True)
-    except subprocess.CalledProcessError as e:
-        return False
-    return True
+################################################################################################################################
+def lancer_saga_en_parallele(tasks, iNbreCPU):
+    """Lance les commandes saga_cmd (listes d'arguments), au plus iNbreCPU à la fois, sans shell ni worker
+    Python (voir ProcessRunner) ; les dalles en échec sont journalisées avec la fin de la sortie d'erreur"""
+    resultats = ProcessRunner(iNbreCPU).run_all(tasks, desc="Lancement de SAGA unitaire en parallèle")
+    nbre_echecs = ProcessRunner.log_failures(resultats, "[SAGA] Dalle")
+    if nbre_echecs:
+        logger.warning(f"[SAGA] {nbre_echecs} dalles en échec sur {len(resultats)} : classées non-sol à l'assemblage")
 
 ################################################################################################################################
 def run_saga_par_dalle_parallel_avec_carte_pentes(RepIN,RepOUT,chem_pente_par_dallle,taille_dallage,rayon,no_data,iNbreCPU):
@@ -56,51 +59,42 @@ def run_saga_par_dalle_parallel_avec_carte_pentes(RepIN,RepOUT,chem_pente_par_da
     liste_images=[]
     liste_rep_out=[]
 
-    for root, dirs, files in os.walk(RepIN):
-        for f in files:
-            #
-            liste_tmp=f.split('_')
-            ligne_tmp=int(liste_tmp[1])
-            colonne_tmp=int(liste_tmp[2].split('.')[0])
-            # 
-            ligne=(ligne_tmp-1)*taille_dallage
-            colonne=(colonne_tmp-1)*taille_dallage
-            #
-            pixel_coords=[ligne,colonne]
-            liste_pixel_coords.append(pixel_coords)
-            #
-            liste_images.append(os.path.join(root,f))
+    for nom_dalle, chem_img in lister_dalles_saga(RepIN):
+        #
+        liste_tmp=nom_dalle.split('_')
+        ligne_tmp=int(liste_tmp[1])
+        colonne_tmp=int(liste_tmp[2])
+        # 
+        ligne=(ligne_tmp-1)*taille_dallage
+        colonne=(colonne_tmp-1)*taille_dallage
+        #
+        pixel_coords=[ligne,colonne]
+        liste_pixel_coords.append(pixel_coords)
+        #
+        liste_images.append(chem_img)
 
-            # préparer / créer le dossier de sortie et l'ajouter à la liste
-            chem_RepTra_SAGA_OUT_1_dalle=os.path.join(RepOUT,f[:-4])
-            if not os.path.isdir(chem_RepTra_SAGA_OUT_1_dalle): os.mkdir(chem_RepTra_SAGA_OUT_1_dalle)
-            liste_rep_out.append(chem_RepTra_SAGA_OUT_1_dalle)
+        # préparer / créer le dossier de sortie et l'ajouter à la liste
+        chem_RepTra_SAGA_OUT_1_dalle=os.path.join(RepOUT,nom_dalle)
+        if not os.path.isdir(chem_RepTra_SAGA_OUT_1_dalle): os.mkdir(chem_RepTra_SAGA_OUT_1_dalle)
+        liste_rep_out.append(chem_RepTra_SAGA_OUT_1_dalle)
 
     tasks = []
 
-    # Ouverture de l'image une seule fois
+    # Ouverture de l'image une seule fois ; un pixel lu par dalle (valeur constante sur la dalle)
     with rasterio.open(chem_pente_par_dallle) as dataset:
-        band_data = dataset.read(1)
         #
         for (row, col), chem_img, chem_rep_out in zip(liste_pixel_coords, liste_images, liste_rep_out):
             #
             chem_ground=os.path.join(chem_rep_out,'ground.sdat')
-            chem_ground_tif=os.path.join(chem_rep_out,'ground.tif')
             chem_non_ground=os.path.join(chem_rep_out,'non_ground.sdat')
-            #
-            if contient_donnees(chem_img, no_data):
-                pente_local = band_data[row, col]
-                # cmd_saga_1_dalle=f"{chem_exe_saga} grid_filter 7 -INPUT {chem_img} -RADIUS {rayon} -TERRAINSLOPE {pente_local} -GROUND {chem_ground} -NONGROUND {chem_non_ground} > /dev/null 2>&1 "
-                cmd_saga_1_dalle=f"{chem_exe_saga} grid_filter 7 -INPUT {chem_img} -RADIUS {rayon} -TERRAINSLOPE 15 -GROUND {chem_ground} -NONGROUND {chem_non_ground} > /dev/null 2>&1 "
-                tasks.append(cmd_saga_1_dalle)
-                logger.info(f"{cmd_saga_1_dalle}")
-            else:
-                #on copie directement la dalle MNS no_data dans le ground.tif, ça sert juste pour l'assemblage plus tard [implémentation très sale]
-                shutil.copyfile(chem_img, chem_ground_tif) 
-
-    #run_task_sans_SORTIEMESSAGE
-    with Pool(processes=iNbreCPU) as pool:
-        list(tqdm(pool.imap_unordered(run_task_sans_SORTIEMESSAGE, tasks), total=len(tasks), desc="Lancement de SAGA unitaire en parallèle"))
+            # les dalles sans donnée ne sont pas écrites par Decouper_image_en_dalles
+            pente_local = dataset.read(1, window=Window(col, row, 1, 1))[0, 0]
+            # cmd_saga_1_dalle=[chem_exe_saga, 'grid_filter', '7', '-INPUT', chem_img, '-RADIUS', str(rayon), '-TERRAINSLOPE', str(pente_local), '-GROUND', chem_ground, '-NONGROUND', chem_non_ground]
+            cmd_saga_1_dalle=[chem_exe_saga, 'grid_filter', '7', '-INPUT', chem_img, '-RADIUS', str(rayon), '-TERRAINSLOPE', '15', '-GROUND', chem_ground, '-NONGROUND', chem_non_ground]
+            tasks.append(cmd_saga_1_dalle)
+            logger.info(' '.join(cmd_saga_1_dalle))
+
+    lancer_saga_en_parallele(tasks, iNbreCPU)
 
     return
 
@@ -109,327 +103,384 @@ def run_saga_par_dalle_parallel(RepIN,RepOUT,rayon,no_data,pente,iNbreCPU):
 
     tasks = []
 
-    for root, dirs, files in os.walk(RepIN):
-        for f in files:
-            #
-            # préparer / créer le dossier de sortie et l'ajouter à la liste
-            chem_rep_out=os.path.join(RepOUT,f[:-4])
-            if not os.path.isdir(chem_rep_out): os.mkdir(chem_rep_out)
+    for nom_dalle, chem_img in lister_dalles_saga(RepIN):
+        #
+        # préparer / créer le dossier de sortie et l'ajouter à la liste
+        chem_rep_out=os.path.join(RepOUT,nom_dalle)
+        if not os.path.isdir(chem_rep_out): os.mkdir(chem_rep_out)
 
-            chem_img=os.path.join(root,f)
-            chem_ground=os.path.join(chem_rep_out,'ground.sdat')
-            chem_ground_tif=os.path.join(chem_rep_out,'ground.tif')
-            chem_non_ground=os.path.join(chem_rep_out,'non_ground.sdat')
-            #
-            if contient_donnees(chem_img, no_data):
-                # cmd_saga_1_dalle=f"{chem_exe_saga} grid_filter 7 -INPUT {chem_img} -RADIUS {rayon} -TERRAINSLOPE {pente_local} -GROUND {chem_ground} -NONGROUND {chem_non_ground} > /dev/null 2>&1 "
-                cmd_saga_1_dalle=f"{chem_exe_saga} grid_filter 7 -INPUT {chem_img} -RADIUS {rayon} -TERRAINSLOPE {pente} -GROUND {chem_ground} -NONGROUND {chem_non_ground} > /dev/null 2>&1 "
-                logger.info(f"{cmd_saga_1_dalle}")
-                tasks.append(cmd_saga_1_dalle)
-                logger.info(f"cmd_saga_1_dalle {cmd_saga_1_dalle}")
-            else:
-                #on copie directement la dalle MNS no_data dans le ground.tif, ça sert juste pour l'assemblage plus tard [implémentation très sale]
-                shutil.copyfile(chem_img, chem_ground_tif) 
-
-    #run_task_sans_SORTIEMESSAGE
-    with Pool(processes=iNbreCPU) as pool:
-        list(tqdm(pool.imap_unordered(run_task_sans_SORTIEMESSAGE, tasks), total=len(tasks), desc="Lancement de SAGA unitaire en parallèle"))
+        chem_ground=os.path.join(chem_rep_out,'ground.sdat')
+        chem_non_ground=os.path.join(chem_rep_out,'non_ground.sdat')
+        # les dalles sans donnée ne sont pas écrites par Decouper_image_en_dalles
+        cmd_saga_1_dalle=[chem_exe_saga, 'grid_filter', '7', '-INPUT', chem_img, '-RADIUS', str(rayon), '-TERRAINSLOPE', str(pente), '-GROUND', chem_ground, '-NONGROUND', chem_non_ground]
+        logger.info(' '.join(cmd_saga_1_dalle))
+        tasks.append(cmd_saga_1_dalle)
+
+    lancer_saga_en_parallele(tasks, iNbreCPU)
 
     return
             
 ############################################################################################################
-def Daller_pente(chem_pente_filtree,chem_pente_par_dallle,taille_carre):
-    #
-    pente_data = rasterio.open(chem_pente_filtree)
-    pente_array = pente_data.read(1)
+def facteur_echelle_geographique(src):
+    """
+    Facteur d'échelle Z/XY à appliquer au calcul de pente (équivalent de l'option -scale de gdaldem).
 
-    # Créer une matrice pour stocker les résultats
-    result_pente_par_dalle = np.zeros_like(pente_array)
+    En EPSG:4326 l'unité des XY (degrés) diffère de celle des Z (mètres) : le facteur est
+    estimé à la latitude du centre du MNS. En projection métrique, le facteur vaut 1.
+    """
+    if src.crs is not None and src.crs.is_geographic:
+        center_y = src.transform.f + (src.transform.e * src.height / 2)
+        return (111320 + (111320 * math.cos(math.radians(center_y)))) / 2
+    return 1.0
 
-    # Parcourir l'image de pente par carrés de tailleXtaille pixels
-    for i in range(0, pente_array.shape[0], taille_carre):
-        for j in range(0, pente_array.shape[1], taille_carre):
-            # Calcul des indices de fin, en s'assurant qu'ils ne dépassent pas les dimensions de l'image
-            i_end = min(i + taille_carre, pente_array.shape[0])
-            j_end = min(j + taille_carre, pente_array.shape[1])
+############################################################################################################
+def pente_zevenbergen_thorne(z, res_x, res_y, echelle=1.0, no_data=None):
+    """
+    Calcule la pente (en degrés) d'un bloc de MNS avec le noyau de Zevenbergen-Thorne.
 
-            # Extraire un carré de 50x50 pixels ou moins si en bordure
-            carre = pente_array[i:i_end, j:j_end]
+    Même convention que gdaldem slope -alg ZevenbergenThorne : la pente n'est pas définie
+    (NaN) sur le bord du bloc et là où le pixel ou l'un de ses 4 voisins est en no_data.
+    """
+    z = z.astype(np.float64, copy=False)
+    invalide = ~np.isfinite(z)
+    if no_data is not None:
+        invalide |= (z == no_data)
 
-            if carre.size == 0:
-                continue
+    pente = np.full(z.shape, np.nan, dtype=np.float32)
+    if z.shape[0] < 3 or z.shape[1] < 3:
+        return pente
 
-            # Calculer la pente max
-            pente_max = np.max(carre)
-            # autres possibilités
-            # pente_mediane = np.median(carre)
-            # quintile_percent = 80
-            # pente_quintile = np.percentile(carre, quintile_percent)
+    dzdx = (z[1:-1, 2:] - z[1:-1, :-2]) / (2 * res_x * echelle)
+    dzdy = (z[:-2, 1:-1] - z[2:, 1:-1]) / (2 * res_y * echelle)
+    interieur = np.degrees(np.arctan(np.hypot(dzdx, dzdy)))
 
-            # ecrire
-            result_pente_par_dalle[i:i_end, j:j_end] = pente_max
+    voisins_invalides = (invalide[1:-1, 1:-1] | invalide[1:-1, 2:] | invalide[1:-1, :-2]
+                         | invalide[:-2, 1:-1] | invalide[2:, 1:-1])
+    interieur[voisins_invalides] = np.nan
+    pente[1:-1, 1:-1] = interieur
+    return pente
 
-    #
-    with rasterio.open(
-        chem_pente_par_dallle,
-        'w',
-        driver='GTiff',
-        height=result_pente_par_dalle.shape[0],
-        width=result_pente_par_dalle.shape[1],
-        count=1,
-        dtype=result_pente_par_dalle.dtype,
-        crs=pente_data.crs,
-        transform=pente_data.transform
-    ) as dst:
-        dst.write(result_pente_par_dalle, 1)
+############################################################################################################
+def percentile_fenetre_glissante(data, percentile=5, taille_fenetre=5, colonnes_par_paquet=2048):
+    """
+    Percentile sur une fenêtre glissante carrée en ignorant les NaN (bords complétés par NaN).
 
-    return
+    Version vectorisée de generic_filter(..., mode='constant', cval=np.nan) : les fenêtres
+    sont des vues (sliding_window_view), traitées par paquets de colonnes pour borner la mémoire.
+    """
+    rayon = taille_fenetre // 2
+    padded = np.pad(data.astype(np.float32, copy=False), rayon, mode='constant', constant_values=np.nan)
+    fenetres = np.lib.stride_tricks.sliding_window_view(padded, (taille_fenetre, taille_fenetre))
+
+    resultat = np.full(data.shape, np.nan, dtype=np.float32)
+    with warnings.catch_warnings():
+        # fenêtres entièrement NaN : le résultat reste NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        for j in range(0, data.shape[1], colonnes_par_paquet):
+            paquet = fenetres[:, j:j + colonnes_par_paquet].reshape(data.shape[0], -1, taille_fenetre * taille_fenetre)
+            resultat[:, j:j + colonnes_par_paquet] = np.nanpercentile(paquet, percentile, axis=-1)
+    return resultat
 
 ############################################################################################################
-def Calculer_pente_filtree(chem_mns, RepTra_tmp, chem_pente_filtree, percentile=5, taille=5, seuil_diff=15):
-    #
-    chem_pente=os.path.join(RepTra_tmp,'pente.tif')
-    chem_pente_smooth=os.path.join(RepTra_tmp,'pente_smooth.tif')
-    #
-    generate_slope_raster(chem_mns, chem_pente)
+def reduire_par_dalle(data, taille_carre, statistique='max', quantile=80):
+    """
+    Réduit un tableau par carrés de taille_carre x taille_carre (les carrés de bordure peuvent être plus petits).
+
+    Args:
+        data: tableau 2D (les NaN sont ignorés)
+        taille_carre: taille des carrés en pixels
+        statistique: 'max', 'median' ou 'quantile'
+        quantile: quantile en pourcent, utilisé si statistique == 'quantile'
+
+    Returns:
+        Tableau (nbre_lignes_dalles, nbre_colonnes_dalles), NaN pour un carré sans valeur valide
+    """
+    hauteur, largeur = data.shape
+    debuts_y = np.arange(0, hauteur, taille_carre)
+    debuts_x = np.arange(0, largeur, taille_carre)
+
+    if statistique == 'max':
+        # reduceat gère directement les carrés incomplets en bordure
+        valeurs = np.where(np.isnan(data), -np.inf, data)
+        resultat = np.maximum.reduceat(np.maximum.reduceat(valeurs, debuts_y, axis=0), debuts_x, axis=1)
+        return np.where(np.isneginf(resultat), np.nan, resultat).astype(np.float32)
+
+    if statistique not in ('median', 'quantile'):
+        raise ValueError(f"Statistique par dalle non supportée: {statistique}")
+
+    # Compléter par NaN jusqu'à un multiple de taille_carre puis regrouper chaque carré sur un axe
+    ny, nx = len(debuts_y), len(debuts_x)
+    complet = np.full((ny * taille_carre, nx * taille_carre), np.nan, dtype=np.float32)
+    complet[:hauteur, :largeur] = data
+    carres = complet.reshape(ny, taille_carre, nx, taille_carre).transpose(0, 2, 1, 3).reshape(ny, nx, -1)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        if statistique == 'median':
+            return np.nanmedian(carres, axis=-1).astype(np.float32)
+        return np.nanpercentile(carres, quantile, axis=-1).astype(np.float32)
+
+############################################################################################################
+def etaler_par_dalle(valeurs_dalles, taille_carre, hauteur, largeur):
+    """Replace la valeur de chaque dalle sur tous ses pixels (image de même taille que le MNS)"""
+    return np.repeat(np.repeat(valeurs_dalles, taille_carre, axis=0), taille_carre, axis=1)[:hauteur, :largeur]
+
+############################################################################################################
+def Daller_pente(chem_pente_filtree, chem_pente_par_dallle, taille_carre, statistique='max', quantile=80):
     #
-    calculer_pente_smooth_percentile_fenetre(chem_pente, chem_pente_smooth, percentile, taille)
+    with rasterio.open(chem_pente_filtree) as pente_data:
+        pente_array = pente_data.read(1).astype(np.float32)
+        profile = pente_data.profile.copy()
+
+    # Pente max (ou médiane / quantile) par carré de tailleXtaille pixels
+    pente_par_dalle = reduire_par_dalle(pente_array, taille_carre, statistique, quantile)
+    result_pente_par_dalle = etaler_par_dalle(np.nan_to_num(pente_par_dalle, nan=0.0), taille_carre, *pente_array.shape)
+
     #
-    filtrer_pente(chem_pente, chem_pente_smooth, seuil_diff, chem_pente_filtree)
+    profile.update(dtype='float32', count=1, nodata=None)
+    with rasterio.open(chem_pente_par_dallle, 'w', **profile) as dst:
+        dst.write(result_pente_par_dalle, 1)
 
-############################################################################################################
-def generate_slope_raster(chem_mns, chem_pente):
+    return
 
-    # NON VALIDE en EPSG:4326 quand l'Unité des Z diff Unité de XY
-    # cmd = "gdaldem slope -alg ZevenbergenThorne {} {}".format(chem_mns, chem_pente)
-    # os.system(cmd)
+############################################################################################################
+def Calculer_pente_par_dalle(chem_mns, chem_pente_par_dallle, taille_carre, percentile=5, taille_fenetre=5,
+                             seuil_diff=15, statistique='max', quantile=80, lignes_par_bloc=1024):
     """
-    Generates a slope raster from a DSM using gdaldem slope.
-    
-    Parameters:
-        chem_mns (str): Path to the DSM file.
-        chem_pente (str): Path to output slope raster.
+    Carte des pentes filtrée puis réduite par dalle, en une lecture du MNS et une écriture.
+
+    Le MNS est traité par bandes de lignes (multiples de taille_carre) avec un halo suffisant
+    pour le noyau de Zevenbergen-Thorne et la fenêtre de percentile : pente, lissage par
+    percentile, filtrage (seuil_diff) et réduction par dalle sont enchaînés en mémoire.
+
+    Args:
+        chem_mns: MNS d'entrée
+        chem_pente_par_dallle: raster de sortie (même emprise que le MNS, une valeur par dalle)
+        taille_carre: taille des dalles en pixels
+        percentile, taille_fenetre: lissage de la pente par percentile sur fenêtre glissante
+        seuil_diff: écart pente - pente lissée au-delà duquel la pente lissée est retenue
+        statistique: 'max', 'median' ou 'quantile' (None pour écrire la pente filtrée elle-même)
+        quantile: quantile en pourcent pour statistique == 'quantile'
+        lignes_par_bloc: hauteur indicative des bandes traitées en mémoire
     """
-    # Open the DSM file
-    ds = gdal.Open(chem_mns)
-    if ds is None:
-        raise FileNotFoundError(f"Cannot open DSM file: {chem_mns}")
-
-    # Get the projection information
-    proj = ds.GetProjection()
-    spatial_ref = osr.SpatialReference(wkt=proj)
-    
-    # Check if the projection is geographic (lat/lon) or projected (meters)
-    if spatial_ref.IsGeographic():
-        # Extract latitude of the center of the DSM
-        transform = ds.GetGeoTransform()
-        center_y = transform[3] + (transform[5] * ds.RasterYSize / 2)
-        
-        # Calculate scale factor based on the center latitude
-        scale_factor = (111320 + (111320 * math.cos(math.radians(center_y)))) / 2
-
-        # Run gdaldem slope with scale parameter
-        cmd = [
-            "gdaldem", "slope", "-alg", "ZevenbergenThorne",
-            "-scale", str(scale_factor),
-            chem_mns, chem_pente
-        ]
-        logger.info(f"Running gdaldem command with scale factor: {' '.join(cmd)}")
-    else:
-        # For projected coordinate systems, no scale parameter is needed
-        cmd = [
-            "gdaldem", "slope", "-alg", "ZevenbergenThorne",
-            chem_mns, chem_pente
-        ]
-        logger.info(f"Running gdaldem command without scale factor: {' '.join(cmd)}")
-    
-    # Execute the command
-    subprocess.run(cmd, check=True)
+    halo = 1 + taille_fenetre // 2
 
-    # Close the dataset
-    ds = None
+    with rasterio.open(chem_mns) as src:
+        hauteur, largeur = src.height, src.width
+        echelle = facteur_echelle_geographique(src)
+        res_x, res_y = abs(src.transform.a), abs(src.transform.e)
+        logger.info(f"[SAGA] Pente Zevenbergen-Thorne en mémoire (facteur d'échelle : {echelle})")
 
-############################################################################################################
-# Fonction de calcul du percentile, définie en dehors de la fonction principale
-def get_percentile_fenetre(values, percentile=5):
-    """Calcule le percentile spécifié en ignorant les valeurs NaN."""
-    return np.percentile(values[~np.isnan(values)], percentile) if np.any(~np.isnan(values)) else np.nan
+        profile = src.profile.copy()
+        profile.update(dtype='float32', count=1, nodata=None, compress='lzw')
 
-############################################################################################################
-def calculer_pente_smooth_percentile_fenetre(chem_pente, chem_pente_smooth, percentile=5, taille_fenetre=5):
-    with rasterio.open(chem_pente) as src:
-        # Lire la bande de données
-        data = src.read(1)
-        
-        # Appliquer le filtre générique avec la fonction définie séparément
-        resultat = generic_filter(data, lambda x: get_percentile_fenetre(x, percentile), size=(taille_fenetre, taille_fenetre), mode='constant', cval=np.nan)
-        
-        # Mettre à jour le profil pour la sortie
-        profile = src.profile
-        profile.update(dtype=rasterio.float32, count=1, compress='lzw')
-        
-        # Écrire le résultat dans un nouveau fichier raster
-        with rasterio.open(chem_pente_smooth, 'w', **profile) as dst:
-            dst.write(resultat, 1)
+        hauteur_bloc = max(1, lignes_par_bloc // taille_carre) * taille_carre
+
+        with rasterio.open(chem_pente_par_dallle, 'w', **profile) as dst:
+            for y0 in tqdm(range(0, hauteur, hauteur_bloc), desc="Pente par dalle", unit="bloc"):
+                y1 = min(y0 + hauteur_bloc, hauteur)
+                r0 = max(0, y0 - halo)
+                r1 = min(hauteur, y1 + halo)
+
+                z = src.read(1, window=Window(0, r0, largeur, r1 - r0))
+                pente = pente_zevenbergen_thorne(z, res_x, res_y, echelle, src.nodata)
+                pente_smooth = percentile_fenetre_glissante(pente, percentile, taille_fenetre)
+
+                # Filtrage : la pente lissée remplace les pentes trop fortes par rapport au voisinage
+                pente_filtree = np.where(pente - pente_smooth > seuil_diff, pente_smooth, pente)
+                pente_filtree = pente_filtree[y0 - r0:y1 - r0]
+
+                if statistique is None:
+                    bloc = pente_filtree
+                else:
+                    pente_par_dalle = reduire_par_dalle(pente_filtree, taille_carre, statistique, quantile)
+                    bloc = etaler_par_dalle(np.nan_to_num(pente_par_dalle, nan=0.0), taille_carre, y1 - y0, largeur)
+
+                dst.write(bloc.astype(np.float32), 1, window=Window(0, y0, largeur, y1 - y0))
 
 ############################################################################################################
-def filtrer_pente(chem_pente, chem_pente_smooth, seuil_diff, chem_pente_filtree):
-    # Ouverture des deux rasters
-    with rasterio.open(chem_pente) as src1, rasterio.open(chem_pente_smooth) as src2:
-        # Vérifier que les dimensions et la transformation géospatiale sont identiques
-        if not (src1.width == src2.width and src1.height == src2.height and src1.transform == src2.transform):
-            raise ValueError("Les rasters doivent avoir la même taille et la même transformation géospatiale.")
-        
-        # Lecture des données des rasters sous forme de matrices numpy
-        data1 = src1.read(1)  # chem_pente
-        data2 = src2.read(1)  # chem_pente_smooth
-        #
-        # Calcul de la différence
-        diff = data1 - data2 
-        
-        # Création du résultat basé sur la différence par rapport au seuil
-        result = np.where(diff > seuil_diff, data2, data1)
-        
-        # Création des méta-données pour le fichier de sortie
-        out_meta = src1.meta.copy()
-        out_meta.update({
-            'dtype': 'float32',  # Modifier le type de données si nécessaire
-            'nodata': None
-        })
-        
-        # Écriture du raster de sortie
-        with rasterio.open(chem_pente_filtree, 'w', **out_meta) as dest:
-            dest.write(result.astype('float32'), 1)
+def Calculer_pente_filtree(chem_mns, RepTra_tmp, chem_pente_filtree, percentile=5, taille=5, seuil_diff=15):
+    # RepTra_tmp n'est plus utilisé : la pente et la pente lissée ne sont plus écrites sur disque
+    Calculer_pente_par_dalle(chem_mns, chem_pente_filtree, 1, percentile, taille, seuil_diff, statistique=None)
+
+################################################################################################################################
+# Source ouverte une fois par worker de découpage
+_src_dallage = None
+
+def init_worker_dallage(chem_mns):
+    """Initialise un worker de découpage : ignore SIGINT, pas de logs, ouvre le MNS une seule fois"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.remove()
+    ouvrir_mns_dallage(chem_mns)
+
+def ouvrir_mns_dallage(chem_mns):
+    """MNS ouvert par ce worker (rouvert si un autre MNS est demandé : workers partagés par le pipeline)"""
+    global _src_dallage
+    if _src_dallage is None or _src_dallage.name != chem_mns:
+        if _src_dallage is not None:
+            _src_dallage.close()
+        _src_dallage = rasterio.open(chem_mns)
+    return _src_dallage
 
 ################################################################################################################################
-def Decouper_image_en_dalles(chem_mns, taille_dallage, RepTra_DALLAGE_tmp, nom_generic='DALLAGE_'):
-    # Charger l'image en entrée
+def ecrire_dalle(args):
+    """
+    Lit la fenêtre d'une dalle et l'écrit si elle contient au moins un pixel valide.
+
+    Returns:
+        True si la dalle a été écrite, False si elle ne contient que du no_data
+    """
+    chem_mns, i, j, taille_dallage, RepTra_DALLAGE_tmp, nom_generic, no_data, format_dalle = args
+    src = ouvrir_mns_dallage(chem_mns)
+
+    x_offset = j * taille_dallage
+    y_offset = i * taille_dallage
+    window = Window(x_offset, y_offset, min(taille_dallage, src.width - x_offset), min(taille_dallage, src.height - y_offset))
+
+    data = src.read(window=window)
+    if no_data is not None and np.all(data == no_data):
+        return False
+
+    # Profil propre à la dalle (le profil source n'est pas modifié) : tuile de travail non compressée
+    profile = {
+        'driver': format_dalle,
+        'height': int(window.height),
+        'width': int(window.width),
+        'count': src.count,
+        'dtype': src.dtypes[0],
+        'crs': src.crs,
+        'transform': src.window_transform(window),
+        'nodata': src.nodata,
+    }
+
+    chemin_dalle = os.path.join(RepTra_DALLAGE_tmp, f"{nom_generic}{i + 1}_{j + 1}{EXTENSIONS_DALLAGE[format_dalle]}")
+    with rasterio.open(chemin_dalle, 'w', **profile) as dst:
+        dst.write(data)
+    return True
+
+################################################################################################################################
+def Decouper_image_en_dalles(chem_mns, taille_dallage, RepTra_DALLAGE_tmp, nom_generic='DALLAGE_', iNbreCPU=1, no_data=None, format_dalle='GTiff', pool=None):
+    """
+    Découpe le MNS en dalles DALLAGE_i_j (i, j à partir de 1) avec un pool de workers
+    (pool fourni par le pipeline, sinon créé ici).
+
+    Chaque worker ouvre le MNS une fois et écrit ses dalles par lecture fenêtrée. Les dalles
+    ne contenant que du no_data ne sont pas écrites. format_dalle='SAGA' écrit directement
+    des grilles SAGA (.sgrd/.sdat), ce qui évite l'import GeoTIFF dans saga_cmd.
+
+    Returns:
+        Nombre de dalles écrites
+    """
+    if format_dalle not in EXTENSIONS_DALLAGE:
+        raise ValueError(f"Format de dalle non supporté: {format_dalle}")
+
     with rasterio.open(chem_mns) as src:
         largeur = src.width
         hauteur = src.height
-        profile = src.profile
-        
-        # Créer le répertoire de sortie s'il n'existe pas
-        if not os.path.exists(RepTra_DALLAGE_tmp):
-            os.makedirs(RepTra_DALLAGE_tmp)
-        
-        # Calculer le nombre de dalles en fonction de la taille spécifiée
-        nombre_lignes = (hauteur + taille_dallage - 1) // taille_dallage
-        nombre_colonnes = (largeur + taille_dallage - 1) // taille_dallage
-        total_dalles = nombre_lignes * nombre_colonnes  # Total des dalles à traiter
-        
-        with tqdm(total=total_dalles, desc="Découpage en dalles", unit="dalle") as pbar:
-            # Boucler sur chaque dalle
-            for i in range(nombre_lignes):
-                for j in range(nombre_colonnes):
-                    # Calculer les coordonnées de la fenêtre pour la dalle
-                    x_offset = j * taille_dallage
-                    y_offset = i * taille_dallage
-                    width = min(taille_dallage, largeur - x_offset)
-                    height = min(taille_dallage, hauteur - y_offset)
-                
-                    # Définir la fenêtre de découpe
-                    window = Window(x_offset, y_offset, width, height)
-                    transform_window = src.window_transform(window)
-                
-                    # Mettre à jour le profil pour correspondre à la taille de la dalle
-                    profile.update({
-                        'height': height,
-                        'width': width,
-                        'transform': transform_window
-                    })
-                
-                    # Nommer et enregistrer la dalle
-                    nom_dalle = f"DALLAGE_{i + 1}_{j + 1}.tif"
-                    nom_dalle = f"{nom_generic}{i + 1}_{j + 1}.tif"
-                    chemin_dalle = os.path.join(RepTra_DALLAGE_tmp, nom_dalle)
-                
-                    with rasterio.open(chemin_dalle, 'w', **profile) as dst:
-                        dst.write(src.read(window=window))
+        if no_data is None:
+            no_data = src.nodata
+
+    # Créer le répertoire de sortie s'il n'existe pas
+    if not os.path.exists(RepTra_DALLAGE_tmp):
+        os.makedirs(RepTra_DALLAGE_tmp)
 
-                    pbar.update(1)
+    # Calculer le nombre de dalles en fonction de la taille spécifiée
+    nombre_lignes = (hauteur + taille_dallage - 1) // taille_dallage
+    nombre_colonnes = (largeur + taille_dallage - 1) // taille_dallage
+    total_dalles = nombre_lignes * nombre_colonnes  # Total des dalles à traiter
+
+    tasks = [(chem_mns, i, j, taille_dallage, RepTra_DALLAGE_tmp, nom_generic, no_data, format_dalle)
+             for i in range(nombre_lignes) for j in range(nombre_colonnes)]
+
+    # Petites tâches très nombreuses : envoi par paquets pour limiter les échanges avec les workers
+    chunksize = max(1, min(64, total_dalles // (4 * iNbreCPU)))
+    if pool is not None:
+        resultats = list(tqdm(pool.imap_unordered(ecrire_dalle, tasks, chunksize=chunksize), total=total_dalles, desc="Découpage en dalles", unit="dalle"))
+    else:
+        with Pool(processes=iNbreCPU, initializer=init_worker_dallage, initargs=(chem_mns,)) as pool:
+            resultats = list(tqdm(pool.imap_unordered(ecrire_dalle, tasks, chunksize=chunksize), total=total_dalles, desc="Découpage en dalles", unit="dalle"))
+
+    nbre_ecrites = sum(resultats)
+    logger.info(f"[SAGA] Découpage : {nbre_ecrites} dalles écrites, {total_dalles - nbre_ecrites} dalles vides ignorées")
+    return nbre_ecrites
                 
 ################################################################################################################################
-def Creer_image_binaire(chem_out_final_expand_tmp, chem_out_final_expand, no_data_ext):
-    # Ouvrir l'image en mode lecture
-    logger.info(f"[SAGA] Creer_image_binaire de : {chem_out_final_expand_tmp} en {chem_out_final_expand}")
-    with rasterio.open(chem_out_final_expand_tmp) as src:
-        # Lire les métadonnées et les données de l'image
-        profile = src.profile
-        data = src.read(1)  # Lire la première bande
-
-        # Créer une image binaire où la valeur est 1 si le pixel vaut no_data_ext ou -99999, sinon 0
-        binary_data = np.where((data == no_data_ext) | (data == -99999), 1, 0).astype(np.uint8)
-
-        # Mettre à jour le profil pour un fichier de sortie binaire
-        profile.update(
-            dtype=rasterio.uint8,
-            count=1,
-            nodata=None,  # Pas de valeur nodata pour une image binaire
-            compress='lzw'  # Compression pour réduire la taille du fichier (optionnel)
-        )
-
-        # Créer l'image de sortie codée sur 1 bit
-        with rasterio.open(chem_out_final_expand, 'w', **profile) as dst:
-            dst.write(binary_data, 1)
-
-    logger.info(f"[SAGA] Creer_image_binaire OK")
-                    
-############################################################################################################
-def Raboutage_DALLAGE_SAGA(RepTra_DALLAGE_SAGA_in,RepTra_raboutage_tmp,chem_out,iNbreCPU):
-    #
-    dirs_col=[]
-    dirs_lig=[]
-    #
-    for root, dirs, files in os.walk(RepTra_DALLAGE_SAGA_in):
-        for dir_name in dirs:
-            if dir_name.startswith("DALLAGE"):
-                dirs_col.append(int(dir_name.split('_')[1]))
-                dirs_lig.append(int(dir_name.split('_')[2]))  
-    #
-    max_col = max(dirs_col)
-    max_lig = max(dirs_lig)
-    #
-    logger.info(f"[RABOUTAGE PAR LIGNE] max_col : {max_col}")
-    logger.info(f"[RABOUTAGE PAR LIGNE] max_lig : {max_lig}")
-    tasks = []
-    #
-    for col in range(max_col):
-        # 
-        liste_files=[]
-        #
-        for lig in range(max_lig):
+def binariser_ground_saga(data, no_data_ext, masque_nodata=None):
+    """Masque binaire SAGA : 1 (non-sol) si le pixel vaut no_data_ext, -99999 ou NaN, 0 (sol) sinon"""
+    binaire = (data == no_data_ext) | (data == -99999) | ~np.isfinite(data)
+    if masque_nodata is not None:
+        binaire |= masque_nodata
+    return binaire.astype(np.uint8)
+
+################################################################################################################################
+def lire_dalle_ground_binaire(args):
+    """Lit le ground.sdat d'une dalle SAGA et le binarise ; None si SAGA n'a rien produit"""
+    chem_ground, no_data_ext = args
+    if not os.path.isfile(chem_ground):
+        return None
+    try:
+        with rasterio.open(chem_ground) as src:
+            data = src.read(1, masked=True)
+            return binariser_ground_saga(data.data, no_data_ext, np.ma.getmaskarray(data))
+    except rasterio.errors.RasterioIOError as e:
+        logger.warning(f"[SAGA] Lecture impossible de {chem_ground}: {e}")
+        return None
+
+################################################################################################################################
+def Assembler_dalles_SAGA(RepTra_OUT_SAGA, chem_mns, taille_dallage, chem_out, no_data_ext, iNbreCPU, nom_generic='DALLAGE_', pool=None):
+    """
+    Assemble directement les ground.sdat de SAGA en masque binaire sol (0) / non-sol (1).
+
+    Chaque dalle DALLAGE_i_j est placée par son indice dans une image pré-allouée sur la
+    grille du MNS et binarisée à la lecture : ni conversion .sdat -> .tif, ni gdal_merge,
+    ni raster intermédiaire. Une dalle absente (vide ou en échec SAGA) reste à 1.
+    Les lectures passent par le pool de threads fourni (voie d'E/S du pipeline) ou, à défaut, par
+    un pool de iNbreCPU threads créé ici.
+    """
+    with rasterio.open(chem_mns) as src:
+        profile = src.profile.copy()
+        hauteur, largeur = src.height, src.width
+
+    masque = np.ones((hauteur, largeur), dtype=np.uint8)
+
+    dalles = []
+    for nom in os.listdir(RepTra_OUT_SAGA):
+        if not nom.startswith(nom_generic):
+            continue
+        ligne, colonne = (int(v) for v in nom[len(nom_generic):].split('_'))
+        dalles.append(((ligne - 1) * taille_dallage, (colonne - 1) * taille_dallage,
+                       os.path.join(RepTra_OUT_SAGA, nom, 'ground.sdat')))
+
+    logger.info(f"[SAGA] Assemblage de {len(dalles)} dalles dans une image {largeur}x{hauteur}")
+
+    # Lectures en threads : GDAL relâche le GIL pendant les entrées/sorties
+    taches = [(chem_ground, no_data_ext) for _, _, chem_ground in dalles]
+
+    def placer(resultats):
+        for (y_offset, x_offset, chem_ground), binaire in tqdm(zip(dalles, resultats), total=len(dalles), desc="Assemblage des ground.sdat de SAGA"):
+            if binaire is None:
+                continue
+            h = min(binaire.shape[0], hauteur - y_offset)
+            l = min(binaire.shape[1], largeur - x_offset)
+            masque[y_offset:y_offset + h, x_offset:x_offset + l] = binaire[:h, :l]
+
+    if pool is not None:
+        placer(pool.imap(lire_dalle_ground_binaire, taches))
+    else:
+        with ThreadPoolExecutor(max_workers=iNbreCPU) as executor:
+            placer(executor.map(lire_dalle_ground_binaire, taches))
+
+    profile.update(
+        dtype=rasterio.uint8,
+        count=1,
+        nodata=None,  # Pas de valeur nodata pour une image binaire
+        compress='lzw'
+    )
+    with rasterio.open(chem_out, 'w', **profile) as dst:
+        dst.write(masque, 1)
+
+    logger.info(f"[SAGA] Assemblage natif OK : {chem_out}")
 
-            #
-            folder_number_col = f"{col+1}"
-            folder_number_lig = f"{lig+1}"                
-            folder_name=f"DALLAGE_{folder_number_col}_{folder_number_lig}"
-            #
-            logger.info(f"recherche dans >> {os.path.join(RepTra_DALLAGE_SAGA_in,folder_name)}")
-            #
-            for root, dirs, files in os.walk(os.path.join(RepTra_DALLAGE_SAGA_in,folder_name)):
-                for file in files:
-                    if file.startswith('ground') and file.endswith("tif"):
-                        liste_files.append(os.path.join(root,file))
-
-        #rajouter un dossier de travail     
-        output_file = os.path.join(RepTra_raboutage_tmp,f"out_{col+1}.tif")  
-        cmd = f"gdal_merge.py -n -99999 -a_nodata -99999  -o {output_file} {' '.join(liste_files)} "
-        logger.info(f"[RABOUTAGE PAR LIGNE] : {cmd}")
-        #cmd = f"gdal_merge.py -n -99999 -a_nodata -99999  -o {output_file} {' '.join(liste_files)} > /dev/null 2>&1 "
-        tasks.append(cmd)
-
-    # # Initialize the pool
-    with Pool(processes=iNbreCPU, initializer=init_worker) as pool:
-        # run_task_sans_SORTIEMESSAGE // run_task
-        results = list(tqdm(pool.imap_unordered(run_task_sans_SORTIEMESSAGE, tasks), total=len(tasks), desc="RABOUTAGE des ground.tif par ligne / AVEC SORTIEMESSAGE "))
-        #results = list(tqdm(pool.imap_unordered(run_task_sans_SORTIEMESSAGE, tasks), total=len(tasks), desc="RABOUTAGE des ground.tif par ligne / SANS SORTIEMESSAGE"))
-        
-    tif_files = ' '.join([os.path.join(RepTra_raboutage_tmp,f'out_{col+1}.tif') for col in range(max_col)])
-    cmd = f"gdal_merge.py -n -99999 -a_nodata -99999  -o {chem_out} {tif_files} > /dev/null 2>&1 "
-    logger.info(f"[RABOUTAGE FINAL] : {cmd}")
-    os.system(cmd)
-    
 ####################################################################################################
 def parse_arguments():
 
@@ -457,7 +508,7 @@ def parse_arguments():
 
 ############################################################################################################
 #def main_saga_ground_extraction_avec_carte_pentes(args):
-def main_saga_ground_extraction_avec_carte_pentes(chem_mns, chem_out_final, RepTra, iNbreCPU, rayon, taille_dallage, no_data_ext, taille_voisinage=5, K=2, percentile=5, seuil_diff=15):
+def main_saga_ground_extraction_avec_carte_pentes(chem_mns, chem_out_final, RepTra, iNbreCPU, rayon, taille_dallage, no_data_ext, taille_voisinage=5, K=2, percentile=5, seuil_diff=15, executor=None):
     
     try:
 
@@ -476,18 +527,12 @@ def main_saga_ground_extraction_avec_carte_pentes(chem_mns, chem_out_final, RepT
         if not os.path.isdir(RepTra_tmp): os.mkdir(RepTra_tmp)
 
         #
-        chem_pente_filtree=os.path.join(RepTra_tmp,'pente_filtree.tif')
-        Calculer_pente_filtree(chem_mns, RepTra_tmp, chem_pente_filtree, percentile, taille_voisinage, seuil_diff)
-
-        time_tmp = time.time()
-        duration_tmp = time_tmp - start_time
-        logger.info(f"FIN Calcule de la carte des pentes & filtre - Durée d'exécution : {duration_tmp:.2f} secondes")        
-        #
+        # Carte des pentes, filtre et pente max par dalle en une seule passe
         chem_pente_par_dallle=os.path.join(RepTra_tmp,'pente_par_dallle.tif')
-        Daller_pente(chem_pente_filtree,chem_pente_par_dallle, taille_dallage)
+        Calculer_pente_par_dalle(chem_mns, chem_pente_par_dallle, taille_dallage, percentile, taille_voisinage, seuil_diff)
         time_tmp = time.time()
         duration_tmp = time_tmp - start_time
-        logger.info(f"FIN Dallage des Pentes - Durée d'exécution : {duration_tmp:.2f} secondes") 
+        logger.info(f"FIN Calcul de la carte des pentes, filtre & dallage des pentes - Durée d'exécution : {duration_tmp:.2f} secondes") 
 
         #
         RepTra_DALLAGE_tmp=os.path.join(RepTra_tmp,"DALLAGE")
@@ -495,7 +540,8 @@ def main_saga_ground_extraction_avec_carte_pentes(chem_mns, chem_out_final, RepT
         
         #
         logger.info(f"BEGIN Dallage du Chantier avec rasterio")
-        Decouper_image_en_dalles(chem_mns, taille_dallage, RepTra_DALLAGE_tmp, 'DALLAGE_')
+        Decouper_image_en_dalles(chem_mns, taille_dallage, RepTra_DALLAGE_tmp, 'DALLAGE_', iNbreCPU, no_data_ext, format_dalle='SAGA',
+                                 pool=executor.cpu if executor is not None else None)
         time_tmp = time.time()
         duration_tmp = time_tmp - start_time
         logger.info(f"FIN Dallage du Chantier avec rasterio - Durée d'exécution : {duration_tmp:.2f} secondes")         
@@ -508,55 +554,14 @@ def main_saga_ground_extraction_avec_carte_pentes(chem_mns, chem_out_final, RepT
         duration_tmp = time_tmp - start_time
         logger.info(f"FIN RUN de SAGA par dalle en // - Durée d'exécution : {duration_tmp:.2f} secondes")  
 
-        RepTra_OUT_SAGA_tmp_expand = os.path.expanduser(RepTra_OUT_SAGA_tmp)
-        chem_out_final_tmp=os.path.join(RepTra_tmp,'out_final_tmp.tif')
-        chem_out_final_expand_tmp  = os.path.expanduser(chem_out_final_tmp)
-        
-        # Créer la liste des tâches gdal
-        tasks_gdal = []
-        for root, dirs, files in os.walk(RepTra_OUT_SAGA_tmp_expand):
-            for f in files:
-                if f.startswith('ground') and f.endswith('sdat'):
-                    chem_in = os.path.join(root, f)
-                    chem_out = f"{chem_in[:-5]}.tif"
-                    cmd = f"gdal_translate {chem_in} {chem_out}"
-                    tasks_gdal.append(cmd)
-                    logger.info(cmd)
-        
-        # Utiliser le Pool de multiprocessing
-        # Utiliser imap_unordered pour traiter les commandes en parallèle
-        with Pool(processes=iNbreCPU) as pool:
-            list(tqdm(pool.imap_unordered(run_task_sans_SORTIEMESSAGE, tasks_gdal), total=len(tasks_gdal), desc="Convertir les .sdat de SAGA en .tif avec gdal_translate"))
-
-        time_tmp = time.time()
-        duration_tmp = time_tmp - start_time
-        logger.info(f"FIN Conversion des .sdat de SAGA en .tif en // - Durée d'exécution : {duration_tmp:.2f} secondes")  
-
-        RepTra_raboutage_tmp=os.path.join(RepTra_OUT_SAGA_tmp,'RABOUTAGE_tmp')
-
-        # 
-        if not os.path.isdir(RepTra_raboutage_tmp): 
-            os.mkdir(RepTra_raboutage_tmp)
-        else:
-            shutil.rmtree(RepTra_raboutage_tmp)
-            os.mkdir(RepTra_raboutage_tmp)
-        logger.info(f"RepTra_raboutage_tmp : {RepTra_raboutage_tmp}")
-
-        RepTra_raboutage_tmp_expand=  os.path.expanduser(RepTra_raboutage_tmp)
-
         ############################################################################################################
-        Raboutage_DALLAGE_SAGA(RepTra_OUT_SAGA_tmp_expand,RepTra_raboutage_tmp_expand,chem_out_final_expand_tmp,iNbreCPU)
-    
-        ################################################
-        end_time=time.time()
-        
+        chem_out_final_expand  = os.path.expanduser(chem_out_final)
+        Assembler_dalles_SAGA(os.path.expanduser(RepTra_OUT_SAGA_tmp), chem_mns, taille_dallage, chem_out_final_expand, no_data_ext, iNbreCPU,
+                              pool=executor.io if executor is not None else None)
+
         time_tmp = time.time()
         duration_tmp = time_tmp - start_time
-        logger.info(f"[SAGA] FIN Assemblage des ground.tif par paquet, avec gdal_merge, en // - Durée d'exécution : {duration_tmp:.2f} secondes")  
-        #print(f"[SAGA] FIN Assemblage des ground.tif par paquet, avec gdal_merge, en // - Durée d'exécution : {duration_tmp:.2f} secondes")  
-        #
-        chem_out_final_expand  = os.path.expanduser(chem_out_final)
-        Creer_image_binaire(chem_out_final_expand_tmp, chem_out_final_expand, no_data_ext)
+        logger.info(f"[SAGA] FIN Assemblage des ground.sdat - Durée d'exécution : {duration_tmp:.2f} secondes")  
         
         # Enregistrer l'heure de fin
         end_time = time.time()
@@ -574,7 +579,7 @@ def main_saga_ground_extraction_avec_carte_pentes(chem_mns, chem_out_final, RepT
 
 ############################################################################################################
 #def main_saga_ground_extraction(args):
-def main_saga_ground_extraction(chem_mns, chem_out_final, RepTra, iNbreCPU, rayon, taille_dallage, no_data_ext, pente, taille_voisinage=5, K=2, percentile=5, seuil_diff=15):
+def main_saga_ground_extraction(chem_mns, chem_out_final, RepTra, iNbreCPU, rayon, taille_dallage, no_data_ext, pente, taille_voisinage=5, K=2, percentile=5, seuil_diff=15, executor=None):
     
     try:
 
@@ -598,7 +603,8 @@ def main_saga_ground_extraction(chem_mns, chem_out_final, RepTra, iNbreCPU, rayo
         
         #
         logger.info(f"BEGIN Dallage du Chantier avec rasterio")
-        Decouper_image_en_dalles(chem_mns, taille_dallage, RepTra_DALLAGE_tmp, 'DALLAGE_')
+        Decouper_image_en_dalles(chem_mns, taille_dallage, RepTra_DALLAGE_tmp, 'DALLAGE_', iNbreCPU, no_data_ext, format_dalle='SAGA',
+                                 pool=executor.cpu if executor is not None else None)
         time_tmp = time.time()
         duration_tmp = time_tmp - start_time
         logger.info(f"FIN Dallage du Chantier avec rasterio - Durée d'exécution : {duration_tmp:.2f} secondes") 
@@ -613,56 +619,14 @@ def main_saga_ground_extraction(chem_mns, chem_out_final, RepTra, iNbreCPU, rayo
         duration_tmp = time_tmp - start_time
         logger.info(f"FIN RUN de SAGA par dalle en // - Durée d'exécution : {duration_tmp:.2f} secondes")  
 
-        RepTra_OUT_SAGA_tmp_expand = os.path.expanduser(RepTra_OUT_SAGA_tmp)
-        chem_out_final_tmp=os.path.join(RepTra_tmp,'out_final_tmp.tif')
-        chem_out_final_expand_tmp  = os.path.expanduser(chem_out_final_tmp)
-        
-        # Créer la liste des tâches gdal
-        tasks_gdal = []
-        for root, dirs, files in os.walk(RepTra_OUT_SAGA_tmp_expand):
-            for f in files:
-                if f.startswith('ground') and f.endswith('sdat'):
-                    chem_in = os.path.join(root, f)
-                    chem_out = f"{chem_in[:-5]}.tif"
-                    cmd = f"gdal_translate {chem_in} {chem_out}"
-                    tasks_gdal.append(cmd)
-                    logger.info(cmd)
-        
-        # Utiliser le Pool de multiprocessing
-        # Utiliser imap_unordered pour traiter les commandes en parallèle
-        ## NE JAMAIS UTILISER OS.SYSTEM DANS LA PARALLELISATION >> results = list(tqdm(pool.imap_unordered(os.system, tasks_gdal), total=len(tasks_gdal), desc="Convertir les .sdat de SAGA en .tif"))
-        with Pool(processes=iNbreCPU) as pool:
-            list(tqdm(pool.imap_unordered(run_task_sans_SORTIEMESSAGE, tasks_gdal), total=len(tasks_gdal), desc="Convertir les .sdat de SAGA en .tif avec gdal_translate"))
-
-        time_tmp = time.time()
-        duration_tmp = time_tmp - start_time
-        logger.info(f"FIN Conversion des .sdat de SAGA en .tif en // - Durée d'exécution : {duration_tmp:.2f} secondes")  
-
-        RepTra_raboutage_tmp=os.path.join(RepTra_OUT_SAGA_tmp,'RABOUTAGE_tmp')
-
-        # 
-        if not os.path.isdir(RepTra_raboutage_tmp): 
-            os.mkdir(RepTra_raboutage_tmp)
-        else:
-            shutil.rmtree(RepTra_raboutage_tmp)
-            os.mkdir(RepTra_raboutage_tmp)
-        logger.info(f"RepTra_raboutage_tmp : {RepTra_raboutage_tmp}")
-
-        RepTra_raboutage_tmp_expand=  os.path.expanduser(RepTra_raboutage_tmp)
-
         ############################################################################################################
-        Raboutage_DALLAGE_SAGA(RepTra_OUT_SAGA_tmp_expand,RepTra_raboutage_tmp_expand,chem_out_final_expand_tmp,iNbreCPU)
-    
-        ################################################
-        end_time=time.time()
-        
+        chem_out_final_expand  = os.path.expanduser(chem_out_final)
+        Assembler_dalles_SAGA(os.path.expanduser(RepTra_OUT_SAGA_tmp), chem_mns, taille_dallage, chem_out_final_expand, no_data_ext, iNbreCPU,
+                              pool=executor.io if executor is not None else None)
+
         time_tmp = time.time()
         duration_tmp = time_tmp - start_time
-        logger.info(f"[SAGA] FIN Assemblage des ground.tif par paquet, avec gdal_merge, en // - Durée d'exécution : {duration_tmp:.2f} secondes")  
-        #print(f"[SAGA] FIN Assemblage des ground.tif par paquet, avec gdal_merge, en // - Durée d'exécution : {duration_tmp:.2f} secondes")  
-        #
-        chem_out_final_expand  = os.path.expanduser(chem_out_final)
-        Creer_image_binaire(chem_out_final_expand_tmp, chem_out_final_expand, no_data_ext)
+        logger.info(f"[SAGA] FIN Assemblage des ground.sdat - Durée d'exécution : {duration_tmp:.2f} secondes")  
         
         # Enregistrer l'heure de fin
         end_time = time.time()
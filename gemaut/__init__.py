@@ -11,9 +11,9 @@ __author__ = "Nicolas Champion"
 __email__ = "nicolas.champion@ign.fr"
 
 # Imports principaux pour faciliter l'utilisation du package
+# (config et GEMAUTConfig sont légers ; le pipeline est importé au premier accès)
 from .config import *
 from .gemaut_config import GEMAUTConfig
-from .script_gemaut import main, GEMAUTPipeline
 
 __all__ = [
     'GEMAUTConfig',
@@ -21,3 +21,10 @@ __all__ = [
     'main',
 ]
 
+
+def __getattr__(name):
+    """Import paresseux de script_gemaut (rasterio, scipy...) à la première utilisation"""
+    if name in ('main', 'GEMAUTPipeline'):
+        from . import script_gemaut
+        return getattr(script_gemaut, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
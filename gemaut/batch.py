@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mode batch de GEMAUT : traitement de nombreux chantiers (feuilles MNS) en une invocation
+Un seul service d'exécution (voir executor_service) est partagé par tous les chantiers : les
+tuiles GEMO d'un chantier tournent pendant que le chantier suivant est préparé et découpé, et
+son assemblage pendant les tuiles du suivant.
+"""
+
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import typing
+from dataclasses import fields
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from . import config
+from .gemaut_config import GEMAUTConfig
+
+
+# Champs de GEMAUTConfig contenant des chemins (relatifs au manifeste s'ils ne sont pas absolus)
+PATH_FIELDS = ('mns_input', 'mnt_output', 'work_dir', 'mask_file', 'init_file')
+
+TRUE_VALUES = ('1', 'true', 'yes', 'oui', 'vrai')
+
+
+class BatchRunner:
+    """Exécute une liste de chantiers GEMAUT avec un pool de workers partagé"""
+
+    # Chantiers découpés dont GEMO ou l'assemblage sont en cours simultanément
+    JOBS_IN_FLIGHT = 2
+
+    def __init__(self, jobs: List[Dict[str, Any]], cpu_count: int):
+        """
+        Args:
+            jobs: Surcharges de GEMAUTConfig, une par chantier (voir load_manifest)
+            cpu_count: Taille du pool partagé
+        """
+        if cpu_count < 1:
+            raise ValueError(f"Nombre de CPU invalide: {cpu_count}")
+        self.jobs = jobs
+        self.cpu_count = cpu_count
+
+    @staticmethod
+    def load_manifest(manifest_file: str) -> List[Dict[str, Any]]:
+        """
+        Charge un manifeste de chantiers (YAML ou CSV)
+
+        YAML : {'defaults': {...}, 'jobs': [{...}, ...]} ou directement une liste de chantiers.
+        CSV : une ligne par chantier, en-tête = noms des champs de GEMAUTConfig, cellule vide = défaut.
+
+        Returns:
+            Liste de dictionnaires de paramètres typés, prêts pour GEMAUTConfig(**job)
+        """
+        base_dir = os.path.dirname(os.path.abspath(manifest_file))
+        ext = os.path.splitext(manifest_file)[1].lower()
+
+        if ext == '.csv':
+            with open(manifest_file, 'r', encoding='utf-8', newline='') as f:
+                defaults = {}
+                raw_jobs = [{k.strip(): v for k, v in row.items() if v not in (None, '')}
+                            for row in csv.DictReader(f)]
+        elif ext in ('.yaml', '.yml'):
+            import yaml
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            if isinstance(data, list):
+                defaults, raw_jobs = {}, data
+            else:
+                defaults, raw_jobs = data.get('defaults', {}) or {}, data.get('jobs', []) or []
+        else:
+            raise ValueError(f"Format de manifeste non supporté (YAML ou CSV attendu): {manifest_file}")
+
+        if not raw_jobs:
+            raise ValueError(f"Aucun chantier dans le manifeste: {manifest_file}")
+
+        return [BatchRunner._convert_job({**defaults, **job}, base_dir) for job in raw_jobs]
+
+    @staticmethod
+    def _convert_job(job: Dict[str, Any], base_dir: str) -> Dict[str, Any]:
+        """Vérifie les clés et convertit les valeurs selon les types de GEMAUTConfig"""
+        field_types = {f.name: f.type for f in fields(GEMAUTConfig)}
+        unknown = [key for key in job if key not in field_types]
+        if unknown:
+            raise ValueError(f"Paramètres inconnus dans le manifeste: {', '.join(unknown)}")
+
+        converted = {}
+        for key, value in job.items():
+            value = BatchRunner._convert_value(field_types[key], value)
+            if key in PATH_FIELDS and value is not None:
+                value = os.path.join(base_dir, os.path.expanduser(value))
+            converted[key] = value
+        return converted
+
+    @staticmethod
+    def _convert_value(field_type, value):
+        """Convertit une valeur (chaîne en CSV) vers le type du champ"""
+        if value is None:
+            return None
+        # Optional[X] -> X
+        args = [t for t in typing.get_args(field_type) if t is not type(None)]
+        if args:
+            field_type = args[0]
+        if typing.get_origin(field_type) is not None:
+            # Liste ou dictionnaire : déjà typé en YAML, JSON dans une cellule CSV
+            return json.loads(value) if isinstance(value, str) else value
+        if field_type is bool:
+            return value if isinstance(value, bool) else str(value).strip().lower() in TRUE_VALUES
+        if field_type in (int, float):
+            return field_type(float(value)) if field_type is int else float(value)
+        return str(value)
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Traite tous les chantiers
+
+        Le thread principal prépare et découpe les chantiers l'un après l'autre ; un chantier
+        découpé est confié à un thread qui exécute ses tuiles GEMO (run_tiles, avec reprises)
+        puis l'assemble, pendant que le suivant est préparé. Les tentatives GEMO de tous les
+        chantiers partagent un plafond de cpu_count jetons : la voie de calcul ne reçoit jamais
+        plus de tuiles que de workers et le découpage du chantier suivant n'attend pas la fin de
+        toutes les tuiles du précédent. Au plus JOBS_IN_FLIGHT chantiers sont en GEMO ou en
+        assemblage. Une erreur n'interrompt pas le batch.
+
+        Returns:
+            Un bilan par chantier : {'job', 'mnt_output', 'status', 'error', 'duration'}
+        """
+        from .executor_service import ExecutorService
+        from .script_gemaut import GEMAUTPipeline
+
+        reports = []
+        drivers: List[threading.Thread] = []
+        slots = threading.Semaphore(self.cpu_count)
+        nb_jobs = len(self.jobs)
+        logger.info(f"🚀 Batch GEMAUT: {nb_jobs} chantiers, pool partagé de {self.cpu_count} workers")
+
+        with ExecutorService(self.cpu_count) as executor:
+            for index, job in enumerate(self.jobs, start=1):
+                while len(drivers) >= BatchRunner.JOBS_IN_FLIGHT:
+                    drivers.pop(0).join()
+                start_time = time.time()
+                report = {'job': index, 'mnt_output': job.get('mnt_output'), 'status': 'erreur',
+                          'error': None, 'duration': 0.0}
+                reports.append(report)
+                logger.info(f"[{index}/{nb_jobs}] Préparation de {job.get('mns_input')}")
+                try:
+                    job = {'cpu_count': self.cpu_count, **job}
+                    pipeline = GEMAUTPipeline(GEMAUTConfig(**job), configure_logging=False, executor=executor)
+                    nbre_dalle_x, nbre_dalle_y = pipeline.prepare()
+                    pipeline._cut_tiles()
+                except Exception as e:
+                    self._record_failure(report, e, start_time)
+                    continue
+
+                # GEMO et assemblage du chantier pendant la préparation du suivant
+                driver = threading.Thread(target=self._finish_job, name=f"chantier-{index}",
+                                          args=(slots, pipeline, nbre_dalle_x, nbre_dalle_y, start_time, report))
+                driver.start()
+                drivers.append(driver)
+
+            for driver in drivers:
+                driver.join()
+
+        self._log_summary(reports)
+        return reports
+
+    @staticmethod
+    def _finish_job(slots, pipeline, nbre_dalle_x, nbre_dalle_y, start_time, report) -> None:
+        """Tuiles GEMO d'un chantier découpé (reprises, rapport d'incidents) puis assemblage"""
+        try:
+            pipeline._run_gemo_parallel(nbre_dalle_x, nbre_dalle_y, slots=slots)
+            pipeline.finalize(nbre_dalle_x, nbre_dalle_y, start_time)
+            report['status'] = 'succès'
+            report['duration'] = time.time() - start_time
+            logger.info(f"[{report['job']}] ✅ {report['mnt_output']} ({report['duration']:.1f}s)")
+        except Exception as e:
+            BatchRunner._record_failure(report, e, start_time)
+
+    @staticmethod
+    def _record_failure(report: Dict[str, Any], error: Exception, start_time: float) -> None:
+        report['error'] = str(error)
+        report['duration'] = time.time() - start_time
+        logger.error(f"[{report['job']}] ❌ Échec du chantier {report['mnt_output']}: {error}")
+
+    @staticmethod
+    def _log_summary(reports: List[Dict[str, Any]]) -> None:
+        failures = [r for r in reports if r['status'] != 'succès']
+        logger.info(f"Batch terminé: {len(reports) - len(failures)} succès, {len(failures)} échecs")
+        for report in failures:
+            logger.warning(f"  - chantier {report['job']} ({report['mnt_output']}): {report['error']}")
+
+
+def setup_batch_logging(manifest_file: str, verbose: bool = False) -> str:
+    """Un seul fichier de log pour tout le batch, à côté du manifeste"""
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    log_file_path = os.path.join(os.path.dirname(os.path.abspath(manifest_file)), f"log_batch_{timestamp}.txt")
+    logger.remove()
+    logger.add(log_file_path, level=config.LOG_LEVEL, format=config.LOG_FORMAT)
+    if verbose:
+        logger.add(sys.stderr, level=config.LOG_LEVEL, format=config.LOG_FORMAT)
+    return log_file_path
+
+
+def run_batch(manifest_file: str, cpu_count: Optional[int] = None, verbose: bool = False) -> List[Dict[str, Any]]:
+    """Charge un manifeste et traite tous ses chantiers"""
+    setup_batch_logging(manifest_file, verbose)
+    jobs = BatchRunner.load_manifest(manifest_file)
+    if cpu_count is None:
+        cpu_count = max(job.get('cpu_count', 1) for job in jobs)
+    return BatchRunner(jobs, cpu_count).run()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Stockage par blocs des rasters intermédiaires (backend de travail 'chunks')
+Un raster est un répertoire de blocs .npy mappés en mémoire et d'un fichier meta.json
+(dimensions, type, géoréférencement, no_data). Plusieurs workers peuvent y écrire en
+parallèle des fenêtres disjointes, et une fenêtre contenue dans un bloc est lue sans copie.
+Seuls les livrables sont écrits en GeoTIFF.
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from rasterio.windows import Window
+from rasterio.windows import transform as window_transform
+
+
+META_FILENAME = 'meta.json'
+
+
+class ChunkStore:
+    """
+    Raster mono-bande stocké en blocs .npy mappés en mémoire
+
+    Expose le sous-ensemble de l'API des datasets rasterio utilisé par le pipeline
+    (read, write, profile, meta, window_transform...) : voir open_raster.
+    """
+
+    def __init__(self, path: str, mode: str = 'r'):
+        """
+        Args:
+            path: Répertoire du raster
+            mode: 'r' (lecture seule) ou 'r+' (lecture et écriture)
+        """
+        if mode not in ('r', 'r+'):
+            raise ValueError(f"Mode d'ouverture invalide: {mode}")
+        with open(os.path.join(path, META_FILENAME), 'r') as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.mode = mode
+        self.width = meta['width']
+        self.height = meta['height']
+        self.dtype = meta['dtype']
+        self.chunk_size = meta['chunk_size']
+        self.nodata = meta['nodata']
+        self.transform = Affine(*meta['transform'])
+        self.crs = CRS.from_wkt(meta['crs']) if meta['crs'] else None
+        self.count = 1
+        self._chunks: Dict[Tuple[int, int], np.memmap] = {}
+
+    @staticmethod
+    def is_store(path: str) -> bool:
+        """Vrai si path est un raster ChunkStore"""
+        return os.path.isfile(os.path.join(path, META_FILENAME))
+
+    @staticmethod
+    def create(path: str, width: int, height: int, dtype, transform, crs=None,
+               nodata=None, chunk_size: int = 512) -> 'ChunkStore':
+        """
+        Crée un raster vide (blocs initialisés à nodata, ou à 0) et l'ouvre en écriture
+
+        Tous les blocs sont alloués ici : les workers n'ont ensuite qu'à ouvrir le raster
+        en 'r+' et écrire leurs fenêtres, sans coordination.
+        """
+        if ChunkStore.is_store(path):
+            # raster d'une exécution précédente, éventuellement de dimensions différentes
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
+        dtype = np.dtype(dtype).name
+        fill = 0 if nodata is None else nodata
+        for i in range(0, height, chunk_size):
+            for j in range(0, width, chunk_size):
+                shape = (min(chunk_size, height - i), min(chunk_size, width - j))
+                chunk = np.lib.format.open_memmap(
+                    ChunkStore._chunk_file(path, i // chunk_size, j // chunk_size),
+                    mode='w+', dtype=dtype, shape=shape)
+                chunk[:] = fill
+                chunk.flush()
+                del chunk
+
+        meta = {
+            'width': int(width),
+            'height': int(height),
+            'dtype': dtype,
+            'chunk_size': int(chunk_size),
+            'nodata': nodata,
+            'transform': list(transform)[:6],
+            'crs': crs.to_wkt() if crs else None
+        }
+        # meta.json en dernier : un répertoire sans meta n'est pas un raster valide
+        with open(os.path.join(path, META_FILENAME), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return ChunkStore(path, 'r+')
+
+    @staticmethod
+    def from_raster(raster_path: str, path: str, chunk_size: int = 512) -> 'ChunkStore':
+        """Convertit un raster (GeoTIFF...) en ChunkStore, par bandes de chunk_size lignes"""
+        with rasterio.open(raster_path) as src:
+            store = ChunkStore.create(path, src.width, src.height, src.dtypes[0], src.transform,
+                                      src.crs, src.nodata, chunk_size)
+            for r0 in range(0, src.height, chunk_size):
+                window = Window(0, r0, src.width, min(chunk_size, src.height - r0))
+                store.write(src.read(1, window=window), 1, window=window)
+        store.close()
+        return ChunkStore(path, 'r')
+
+    @staticmethod
+    def _chunk_file(path: str, i: int, j: int) -> str:
+        return os.path.join(path, f"{i}_{j}.npy")
+
+    def _chunk(self, i: int, j: int) -> np.memmap:
+        """Bloc (i, j), mappé à la première utilisation"""
+        chunk = self._chunks.get((i, j))
+        if chunk is None:
+            chunk = np.load(self._chunk_file(self.path, i, j), mmap_mode=self.mode)
+            self._chunks[(i, j)] = chunk
+        return chunk
+
+    def _chunk_ranges(self, window: Window):
+        """Parcourt les blocs couverts par window : (bloc, tranche dans le bloc, tranche dans la fenêtre)"""
+        r0, c0 = int(window.row_off), int(window.col_off)
+        r1, c1 = r0 + int(window.height), c0 + int(window.width)
+        if r0 < 0 or c0 < 0 or r1 > self.height or c1 > self.width:
+            raise ValueError(f"Fenêtre hors du raster {self.width}x{self.height}: {window}")
+        cs = self.chunk_size
+        for i in range(r0 // cs, (r1 - 1) // cs + 1):
+            lo_r, hi_r = max(r0, i * cs), min(r1, (i + 1) * cs)
+            for j in range(c0 // cs, (c1 - 1) // cs + 1):
+                lo_c, hi_c = max(c0, j * cs), min(c1, (j + 1) * cs)
+                yield ((i, j),
+                       (slice(lo_r - i * cs, hi_r - i * cs), slice(lo_c - j * cs, hi_c - j * cs)),
+                       (slice(lo_r - r0, hi_r - r0), slice(lo_c - c0, hi_c - c0)))
+
+    def read(self, indexes: int = 1, window: Optional[Window] = None) -> np.ndarray:
+        """
+        Lit une fenêtre (tout le raster par défaut)
+
+        Une fenêtre contenue dans un seul bloc est renvoyée sans copie (vue du memmap,
+        en lecture seule si le raster est ouvert en 'r').
+        """
+        if window is None:
+            window = Window(0, 0, self.width, self.height)
+        if int(window.width) == 0 or int(window.height) == 0:
+            return np.empty((int(window.height), int(window.width)), dtype=self.dtype)
+
+        ranges = list(self._chunk_ranges(window))
+        if len(ranges) == 1:
+            key, chunk_slice, _ = ranges[0]
+            return self._chunk(*key)[chunk_slice]
+
+        data = np.empty((int(window.height), int(window.width)), dtype=self.dtype)
+        for key, chunk_slice, data_slice in ranges:
+            data[data_slice] = self._chunk(*key)[chunk_slice]
+        return data
+
+    def write(self, data: np.ndarray, indexes: int = 1, window: Optional[Window] = None) -> None:
+        """Écrit une fenêtre ; des workers peuvent écrire des fenêtres disjointes en parallèle"""
+        if self.mode != 'r+':
+            raise PermissionError(f"Raster ouvert en lecture seule: {self.path}")
+        if window is None:
+            window = Window(0, 0, self.width, self.height)
+        if data.shape != (int(window.height), int(window.width)):
+            raise ValueError(f"Dimensions {data.shape} incompatibles avec la fenêtre {window}")
+        for key, chunk_slice, data_slice in self._chunk_ranges(window):
+            self._chunk(*key)[chunk_slice] = data[data_slice]
+
+    def window_transform(self, window: Window) -> Affine:
+        """Transformation affine d'une fenêtre"""
+        return window_transform(window, self.transform)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.height, self.width)
+
+    @property
+    def dtypes(self) -> Tuple[str]:
+        return (self.dtype,)
+
+    @property
+    def meta(self) -> Dict:
+        """Métadonnées au format rasterio (pilote GTiff pour les exports)"""
+        return {
+            'driver': 'GTiff',
+            'dtype': self.dtype,
+            'nodata': self.nodata,
+            'width': self.width,
+            'height': self.height,
+            'count': 1,
+            'crs': self.crs,
+            'transform': self.transform
+        }
+
+    @property
+    def profile(self) -> Dict:
+        return self.meta
+
+    def to_geotiff(self, output_path: str, **profile_updates) -> None:
+        """Exporte le raster en GeoTIFF (livrable), par bandes de chunk_size lignes"""
+        profile = self.meta
+        profile.update(profile_updates)
+        with rasterio.open(output_path, 'w', **profile) as dst:
+            for r0 in range(0, self.height, self.chunk_size):
+                window = Window(0, r0, self.width, min(self.chunk_size, self.height - r0))
+                dst.write(self.read(1, window=window).astype(profile['dtype'], copy=False), 1, window=window)
+
+    def close(self) -> None:
+        """Vide les écritures sur disque et libère les blocs mappés"""
+        for chunk in self._chunks.values():
+            if self.mode == 'r+':
+                chunk.flush()
+        self._chunks.clear()
+
+    def __enter__(self) -> 'ChunkStore':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def open_raster(path, mode: str = 'r'):
+    """
+    Ouvre un raster intermédiaire : vue en mémoire partagée si path est un SharedRasterSpec,
+    ChunkStore si path en est un, sinon rasterio
+    """
+    from .shared_rasters import SharedRasterSpec, SharedRasterView
+    if isinstance(path, SharedRasterSpec):
+        return SharedRasterView(path)
+    if ChunkStore.is_store(path):
+        return ChunkStore(path, mode)
+    return rasterio.open(path, mode)
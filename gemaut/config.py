@@ -13,6 +13,87 @@ DEFAULT_TILE_SIZE = 300
 DEFAULT_PAD_SIZE = 120
 DEFAULT_NORME = "hubertukey"
 
+# Plan de tuilage (tile_plan)
+TILE_PLANS = ['grid', 'quadtree']
+DEFAULT_TILE_PLAN = 'grid'          # 'quadtree' : dalles fusionnées ou subdivisées selon leur coût GEMO estimé
+TILE_PLAN_MERGE_LEVELS = 2          # Fusion jusqu'à 4 x 4 dalles nominales (subdivision en demi-dalles)
+TILE_PLAN_TARGET_COST = 1.5         # Coût par pixel d'une dalle nominale admis avant subdivision
+TILE_PLAN_PIXEL_COST = 0.05         # Coût d'un pixel hors zone, relativement à un pixel de la zone
+TILE_PLAN_RELIEF_REF = 20.0         # Dénivelé (m) d'une cellule pour lequel le coût de ses pixels augmente de 1
+TILE_PLAN_FILE = 'tile_plan.json'   # Plan quadtree du chantier (répertoire temporaire)
+
+# Reprise des raccords entre tuiles après l'assemblage (seam_repair)
+DEFAULT_SEAM_REPAIR = False         # Permet un recouvrement réduit (pad de 20 à 40 px)
+DEFAULT_SEAM_THRESHOLD = 0.5        # Écart (m) entre tuiles voisines au-delà duquel un raccord est repris
+SEAM_REPAIR_SEGMENT = 64            # Longueur (px) des tronçons de raccord évalués
+SEAM_REPAIR_MARGIN = 16             # Élargissement (px) de la fenêtre reprise autour du recouvrement
+
+# Budget du solveur GEMO (gradient conjugué de GSL, voir GEMO/src/GEA.cpp)
+DEFAULT_GEMO_MAX_ITER = 30000       # Plafond d'itérations
+DEFAULT_GEMO_TOL_GRAD = 1e-3        # Seuil du test de gradient (norme euclidienne sur la tuile)
+DEFAULT_GEMO_STEP = 0.01            # Pas initial de la recherche linéaire
+DEFAULT_GEMO_TOL_LINE = 1e-4        # Tolérance de la recherche linéaire
+SOLVER_BUDGETS = ['fixed', 'adaptive']
+DEFAULT_SOLVER_BUDGET = 'fixed'     # 'adaptive' : budget proportionnel à la taille utile de la tuile
+GEMO_ADAPTIVE_ITER_PER_SIDE = 50    # Itérations par pixel de côté (racine du nombre de pixels valides)
+GEMO_ADAPTIVE_MIN_ITER = 500        # Plancher d'itérations du budget adaptatif
+GEMO_ADAPTIVE_REF_PIXELS = DEFAULT_TILE_SIZE ** 2   # Tuile pour laquelle tol_grad est donné
+
+# Moteur de minimisation GEMO
+GEMO_ENGINES = ['native', 'extension', 'sparse', 'multigrid']
+DEFAULT_GEMO_ENGINE = 'native'      # 'native' : main_GEMAUT_unit ; 'extension' : GEA() via le module _gemo (gemo_native) ;
+                                    # 'sparse' : IRLS creux (gemo_sparse) ; 'multigrid' : IRLS multigrille (gemo_multigrid)
+SPARSE_METHODS = ['auto', 'direct', 'cg']
+DEFAULT_SPARSE_METHOD = 'auto'      # Factorisation directe en L2 jusqu'à GEMO_SPARSE_DIRECT_MAX_PIXELS, sinon CG
+GEMO_SPARSE_DIRECT_MAX_PIXELS = 250000
+GEMO_SPARSE_MAX_IRLS = 30           # Systèmes repondérés au plus par tuile
+GEMO_SPARSE_TOL_STEP = 1e-6         # Variation maximale de la solution normalisée entre deux systèmes
+GEMO_SPARSE_CG_RTOL = 1e-8          # Tolérance relative du gradient conjugué préconditionné
+GEMO_MULTIGRID_COARSEST = 24        # Côté du niveau grossier résolu par factorisation directe
+GEMO_MULTIGRID_SMOOTHING_DEGREE = 3 # Degré du lisseur de Chebyshev
+GEMO_MULTIGRID_SMOOTHING_RANGE = 10 # Le lisseur amortit les valeurs propres de [lambda_max / 10, lambda_max]
+GEMO_MULTIGRID_RTOL = 1e-8          # Tolérance relative du gradient conjugué multigrille
+
+# Raccourcis des tuiles triviales (gemo_fastpath)
+FAST_PATHS = ['off', 'budget', 'smooth']
+DEFAULT_FAST_PATH = 'off'           # 'budget' : budget réduit ; 'smooth' : MNS lissé pour les tuiles tout sol
+DEFAULT_FAST_PATH_CHECK = 0.0       # Fraction des tuiles raccourcies recalculées avec le solveur complet
+GEMO_FASTPATH_MIN_GROUND = 0.02     # Tuile 'sursol' : moins de 2 % de pixels sol dans la zone
+GEMO_FASTPATH_MIN_DOMAIN = 0.02     # Tuile 'hors_zone' : moins de 2 % de pixels hors masque 11
+GEMO_FASTPATH_BUDGET_FACTOR = 0.1   # Fraction de max_iter accordée aux tuiles triviales
+GEMO_FASTPATH_SMOOTH_SIGMA = 1.0    # Écart-type (pixels) du lissage des tuiles tout sol
+
+# Tolérance aux pannes des tuiles GEMO
+DEFAULT_TILE_TIMEOUT = 0            # Durée maximale d'une tentative (s), 0 = sans limite
+DEFAULT_MAX_RETRIES = 2             # Reprises d'une tuile en échec ou en timeout
+GEMO_RETRY_FALLBACKS = [            # Paramètres GEMO de la reprise i (le dernier sert aux suivantes)
+    {},                             # 1re reprise : mêmes paramètres (plantage transitoire)
+    {'norme': 'L2'}                 # 2e reprise : norme convexe, convergence assurée
+]
+DEFAULT_SPECULATION = True          # Copie des tuiles plus lentes que le p95 quand des CPU sont libres
+GEMO_SPECULATION_MIN_SAMPLES = 10   # Tuiles terminées nécessaires avant d'estimer le p95
+GEMO_INCIDENTS_FILE = 'GEMO_incidents.json'
+TRACE_SPANS_DIR = 'trace_spans'  # intervalles par processus, fusionnés dans le fichier --trace
+
+# Métriques d'avancement (--metrics-file, --metrics-port)
+METRICS_INTERVAL = 15.0           # période de mesure et de réécriture du fichier (s)
+METRICS_HOST = '127.0.0.1'        # point HTTP local uniquement
+GEMO_STATS_CSV_FILE = 'GEMO_STATS.csv'           # Télémétrie de convergence par tuile
+GEMO_STATS_RASTER_FILE = 'GEMO_STATS.tif'        # Même télémétrie, un pixel par tuile
+
+# Contrôle d'admission mémoire des tuiles GEMO (gemo_memory)
+DEFAULT_MEMORY_FRACTION = 0.8       # Budget : fraction de MemAvailable au lancement de GEMO, 0 = sans contrôle
+DEFAULT_WORKER_RLIMIT = False       # Plafond RLIMIT_DATA par worker (une tuile sous-estimée échoue au lieu du swap)
+GEMO_MEMORY_BYTES_PER_PIXEL = {     # Estimation conservatrice de la mémoire d'une tuile, par pixel
+    'native': 128,                  # vecteurs GSL tailleX*tailleY et images OpenCV Float64 de GEA()
+    'extension': 160,               # idem, plus les tableaux NumPy du worker
+    'sparse': 1024,                 # opérateurs creux, poids IRLS et remplissage de la factorisation
+    'multigrid': 512                # hiérarchie de grilles et lisseur
+}
+GEMO_MEMORY_TILE_OVERHEAD = 32 * 2**20      # Coût fixe d'une tuile (lecture, écriture, tampons GDAL)
+GEMO_WORKER_BASELINE = 256 * 2**20          # Marge d'un worker au-delà de sa mémoire au démarrage (imports, GDAL)
+GEMO_RLIMIT_HEADROOM = 2.0          # Marge du plafond d'un worker sur la tuile la plus lourde
+
 # Valeurs NoData
 DEFAULT_NODATA_EXT = -32768
 DEFAULT_NODATA_INT = -32767
@@ -25,7 +106,7 @@ TILE_SAGA = 100
 PENTE_SAGA = 15
 
 # Paramètres de calcul automatique de masque
-MASK_COMPUTATION_METHODS = ['saga', 'pdal']
+MASK_COMPUTATION_METHODS = ['saga', 'pdal', 'numpy']
 DEFAULT_MASK_METHOD = 'pdal'
 DEFAULT_MASK_COMPUTATION = True  # Calcul automatique par défaut
 
@@ -38,6 +119,44 @@ PDAL_CSF_RIGIDNESS = 5              # Changer 4 → 5
 PDAL_CSF_HDIFF = 0.2                # Ajouter cette constante
 PDAL_CSF_SMOOTH = True              # Ajouter cette constante
 
+# Paramètres du filtre morphologique progressif NumPy pour le calcul de masque
+NUMPY_PMF_DH0 = 0.3                 # Seuil de hauteur initial (m)
+NUMPY_PMF_DH_MAX = 2.5              # Seuil de hauteur maximal (m)
+NUMPY_PMF_BLOCK_SIZE = 1024         # Taille des blocs traités par worker (pixels, hors halo)
+
+# Taille des blocs d'empreinte pour la mise à jour incrémentale (pixels de la grille de travail)
+INCREMENTAL_BLOCK_SIZE = 64
+# Blocs d'empreinte du MNS source (pixels du MNS) : délimitent les régions à préparer de nouveau
+INCREMENTAL_SOURCE_BLOCK_SIZE = 256
+INCREMENTAL_SOURCE_HASHES_FILE = 'MNS_empreintes.json'   # répertoire temporaire, écrit avec le MNT
+
+# Backend des rasters intermédiaires : GeoTIFF, ou blocs .npy mappés en mémoire (écriture parallèle)
+SCRATCH_BACKENDS = ['geotiff', 'chunks']
+DEFAULT_SCRATCH_BACKEND = 'geotiff'
+CHUNK_STORE_CHUNK_SIZE = 512        # Taille des blocs (pixels de la grille de travail)
+
+# Entrées GEMO en mémoire partagée pour le découpage : 'auto' si elles tiennent dans
+# la fraction indiquée de la mémoire disponible. Désactivé par défaut : seul le découpage
+# lit la mémoire partagée, GEMO et l'assemblage relisent les fichiers des tuiles
+SHARED_MEMORY_MODES = ['auto', 'on', 'off']
+DEFAULT_SHARED_MEMORY = 'off'
+SHARED_MEMORY_MAX_RAM_FRACTION = 0.5
+
+# Service d'exécution du chantier : workers créés une fois, partagés par toutes les étapes
+EXECUTOR_IO_THREADS_PER_CPU = 2     # Threads de la voie entrées/sorties (commandes externes, lectures GDAL)
+EXECUTOR_GDAL_OPTIONS = {           # Configuration GDAL des workers de calcul
+    'GDAL_CACHEMAX': '256',                     # Mo de cache de blocs par worker
+    'GDAL_NUM_THREADS': '1',                    # un worker = un CPU
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR', # pas de listage des répertoires de tuiles
+}
+
+# Commandes externes (voir process_runner)
+PROCESS_STDERR_MAX_BYTES = 64 * 1024  # Fin de la sortie d'erreur conservée par commande
+COMMAND_TIMEOUTS = {                  # Durée maximale par exécutable (s), à défaut de timeout explicite
+    'saga_cmd': 1800,                 # une dalle SAGA
+    'gdalwarp': 7200,                 # sous-échantillonnage du chantier entier
+}
+
 # Paramètres de traitement des trous
 DEFAULT_WEIGHT_TYPE = 1  # Distance Euclidienne
 DEFAULT_EDGE_SIZE = 5
@@ -66,10 +185,19 @@ TEMP_FILES = {
     'init_sous_ech': 'INIT.tif'
 }
 
+# Rasters intermédiaires du backend 'chunks' (répertoires ChunkStore)
+TEMP_STORES = {
+    'mns_sous_ech': 'MNS_SousEch.chunks',
+    'masque_sous_ech': 'MASQUE_SousEch.chunks',
+    'init_sous_ech': 'INIT.chunks',
+    'mnt_out_tmp': 'OUT_MNT_tmp.chunks'
+}
+
 # Répertoires temporaires
 TEMP_DIRS = {
     'saga': 'RepTra_SAGA',
-    'tmp': 'tmp'
+    'tmp': 'tmp',
+    'incremental': 'Incremental_staging'   # entrées GEMO d'une mise à jour incrémentale en cours
 }
 
 # Paramètres de logging
@@ -8,10 +8,12 @@ Permet de charger les paramètres depuis un fichier YAML
 
 import yaml
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 from loguru import logger
 
+from .config import DEFAULT_SCRATCH_BACKEND, DEFAULT_SHARED_MEMORY, SCRATCH_BACKENDS, SHARED_MEMORY_MODES
+
 
 @dataclass
 class GEMAUTConfigFromFile:
@@ -29,15 +31,38 @@ class GEMAUTConfigFromFile:
     cpu_count: int = 8
     clean_temp: bool = False
     verbose: bool = False
+    scratch_backend: str = DEFAULT_SCRATCH_BACKEND
+    shared_memory: str = DEFAULT_SHARED_MEMORY
+    trace_file: Optional[str] = None
+    metrics_file: Optional[str] = None
+    metrics_port: Optional[int] = None
     
     # Paramètres GEMO
     sigma: float = 0.5
     regul: float = 0.01
     norme: str = "hubertukey"
+    gemo_engine: str = 'native'
+    sparse_method: str = 'auto'
+    max_iter: int = 30000
+    tol_grad: float = 1e-3
+    step: float = 0.01
+    tol_line: float = 1e-4
+    solver_budget: str = 'fixed'
+    fast_path: str = 'off'
+    fast_path_check: float = 0.0
+    tile_timeout: float = 0
+    max_retries: int = 2
+    fallbacks: Optional[List[Dict]] = None
+    speculation: bool = True
+    memory_fraction: float = 0.8
+    worker_rlimit: bool = False
     
     # Paramètres de tuilage
     tile_size: int = 300
     pad_size: int = 120
+    tile_plan: str = 'grid'
+    seam_repair: bool = False
+    seam_threshold: float = 0.5
     
     # Paramètres NoData
     nodata_ext: int = -32768
@@ -90,15 +115,39 @@ class ConfigManager:
                 cpu_count=processing_data.get('cpu_count', 8),
                 clean_temp=processing_data.get('clean_temp', False),
                 verbose=processing_data.get('verbose', False),
+                scratch_backend=processing_data.get('scratch_backend', DEFAULT_SCRATCH_BACKEND),
+                shared_memory=ConfigManager._parse_on_off(processing_data.get('shared_memory', DEFAULT_SHARED_MEMORY)),
+                trace_file=processing_data.get('trace_file'),
+                metrics_file=processing_data.get('metrics_file'),
+                metrics_port=processing_data.get('metrics_port'),
                 
                 # Paramètres GEMO
                 sigma=gemo_data.get('sigma', 0.5),
                 regul=gemo_data.get('regul', 0.01),
                 norme=gemo_data.get('norme', 'hubertukey'),
+                gemo_engine=gemo_data.get('engine', 'native'),
+                sparse_method=gemo_data.get('sparse_method', 'auto'),
+                max_iter=gemo_data.get('max_iter', 30000),
+                # float() : YAML lit '1e-3' (sans point décimal) comme une chaîne
+                tol_grad=float(gemo_data.get('tol_grad', 1e-3)),
+                step=float(gemo_data.get('step', 0.01)),
+                tol_line=float(gemo_data.get('tol_line', 1e-4)),
+                solver_budget=gemo_data.get('solver_budget', 'fixed'),
+                fast_path=ConfigManager._parse_on_off(gemo_data.get('fast_path', 'off')),
+                fast_path_check=float(gemo_data.get('fast_path_check', 0.0)),
+                tile_timeout=gemo_data.get('tile_timeout', 0),
+                max_retries=gemo_data.get('max_retries', 2),
+                fallbacks=gemo_data.get('fallbacks'),
+                speculation=gemo_data.get('speculation', True),
+                memory_fraction=float(gemo_data.get('memory_fraction', 0.8)),
+                worker_rlimit=gemo_data.get('worker_rlimit', False),
                 
                 # Paramètres de tuilage
                 tile_size=tiling_data.get('tile_size', 300),
                 pad_size=tiling_data.get('pad_size', 120),
+                tile_plan=tiling_data.get('plan', 'grid'),
+                seam_repair=tiling_data.get('seam_repair', False),
+                seam_threshold=float(tiling_data.get('seam_threshold', 0.5)),
                 
                 # Paramètres NoData
                 nodata_ext=nodata_data.get('external', -32768),
@@ -127,6 +176,13 @@ class ConfigManager:
             logger.error(f"Erreur lors du chargement de la configuration: {e}")
             raise
     
+    @staticmethod
+    def _parse_on_off(value) -> str:
+        """YAML lit on/off comme des booléens : les ramène à 'on'/'off'"""
+        if isinstance(value, bool):
+            return 'on' if value else 'off'
+        return str(value).lower()
+    
     @staticmethod
     def create_template(config_file: str) -> None:
         """Crée un fichier de configuration template"""
@@ -142,16 +198,39 @@ class ConfigManager:
                 'resolution': 4.0,
                 'cpu_count': 8,
                 'clean_temp': False,
-                'verbose': False
+                'verbose': False,
+                'scratch_backend': DEFAULT_SCRATCH_BACKEND,
+                'shared_memory': DEFAULT_SHARED_MEMORY,
+                'trace_file': None,
+                'metrics_file': None,
+                'metrics_port': None
             },
             'gemo': {
                 'sigma': 0.5,
                 'regul': 0.01,
-                'norme': 'hubertukey'
+                'norme': 'hubertukey',
+                'engine': 'native',
+                'sparse_method': 'auto',
+                'max_iter': 30000,
+                'tol_grad': 1e-3,
+                'step': 0.01,
+                'tol_line': 1e-4,
+                'solver_budget': 'fixed',
+                'fast_path': 'off',
+                'fast_path_check': 0.0,
+                'tile_timeout': 0,
+                'max_retries': 2,
+                'fallbacks': [{}, {'norme': 'L2'}],
+                'speculation': True,
+                'memory_fraction': 0.8,
+                'worker_rlimit': False
             },
             'tiling': {
                 'tile_size': 300,
-                'pad_size': 120
+                'pad_size': 120,
+                'plan': 'grid',
+                'seam_repair': False,
+                'seam_threshold': 0.5
             },
             'nodata': {
                 'external': -32768,
@@ -221,6 +300,39 @@ class ConfigManager:
         if config.regul <= 0:
             errors.append("regul doit être positif")
         
+        if config.gemo_engine not in ('native', 'extension', 'sparse', 'multigrid'):
+            errors.append("engine (gemo) doit valoir 'native', 'extension', 'sparse' ou 'multigrid'")
+        
+        if config.sparse_method not in ('auto', 'direct', 'cg'):
+            errors.append("sparse_method doit valoir 'auto', 'direct' ou 'cg'")
+        
+        if config.max_iter < 1:
+            errors.append("max_iter doit être positif")
+        
+        if config.tol_grad <= 0 or config.step <= 0 or config.tol_line <= 0:
+            errors.append("tol_grad, step et tol_line doivent être positifs")
+        
+        if config.solver_budget not in ('fixed', 'adaptive'):
+            errors.append("solver_budget doit valoir 'fixed' ou 'adaptive'")
+        
+        if config.fast_path not in ('off', 'budget', 'smooth'):
+            errors.append("fast_path doit valoir 'off', 'budget' ou 'smooth'")
+        
+        if not 0 <= config.fast_path_check <= 1:
+            errors.append("fast_path_check doit être compris entre 0 et 1")
+        
+        if config.tile_timeout < 0:
+            errors.append("tile_timeout doit être positif ou nul")
+        
+        if config.max_retries < 0:
+            errors.append("max_retries doit être positif ou nul")
+        
+        if config.fallbacks is not None and not all(isinstance(f, dict) for f in config.fallbacks):
+            errors.append("fallbacks doit être une liste de dictionnaires de paramètres GEMO")
+        
+        if not 0 <= config.memory_fraction <= 1:
+            errors.append("memory_fraction doit être compris entre 0 et 1")
+        
         if config.tile_size < 1:
             errors.append("tile_size doit être positif")
         
@@ -230,6 +342,21 @@ class ConfigManager:
         if config.pad_size >= config.tile_size:
             errors.append("pad_size doit être inférieur à tile_size")
         
+        if config.tile_plan not in ('grid', 'quadtree'):
+            errors.append("plan (tiling) doit valoir 'grid' ou 'quadtree'")
+        
+        if config.seam_threshold < 0:
+            errors.append("seam_threshold doit être positif ou nul")
+        
+        if config.scratch_backend not in SCRATCH_BACKENDS:
+            errors.append(f"scratch_backend invalide: {config.scratch_backend} (choix: {', '.join(SCRATCH_BACKENDS)})")
+        
+        if config.shared_memory not in SHARED_MEMORY_MODES:
+            errors.append(f"shared_memory invalide: {config.shared_memory} (choix: {', '.join(SHARED_MEMORY_MODES)})")
+        
+        if config.metrics_port is not None and not 0 < config.metrics_port < 65536:
+            errors.append("metrics_port doit être compris entre 1 et 65535")
+        
         # Afficher les erreurs
         if errors:
             error_msg = "Erreurs de configuration:\n" + "\n".join(f"  - {error}" for error in errors)
@@ -260,7 +387,30 @@ class ConfigManager:
             regul=config.regul,
             tile_size=config.tile_size,
             pad_size=config.pad_size,
+            tile_plan=getattr(config, 'tile_plan', 'grid'),
+            seam_repair=getattr(config, 'seam_repair', False),
+            seam_threshold=getattr(config, 'seam_threshold', 0.5),
             norme=config.norme,
+            gemo_engine=getattr(config, 'gemo_engine', 'native'),
+            sparse_method=getattr(config, 'sparse_method', 'auto'),
+            max_iter=getattr(config, 'max_iter', 30000),
+            tol_grad=getattr(config, 'tol_grad', 1e-3),
+            step=getattr(config, 'step', 0.01),
+            tol_line=getattr(config, 'tol_line', 1e-4),
+            solver_budget=getattr(config, 'solver_budget', 'fixed'),
+            fast_path=getattr(config, 'fast_path', 'off'),
+            fast_path_check=getattr(config, 'fast_path_check', 0.0),
+            tile_timeout=getattr(config, 'tile_timeout', 0),
+            max_retries=getattr(config, 'max_retries', 2),
+            retry_fallbacks=getattr(config, 'fallbacks', None),
+            speculation=getattr(config, 'speculation', True),
+            memory_fraction=getattr(config, 'memory_fraction', 0.8),
+            worker_rlimit=getattr(config, 'worker_rlimit', False),
+            scratch_backend=getattr(config, 'scratch_backend', DEFAULT_SCRATCH_BACKEND),
+            shared_memory=getattr(config, 'shared_memory', DEFAULT_SHARED_MEMORY),
+            trace_file=getattr(config, 'trace_file', None),
+            metrics_file=getattr(config, 'metrics_file', None),
+            metrics_port=getattr(config, 'metrics_port', None),
             clean_temp=config.clean_temp,
             verbose=config.verbose
         ) 
\ No newline at end of file
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service d'exécution du chantier GEMAUT
+Un seul jeu de workers, créé au démarrage du pipeline (le processus principal est encore
+léger : chaque fork copie peu de mémoire) et partagé par toutes les étapes au lieu d'un
+pool créé puis détruit par étape :
+- voie 'cpu' : pool de processus pour les calculs (découpage, GEMO, assemblage, raccords,
+  masque NumPy et dallage SAGA) ; chaque worker est initialisé une fois (signaux, logs,
+  configuration GDAL) ;
+- voie 'io' : pool de threads pour ce qui attend des entrées/sorties (lectures GDAL qui
+  relâchent le GIL, moteur GEMO 'extension', préparation des tuiles du moteur natif) ;
+- commandes : un ProcessRunner démarré (boucle asyncio dans un thread) qui lance les
+  main_GEMAUT_unit du moteur natif, au plus cpu_count à la fois, sans occuper de worker.
+Les autres commandes externes (saga_cmd, gdalwarp) ont leur propre runner : voir process_runner.
+Les tâches de toutes les étapes simultanées du graphe se partagent les cpu_count workers
+de calcul : c'est le budget de concurrence unique du chantier.
+"""
+
+import os
+import signal
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from typing import Dict, Optional
+
+from loguru import logger
+
+from . import config
+from .process_runner import ProcessRunner
+
+
+class ExecutorService:
+    """Pools de workers du chantier, partagés par les étapes du pipeline"""
+
+    def __init__(self, cpu_count: int, gdal_options: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            cpu_count: workers de la voie de calcul (budget de concurrence du chantier)
+            gdal_options: configuration GDAL des workers de calcul (config.EXECUTOR_GDAL_OPTIONS par défaut)
+        """
+        if cpu_count < 1:
+            raise ValueError(f"Nombre de CPU invalide: {cpu_count}")
+        self.cpu_count = cpu_count
+        self.io_threads = cpu_count * config.EXECUTOR_IO_THREADS_PER_CPU
+        self.gdal_options = dict(config.EXECUTOR_GDAL_OPTIONS if gdal_options is None else gdal_options)
+        self.cpu = Pool(processes=cpu_count, initializer=ExecutorService.init_worker,
+                        initargs=(self.gdal_options,))
+        self.io = ThreadPool(processes=self.io_threads)
+        self.commands = ProcessRunner(cpu_count).start()
+        self.closed = False
+        logger.info(f"⚙️ Service d'exécution: {cpu_count} workers de calcul, {self.io_threads} threads d'E/S")
+
+    @staticmethod
+    def init_worker(gdal_options: Dict[str, str]):
+        """Initialise un worker de calcul une fois pour toutes les étapes : signaux, logs, GDAL"""
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        logger.remove()
+        # Lues par GDAL à l'ouverture des jeux de données du worker
+        os.environ.update(gdal_options)
+
+    def lane(self, io_bound: bool = False):
+        """Pool de la voie demandée"""
+        return self.io if io_bound else self.cpu
+
+    def close(self) -> None:
+        """Attend la fin des tâches en cours et arrête les workers"""
+        if self.closed:
+            return
+        self.closed = True
+        for pool in (self.cpu, self.io):
+            pool.close()
+            pool.join()
+        self.commands.close()
+
+    def terminate(self) -> None:
+        """Arrête les workers sans attendre (après une erreur)"""
+        if self.closed:
+            return
+        self.closed = True
+        # Commandes d'abord : les threads qui les attendent sont ensuite arrêtés
+        self.commands.close()
+        for pool in (self.cpu, self.io):
+            pool.terminate()
+            pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+        return False
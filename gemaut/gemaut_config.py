@@ -8,7 +8,7 @@ Gère tous les paramètres et constantes du pipeline
 
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, List, Optional
 from . import config
 
 
@@ -35,7 +35,31 @@ class GEMAUTConfig:
     regul: float = config.DEFAULT_REGUL
     tile_size: int = config.DEFAULT_TILE_SIZE
     pad_size: int = config.DEFAULT_PAD_SIZE
+    tile_plan: str = config.DEFAULT_TILE_PLAN
     norme: str = config.DEFAULT_NORME
+    seam_repair: bool = config.DEFAULT_SEAM_REPAIR
+    seam_threshold: float = config.DEFAULT_SEAM_THRESHOLD
+    
+    # Moteur et budget du solveur GEMO
+    gemo_engine: str = config.DEFAULT_GEMO_ENGINE
+    sparse_method: str = config.DEFAULT_SPARSE_METHOD
+    max_iter: int = config.DEFAULT_GEMO_MAX_ITER
+    tol_grad: float = config.DEFAULT_GEMO_TOL_GRAD
+    step: float = config.DEFAULT_GEMO_STEP
+    tol_line: float = config.DEFAULT_GEMO_TOL_LINE
+    solver_budget: str = config.DEFAULT_SOLVER_BUDGET
+    fast_path: str = config.DEFAULT_FAST_PATH
+    fast_path_check: float = config.DEFAULT_FAST_PATH_CHECK
+    
+    # Tolérance aux pannes des tuiles GEMO
+    tile_timeout: float = config.DEFAULT_TILE_TIMEOUT
+    max_retries: int = config.DEFAULT_MAX_RETRIES
+    retry_fallbacks: Optional[List[Dict]] = None
+    speculation: bool = config.DEFAULT_SPECULATION
+    
+    # Contrôle d'admission mémoire des tuiles GEMO
+    memory_fraction: float = config.DEFAULT_MEMORY_FRACTION
+    worker_rlimit: bool = config.DEFAULT_WORKER_RLIMIT
     
     # Paramètres SAGA
     radius_saga: int = config.RADIUS_SAGA
@@ -51,6 +75,11 @@ class GEMAUTConfig:
     nodata_max: int = config.NODATA_MAX
     
     # Options de traitement
+    scratch_backend: str = config.DEFAULT_SCRATCH_BACKEND
+    shared_memory: str = config.DEFAULT_SHARED_MEMORY
+    trace_file: Optional[str] = None   # trace d'exécution Chrome trace (JSON), désactivée si None
+    metrics_file: Optional[str] = None  # métriques Prometheus (fichier texte), désactivées si None
+    metrics_port: Optional[int] = None  # point HTTP local /metrics, désactivé si None
     clean_temp: bool = False
     verbose: bool = False
     
@@ -75,6 +104,65 @@ class GEMAUTConfig:
         
         if self.resolution <= 0:
             raise ValueError(f"Résolution invalide: {self.resolution}")
+        
+        if self.gemo_engine not in config.GEMO_ENGINES:
+            raise ValueError(f"Moteur GEMO invalide: {self.gemo_engine} "
+                             f"(choix: {', '.join(config.GEMO_ENGINES)})")
+        
+        if self.gemo_engine == 'extension':
+            from .gemo_native import is_available
+            if not is_available():
+                raise ValueError("Moteur GEMO 'extension' indisponible: module _gemo introuvable "
+                                 "(compiler GEMO avec cmake -DGEMO_PYTHON=ON)")
+        
+        if self.sparse_method not in config.SPARSE_METHODS:
+            raise ValueError(f"Méthode de résolution creuse invalide: {self.sparse_method} "
+                             f"(choix: {', '.join(config.SPARSE_METHODS)})")
+        
+        if self.max_iter < 1:
+            raise ValueError(f"Nombre maximal d'itérations GEMO invalide: {self.max_iter}")
+        
+        if self.tol_grad <= 0 or self.step <= 0 or self.tol_line <= 0:
+            raise ValueError(f"Tolérances et pas GEMO strictement positifs attendus: "
+                             f"tol_grad={self.tol_grad}, step={self.step}, tol_line={self.tol_line}")
+        
+        if self.solver_budget not in config.SOLVER_BUDGETS:
+            raise ValueError(f"Budget de solveur invalide: {self.solver_budget} "
+                             f"(choix: {', '.join(config.SOLVER_BUDGETS)})")
+        
+        if self.fast_path not in config.FAST_PATHS:
+            raise ValueError(f"Raccourci GEMO invalide: {self.fast_path} "
+                             f"(choix: {', '.join(config.FAST_PATHS)})")
+        
+        if not 0 <= self.fast_path_check <= 1:
+            raise ValueError(f"Fraction de vérification des raccourcis invalide: {self.fast_path_check}")
+        
+        if self.tile_plan not in config.TILE_PLANS:
+            raise ValueError(f"Plan de tuilage invalide: {self.tile_plan} "
+                             f"(choix: {', '.join(config.TILE_PLANS)})")
+        
+        if self.seam_threshold < 0:
+            raise ValueError(f"Seuil de reprise des raccords invalide: {self.seam_threshold}")
+        
+        if self.tile_timeout < 0:
+            raise ValueError(f"Timeout de tuile invalide: {self.tile_timeout}")
+        
+        if self.max_retries < 0:
+            raise ValueError(f"Nombre de reprises invalide: {self.max_retries}")
+        
+        if not 0 <= self.memory_fraction <= 1:
+            raise ValueError(f"Fraction de mémoire GEMO invalide: {self.memory_fraction}")
+        
+        if self.scratch_backend not in config.SCRATCH_BACKENDS:
+            raise ValueError(f"Backend de travail invalide: {self.scratch_backend} "
+                             f"(choix: {', '.join(config.SCRATCH_BACKENDS)})")
+        
+        if self.shared_memory not in config.SHARED_MEMORY_MODES:
+            raise ValueError(f"Mode de mémoire partagée invalide: {self.shared_memory} "
+                             f"(choix: {', '.join(config.SHARED_MEMORY_MODES)})")
+        
+        if self.metrics_port is not None and not 0 < self.metrics_port < 65536:
+            raise ValueError(f"Port des métriques invalide: {self.metrics_port}")
     
     def _setup_paths(self):
         """Configure les chemins de fichiers temporaires"""
@@ -92,6 +180,20 @@ class GEMAUTConfig:
             'mnt_out_tmp': os.path.join(self.tmp_dir, config.TEMP_FILES['mnt_out_tmp']),
             'init_sous_ech': os.path.join(self.tmp_dir, config.TEMP_FILES['init_sous_ech'])
         }
+        
+        # Plan de tuilage quadtree du chantier
+        self.tile_plan_file = os.path.join(self.tmp_dir, config.TILE_PLAN_FILE)
+        
+        # Empreintes par bloc du MNS source (mise à jour incrémentale)
+        self.source_hashes_file = os.path.join(self.tmp_dir, config.INCREMENTAL_SOURCE_HASHES_FILE)
+        
+        # Rapport des tuiles GEMO en difficulté (conservé après --clean)
+        self.incident_manifest = os.path.join(self.work_dir, config.GEMO_INCIDENTS_FILE)
+        
+        # Rasters intermédiaires du backend 'chunks'
+        self.temp_stores = {
+            name: os.path.join(self.tmp_dir, dirname) for name, dirname in config.TEMP_STORES.items()
+        }
     
     def get_tile_dimensions(self):
         """Retourne les dimensions des tuiles"""
@@ -103,7 +205,32 @@ class GEMAUTConfig:
             'sigma': self.sigma,
             'lambda': self.regul,
             'norme': self.norme,
-            'no_data_value': self.nodata_ext
+            'no_data_value': self.nodata_ext,
+            'engine': self.gemo_engine,
+            'sparse_method': self.sparse_method,
+            'max_iter': self.max_iter,
+            'tol_grad': self.tol_grad,
+            'step': self.step,
+            'tol_line': self.tol_line,
+            'budget': self.solver_budget,
+            'fast_path': self.fast_path,
+            'fast_path_check': self.fast_path_check,
+            'timeout': self.tile_timeout or None
+        }
+    
+    def get_retry_policy(self):
+        """Retourne la politique de reprise des tuiles GEMO (voir GEMOExecutor.run_tiles)"""
+        return {
+            'max_retries': self.max_retries,
+            'fallbacks': self.retry_fallbacks if self.retry_fallbacks is not None else config.GEMO_RETRY_FALLBACKS,
+            'speculation': self.speculation
+        }
+    
+    def get_memory_policy(self):
+        """Retourne la politique mémoire des tuiles GEMO (voir GEMOExecutor.run_gemo_parallel)"""
+        return {
+            'fraction': self.memory_fraction,
+            'worker_rlimit': self.worker_rlimit
         }
     
     def get_saga_params(self):
@@ -127,6 +254,17 @@ class GEMAUTConfig:
             'csf_smooth': config.PDAL_CSF_SMOOTH
         }
     
+    def get_numpy_params(self):
+        """Retourne les paramètres du filtre NumPy pour le calcul de masque"""
+        return {
+            'radius': self.radius_saga,
+            'no_data_max': self.nodata_max,
+            'pente': self.pente_saga,
+            'dh0': config.NUMPY_PMF_DH0,
+            'dh_max': config.NUMPY_PMF_DH_MAX,
+            'block_size': config.NUMPY_PMF_BLOCK_SIZE
+        }
+    
     def create_directories(self):
         """Crée les répertoires nécessaires"""
         os.makedirs(self.work_dir, exist_ok=True)
@@ -154,7 +292,29 @@ class GEMAUTConfig:
             'regul': self.regul,
             'tile_size': self.tile_size,
             'pad_size': self.pad_size,
+            'tile_plan': self.tile_plan,
             'norme': self.norme,
+            'seam_repair': self.seam_repair,
+            'seam_threshold': self.seam_threshold,
+            'gemo_engine': self.gemo_engine,
+            'sparse_method': self.sparse_method,
+            'max_iter': self.max_iter,
+            'tol_grad': self.tol_grad,
+            'step': self.step,
+            'tol_line': self.tol_line,
+            'solver_budget': self.solver_budget,
+            'fast_path': self.fast_path,
+            'fast_path_check': self.fast_path_check,
+            'tile_timeout': self.tile_timeout,
+            'max_retries': self.max_retries,
+            'speculation': self.speculation,
+            'memory_fraction': self.memory_fraction,
+            'worker_rlimit': self.worker_rlimit,
+            'scratch_backend': self.scratch_backend,
+            'shared_memory': self.shared_memory,
+            'trace_file': self.trace_file,
+            'metrics_file': self.metrics_file,
+            'metrics_port': self.metrics_port,
             'clean_temp': self.clean_temp,
             'verbose': self.verbose
         } 
\ No newline at end of file
@@ -7,14 +7,52 @@ Gère l'exécution des commandes GEMO sur les tuiles
 """
 
 import os
+import shlex
 import subprocess
 import shutil
+import time
+import json
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import dataclass, field, asdict
 from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 from tqdm import tqdm
 import signal
+import numpy as np
 from loguru import logger
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from . import config
 from . import image_utils
+from .gemo_fastpath import GEMOFastPath
+from .gemo_memory import GEMOMemory, MemoryAdmission
+from .process_runner import ProcessRunner
+from .tracing import Tracer
+
+
+@dataclass
+class TileResult:
+    """Résultat d'une tentative GEMO sur une tuile"""
+    x: int
+    y: int
+    status: str                        # 'succès', 'copiée', 'échec', 'timeout' ou 'annulée'
+    attempt: int = 0                   # 0 = première exécution, puis numéro de reprise
+    speculative: bool = False          # copie lancée sur une tuile trop lente
+    returncode: Optional[int] = None
+    duration: float = 0.0
+    params: Dict = field(default_factory=dict)   # paramètres modifiés par rapport au chantier
+    stats: Dict = field(default_factory=dict)    # télémétrie GEMO (itérations, arrêt, énergie, gradient)
+    budget: Dict = field(default_factory=dict)   # budget du solveur appliqué (voir solver_budget)
+    tile_class: str = ''               # classe de la tuile (voir gemo_fastpath), si classée
+    fast_path: str = ''                # raccourci appliqué : '', 'budget' ou 'smooth'
+    message: str = ''
+    
+    @property
+    def ok(self) -> bool:
+        return self.status in ('succès', 'copiée')
+    
+    def __str__(self) -> str:
+        return self.message
 
 
 class GEMOExecutor:
@@ -23,6 +61,15 @@ class GEMOExecutor:
     # Commande GEMO unitaire
     GEMO_UNIT_CMD = 'main_GEMAUT_unit'
     
+    # Préfixe de la ligne de télémétrie écrite par main_GEMAUT_unit
+    STATS_PREFIX = 'GEMO_STATS '
+    
+    # Intervalle de surveillance du dispatcher (s)
+    POLL_INTERVAL = 0.2
+    
+    # Moteurs exécutés dans le worker, sans lancer main_GEMAUT_unit
+    INPROCESS_ENGINES = ('sparse', 'multigrid', 'extension')
+    
     @staticmethod
     def init_worker():
         """Initialise le worker pour ignorer les signaux d'interruption"""
@@ -30,28 +77,216 @@ class GEMOExecutor:
         logger.remove()
     
     @staticmethod
-    def run_command_without_output(cmd: str) -> int:
-        """Exécute une commande sans afficher la sortie"""
-        try:
-            result = subprocess.run(cmd, shell=True, 
-                                  stdout=subprocess.DEVNULL, 
-                                  stderr=subprocess.DEVNULL)
-            return result.returncode
-        except Exception as e:
-            logger.error(f"Erreur lors de l'exécution de la commande: {e}")
-            return -1
+    def run_command_supervised(argv: List[str], timeout: Optional[float] = None,
+                               cancel_file: Optional[str] = None,
+                               stdout_file: Optional[str] = None,
+                               runner: Optional[ProcessRunner] = None) -> Tuple[int, Optional[str], str]:
+        """
+        Exécute une commande sans shell, interrompue en cas de dépassement ou d'annulation
+        (voir ProcessRunner.run : GEMO est tué avec son groupe de processus)
+        
+        Args:
+            timeout: durée maximale en secondes (None ou 0 : pas de limite)
+            cancel_file: la commande est tuée dès que ce fichier existe
+            stdout_file: fichier recevant la sortie standard (ignorée par défaut)
+            runner: ProcessRunner démarré du chantier (sémaphore partagé) ; à défaut la commande
+                    est exécutée par une boucle propre à l'appel
+        
+        Returns:
+            (code de retour, None ou 'timeout' / 'annulée', fin de la sortie d'erreur)
+        """
+        if runner is not None:
+            result = runner.submit(argv, timeout or 0, cancel_file, stdout_file).result()
+        else:
+            result = ProcessRunner.run_command(argv, timeout or 0, cancel_file, stdout_file)
+        return result.returncode, result.reason, result.stderr
+    
+    @staticmethod
+    def parse_gemo_stats(output: str) -> Dict:
+        """
+        Extrait la ligne de télémétrie de main_GEMAUT_unit
+        
+        Format : GEMO_STATS {"iterations": ..., "stop": ..., "gsl_status": ..., "energy": ...,
+        "gradient_norm": ..., "size": [largeur, hauteur]}
+        
+        Returns:
+            Dictionnaire des statistiques, vide si la ligne est absente ou illisible
+            (binaire antérieur à la télémétrie, exécution interrompue)
+        """
+        for line in reversed(output.splitlines()):
+            if line.startswith(GEMOExecutor.STATS_PREFIX):
+                try:
+                    return json.loads(line[len(GEMOExecutor.STATS_PREFIX):])
+                except ValueError:
+                    return {}
+        return {}
     
     @staticmethod
     def build_gemo_command(mns_file: str, masque_file: str, init_file: str, 
                           output_file: str, sigma: float, lambda_val: float, 
-                          no_data_value: float, norme: str) -> str:
-        """Construit la commande GEMO pour une tuile"""
-        return f"{GEMOExecutor.GEMO_UNIT_CMD} {mns_file} {masque_file} {init_file} {output_file} {sigma:.5f} {lambda_val:.5f} {no_data_value:.5f} {norme}"
+                          no_data_value: float, norme: str, solver: Optional[Dict] = None) -> List[str]:
+        """Construit la liste d'arguments de GEMO pour une tuile (solver : budget du solveur, voir solver_budget)"""
+        argv = shlex.split(GEMOExecutor.GEMO_UNIT_CMD) + [
+            mns_file, masque_file, init_file, output_file,
+            f"{sigma:.5f}", f"{lambda_val:.5f}", f"{no_data_value:.5f}", norme]
+        if solver:
+            argv += [str(int(solver['max_iter'])), f"{solver['tol_grad']:g}", f"{solver['step']:g}",
+                     f"{solver['tol_line']:g}"]
+        return argv
+    
+    @staticmethod
+    def solver_budget(gemo_params: Dict, valid_pixels: Optional[int] = None) -> Dict:
+        """
+        Budget du solveur GEMO d'une tuile
+        
+        En mode 'fixed', les valeurs configurées. En mode 'adaptive' (valid_pixels requis) :
+        - le plafond d'itérations suit le côté utile de la tuile, le gradient conjugué progressant
+          d'environ un pixel par itération : GEMO_ADAPTIVE_ITER_PER_SIDE * sqrt(valid_pixels),
+          borné par GEMO_ADAPTIVE_MIN_ITER et max_iter ;
+        - le seuil de gradient, norme euclidienne sur toute la tuile, est ramené au nombre de
+          pixels valides (gradient moyen par pixel constant), sans jamais être plus strict que
+          tol_grad.
+        """
+        budget = {
+            'max_iter': int(gemo_params.get('max_iter', config.DEFAULT_GEMO_MAX_ITER)),
+            'tol_grad': float(gemo_params.get('tol_grad', config.DEFAULT_GEMO_TOL_GRAD)),
+            'step': float(gemo_params.get('step', config.DEFAULT_GEMO_STEP)),
+            'tol_line': float(gemo_params.get('tol_line', config.DEFAULT_GEMO_TOL_LINE))
+        }
+        if gemo_params.get('budget', config.DEFAULT_SOLVER_BUDGET) == 'adaptive' and valid_pixels is not None:
+            max_iter = int(np.ceil(config.GEMO_ADAPTIVE_ITER_PER_SIDE * np.sqrt(valid_pixels)))
+            budget['max_iter'] = min(budget['max_iter'], max(config.GEMO_ADAPTIVE_MIN_ITER, max_iter))
+            budget['tol_grad'] *= max(1.0, float(np.sqrt(valid_pixels / config.GEMO_ADAPTIVE_REF_PIXELS)))
+        return budget
     
     @staticmethod
-    def process_tile(args: tuple) -> str:
-        """Traite une tuile avec GEMO"""
-        x, y, rep_travail_tmp, gemo_params = args
+    def run_inprocess_gemo(mns_file: str, masque_file: str, init_file: str, output_file: str,
+                           gemo_params: Dict, budget: Dict,
+                           cancel_file: Optional[str] = None) -> Tuple[int, Optional[str], Dict, str]:
+        """
+        Exécute GEMO sur une tuile dans le processus courant, selon gemo_params['engine'] :
+        creux (gemo_sparse), multigrille (gemo_multigrid) ou GEA() natif via le module _gemo
+        (gemo_native)
+        
+        Le timeout et l'annulation sont vérifiés entre deux systèmes et entre deux itérations
+        du gradient conjugué (toutes les 50 itérations GSL pour _gemo). Pour les moteurs Python,
+        le seuil de gradient du budget est celui du solveur natif et max_iter borne les
+        itérations du gradient conjugué de chaque système.
+        
+        Returns:
+            (code de retour, None ou 'timeout' / 'annulée', statistiques de convergence, sortie
+            d'erreur toujours vide : même forme que run_solver)
+        """
+        from .gemo_sparse import GEMOInterrupted, SparseGEMOSolver
+        
+        timeout = gemo_params.get('timeout')
+        engine = gemo_params.get('engine')
+        try:
+            if engine == 'extension':
+                from .gemo_native import NativeGEMOSolver
+                solver = NativeGEMOSolver(gemo_params['sigma'], gemo_params['lambda'], gemo_params['norme'],
+                                          gemo_params['no_data_value'], budget)
+                stats = solver.process_files(mns_file, masque_file, init_file, output_file, timeout, cancel_file)
+            else:
+                from .gemo_multigrid import MultigridGEMOSolver
+                deadline = time.monotonic() + timeout if timeout else None
+                solver_class = MultigridGEMOSolver if engine == 'multigrid' else SparseGEMOSolver
+                solver = solver_class(gemo_params['sigma'], gemo_params['lambda'], gemo_params['norme'],
+                                      gemo_params['no_data_value'], budget['tol_grad'],
+                                      gemo_params.get('sparse_method', config.DEFAULT_SPARSE_METHOD),
+                                      max_cg_iter=budget['max_iter'])
+                stats = solver.process_files(mns_file, masque_file, init_file, output_file, deadline, cancel_file)
+        except GEMOInterrupted as e:
+            return 1, e.reason, {}, ''
+        return 0, None, stats, ''
+    
+    @staticmethod
+    def cancel_file(rep_travail_tmp: str, x: int, y: int) -> str:
+        """Fichier dont la présence interrompt les tentatives encore en cours sur une tuile"""
+        return os.path.join(rep_travail_tmp, f"Dalle_{x}_{y}", "ANNULER")
+    
+    @staticmethod
+    def run_solver(mns_file: str, masque_file: str, init_file: str, output_file: str, gemo_params: Dict,
+                   budget: Dict, cancel_file: str, stdout_name: str,
+                   runner: Optional[ProcessRunner] = None) -> Tuple[int, Optional[str], Dict, str]:
+        """
+        Minimisation GEMO d'une tuile avec le moteur du chantier
+        
+        Args:
+            stdout_name: fichier (dans le répertoire de la tuile) recevant la sortie de main_GEMAUT_unit
+            runner: ProcessRunner exécutant main_GEMAUT_unit (moteur natif, voir run_command_supervised)
+        
+        Returns:
+            (code de retour, None ou 'timeout' / 'annulée', statistiques de convergence,
+            fin de la sortie d'erreur de main_GEMAUT_unit)
+        """
+        if gemo_params.get('engine', config.DEFAULT_GEMO_ENGINE) in GEMOExecutor.INPROCESS_ENGINES:
+            # Moteurs en processus, dans le worker (opérateurs creux en cache d'une tuile à l'autre)
+            return GEMOExecutor.run_inprocess_gemo(mns_file, masque_file, init_file, output_file,
+                                                   gemo_params, budget, cancel_file)
+        
+        # Construire et exécuter la commande GEMO
+        cmd = GEMOExecutor.build_gemo_command(
+            mns_file, masque_file, init_file, output_file,
+            gemo_params['sigma'], gemo_params['lambda'], 
+            gemo_params['no_data_value'], gemo_params['norme'], budget
+        )
+        
+        #logger.debug(f"Exécution GEMO pour tuile: {cmd}")
+        chem_sortie = os.path.join(os.path.dirname(output_file), stdout_name)
+        returncode, reason, stderr = GEMOExecutor.run_command_supervised(
+            cmd, gemo_params.get('timeout'), cancel_file, chem_sortie, runner)
+        with open(chem_sortie, 'r', errors='replace') as f:
+            stats = GEMOExecutor.parse_gemo_stats(f.read())
+        os.remove(chem_sortie)
+        return returncode, reason, stats, stderr
+    
+    @staticmethod
+    def check_fast_path(mns_file: str, masque_file: str, init_file: str, fast_file: str, gemo_params: Dict,
+                        budget: Dict, cancel_file: str, runner: Optional[ProcessRunner] = None) -> Dict:
+        """
+        Recalcule une tuile raccourcie avec le solveur complet et mesure l'écart
+        
+        Returns:
+            {'reference_rmse', 'reference_max_error', 'reference_runtime'}, vide si le calcul
+            de référence échoue (le MNT raccourci est conservé)
+        """
+        chem_reference = fast_file.replace('.tif', '.reference.tif')
+        start = time.time()
+        try:
+            returncode, reason, _, _ = GEMOExecutor.run_solver(mns_file, masque_file, init_file, chem_reference,
+                                                            gemo_params, budget, cancel_file,
+                                                            "gemo_stdout.reference.txt", runner)
+            if reason is not None or returncode != 0 or not os.path.exists(chem_reference):
+                return {}
+            mesures = GEMOFastPath.compare_files(fast_file, chem_reference)
+            mesures['reference_runtime'] = time.time() - start
+            return mesures
+        finally:
+            if os.path.exists(chem_reference):
+                os.remove(chem_reference)
+    
+    @staticmethod
+    def process_tile(args: tuple, runner: Optional[ProcessRunner] = None) -> TileResult:
+        """
+        Traite une tuile avec GEMO
+        
+        Avec runner (moteur natif, voir run_tiles), process_tile tourne dans un thread du processus
+        principal et main_GEMAUT_unit est lancé par la boucle du runner, dans son sémaphore.
+        
+        Chaque tentative écrit son propre MNT, renommé en Out_MNT_x_y.tif en cas de succès :
+        une tentative interrompue ou concurrente ne laisse jamais de résultat partiel.
+        gemo_params peut contenir, en plus des paramètres GEMO, 'timeout' (s), 'attempt',
+        'speculative' et 'overrides' (paramètres de reprise, pour le rapport).
+        Avec 'fast_path' ('budget' ou 'smooth'), les tuiles triviales de la première tentative
+        sont raccourcies (voir gemo_fastpath) ; 'fast_path_check' est la fraction de ces tuiles
+        recalculées avec le solveur complet pour mesurer l'écart.
+        """
+        x, y, rep_travail_tmp, gemo_params, has_data = args
+        attempt = gemo_params.get('attempt', 0)
+        speculative = gemo_params.get('speculative', False)
+        result = TileResult(x, y, 'échec', attempt, speculative, params=gemo_params.get('overrides', {}))
+        start = time.time()
         
         try:
             # Chemins des fichiers pour cette tuile
@@ -61,107 +296,437 @@ class GEMOExecutor:
             chem_out_init = os.path.join(rep_dalle_xy, f"Out_INIT_{x}_{y}.tif")
             chem_out_mnt = os.path.join(rep_dalle_xy, f"Out_MNT_{x}_{y}.tif")
             
-            # Vérifier si la tuile contient des données valides
-            if image_utils.RasterProcessor.contains_valid_data(chem_out_mns, gemo_params['no_data_value']):
-                # Construire et exécuter la commande GEMO
-                cmd = GEMOExecutor.build_gemo_command(
-                    chem_out_mns, chem_out_masque, chem_out_init, chem_out_mnt,
-                    gemo_params['sigma'], gemo_params['lambda'], 
-                    gemo_params['no_data_value'], gemo_params['norme']
-                )
+            # Vérifier si la tuile contient des données valides (déjà connu si le découpage l'a établi)
+            if has_data is None:
+                has_data = image_utils.RasterProcessor.contains_valid_data(chem_out_mns, gemo_params['no_data_value'])
+            if has_data:
+                # MNT propre à la tentative
+                suffixe = f"{attempt}{'s' if speculative else ''}"
+                chem_tentative = os.path.join(rep_dalle_xy, f"Out_MNT_{x}_{y}.essai{suffixe}.tif")
+                cancel = GEMOExecutor.cancel_file(rep_travail_tmp, x, y)
                 
-                #logger.debug(f"Exécution GEMO pour tuile {x}_{y}: {cmd}")
-                result = GEMOExecutor.run_command_without_output(cmd)
+                # Classe de la tuile et raccourci (jamais sur une reprise)
+                policy = gemo_params.get('fast_path', config.DEFAULT_FAST_PATH)
+                if policy != 'off':
+                    result.tile_class, _ = GEMOFastPath.classify_files(chem_out_mns, chem_out_masque,
+                                                                       gemo_params['no_data_value'])
+                    if attempt == 0:
+                        result.fast_path = GEMOFastPath.choose(result.tile_class, policy)
+                
+                # Budget du solveur, selon le nombre de pixels valides en mode adaptatif
+                valid_pixels = None
+                if gemo_params.get('budget') == 'adaptive':
+                    valid_pixels, _ = image_utils.RasterProcessor.count_valid_pixels(
+                        chem_out_mns, gemo_params['no_data_value'])
+                full_budget = GEMOExecutor.solver_budget(gemo_params, valid_pixels)
+                result.budget = GEMOFastPath.reduced_budget(full_budget) if result.fast_path == 'budget' else full_budget
+                
+                stderr = ''
+                if result.fast_path == 'smooth':
+                    returncode, reason = 0, None
+                    result.stats = GEMOFastPath.smooth_files(chem_out_mns, chem_tentative, gemo_params['no_data_value'])
+                else:
+                    returncode, reason, result.stats, stderr = GEMOExecutor.run_solver(
+                        chem_out_mns, chem_out_masque, chem_out_init, chem_tentative, gemo_params,
+                        result.budget, cancel, f"gemo_stdout.essai{suffixe}.txt", runner)
+                result.returncode = returncode
                 
-                if result == 0:
-                    return f"Tuile {x}_{y} traitée avec succès"
+                if reason is None and returncode == 0 and os.path.exists(chem_tentative):
+                    if result.fast_path and GEMOFastPath.should_check(x, y, gemo_params.get('fast_path_check', 0)):
+                        result.stats.update(GEMOExecutor.check_fast_path(
+                            chem_out_mns, chem_out_masque, chem_out_init, chem_tentative, gemo_params,
+                            full_budget, cancel, runner))
+                    os.replace(chem_tentative, chem_out_mnt)
+                    result.status = 'succès'
+                    result.message = f"Tuile {x}_{y} traitée avec succès"
                 else:
-                    return f"Erreur lors du traitement de la tuile {x}_{y} (code: {result})"
+                    if os.path.exists(chem_tentative):
+                        os.remove(chem_tentative)
+                    result.status = reason or 'échec'
+                    detail = reason or (f"code: {returncode}" if returncode != 0 else "MNT absent")
+                    if stderr.strip():
+                        detail += f", {stderr.strip().splitlines()[-1]}"
+                    result.message = f"Erreur lors du traitement de la tuile {x}_{y} ({detail})"
             else:
                 # Copier le MNS vers le MNT si pas de données valides
                 shutil.copyfile(chem_out_mns, chem_out_mnt)
-                return f"Tuile {x}_{y} copiée (pas de données valides)"
+                result.status = 'copiée'
+                result.message = f"Tuile {x}_{y} copiée (pas de données valides)"
                 
         except Exception as e:
             logger.error(f"Erreur lors du traitement de la tuile {x}_{y}: {e}")
-            return f"Erreur lors du traitement de la tuile {x}_{y}: {e}"
+            result.message = f"Erreur lors du traitement de la tuile {x}_{y}: {e}"
+        
+        result.duration = time.time() - start
+        Tracer.record('gemo', 'tuile', start, start + result.duration, x=x, y=y, attempt=attempt,
+                      speculative=speculative, status=result.status, fast_path=result.fast_path,
+                      engine=gemo_params.get('engine'))
+        return result
     
     @staticmethod
-    def run_gemo_parallel(rep_travail_tmp: str, nbre_dalle_x: int, nbre_dalle_y: int,
-                         gemo_params: Dict, cpu_count: int) -> None:
-        """Exécute GEMO en parallèle sur toutes les tuiles"""
+    def build_tasks(rep_travail_tmp: str, nbre_dalle_x: int, nbre_dalle_y: int,
+                    gemo_params: Dict, tiles=None, has_data=None) -> List[tuple]:
+        """
+        Prépare les arguments de process_tile pour chaque tuile d'un chantier
         
-        # Préparer les arguments pour chaque tuile
+        Args:
+            tiles: ensemble de couples (x, y) à traiter ; toutes les tuiles si None
+            has_data: présence de données valides par tuile, renvoyée par le découpage ;
+                      à défaut process_tile relit le MNS de la tuile
+        """
+        has_data = has_data or {}
         tasks = []
         for x in range(nbre_dalle_x):
             for y in range(nbre_dalle_y):
-                tasks.append((x, y, rep_travail_tmp, gemo_params))
-        
-        logger.info(f"Lancement de GEMO sur {len(tasks)} tuiles avec {cpu_count} CPUs")
-        
-        # Exécuter en parallèle
-        with Pool(processes=cpu_count, initializer=GEMOExecutor.init_worker) as pool:
-            results = list(tqdm(
-                pool.imap_unordered(GEMOExecutor.process_tile, tasks), 
-                total=len(tasks), 
-                desc="Lancement de GEMO unitaire en parallèle"
-            ))
-        
-        # Analyser les résultats
-        success_count = sum(1 for result in results if "succès" in result)
+                if tiles is None or (x, y) in tiles:
+                    tasks.append((x, y, rep_travail_tmp, gemo_params, has_data.get((x, y))))
+        return tasks
+    
+    @staticmethod
+    def log_results(results: List[TileResult]) -> int:
+        """Analyse les résultats de process_tile et retourne le nombre d'erreurs"""
+        success_count = sum(1 for result in results if result.ok)
         error_count = len(results) - success_count
         
         logger.info(f"Traitement GEMO terminé: {success_count} succès, {error_count} erreurs")
         
+        # Effet des raccourcis sur les tuiles triviales
+        shortcut = [r for r in results if r.fast_path and r.status == 'succès']
+        if shortcut:
+            full = [r.duration for r in results if r.status == 'succès' and not r.fast_path]
+            par_type = ', '.join(f"{p}: {sum(1 for r in shortcut if r.fast_path == p)}" for p in ('budget', 'smooth'))
+            logger.info(f"⚡ Raccourcis GEMO: {len(shortcut)} tuiles ({par_type}), durée moyenne "
+                        f"{np.mean([r.duration for r in shortcut]):.2f}s"
+                        + (f" contre {np.mean(full):.2f}s en calcul complet" if full else ""))
+            checked = [r for r in shortcut if 'reference_rmse' in r.stats]
+            if checked:
+                logger.info(f"   Vérification sur {len(checked)} tuiles: écart RMS max "
+                            f"{max(r.stats['reference_rmse'] for r in checked):.3f} m, écart max "
+                            f"{max(r.stats['reference_max_error'] for r in checked):.3f} m, calcul complet "
+                            f"{np.mean([r.stats['reference_runtime'] for r in checked]):.2f}s en moyenne")
+        
         # Afficher les erreurs si il y en a
         if error_count > 0:
             logger.warning("Erreurs détectées:")
             for result in results:
-                if "Erreur" in result:
+                if not result.ok:
                     logger.warning(f"  - {result}")
+        
+        return error_count
+    
+    @staticmethod
+    def _retry_task(task: tuple, attempt: int, fallbacks: List[Dict]) -> tuple:
+        """Tâche de reprise : paramètres de repli de la reprise attempt (le dernier est réutilisé)"""
+        x, y, rep_travail_tmp, gemo_params, has_data = task
+        overrides = dict(fallbacks[min(attempt, len(fallbacks)) - 1]) if fallbacks else {}
+        params = {**gemo_params, **overrides, 'attempt': attempt, 'speculative': False, 'overrides': overrides}
+        return (x, y, rep_travail_tmp, params, has_data)
+    
+    @staticmethod
+    def run_tiles(pool, tasks: List[tuple], in_flight: int, max_retries: int = 0,
+                  fallbacks: Optional[List[Dict]] = None, speculation: bool = False,
+                  admission=None, metrics=None, runner: Optional[ProcessRunner] = None,
+                  slots=None) -> Tuple[List[TileResult], Dict[Tuple[int, int], List[TileResult]]]:
+        """
+        Exécute les tuiles sur un pool avec reprises et exécution spéculative
+        
+        Au plus in_flight tentatives sont soumises à la fois. Une tuile en échec (code de retour,
+        MNT absent ou timeout) est relancée jusqu'à max_retries fois, avec fallbacks[i - 1]
+        fusionné aux paramètres GEMO pour la reprise i. Quand plus aucune tuile n'attend et que
+        des workers sont libres, une copie est lancée pour chaque tuile dont la durée dépasse le
+        p95 des tuiles terminées ; la première tentative réussie l'emporte et l'autre est annulée.
+        Avec admission (MemoryAdmission, voir gemo_memory), une tentative n'est soumise que si
+        son estimation mémoire tient dans le budget restant : la première tâche en attente qui
+        tient est lancée, les plus lourdes attendent la fin de tuiles en cours.
+        Avec metrics (ProductionMetrics, voir metrics), l'avancement est publié à chaque tour.
+        Avec runner (moteur natif), pool est un pool de threads du processus principal : chaque
+        tentative y prépare sa tuile et main_GEMAUT_unit est lancé par la boucle unique du runner,
+        qui borne les commandes simultanées et applique timeout et fichier d'annulation.
+        Avec slots (threading.Semaphore partagé par les chantiers d'un batch), chaque tentative
+        prend en plus un jeton, rendu à sa fin : les tuiles de chantiers simultanés ne dépassent
+        pas ce plafond commun et la file du pool ne contient jamais plus de tâches que de jetons.
+        
+        Returns:
+            (résultat final par tuile, historique des tentatives par tuile)
+        """
+        fallbacks = fallbacks or []
+        pending = deque(tasks)
+        running = {}                 # AsyncResult -> (tâche, date de soumission)
+        history: Dict[Tuple[int, int], List[TileResult]] = {}
+        final: Dict[Tuple[int, int], TileResult] = {}
+        speculated = set()
+        durations = []
+        
+        def submit(task):
+            x, y, rep_travail_tmp = task[:3]
+            if not task[3].get('speculative'):
+                cancel = GEMOExecutor.cancel_file(rep_travail_tmp, x, y)
+                if os.path.exists(cancel):
+                    os.remove(cancel)
+            if admission is not None:
+                admission.acquire(task)
+            running[pool.apply_async(GEMOExecutor.process_tile, (task, runner))] = (task, time.time())
+        
+        def next_admitted():
+            # Première tâche en attente qui tient dans le budget mémoire
+            if admission is None:
+                return 0
+            for i, task in enumerate(pending):
+                if admission.admits(task, len(running)):
+                    return i
+            return None
+        
+        if metrics is not None:
+            metrics.tiles_started(len(tasks))
+        try:
+            with tqdm(total=len(tasks), desc="Lancement de GEMO unitaire en parallèle") as pbar:
+                while pending or running:
+                    while pending and len(running) < in_flight:
+                        i = next_admitted()
+                        if i is None or (slots is not None and not slots.acquire(blocking=False)):
+                            break
+                        task = pending[i]
+                        del pending[i]
+                        submit(task)
+                    
+                    # Workers libres et plus rien en attente : copie des tuiles anormalement lentes
+                    if speculation and not pending and len(running) < in_flight \
+                            and len(durations) >= config.GEMO_SPECULATION_MIN_SAMPLES:
+                        seuil = float(np.percentile(durations, 95))
+                        now = time.time()
+                        for task, submitted in list(running.values()):
+                            key = (task[0], task[1])
+                            if len(running) >= in_flight:
+                                break
+                            if key in speculated or key in final or now - submitted <= seuil:
+                                continue
+                            if admission is not None and not admission.admits(task, len(running)):
+                                continue
+                            if slots is not None and not slots.acquire(blocking=False):
+                                break
+                            speculated.add(key)
+                            submit((*task[:3], {**task[3], 'speculative': True}, task[4]))
+                            logger.info(f"Tuile {key[0]}_{key[1]}: copie spéculative après {now - submitted:.1f}s (p95 {seuil:.1f}s)")
+                    
+                    if metrics is not None:
+                        metrics.tiles_progress(len(final), sum(not r.ok for r in final.values()), len(running), in_flight)
+                    finished = [async_result for async_result in running if async_result.ready()]
+                    if not finished:
+                        time.sleep(GEMOExecutor.POLL_INTERVAL)
+                        continue
+                    
+                    for async_result in finished:
+                        task, submitted = running.pop(async_result)
+                        if admission is not None:
+                            admission.release(task)
+                        if slots is not None:
+                            slots.release()
+                        x, y, rep_travail_tmp, gemo_params = task[:4]
+                        key = (x, y)
+                        try:
+                            result = async_result.get()
+                        except Exception as e:
+                            result = TileResult(x, y, 'échec', gemo_params.get('attempt', 0),
+                                                gemo_params.get('speculative', False),
+                                                duration=time.time() - submitted,
+                                                message=f"Erreur lors du traitement de la tuile {x}_{y}: {e}")
+                        history.setdefault(key, []).append(result)
+                        
+                        if key in final:
+                            continue
+                        others = [t for t, _ in running.values() if (t[0], t[1]) == key]
+                        if result.ok:
+                            final[key] = result
+                            if result.status == 'succès':
+                                durations.append(result.duration)
+                            if others:
+                                # La tentative concurrente est tuée par process_tile
+                                open(GEMOExecutor.cancel_file(rep_travail_tmp, x, y), 'w').close()
+                            pbar.update(1)
+                        elif others:
+                            # L'autre tentative (originale ou copie) est encore en cours
+                            continue
+                        elif result.attempt < max_retries:
+                            retry = GEMOExecutor._retry_task(task, result.attempt + 1, fallbacks)
+                            logger.warning(f"Tuile {x}_{y}: {result.status}, reprise {result.attempt + 1}/{max_retries} "
+                                           f"{retry[3]['overrides'] or ''}")
+                            pending.appendleft(retry)
+                        else:
+                            final[key] = result
+                            pbar.update(1)
+        finally:
+            # Tentatives abandonnées sur erreur : leurs jetons reviennent aux autres chantiers
+            if slots is not None:
+                for _ in running:
+                    slots.release()
+        
+        if metrics is not None:
+            metrics.tiles_progress(len(final), sum(not r.ok for r in final.values()), 0, in_flight)
+        return list(final.values()), history
+    
+    @staticmethod
+    def write_incident_manifest(manifest_file: str, history: Dict[Tuple[int, int], List[TileResult]]) -> int:
+        """
+        Écrit le rapport JSON des tuiles qui ont eu besoin d'aide (reprise, copie spéculative ou échec)
+        
+        Returns:
+            Nombre de tuiles listées
+        """
+        incidents = []
+        for (x, y), attempts in sorted(history.items()):
+            final_status = 'succès' if any(a.ok for a in attempts) else attempts[-1].status
+            if len(attempts) == 1 and attempts[0].ok:
+                continue
+            incidents.append({
+                'tile': f"{x}_{y}",
+                'final_status': final_status,
+                'attempts': [{k: v for k, v in asdict(a).items() if k not in ('x', 'y')} for a in attempts]
+            })
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump({'tiles': incidents}, f, indent=2, ensure_ascii=False)
+        return len(incidents)
+    
+    @staticmethod
+    def check_failures(results: List[TileResult], manifest_file: Optional[str]) -> None:
+        """Lève une erreur explicite si des tuiles n'ont aucun MNT (l'assemblage échouerait)"""
+        failed = [r for r in results if not r.ok]
+        if failed:
+            tiles = ', '.join(f"{r.x}_{r.y}" for r in failed[:10])
+            raise RuntimeError(f"{len(failed)} tuiles GEMO en échec ({tiles}{'...' if len(failed) > 10 else ''})"
+                               + (f", voir {manifest_file}" if manifest_file else ""))
+    
+    @staticmethod
+    def run_gemo_parallel(rep_travail_tmp: str, nbre_dalle_x: int, nbre_dalle_y: int,
+                         gemo_params: Dict, cpu_count: int, pool=None, tiles=None, has_data=None,
+                         retry_policy: Optional[Dict] = None, manifest_file: Optional[str] = None,
+                         telemetry=None, memory_policy: Optional[Dict] = None, metrics=None,
+                         runner: Optional[ProcessRunner] = None, slots=None) -> List[TileResult]:
+        """
+        Exécute GEMO en parallèle sur toutes les tuiles
+        
+        Le moteur natif (main_GEMAUT_unit) n'occupe pas de worker : les tuiles sont préparées
+        dans des threads et les commandes lancées par un seul ProcessRunner du processus
+        principal. Seuls les moteurs en processus ('sparse', 'multigrid') utilisent des workers.
+        
+        Args:
+            pool: pool existant (service d'exécution du pipeline, mode batch) : workers pour les
+                  moteurs en processus, threads pour 'extension' et le moteur natif ; à défaut un
+                  pool de cpu_count workers ou threads est créé pour ce chantier
+            runner: ProcessRunner démarré, partagé avec pool pour le moteur natif (voir run_tiles) ;
+                    à défaut un runner de cpu_count commandes est créé pour ce chantier
+            slots: plafond de tentatives partagé avec d'autres chantiers (mode batch, voir run_tiles)
+            tiles: ensemble de couples (x, y) à traiter ; toutes les tuiles si None
+            has_data: présence de données valides par tuile (voir build_tasks)
+            retry_policy: {'max_retries', 'fallbacks', 'speculation'} (voir run_tiles) ; aucune reprise si None
+            manifest_file: rapport JSON des tuiles en difficulté
+            telemetry: GemoTelemetry recevant les résultats (voir gemo_stats), y compris en cas d'échec
+            memory_policy: {'fraction', 'worker_rlimit'} : admission des tuiles dans une fraction de
+                           MemAvailable et plafond mémoire des workers ou commandes GEMO lancés ici
+                           (voir gemo_memory) ;
+                           pas de contrôle si None
+            metrics: ProductionMetrics recevant l'avancement des tuiles (voir metrics)
+        
+        Returns:
+            Résultat retenu pour chaque tuile
+        
+        Raises:
+            RuntimeError: si des tuiles restent en échec après les reprises
+        """
+        
+        # Préparer les arguments pour chaque tuile
+        tasks = GEMOExecutor.build_tasks(rep_travail_tmp, nbre_dalle_x, nbre_dalle_y, gemo_params, tiles, has_data)
+        
+        logger.info(f"Lancement de GEMO sur {len(tasks)} tuiles avec {cpu_count} CPUs")
+        
+        # Budget mémoire : admission des tuiles et plafond des workers
+        memory_policy = memory_policy or {}
+        admission = MemoryAdmission.from_fraction(memory_policy.get('fraction', 0))
+        initializer, initargs = GEMOExecutor.init_worker, ()
+        data_limit = None
+        if admission is not None:
+            largest = admission.largest(tasks)
+            logger.info(f"🧮 Budget mémoire GEMO: {admission.budget / 2**20:.0f} Mo, "
+                        f"tuile la plus lourde {largest / 2**20:.0f} Mo estimés")
+            if memory_policy.get('worker_rlimit'):
+                data_limit = GEMOMemory.worker_limit(admission.budget, cpu_count, largest)
+                initializer, initargs = GEMOMemory.init_worker, (data_limit,)
+        
+        # Exécuter en parallèle
+        retry_policy = retry_policy or {}
+        engine = gemo_params.get('engine', config.DEFAULT_GEMO_ENGINE)
+        if engine not in GEMOExecutor.INPROCESS_ENGINES:
+            # Moteur natif : threads de préparation, commandes dans la boucle d'un seul runner
+            with ExitStack() as stack:
+                if pool is None:
+                    pool = stack.enter_context(ThreadPool(processes=cpu_count))
+                if runner is None:
+                    runner = stack.enter_context(ProcessRunner(cpu_count, data_limit=data_limit))
+                results, history = GEMOExecutor.run_tiles(pool, tasks, cpu_count, admission=admission,
+                                                          metrics=metrics, runner=runner, slots=slots, **retry_policy)
+        elif pool is not None:
+            results, history = GEMOExecutor.run_tiles(pool, tasks, cpu_count, admission=admission,
+                                                      metrics=metrics, slots=slots, **retry_policy)
+        elif engine == 'extension':
+            # GEA() relâche le GIL : threads du processus courant, sans démarrage de workers
+            # (le plafond par worker ne s'applique pas à des threads)
+            with ThreadPool(processes=cpu_count) as pool:
+                results, history = GEMOExecutor.run_tiles(pool, tasks, cpu_count, admission=admission,
+                                                          metrics=metrics, slots=slots, **retry_policy)
+        else:
+            with Pool(processes=cpu_count, initializer=initializer, initargs=initargs) as pool:
+                results, history = GEMOExecutor.run_tiles(pool, tasks, cpu_count, admission=admission,
+                                                          metrics=metrics, slots=slots, **retry_policy)
+        if admission is not None:
+            logger.info(f"🧮 Pic de mémoire estimée: {admission.peak / 2**20:.0f} Mo "
+                        f"sur {admission.budget / 2**20:.0f} Mo")
+        
+        # Analyser les résultats
+        GEMOExecutor.log_results(results)
+        if manifest_file:
+            count = GEMOExecutor.write_incident_manifest(manifest_file, history)
+            if count:
+                logger.warning(f"⚠️ {count} tuiles ont nécessité une reprise ou une copie: {manifest_file}")
+        if telemetry is not None:
+            telemetry.write(results)
+        GEMOExecutor.check_failures(results, manifest_file)
+        return results
 
 
 class GDALProcessor:
     """Classe pour les opérations GDAL"""
     
     @staticmethod
-    def run_gdal_command(cmd: str, description: str = "") -> None:
-        """Exécute une commande GDAL"""
-        try:
-            if description:
-                logger.info(f"{description}: {cmd}")
-            
-            result = subprocess.run(cmd, shell=True, 
-                                  stdout=subprocess.DEVNULL, 
-                                  stderr=subprocess.DEVNULL)
-            
-            if result.returncode != 0:
-                logger.error(f"Erreur lors de l'exécution de la commande GDAL: {cmd}")
-                raise subprocess.CalledProcessError(result.returncode, cmd)
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de l'exécution GDAL: {e}")
-            raise
+    def run_gdal_command(argv: List[str], description: str = "") -> None:
+        """Exécute une commande GDAL (liste d'arguments, sans shell ; voir ProcessRunner)"""
+        cmd = ' '.join(argv)
+        if description:
+            logger.info(f"{description}: {cmd}")
+        
+        result = ProcessRunner.run_command(argv)
+        if not result.ok:
+            logger.error(f"Erreur lors de l'exécution de la commande GDAL ({result.reason or result.returncode}): {cmd}")
+            if result.stderr.strip():
+                logger.error(result.stderr.strip())
+            raise subprocess.CalledProcessError(result.returncode, argv, stderr=result.stderr)
     
     @staticmethod
     def resample_raster(input_file: str, output_file: str, resolution: float, 
                        src_nodata: float, dst_nodata: float, output_type: str = None) -> None:
         """Rééchantillonne un raster avec GDAL"""
-        cmd_parts = [
+        argv = [
             "gdalwarp",
-            f"-tr {resolution:.10f} {resolution:.10f}",
-            f"-srcnodata {src_nodata}",
-            f"-dstnodata {dst_nodata}",
+            "-tr", f"{resolution:.10f}", f"{resolution:.10f}",
+            "-srcnodata", str(src_nodata),
+            "-dstnodata", str(dst_nodata),
             input_file,
             output_file,
             "-overwrite"
         ]
         
         if output_type:
-            cmd_parts.insert(-2, f"-ot {output_type}")
+            argv[-3:-3] = ["-ot", output_type]
         
-        cmd = " ".join(cmd_parts)
-        GDALProcessor.run_gdal_command(cmd, f"Sous-échantillonnage à la résolution de {resolution} mètres")
+        GDALProcessor.run_gdal_command(argv, f"Sous-échantillonnage à la résolution de {resolution} mètres")
     
     @staticmethod
     def resample_mns(input_file: str, output_file: str, resolution: float, 
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Raccourcis GEMO pour les tuiles triviales
+Les tuiles sont classées d'après leur masque avant la minimisation :
+    - 'sol' : tous les pixels de la zone sont au sol (masque 0), champs ouverts ;
+    - 'sursol' : presque aucun pixel sol parmi les pixels de la zone (îlots urbains denses) ;
+    - 'hors_zone' : tuile presque entièrement en masque 11 ;
+    - 'standard' : les autres.
+Selon la politique fast_path, les tuiles triviales reçoivent un budget de solveur réduit
+('budget'), ou, pour les tuiles 'sol', un simple lissage du MNS à la place de GEMO ('smooth').
+Une fraction des tuiles raccourcies peut être recalculée avec le solveur complet
+(fast_path_check) : l'écart et le temps de référence sont enregistrés dans la télémétrie
+pour valider le raccourci sur des sites de référence.
+"""
+
+import zlib
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+from scipy import ndimage
+
+from . import config
+
+
+class GEMOFastPath:
+    """Classement des tuiles et solutions rapides"""
+
+    @staticmethod
+    def classify(mne: np.ndarray, masque: np.ndarray, no_data_value: float) -> Tuple[str, Dict]:
+        """
+        Classe d'une tuile d'après son masque (0 sol, 255 sursol, 11 hors zone) et son MNS
+
+        Returns:
+            (classe, {'ground_fraction', 'domain_fraction'})
+        """
+        zone = (masque != config.NODATA_INTERNE_MASK) & (mne != no_data_value)
+        n_zone = int(zone.sum())
+        n_sol = int(((masque == 0) & zone).sum())
+        mesures = {'domain_fraction': n_zone / max(1, masque.size),
+                   'ground_fraction': n_sol / max(1, n_zone)}
+        if mesures['domain_fraction'] < config.GEMO_FASTPATH_MIN_DOMAIN:
+            return 'hors_zone', mesures
+        if n_sol == n_zone:
+            return 'sol', mesures
+        if mesures['ground_fraction'] < config.GEMO_FASTPATH_MIN_GROUND:
+            return 'sursol', mesures
+        return 'standard', mesures
+
+    @staticmethod
+    def classify_files(mns_file: str, masque_file: str, no_data_value: float) -> Tuple[str, Dict]:
+        """classify sur les fichiers d'une tuile"""
+        with rasterio.open(mns_file) as src:
+            mne = src.read(1)
+        with rasterio.open(masque_file) as src:
+            masque = src.read(1)
+        return GEMOFastPath.classify(mne, masque, no_data_value)
+
+    @staticmethod
+    def choose(tile_class: str, policy: str) -> str:
+        """Raccourci appliqué à une classe : '' (solveur complet), 'budget' ou 'smooth'"""
+        if policy == 'off' or tile_class == 'standard':
+            return ''
+        if policy == 'smooth' and tile_class == 'sol':
+            return 'smooth'
+        return 'budget'
+
+    @staticmethod
+    def reduced_budget(budget: Dict) -> Dict:
+        """Budget du solveur des tuiles triviales : itérations réduites, plancher GEMO_ADAPTIVE_MIN_ITER"""
+        max_iter = int(budget['max_iter'] * config.GEMO_FASTPATH_BUDGET_FACTOR)
+        return dict(budget, max_iter=min(budget['max_iter'], max(config.GEMO_ADAPTIVE_MIN_ITER, max_iter)))
+
+    @staticmethod
+    def smooth_files(mns_file: str, output_file: str, no_data_value: float) -> Dict:
+        """
+        MNT d'une tuile tout sol : MNS lissé (gaussienne de GEMO_FASTPATH_SMOOTH_SIGMA pixels),
+        écrit comme main_GEMAUT_unit (float64, géoréférencement du MNS)
+
+        Returns:
+            Statistiques au format GEMO_STATS (engine 'smooth')
+        """
+        with rasterio.open(mns_file) as src:
+            mne = src.read(1).astype(np.float64)
+            profile = {'driver': 'GTiff', 'dtype': 'float64', 'count': 1, 'width': src.width,
+                       'height': src.height, 'crs': src.crs, 'transform': src.transform}
+        valide = mne != no_data_value
+        # Moyenne pondérée par les pixels valides : le nodata n'est pas diffusé
+        poids = ndimage.gaussian_filter(valide.astype(np.float64), config.GEMO_FASTPATH_SMOOTH_SIGMA, mode='nearest')
+        lisse = ndimage.gaussian_filter(np.where(valide, mne, 0.), config.GEMO_FASTPATH_SMOOTH_SIGMA, mode='nearest')
+        mnt = np.where(valide, lisse / np.maximum(poids, 1e-12), mne)
+        with rasterio.open(output_file, 'w', **profile) as dst:
+            dst.write(mnt, 1)
+        return {'iterations': 0, 'stop': 'converged', 'engine': 'smooth', 'size': [profile['width'], profile['height']]}
+
+    @staticmethod
+    def should_check(x: int, y: int, ratio: float) -> bool:
+        """Tuile tirée pour la vérification (tirage reproductible d'un chantier à l'autre)"""
+        if ratio <= 0:
+            return False
+        return zlib.crc32(f"{x}_{y}".encode()) % 10000 < ratio * 10000
+
+    @staticmethod
+    def compare_files(fast_file: str, reference_file: str, no_data_value: Optional[float] = None) -> Dict:
+        """Écarts (m) entre le MNT raccourci et le MNT du solveur complet"""
+        with rasterio.open(fast_file) as src:
+            fast = src.read(1).astype(np.float64)
+        with rasterio.open(reference_file) as src:
+            reference = src.read(1).astype(np.float64)
+        valide = np.isfinite(fast) & np.isfinite(reference)
+        if no_data_value is not None:
+            valide &= reference != no_data_value
+        ecart = (fast - reference)[valide]
+        if ecart.size == 0:
+            return {}
+        return {'reference_rmse': float(np.sqrt(np.mean(ecart ** 2))),
+                'reference_max_error': float(np.abs(ecart).max())}
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contrôle d'admission mémoire des tuiles GEMO
+GEMO alloue par tuile plusieurs vecteurs tailleX*tailleY en double et des images OpenCV
+Float64 ; avec de grandes tuiles et beaucoup de CPU, cpu_count solveurs simultanés font
+swapper le nœud ou déclenchent l'OOM killer. La mémoire de chaque tuile est estimée d'après
+ses dimensions et le moteur (GEMO_MEMORY_BYTES_PER_PIXEL) ; une tuile n'est lancée que si
+la somme des estimations des tuiles en cours reste dans le budget, une fraction de
+MemAvailable : la concurrence s'adapte à la mémoire au lieu de planter.
+En option, chaque worker reçoit un plafond RLIMIT_DATA (hérité par main_GEMAUT_unit) : une
+tuile dont l'estimation est trop optimiste échoue seule et passe par les reprises.
+"""
+
+import os
+from typing import Dict, Optional
+
+import rasterio
+from loguru import logger
+
+from . import config
+
+
+class GEMOMemory:
+    """Estimation de la mémoire des tuiles et budget du nœud"""
+
+    @staticmethod
+    def available() -> int:
+        """MemAvailable en octets (mémoire libre à défaut de /proc/meminfo, 0 si inconnue)"""
+        try:
+            with open('/proc/meminfo', 'r') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        from .shared_rasters import available_memory
+        return available_memory()
+
+    @staticmethod
+    def budget(fraction: float) -> int:
+        """Budget mémoire des tuiles GEMO (octets), 0 si le contrôle est désactivé ou impossible"""
+        if fraction <= 0:
+            return 0
+        return int(fraction * GEMOMemory.available())
+
+    @staticmethod
+    def tile_bytes(width: int, height: int, engine: str) -> int:
+        """Mémoire estimée d'une tuile de width x height pixels avec le moteur engine"""
+        per_pixel = config.GEMO_MEMORY_BYTES_PER_PIXEL.get(engine, max(config.GEMO_MEMORY_BYTES_PER_PIXEL.values()))
+        return width * height * per_pixel + config.GEMO_MEMORY_TILE_OVERHEAD
+
+    @staticmethod
+    def task_bytes(task: tuple) -> int:
+        """Mémoire estimée d'une tâche de process_tile (0 pour une tuile sans données, copiée)"""
+        x, y, rep_travail_tmp, gemo_params, has_data = task
+        if has_data is False:
+            return 0
+        with rasterio.open(os.path.join(rep_travail_tmp, f"Dalle_{x}_{y}", f"Out_MNS_{x}_{y}.tif")) as src:
+            width, height = src.width, src.height
+        return GEMOMemory.tile_bytes(width, height, gemo_params.get('engine', config.DEFAULT_GEMO_ENGINE))
+
+    @staticmethod
+    def data_size() -> int:
+        """Segment de données du processus courant (VmData, octets ; 0 si inconnu)"""
+        try:
+            with open('/proc/self/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmData:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    @staticmethod
+    def worker_limit(budget: int, workers: int, largest: int) -> int:
+        """
+        Plafond RLIMIT_DATA d'un worker, au-delà de sa mémoire au démarrage : sa part du budget,
+        sans descendre sous GEMO_RLIMIT_HEADROOM fois la tuile la plus lourde, plus GEMO_WORKER_BASELINE
+        """
+        share = max(budget // max(1, workers), int(config.GEMO_RLIMIT_HEADROOM * largest))
+        return share + config.GEMO_WORKER_BASELINE
+
+    @staticmethod
+    def init_worker(limit: int):
+        """Initialise un worker GEMO (signaux, logs) et plafonne sa mémoire (voir worker_limit)"""
+        import resource
+        from .gemo_executor import GEMOExecutor
+
+        GEMOExecutor.init_worker()
+        # Le worker hérite du tas du processus principal par fork
+        limit += GEMOMemory.data_size()
+        _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+
+
+class MemoryAdmission:
+    """Admission des tuiles GEMO dans un budget mémoire (voir GEMOExecutor.run_tiles)"""
+
+    def __init__(self, budget: int):
+        """
+        Args:
+            budget: mémoire (octets) partagée par les tuiles en cours
+        """
+        self.budget = budget
+        self.used = 0
+        self.peak = 0
+        self._estimates: Dict[tuple, int] = {}
+        self._oversized = set()
+
+    @staticmethod
+    def from_fraction(fraction: float) -> Optional['MemoryAdmission']:
+        """Admission sur une fraction de MemAvailable ; None si désactivée ou mémoire inconnue"""
+        budget = GEMOMemory.budget(fraction)
+        return MemoryAdmission(budget) if budget > 0 else None
+
+    def estimate(self, task: tuple) -> int:
+        """Mémoire estimée d'une tâche (mise en cache par tuile et moteur)"""
+        key = (task[0], task[1], task[2], task[3].get('engine'))
+        if key not in self._estimates:
+            self._estimates[key] = GEMOMemory.task_bytes(task)
+        return self._estimates[key]
+
+    def admits(self, task: tuple, running: int) -> bool:
+        """
+        La tâche tient-elle dans le budget restant ? Une tâche est toujours admise quand rien ne
+        tourne, pour ne jamais bloquer une tuile plus lourde que le budget entier.
+        """
+        needed = self.estimate(task)
+        if running == 0:
+            if needed > self.budget and (task[0], task[1]) not in self._oversized:
+                self._oversized.add((task[0], task[1]))
+                logger.warning(f"⚠️ Tuile {task[0]}_{task[1]}: {needed / 2**20:.0f} Mo estimés, au-delà du "
+                               f"budget mémoire ({self.budget / 2**20:.0f} Mo), lancée seule")
+            return True
+        return self.used + needed <= self.budget
+
+    def acquire(self, task: tuple) -> None:
+        self.used += self.estimate(task)
+        self.peak = max(self.peak, self.used)
+
+    def release(self, task: tuple) -> None:
+        self.used -= self.estimate(task)
+
+    def largest(self, tasks) -> int:
+        """Estimation de la tâche la plus lourde"""
+        return max((self.estimate(task) for task in tasks), default=0)
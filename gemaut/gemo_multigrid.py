@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Moteur GEMO multigrille : même énergie et mêmes repondérations IRLS que le moteur creux
+(gemo_sparse), mais sans matrice sur la grille fine. Les différences secondes sont appliquées
+directement sur les tableaux NumPy de la tuile ; chaque système repondéré est résolu par un
+gradient conjugué préconditionné par un V-cycle géométrique :
+    - niveaux grossiers d'un pixel sur deux, prolongement bilinéaire et restriction transposée,
+      limités aux pixels hors masque 11 ;
+    - opérateur grossier rediscrétisé (différences secondes du niveau, pondérées par 4^-niveau)
+      et attache aux données condensée par restriction ;
+    - lissage de Chebyshev préconditionné par la diagonale, encadré par la plus grande valeur
+      propre estimée par itérations de puissance ;
+    - factorisation creuse directe sur le niveau le plus grossier.
+Le coût d'un V-cycle reste proportionnel au nombre de pixels, ce qui rend utilisables des tuiles
+de 2000 pixels et plus, voire un calcul sans découpage sur une scène de taille moyenne.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+from . import config
+from .gemo_sparse import SparseGEMOSolver, regularization_matrix
+
+
+def _prolong_axis(coarse: np.ndarray, n: int, axis: int) -> np.ndarray:
+    """Interpolation linéaire vers n pixels le long d'un axe (pixels pairs = pixels grossiers)"""
+    c = np.moveaxis(coarse, axis, 0)
+    nc = c.shape[0]
+    fine = np.empty((n,) + c.shape[1:], dtype=c.dtype)
+    fine[::2] = c
+    n_impairs = n // 2
+    m = min(n_impairs, nc - 1)
+    fine[1:2 * m:2] = 0.5 * (c[:m] + c[1:m + 1])
+    if n_impairs > m:
+        # Dernier pixel impair sans voisin grossier à droite : extrapolation linéaire, qui
+        # conserve les plans (noyau du terme de régularisation)
+        fine[2 * m + 1] = 1.5 * c[m] - 0.5 * c[m - 1] if m > 0 else c[m]
+    return np.moveaxis(fine, 0, axis)
+
+
+def _restrict_axis(fine: np.ndarray, axis: int) -> np.ndarray:
+    """Transposée exacte de _prolong_axis"""
+    f = np.moveaxis(fine, axis, 0)
+    n = f.shape[0]
+    nc = (n + 1) // 2
+    coarse = f[::2].copy()
+    n_impairs = n // 2
+    m = min(n_impairs, nc - 1)
+    coarse[:m] += 0.5 * f[1:2 * m:2]
+    coarse[1:m + 1] += 0.5 * f[1:2 * m:2]
+    if n_impairs > m:
+        if m > 0:
+            coarse[m] += 1.5 * f[2 * m + 1]
+            coarse[m - 1] -= 0.5 * f[2 * m + 1]
+        else:
+            coarse[m] += f[2 * m + 1]
+    return np.moveaxis(coarse, 0, axis)
+
+
+def prolong(coarse: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Prolongement bilinéaire d'un niveau grossier vers la grille fine de forme shape"""
+    return _prolong_axis(_prolong_axis(coarse, shape[0], 0), shape[1], 1)
+
+
+def restrict(fine: np.ndarray) -> np.ndarray:
+    """Restriction (transposée du prolongement bilinéaire)"""
+    return _restrict_axis(_restrict_axis(fine, 0), 1)
+
+
+def coarse_validity(valide: np.ndarray) -> np.ndarray:
+    """
+    Pixels du niveau grossier : pixels pairs dont le voisinage 3 x 3 contient un pixel fin hors
+    masque 11, pour que chaque pixel fin valide soit interpolé depuis ses voisins grossiers
+    """
+    height, width = valide.shape
+    pad = np.pad(valide, 1)
+    dilate = np.zeros_like(valide)
+    for dy in range(3):
+        for dx in range(3):
+            dilate |= pad[dy:dy + height, dx:dx + width]
+    return dilate[::2, ::2]
+
+
+class MultigridLevel:
+    """Un niveau de la hiérarchie : pixels hors masque 11 et différences secondes retenues"""
+
+    def __init__(self, valide: np.ndarray, level: int):
+        self.valide = valide
+        self.shape = valide.shape
+        self.level = level
+        # Les différences secondes d'un niveau grossier (pas 2^niveau) pèsent 4^-niveau :
+        # approximation de l'opérateur de Galerkin du bi-laplacien discret
+        self.coef = 2.0 * 4.0 ** -level
+        # Différences secondes retenues (1.) ou écartées (0.), par pixel central
+        self.garde_x = (valide[:, :-2] & valide[:, 1:-1] & valide[:, 2:]).astype(np.float64)
+        self.garde_y = (valide[:-2, :] & valide[1:-1, :] & valide[2:, :]).astype(np.float64)
+        self.diagonal = self._scatter(self.garde_x, self.garde_y, 4.0)
+        self.data = None
+        self.inv_diag = None
+        self.bounds = None
+        self.lu = None
+
+    def _scatter(self, gx: np.ndarray, gy: np.ndarray, centre: float) -> np.ndarray:
+        """Accumule des valeurs par différence seconde sur ses trois pixels (poids 1, centre, 1)"""
+        out = np.zeros(self.shape)
+        out[:-2, :] += gy
+        out[1:-1, :] += centre * gy
+        out[2:, :] += gy
+        out[:, :-2] += gx
+        out[:, 1:-1] += centre * gx
+        out[:, 2:] += gx
+        out *= self.coef
+        return out
+
+    def differences(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Différences secondes retenues en X et en Y (0 ailleurs)"""
+        dx = x[:, :-2] + x[:, 2:]
+        dx -= 2 * x[:, 1:-1]
+        dx *= self.garde_x
+        dy = x[:-2, :] + x[2:, :]
+        dy -= 2 * x[1:-1, :]
+        dy *= self.garde_y
+        return dx, dy
+
+    def regularization(self, x: np.ndarray) -> np.ndarray:
+        """Produit par 2 DᵀD (pondéré pour les niveaux grossiers)"""
+        dx, dy = self.differences(x)
+        return self._scatter(dx, dy, -2.0)
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        """Produit par la matrice du système du niveau"""
+        return self.regularization(x) + self.data * x
+
+
+class MultigridGEMOSolver(SparseGEMOSolver):
+    """Minimisation IRLS de l'énergie GEMO, systèmes résolus par gradient conjugué multigrille"""
+
+    ENGINE = 'multigrid'
+
+    def __init__(self, *args, coarsest: int = config.GEMO_MULTIGRID_COARSEST,
+                 degree: int = config.GEMO_MULTIGRID_SMOOTHING_DEGREE, **kwargs):
+        """
+        Args:
+            coarsest: Côté en dessous duquel le niveau est résolu par factorisation directe
+            degree: Degré du polynôme de Chebyshev des lissages
+            Autres arguments : voir SparseGEMOSolver (method est ignoré)
+        """
+        super().__init__(*args, **kwargs)
+        self.coarsest = coarsest
+        self.degree = degree
+        self.cycles = 0
+
+    def solve(self, mne: np.ndarray, masque: np.ndarray, init: np.ndarray,
+              deadline: Optional[float] = None, cancel_file: Optional[str] = None,
+              fixed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Dict]:
+        """Voir SparseGEMOSolver.solve ; les statistiques comptent en plus les V-cycles ('cycles')"""
+        self.cycles = 0
+        mnt, stats = super().solve(mne, masque, init, deadline, cancel_file, fixed)
+        stats['cycles'] = self.cycles
+        return mnt, stats
+
+    def _operators(self, masque: np.ndarray) -> List[MultigridLevel]:
+        """Hiérarchie des niveaux, du plus fin au plus grossier"""
+        valide = masque != config.NODATA_INTERNE_MASK
+        levels = [MultigridLevel(valide, 0)]
+        while min(levels[-1].shape) > self.coarsest:
+            levels.append(MultigridLevel(coarse_validity(levels[-1].valide), len(levels)))
+        return levels
+
+    def _regularization(self, operators: List[MultigridLevel], z: np.ndarray) -> Tuple[float, np.ndarray]:
+        """||D z||² et son gradient, sans matrice"""
+        fine = operators[0]
+        x = z.reshape(fine.shape)
+        dx, dy = fine.differences(x)
+        return float(np.sum(dx * dx) + np.sum(dy * dy)), fine.regularization(x).ravel()
+
+    def _setup(self, levels: List[MultigridLevel], diag: np.ndarray) -> None:
+        """Attache aux données de chaque niveau, bornes des lisseurs et factorisation grossière"""
+        data = diag.reshape(levels[0].shape)
+        for level in levels:
+            if level.level > 0:
+                data = np.where(level.valide, restrict(data), 0.)
+            level.data = data
+            level.inv_diag = np.where(level.valide, 1.0 / (level.diagonal + data + ~level.valide), 0.)
+
+        for level in levels[:-1]:
+            lambda_max = self._lambda_max(level)
+            level.bounds = (lambda_max / config.GEMO_MULTIGRID_SMOOTHING_RANGE, 1.1 * lambda_max)
+
+        coarse = levels[-1]
+        masque = np.where(coarse.valide, 0, config.NODATA_INTERNE_MASK)
+        _, reg = regularization_matrix(masque)
+        # Pixels hors zone : équation identité, correction nulle
+        a = reg * (coarse.coef / 2.0) + sp.diags((coarse.data + ~coarse.valide).ravel())
+        coarse.lu = spla.splu(a.tocsc(), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.,
+                              options={'SymmetricMode': True})
+
+    @staticmethod
+    def _lambda_max(level: MultigridLevel, iterations: int = 10) -> float:
+        """Plus grande valeur propre de D⁻¹ A (itérations de puissance)"""
+        x = np.where(level.valide, np.random.default_rng(0).random(level.shape), 0.)
+        lambda_max = 1.
+        for _ in range(iterations):
+            y = level.inv_diag * level.apply(x)
+            lambda_max = float(np.linalg.norm(y)) / max(float(np.linalg.norm(x)), 1e-300)
+            x = y / max(float(np.linalg.norm(y)), 1e-300)
+        return lambda_max
+
+    def _smooth(self, level: MultigridLevel, x: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Lissage de Chebyshev sur [bounds] du système préconditionné par la diagonale"""
+        low, high = level.bounds
+        theta, delta = (high + low) / 2, (high - low) / 2
+        sigma = theta / delta
+        rho = 1 / sigma
+        r = level.inv_diag * (b - level.apply(x))
+        d = r / theta
+        for k in range(self.degree):
+            x = x + d
+            if k == self.degree - 1:
+                break
+            r = r - level.inv_diag * level.apply(d)
+            rho_new = 1 / (2 * sigma - rho)
+            d = rho_new * rho * d + 2 * rho_new / delta * r
+            rho = rho_new
+        return x
+
+    def _v_cycle(self, levels: List[MultigridLevel], index: int, b: np.ndarray) -> np.ndarray:
+        """Solution approchée de A x = b au niveau index, à partir de x = 0"""
+        level = levels[index]
+        if index == len(levels) - 1:
+            return level.lu.solve(b.ravel()).reshape(level.shape)
+        x = self._smooth(level, np.zeros(level.shape), b)
+        residu = np.where(level.valide, b - level.apply(x), 0.)
+        coarse = levels[index + 1]
+        correction = self._v_cycle(levels, index + 1, np.where(coarse.valide, restrict(residu), 0.))
+        x = x + np.where(level.valide, prolong(correction, level.shape), 0.)
+        return self._smooth(level, x, b)
+
+    def _solve(self, operators: List[MultigridLevel], diag: np.ndarray, b: np.ndarray,
+               x0: np.ndarray, check) -> np.ndarray:
+        """Résout (2 DᵀD + diag) x = b par gradient conjugué préconditionné par un V-cycle"""
+        levels = operators
+        fine = levels[0]
+        self._setup(levels, diag)
+        n = diag.size
+
+        def matvec(v):
+            return fine.apply(v.reshape(fine.shape)).ravel()
+
+        def preconditioner(v):
+            self.cycles += 1
+            v = v.reshape(fine.shape)
+            # Pixels hors zone découplés : préconditionneur diagonal
+            return np.where(fine.valide, self._v_cycle(levels, 0, v), v / fine.data).ravel()
+
+        a = spla.LinearOperator((n, n), matvec=matvec, dtype=np.float64)
+        m = spla.LinearOperator((n, n), matvec=preconditioner, dtype=np.float64)
+        x, _ = spla.cg(a, b, x0=x0, rtol=config.GEMO_MULTIGRID_RTOL, maxiter=self.max_cg_iter,
+                       M=m, callback=lambda xk: check())
+        return x
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Moteur GEMO natif en processus : GEA() de GEMO/src appelé par le module d'extension _gemo
+(GEMO/src/gemo_python.cpp, construit avec cmake -DGEMO_PYTHON=ON).
+Même minimisation que main_GEMAUT_unit, sur les tableaux de la tuile : pas de processus par
+tuile, pas d'initialisation GDAL, et le GIL est relâché pendant la minimisation, ce qui permet
+de traiter les tuiles dans des threads du processus principal.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+
+from . import config
+from .gemo_sparse import GEMOInterrupted
+
+try:
+    import _gemo
+except ImportError:
+    _gemo = None
+
+
+def is_available() -> bool:
+    """Le module _gemo est-il importable ?"""
+    return _gemo is not None
+
+
+class NativeGEMOSolver:
+    """Minimisation GEMO de main_GEMAUT_unit (gradient conjugué GSL) sur tableaux NumPy"""
+
+    ENGINE = 'extension'
+
+    def __init__(self, sigma: float, lambda_val: float, norme: str = config.DEFAULT_NORME,
+                 no_data_value: float = config.DEFAULT_NODATA_EXT, budget: Optional[Dict] = None):
+        """
+        Args:
+            sigma, lambda_val, norme, no_data_value: Paramètres de main_GEMAUT_unit
+            budget: Budget du solveur (max_iter, tol_grad, step, tol_line), défauts de config sinon
+        """
+        if _gemo is None:
+            raise ImportError("Module _gemo introuvable : compiler GEMO avec cmake -DGEMO_PYTHON=ON")
+        budget = budget or {}
+        self.sigma = sigma
+        self.lambda_val = lambda_val
+        self.norme = norme
+        self.no_data_value = no_data_value
+        self.max_iter = int(budget.get('max_iter', config.DEFAULT_GEMO_MAX_ITER))
+        self.tol_grad = float(budget.get('tol_grad', config.DEFAULT_GEMO_TOL_GRAD))
+        self.step = float(budget.get('step', config.DEFAULT_GEMO_STEP))
+        self.tol_line = float(budget.get('tol_line', config.DEFAULT_GEMO_TOL_LINE))
+
+    def solve(self, mne: np.ndarray, masque: np.ndarray, init: np.ndarray,
+              timeout: Optional[float] = None, cancel_file: Optional[str] = None) -> Tuple[np.ndarray, Dict]:
+        """
+        Minimise l'énergie GEMO d'une tuile
+
+        Les tableaux float32 (MNS, init) et uint8 (masque) contigus sont passés sans copie.
+
+        Args:
+            timeout: durée maximale (s) de la minimisation
+            cancel_file: la minimisation est interrompue dès que ce fichier existe
+
+        Returns:
+            (MNT float64, statistiques au format de la ligne GEMO_STATS)
+
+        Raises:
+            GEMOInterrupted: dépassement du timeout ou annulation
+        """
+        mnt, stats = _gemo.gea(
+            np.ascontiguousarray(mne, dtype=np.float32), np.ascontiguousarray(masque, dtype=np.uint8),
+            np.ascontiguousarray(init, dtype=np.float32), self.norme, self.sigma, self.lambda_val,
+            self.no_data_value, self.max_iter, self.tol_grad, self.step, self.tol_line,
+            timeout or 0., cancel_file or '')
+        if stats.get('stop') == 'interrupted':
+            raise GEMOInterrupted(stats.get('reason', 'timeout'))
+        stats['size'] = list(stats['size'])
+        stats['engine'] = self.ENGINE
+        return mnt, stats
+
+    def process_files(self, mns_file: str, masque_file: str, init_file: str, output_file: str,
+                      timeout: Optional[float] = None, cancel_file: Optional[str] = None) -> Dict:
+        """
+        Équivalent de main_GEMAUT_unit sur des fichiers : MNT float64 géoréférencé comme le MNS
+
+        Returns:
+            Statistiques de convergence (voir solve)
+        """
+        with rasterio.open(mns_file) as src:
+            mne = src.read(1)
+            profile = {'driver': 'GTiff', 'dtype': 'float64', 'count': 1, 'width': src.width,
+                       'height': src.height, 'crs': src.crs, 'transform': src.transform}
+        with rasterio.open(masque_file) as src:
+            masque = src.read(1)
+        with rasterio.open(init_file) as src:
+            init = src.read(1)
+
+        mnt, stats = self.solve(mne, masque, init, timeout, cancel_file)
+        with rasterio.open(output_file, 'w', **profile) as dst:
+            dst.write(mnt, 1)
+        return stats
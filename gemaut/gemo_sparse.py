@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Moteur GEMO creux : minimisation de l'énergie GEMO par moindres carrés repondérés (IRLS)
+L'énergie est celle de main_GEMAUT_unit (GEMO/src) :
+    E(z) = ||D z||² + lambda * somme des rho((z - mne) / sigma) sur les pixels de masque 0
+où D regroupe les différences secondes en X et en Y dont les trois pixels sont hors masque 11,
+dans l'espace normalisé (mne - min) / (max - min), lambda = lambda0 / d², sigma = sigma0 / d
+avec d = int(max) - int(min). Pour la norme L2 le problème est un système linéaire creux, résolu
+en une fois ; pour les normes robustes (Huber, Tukey, Huber/Tukey de Normes.h), une courte suite
+de systèmes repondérés. Les opérateurs de différences secondes sont construits une fois par
+forme de tuile.
+"""
+
+import os
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+from . import config
+
+
+# Coefficients des normes (GEMO/src/Normes.cpp)
+COEF_HUBER = 1.2107
+COEF_TUKEY = 4.6851
+
+NORMES = ('huber', 'tukey', 'hubertukey', 'L2')
+
+# Rappel vers la solution initiale : rend le système défini positif sur les zones sans
+# attache aux données (pixels de masque 11, îlots sans pixel sol), qui restent à l'initialisation
+EPS_INIT = 1e-10
+
+# Rappel des pixels fixés (condition aux limites de solve) : domine la régularisation (quelques unités)
+POIDS_FIXE = 1e8
+
+
+class GEMOInterrupted(Exception):
+    """Minimisation interrompue (reason : 'timeout' ou 'annulée')"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@lru_cache(maxsize=4)
+def second_difference_operators(height: int, width: int) -> Tuple[sp.csr_matrix, np.ndarray, sp.csr_matrix, np.ndarray]:
+    """
+    Différences secondes sur une grille height x width (indices ligne par ligne)
+
+    Returns:
+        (Dx, centres_x, Dy, centres_y) : une ligne de D par pixel central ayant ses deux voisins
+        dans la grille, et l'indice de ce pixel central
+    """
+    index = np.arange(height * width).reshape(height, width)
+
+    def operator(centres, pas):
+        n = centres.size
+        rows = np.repeat(np.arange(n), 3)
+        cols = np.stack([centres - pas, centres, centres + pas], axis=1).ravel()
+        vals = np.tile([1.0, -2.0, 1.0], n)
+        return sp.csr_matrix((vals, (rows, cols)), shape=(n, height * width))
+
+    centres_x = index[:, 1:-1].ravel()
+    centres_y = index[1:-1, :].ravel()
+    return operator(centres_x, 1), centres_x, operator(centres_y, width), centres_y
+
+
+@lru_cache(maxsize=4)
+def _full_regularization(height: int, width: int) -> sp.csr_matrix:
+    """2 DᵀD d'une tuile sans pixel de masque 11 (cas courant, mis en cache)"""
+    dx, _, dy, _ = second_difference_operators(height, width)
+    return (2.0 * (dx.T @ dx + dy.T @ dy)).tocsr()
+
+
+def regularization_matrix(masque: np.ndarray) -> Tuple[sp.csr_matrix, sp.csr_matrix]:
+    """
+    Opérateur D de la tuile et hessienne 2 DᵀD du terme de régularisation
+
+    Une différence seconde n'est retenue que si ses trois pixels sont hors masque 11
+    (types de dérivée 5 à 8 de Parametres.cpp).
+    """
+    height, width = masque.shape
+    dx, centres_x, dy, centres_y = second_difference_operators(height, width)
+    hors_zone = (masque == config.NODATA_INTERNE_MASK).ravel()
+    if not hors_zone.any():
+        return sp.vstack([dx, dy]).tocsr(), _full_regularization(height, width)
+
+    valide = ~hors_zone
+    garde_x = valide[centres_x - 1] & valide[centres_x] & valide[centres_x + 1]
+    garde_y = valide[centres_y - width] & valide[centres_y] & valide[centres_y + width]
+    d = sp.vstack([dx[np.flatnonzero(garde_x)], dy[np.flatnonzero(garde_y)]]).tocsr()
+    return d, (2.0 * (d.T @ d)).tocsr()
+
+
+def norm_distance(u: np.ndarray, norme: str) -> np.ndarray:
+    """rho(u) des normes robustes (u = résidu / sigma)"""
+    a = np.abs(u)
+    huber = np.where(a < COEF_HUBER, u * u / 2, COEF_HUBER * (a - COEF_HUBER / 2))
+    t = 1 - (np.minimum(a, COEF_TUKEY) / COEF_TUKEY) ** 2
+    tukey = COEF_TUKEY ** 2 / 6. * (1 - t ** 3)
+    if norme == 'huber':
+        return huber
+    if norme == 'tukey':
+        return tukey
+    return np.where(u > 0, huber, tukey)
+
+
+def norm_derivative(u: np.ndarray, norme: str) -> np.ndarray:
+    """psi(u) = rho'(u)"""
+    a = np.abs(u)
+    huber = np.where(a < COEF_HUBER, u, COEF_HUBER * np.sign(u))
+    tukey = np.where(a < COEF_TUKEY, u * (1 - (u / COEF_TUKEY) ** 2) ** 2, 0.)
+    if norme == 'huber':
+        return huber
+    if norme == 'tukey':
+        return tukey
+    return np.where(u > 0, huber, tukey)
+
+
+def norm_weight(u: np.ndarray, norme: str) -> np.ndarray:
+    """Poids IRLS psi(u) / u (1 en u = 0)"""
+    a = np.abs(u)
+    huber = np.where(a < COEF_HUBER, 1., COEF_HUBER / np.maximum(a, COEF_HUBER))
+    tukey = np.where(a < COEF_TUKEY, (1 - (u / COEF_TUKEY) ** 2) ** 2, 0.)
+    if norme == 'huber':
+        return huber
+    if norme == 'tukey':
+        return tukey
+    return np.where(u > 0, huber, tukey)
+
+
+class SparseGEMOSolver:
+    """
+    Minimisation IRLS de l'énergie GEMO d'une tuile
+
+    Les sous-classes changent la représentation du terme de régularisation et la résolution
+    des systèmes repondérés (_operators, _regularization, _solve).
+    """
+
+    ENGINE = 'sparse'
+
+    def __init__(self, sigma: float, lambda_val: float, norme: str = config.DEFAULT_NORME,
+                 no_data_value: float = config.DEFAULT_NODATA_EXT, tol_grad: float = config.DEFAULT_GEMO_TOL_GRAD,
+                 method: str = config.DEFAULT_SPARSE_METHOD, max_irls: int = config.GEMO_SPARSE_MAX_IRLS,
+                 tol_step: float = config.GEMO_SPARSE_TOL_STEP, max_cg_iter: int = config.DEFAULT_GEMO_MAX_ITER):
+        """
+        Args:
+            sigma, lambda_val, norme, no_data_value: Paramètres de main_GEMAUT_unit
+            tol_grad: Arrêt quand la norme du gradient de l'énergie passe sous ce seuil (critère GSL)
+            method: 'direct' (factorisation creuse), 'cg' (gradient conjugué préconditionné)
+                    ou 'auto' (direct pour la norme L2 jusqu'à GEMO_SPARSE_DIRECT_MAX_PIXELS pixels, CG sinon)
+            max_irls: Nombre maximal de systèmes repondérés
+            tol_step: Arrêt quand la solution (normalisée) varie de moins que ce seuil
+            max_cg_iter: Itérations maximales du gradient conjugué par système
+        """
+        if norme not in NORMES:
+            raise ValueError(f"Norme inconnue: {norme} (choix: {', '.join(NORMES)})")
+        if method not in config.SPARSE_METHODS:
+            raise ValueError(f"Méthode de résolution inconnue: {method} (choix: {', '.join(config.SPARSE_METHODS)})")
+        self.sigma = sigma
+        self.lambda_val = lambda_val
+        self.norme = norme
+        self.no_data_value = no_data_value
+        self.tol_grad = tol_grad
+        self.method = method
+        self.max_irls = max_irls
+        self.tol_step = tol_step
+        self.max_cg_iter = max_cg_iter
+
+    def _data_scale(self, d: int) -> Tuple[float, float]:
+        """(lambda, sigma) de l'espace normalisé"""
+        return self.lambda_val / (d * d), self.sigma / d
+
+    def _operators(self, masque: np.ndarray):
+        """Terme de régularisation de la tuile : (D, 2 DᵀD)"""
+        return regularization_matrix(masque)
+
+    def _regularization(self, operators, z: np.ndarray) -> Tuple[float, np.ndarray]:
+        """||D z||² et son gradient"""
+        d_op, reg = operators
+        dz = d_op @ z
+        return float(dz @ dz), reg @ z
+
+    def energy_and_gradient(self, z: np.ndarray, mne: np.ndarray, attache: np.ndarray,
+                            operators, d: int) -> Tuple[float, np.ndarray]:
+        """Énergie GEMO et son gradient (espace normalisé)"""
+        lam, sig = self._data_scale(d)
+        energy, gradient = self._regularization(operators, z)
+        r = (z - mne)[attache]
+        if self.norme == 'L2':
+            # NormeL2 ignore sigma
+            data, psi = float(np.sum(r * r / 2)), r
+        else:
+            u = r / sig
+            data, psi = float(np.sum(norm_distance(u, self.norme))), norm_derivative(u, self.norme) / sig
+        gradient[attache] += lam * psi
+        return energy + lam * data, gradient
+
+    def _solve(self, operators, diag: np.ndarray, b: np.ndarray, x0: np.ndarray, check) -> np.ndarray:
+        """Résout (2 DᵀD + diag) x = b, système symétrique défini positif"""
+        a = (operators[1] + sp.diags(diag)).tocsr()
+        method = self.method
+        if method == 'auto':
+            # L2 : attache aux données en lambda0 / d², système mal conditionné pour le CG
+            # Normes robustes : attache en lambda0 / sigma0², le CG préconditionné converge vite
+            direct = self.norme == 'L2' and a.shape[0] <= config.GEMO_SPARSE_DIRECT_MAX_PIXELS
+            method = 'direct' if direct else 'cg'
+        if method == 'direct':
+            # Matrice symétrique définie positive : pivots diagonaux, ordre de A + Aᵀ
+            lu = spla.splu(a.tocsc(), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.,
+                           options={'SymmetricMode': True})
+            return lu.solve(b)
+        preconditioner = sp.diags(1.0 / a.diagonal())
+        x, _ = spla.cg(a, b, x0=x0, rtol=config.GEMO_SPARSE_CG_RTOL, maxiter=self.max_cg_iter,
+                       M=preconditioner, callback=lambda xk: check())
+        return x
+
+    def solve(self, mne: np.ndarray, masque: np.ndarray, init: np.ndarray,
+              deadline: Optional[float] = None, cancel_file: Optional[str] = None,
+              fixed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Dict]:
+        """
+        Minimise l'énergie GEMO d'une tuile
+
+        Args:
+            mne, masque, init: MNS, masque (0 = sol, 11 = hors zone) et solution initiale de la tuile
+            deadline: instant (time.monotonic) au-delà duquel la minimisation est interrompue
+            cancel_file: la minimisation est interrompue dès que ce fichier existe
+            fixed: pixels maintenus à init (condition aux limites), exclus du test de gradient ;
+                   à résoudre par factorisation (method 'direct') : leur rappel domine le second
+                   membre, donc le critère d'arrêt relatif du gradient conjugué
+
+        Returns:
+            (MNT float64, statistiques au format de la ligne GEMO_STATS de main_GEMAUT_unit)
+
+        Raises:
+            GEMOInterrupted: dépassement de deadline ou annulation
+        """
+        def check():
+            if deadline is not None and time.monotonic() > deadline:
+                raise GEMOInterrupted('timeout')
+            if cancel_file and os.path.exists(cancel_file):
+                raise GEMOInterrupted('annulée')
+
+        height, width = mne.shape
+        valide = mne != self.no_data_value
+        if valide.any():
+            min_val, max_val = float(mne[valide].min()), float(mne[valide].max())
+        else:
+            min_val, max_val = 0., 1.
+        # Normalisation de GEA.cpp ; d entier comme dans Parametres (au moins 1 : tuile plane)
+        scale = (max_val - min_val) or 1.
+        d = max(1, int(max_val) - int(min_val))
+        m = ((mne.astype(np.float64) - min_val) / scale).ravel()
+        z0 = ((init.astype(np.float64) - min_val) / scale).ravel()
+
+        attache = (masque == 0).ravel()
+        fixe = np.zeros(z0.size, bool) if fixed is None else fixed.ravel()
+        attache &= ~fixe
+        operators = self._operators(masque)
+        lam, sig = self._data_scale(d)
+        a_data = lam if self.norme == 'L2' else lam / (sig * sig)
+
+        z = z0.copy()
+        stop, iterations = 'max_iter', 0
+        gradient_norm, energy = np.inf, np.inf
+        for iterations in range(1, self.max_irls + 1):
+            check()
+            if self.norme == 'L2':
+                w = np.ones(int(attache.sum()))
+            else:
+                w = norm_weight((z[attache] - m[attache]) / sig, self.norme)
+            diag = np.full(z.size, EPS_INIT)
+            diag[attache] += a_data * w
+            diag[fixe] = POIDS_FIXE
+            rhs = EPS_INIT * z0
+            rhs[attache] += a_data * w * m[attache]
+            rhs[fixe] = POIDS_FIXE * z0[fixe]
+            z_new = self._solve(operators, diag, rhs, z, check)
+            step = float(np.max(np.abs(z_new - z))) if z.size else 0.
+            z = z_new
+
+            energy, gradient = self.energy_and_gradient(z, m, attache, operators, d)
+            gradient[fixe] = 0.
+            gradient_norm = float(np.linalg.norm(gradient))
+            if gradient_norm < self.tol_grad:
+                stop = 'gradient'
+                break
+            if self.norme == 'L2' or step < self.tol_step:
+                # L2 : système exact, une seule résolution
+                stop = 'converged'
+                break
+
+        mnt = z.reshape(height, width) * scale + min_val
+        stats = {'iterations': iterations, 'stop': stop, 'gsl_status': 0, 'energy': energy,
+                 'gradient_norm': gradient_norm, 'size': [width, height], 'engine': self.ENGINE}
+        return mnt, stats
+
+    def process_files(self, mns_file: str, masque_file: str, init_file: str, output_file: str,
+                      deadline: Optional[float] = None, cancel_file: Optional[str] = None) -> Dict:
+        """
+        Équivalent de main_GEMAUT_unit sur des fichiers : MNT float64 géoréférencé comme le MNS
+
+        Returns:
+            Statistiques de convergence (voir solve)
+        """
+        with rasterio.open(mns_file) as src:
+            mne = src.read(1)
+            profile = {'driver': 'GTiff', 'dtype': 'float64', 'count': 1, 'width': src.width,
+                       'height': src.height, 'crs': src.crs, 'transform': src.transform}
+        with rasterio.open(masque_file) as src:
+            masque = src.read(1)
+        with rasterio.open(init_file) as src:
+            init = src.read(1)
+
+        mnt, stats = self.solve(mne, masque, init, deadline, cancel_file)
+        with rasterio.open(output_file, 'w', **profile) as dst:
+            dst.write(mnt, 1)
+        return stats
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Télémétrie de convergence GEMO par tuile
+main_GEMAUT_unit écrit en fin d'exécution une ligne GEMO_STATS (itérations, critère
+d'arrêt, énergie finale, norme du gradient) ; l'exécuteur la récupère dans TileResult.stats.
+Ce module écrit ces mesures en CSV (une ligne par tuile) et en raster aligné sur la grille
+des tuiles (un pixel par tuile), pour régler tile_size, sigma et regul sur des données.
+"""
+
+import csv
+import os
+from typing import Dict, List
+
+import numpy as np
+import rasterio
+from loguru import logger
+from rasterio.transform import Affine
+
+from . import config
+
+
+# Colonnes du CSV
+CSV_FIELDS = ('x', 'y', 'col_off', 'row_off', 'width', 'height', 'status', 'attempt', 'speculative',
+              'engine', 'iterations', 'stop', 'gsl_status', 'energy', 'gradient_norm', 'runtime',
+              'max_iter', 'tol_grad', 'sigma', 'regul', 'norme', 'tile_size',
+              'tile_class', 'fast_path', 'reference_rmse', 'reference_max_error', 'reference_runtime')
+
+# Bandes du raster, dans l'ordre
+RASTER_BANDS = ('iterations', 'energy', 'gradient_norm', 'runtime', 'stop')
+
+# Codage du critère d'arrêt dans la bande 'stop' ('converged' : solution stable du moteur creux
+# ou lissage d'une tuile tout sol)
+STOP_CODES = {'gradient': 1, 'max_iter': 2, 'gsl_error': 3, 'converged': 4}
+CONVERGED = ('gradient', 'converged')
+
+
+class GemoTelemetry:
+    """Écrit la télémétrie des tuiles GEMO d'un chantier"""
+
+    def __init__(self, grid_file: str, tile_size: int, pad_size: int, gemo_params: Dict,
+                 csv_file: str, raster_file: str, plan=None):
+        """
+        Args:
+            grid_file: Raster de travail découpé en tuiles (MNS sous-échantillonné)
+            tile_size, pad_size: Géométrie des tuiles
+            gemo_params: Paramètres du chantier (sigma, lambda, norme), repris dans le CSV
+            csv_file, raster_file: Fichiers produits
+            plan: TilePlan du chantier (tile_plan 'quadtree') ; grille uniforme si None
+        """
+        self.grid_file = grid_file
+        self.tile_size = tile_size
+        self.pad_size = pad_size
+        self.gemo_params = gemo_params
+        self.csv_file = csv_file
+        self.raster_file = raster_file
+        self.plan = plan
+
+    @staticmethod
+    def from_config(gemaut_config, plan=None) -> 'GemoTelemetry':
+        """Télémétrie écrite dans le répertoire de travail (conservée après --clean)"""
+        return GemoTelemetry(gemaut_config.temp_files['mns_sous_ech'], gemaut_config.tile_size,
+                             gemaut_config.pad_size, gemaut_config.get_gemo_params(),
+                             os.path.join(gemaut_config.work_dir, config.GEMO_STATS_CSV_FILE),
+                             os.path.join(gemaut_config.work_dir, config.GEMO_STATS_RASTER_FILE), plan)
+
+    def write(self, results: List) -> None:
+        """Écrit le CSV et le raster ; un échec d'écriture n'interrompt pas le chantier"""
+        try:
+            with rasterio.open(self.grid_file) as src:
+                largeur, hauteur = src.width, src.height
+                transform, crs = src.transform, src.crs
+            self.write_csv(results, largeur, hauteur)
+            self.write_raster(results, largeur, hauteur, transform, crs)
+        except Exception as e:
+            logger.warning(f"⚠️ Télémétrie GEMO non écrite: {e}")
+            return
+
+        measured = [r.stats for r in results if r.stats]
+        if measured:
+            iterations = np.array([s.get('iterations', 0) for s in measured])
+            capped = sum(1 for s in measured if s.get('stop') not in CONVERGED)
+            logger.info(f"📈 Convergence GEMO: {len(measured)} tuiles, itérations médiane {np.median(iterations):.0f} "
+                        f"/ max {iterations.max()}, {capped} arrêtées sans convergence")
+        logger.info(f"Télémétrie GEMO: {self.csv_file}, {self.raster_file}")
+
+    def _tile_window(self, x: int, y: int, largeur: int, hauteur: int):
+        """(col_off, row_off, width, height) d'une tuile sur la grille de travail"""
+        if self.plan is not None:
+            return self.plan.window(x, y)
+        pas = self.tile_size - self.pad_size
+        col_off, row_off = x * pas, y * pas
+        return col_off, row_off, min(self.tile_size, largeur - col_off), min(self.tile_size, hauteur - row_off)
+
+    def write_csv(self, results: List, largeur: int, hauteur: int) -> None:
+        """Une ligne par tuile (dernière tentative retenue)"""
+        with open(self.csv_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for r in sorted(results, key=lambda r: (r.y, r.x)):
+                col_off, row_off, width, height = self._tile_window(r.x, r.y, largeur, hauteur)
+                writer.writerow({
+                    'x': r.x, 'y': r.y, 'col_off': col_off, 'row_off': row_off,
+                    'width': width, 'height': height,
+                    'status': r.status, 'attempt': r.attempt, 'speculative': int(r.speculative),
+                    'engine': r.stats.get('engine', 'native') if r.stats else '',
+                    'iterations': r.stats.get('iterations', ''),
+                    'stop': r.stats.get('stop', ''),
+                    'gsl_status': r.stats.get('gsl_status', ''),
+                    'energy': r.stats.get('energy', ''),
+                    'gradient_norm': r.stats.get('gradient_norm', ''),
+                    'runtime': f"{r.duration:.3f}",
+                    'max_iter': r.budget.get('max_iter', ''),
+                    'tol_grad': r.budget.get('tol_grad', ''),
+                    'sigma': r.params.get('sigma', self.gemo_params.get('sigma')),
+                    'regul': r.params.get('lambda', self.gemo_params.get('lambda')),
+                    'norme': r.params.get('norme', self.gemo_params.get('norme')),
+                    'tile_size': self.tile_size,
+                    'tile_class': r.tile_class,
+                    'fast_path': r.fast_path,
+                    'reference_rmse': r.stats.get('reference_rmse', ''),
+                    'reference_max_error': r.stats.get('reference_max_error', ''),
+                    'reference_runtime': r.stats.get('reference_runtime', '')
+                })
+
+    def write_raster(self, results: List, largeur: int, hauteur: int, transform: Affine, crs=None) -> None:
+        """
+        Raster float32 d'un pixel par tuile, aligné sur la grille des tuiles
+
+        Le pixel (y, x) couvre le pas de la tuile (x, y) ; bandes : voir RASTER_BANDS,
+        NaN pour les tuiles sans mesure (copiées, en échec, non recalculées en mode incrémental).
+        Avec un plan quadtree, un pixel par cellule de la grille de base, toutes les cellules
+        d'une dalle portant ses mesures.
+        """
+        if self.plan is not None:
+            pas, nx, ny = self.plan.step, self.plan.nx, self.plan.ny
+        else:
+            pas = self.tile_size - self.pad_size
+            nx = max(1, (largeur - self.pad_size + pas - 1) // pas)
+            ny = max(1, (hauteur - self.pad_size + pas - 1) // pas)
+        bands = np.full((len(RASTER_BANDS), ny, nx), np.nan, dtype=np.float32)
+        for r in results:
+            x0, x1, y0, y1 = self.plan.cells(r.x, r.y) if self.plan is not None else (r.x, r.x + 1, r.y, r.y + 1)
+            cells = (slice(y0, y1), slice(x0, x1))
+            if r.stats:
+                bands[(0, *cells)] = r.stats.get('iterations', np.nan)
+                bands[(1, *cells)] = r.stats.get('energy', np.nan)
+                bands[(2, *cells)] = r.stats.get('gradient_norm', np.nan)
+                bands[(4, *cells)] = STOP_CODES.get(r.stats.get('stop'), np.nan)
+            if r.status == 'succès':
+                bands[(3, *cells)] = r.duration
+
+        profile = {
+            'driver': 'GTiff',
+            'dtype': 'float32',
+            'count': len(RASTER_BANDS),
+            'width': bands.shape[2],
+            'height': bands.shape[1],
+            'nodata': np.nan,
+            'crs': crs,
+            'transform': Affine(transform.a * pas, transform.b, transform.c,
+                                transform.d, transform.e * pas, transform.f)
+        }
+        with rasterio.open(self.raster_file, 'w', **profile) as dst:
+            dst.write(bands)
+            for index, name in enumerate(RASTER_BANDS, start=1):
+                dst.set_band_description(index, name)
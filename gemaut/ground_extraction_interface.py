@@ -18,6 +18,10 @@ class GroundExtractionInterface(ABC):
     Toutes les implémentations (SAGA, PDAL) doivent respecter ce contrat
     """
     
+    # ExecutorService du pipeline (voir executor_service), affecté par MaskComputer ;
+    # None : l'implémentation crée ses propres workers
+    executor = None
+    
     @abstractmethod
     def compute_mask(self, mns_file: str, output_mask_file: str, 
                     work_dir: str, cpu_count: int,
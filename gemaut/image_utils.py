@@ -15,6 +15,7 @@ from loguru import logger
 import os
 import shutil
 from typing import Tuple, Optional
+from .chunk_store import open_raster
 
 
 class RasterProcessor:
@@ -112,6 +113,13 @@ class RasterProcessor:
             logger.error(f"Erreur lors de la vérification des données de {file_path}: {e}")
             return False
     
+    @staticmethod
+    def count_valid_pixels(file_path: str, no_data_value: float = -9999) -> Tuple[int, int]:
+        """Nombre de pixels valides et nombre total de pixels d'une image"""
+        with rasterio.open(file_path) as src:
+            data = src.read(1)
+        return int(np.count_nonzero(data != no_data_value)), int(data.size)
+    
     @staticmethod
     def save_raster(data: np.ndarray, file_path: str, profile: dict) -> None:
         """Sauvegarde une image raster"""
@@ -320,7 +328,8 @@ class DataReplacer:
                                            output_path: str, no_data_ext: float) -> None:
         """Applique le masque NoData externe au MNT final"""
         try:
-            with rasterio.open(mnt_tmp_path) as src_mnt, rasterio.open(mns_sous_ech_path) as src_mns:
+            # MNT et MNS de travail : GeoTIFF ou ChunkStore (backend 'chunks')
+            with open_raster(mnt_tmp_path) as src_mnt, open_raster(mns_sous_ech_path) as src_mns:
                 if src_mnt.shape != src_mns.shape:
                     raise ValueError("Les deux images doivent avoir les mêmes dimensions.")
                 
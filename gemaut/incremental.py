@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mise à jour incrémentale d'un MNT après modification d'une partie du MNS
+Les entrées GEMO (MNS, masque et INIT sous-échantillonnés) sont comparées par blocs
+(empreintes) entre l'exécution précédente et la nouvelle ; seules les dalles GEMO dont
+la fenêtre, élargie du recouvrement, touche un bloc modifié sont recalculées, puis
+refondues dans le MNT existant.
+La préparation (masque, sous-échantillonnage) n'est reprise que sur les régions du MNS
+source dont les blocs ont changé depuis l'exécution précédente, élargies d'un halo, et
+recopiée dans les entrées GEMO précédentes ; sans empreintes du MNS précédent, ou avec un
+masque ou une INIT fournis, tout le chantier est préparé de nouveau.
+Les nouvelles entrées GEMO sont préparées dans un répertoire d'attente et ne remplacent
+celles de l'exécution précédente qu'une fois les dalles et le MNT mis à jour : après un
+échec, la mise à jour suivante retrouve les mêmes blocs modifiés.
+"""
+
+import copy
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import rasterio
+from loguru import logger
+from rasterio.windows import Window
+from scipy import ndimage
+
+from . import config
+from .gemaut_config import GEMAUTConfig
+
+
+class IncrementalUpdater:
+    """Recalcule uniquement les dalles GEMO touchées par une modification du MNS"""
+
+    def __init__(self, gemaut_config: GEMAUTConfig, block_size: int = config.INCREMENTAL_BLOCK_SIZE,
+                 source_block_size: int = config.INCREMENTAL_SOURCE_BLOCK_SIZE):
+        """
+        Args:
+            gemaut_config: Configuration du nouveau calcul ; work_dir doit être le répertoire
+                           de l'exécution précédente (lancée sans --clean) et mnt_output le MNT
+                           existant, mis à jour sur place
+            block_size: Taille des blocs d'empreinte, en pixels de la grille de travail
+            source_block_size: Taille des blocs d'empreinte du MNS source, en pixels du MNS
+        """
+        self.config = gemaut_config
+        self.block_size = block_size
+        self.source_block_size = source_block_size
+
+    @staticmethod
+    def grid_signature(file_path: str) -> Tuple:
+        """Dimensions et géoréférencement d'un raster"""
+        with rasterio.open(file_path) as src:
+            return (src.width, src.height, tuple(src.transform)[:6], str(src.crs))
+
+    @staticmethod
+    def compute_block_hashes(file_paths: List[str], block_size: int) -> Dict[Tuple[int, int], str]:
+        """
+        Empreinte de chaque bloc (bi, bj) de block_size x block_size pixels, sur l'ensemble des rasters
+
+        Les rasters sont lus par bandes de block_size lignes.
+        """
+        sources = [rasterio.open(path) for path in file_paths]
+        try:
+            largeur, hauteur = sources[0].width, sources[0].height
+            hashes = {}
+            for bi, r0 in enumerate(range(0, hauteur, block_size)):
+                window = Window(0, r0, largeur, min(block_size, hauteur - r0))
+                bandes = [src.read(1, window=window) for src in sources]
+                for bj, c0 in enumerate(range(0, largeur, block_size)):
+                    h = hashlib.blake2b(digest_size=16)
+                    for bande in bandes:
+                        h.update(np.ascontiguousarray(bande[:, c0:c0 + block_size]).tobytes())
+                    hashes[(bi, bj)] = h.hexdigest()
+            return hashes
+        finally:
+            for src in sources:
+                src.close()
+
+    @staticmethod
+    def changed_blocks(old_hashes: Dict, new_hashes: Dict) -> Set[Tuple[int, int]]:
+        """Blocs dont l'empreinte diffère (ou qui n'existent que d'un côté)"""
+        keys = set(old_hashes) | set(new_hashes)
+        return {key for key in keys if old_hashes.get(key) != new_hashes.get(key)}
+
+    @staticmethod
+    def affected_tiles(changed: Set[Tuple[int, int]], block_size: int, nbre_dalle_x: int, nbre_dalle_y: int,
+                       tile_size: int, pad_size: int, largeur: int, hauteur: int) -> Set[Tuple[int, int]]:
+        """Dalles (x, y) dont la fenêtre élargie de pad_size intersecte un bloc modifié"""
+        pas = tile_size - pad_size
+
+        def intervalles(nbre_dalles, total):
+            debuts = np.arange(nbre_dalles) * pas
+            fins = debuts + np.minimum(tile_size, total - debuts)
+            return debuts - pad_size, fins + pad_size
+
+        debuts_x, fins_x = intervalles(nbre_dalle_x, largeur)
+        debuts_y, fins_y = intervalles(nbre_dalle_y, hauteur)
+
+        tiles = set()
+        for bi, bj in changed:
+            r0, c0 = bi * block_size, bj * block_size
+            xs = np.nonzero((debuts_x < c0 + block_size) & (fins_x > c0))[0]
+            ys = np.nonzero((debuts_y < r0 + block_size) & (fins_y > r0))[0]
+            tiles.update((int(x), int(y)) for x in xs for y in ys)
+        return tiles
+
+    @staticmethod
+    def source_regions(changed: Set[Tuple[int, int]], block_size: int, halo: int, align: int,
+                       largeur: int, hauteur: int) -> List[Tuple[Tuple[int, int, int, int], Tuple[int, int, int, int]]]:
+        """
+        Régions du MNS à préparer de nouveau, (cœur, région) en pixels du MNS (r0, c0, r1, c1)
+
+        Les blocs modifiés dont les halos se recouvrent forment une seule région ; le cœur
+        englobe ses blocs modifiés, la région l'élargit de halo pixels, bornes alignées sur
+        un multiple de align (pixels de la grille de travail et dalles SAGA inchangés).
+        """
+        nbre_i, nbre_j = -(-hauteur // block_size), -(-largeur // block_size)
+        modifies = np.zeros((nbre_i, nbre_j), dtype=bool)
+        for bi, bj in changed:
+            if bi < nbre_i and bj < nbre_j:
+                modifies[bi, bj] = True
+        if not modifies.any():
+            return []
+
+        marge = -(-halo // block_size)
+        voisins = ndimage.binary_dilation(modifies, np.ones((3, 3), bool), iterations=marge) if marge else modifies
+        etiquettes, _ = ndimage.label(voisins, np.ones((3, 3), int))
+
+        regions = []
+        for tranche in ndimage.find_objects(np.where(modifies, etiquettes, 0)):
+            if tranche is None:
+                continue
+            r0, r1 = tranche[0].start * block_size, min(tranche[0].stop * block_size, hauteur)
+            c0, c1 = tranche[1].start * block_size, min(tranche[1].stop * block_size, largeur)
+            region = (max(0, (r0 - halo) // align * align), max(0, (c0 - halo) // align * align),
+                      min(hauteur, -(-(r1 + halo) // align) * align), min(largeur, -(-(c1 + halo) // align) * align))
+            regions.append(((r0, c0, r1, c1), region))
+        return regions
+
+    @staticmethod
+    def source_settings(gemaut_config: GEMAUTConfig, mask_file: Optional[str], init_file: Optional[str]) -> Dict:
+        """Paramètres de la préparation : des empreintes du MNS ne sont comparables qu'à paramètres égaux"""
+        return {
+            'resolution': gemaut_config.resolution,
+            'nodata_ext': gemaut_config.nodata_ext,
+            'nodata_int': gemaut_config.nodata_int,
+            'nodata_max': gemaut_config.nodata_max,
+            'nodata_interne_mask': gemaut_config.nodata_interne_mask,
+            'ground_value': gemaut_config.ground_value,
+            'auto_mask_computation': gemaut_config.auto_mask_computation,
+            'mask_method': gemaut_config.mask_method,
+            'saga': gemaut_config.get_saga_params(),
+            'pdal': gemaut_config.get_pdal_params(),
+            'numpy': gemaut_config.get_numpy_params(),
+            'mask_file': mask_file,
+            'init_file': init_file
+        }
+
+    @staticmethod
+    def write_source_hashes(gemaut_config: GEMAUTConfig, hashes: Dict[Tuple[int, int], str], block_size: int,
+                            mask_file: Optional[str], init_file: Optional[str]):
+        """Enregistre les empreintes du MNS source, référence de la mise à jour suivante"""
+        contenu = {
+            'block_size': block_size,
+            'grid': IncrementalUpdater.grid_signature(gemaut_config.mns_input),
+            'settings': IncrementalUpdater.source_settings(gemaut_config, mask_file, init_file),
+            'blocks': {f"{bi}_{bj}": value for (bi, bj), value in hashes.items()}
+        }
+        tmp_path = gemaut_config.source_hashes_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(contenu, f)
+        os.replace(tmp_path, gemaut_config.source_hashes_file)
+
+    def _previous_source_hashes(self, grid: Tuple) -> Optional[Dict[Tuple[int, int], str]]:
+        """Empreintes du MNS de l'exécution précédente, None si la préparation doit être complète"""
+        if self.config.mask_file is not None or self.config.init_file is not None:
+            logger.info("Masque ou INIT fourni : préparation complète du chantier")
+            return None
+        if not os.path.exists(self.config.source_hashes_file):
+            logger.info("Empreintes du MNS précédent absentes : préparation complète du chantier")
+            return None
+        with open(self.config.source_hashes_file) as f:
+            precedent = json.load(f)
+        attendu = json.loads(json.dumps({
+            'block_size': self.source_block_size,
+            'grid': grid,
+            'settings': self.source_settings(self.config, None, None)
+        }))
+        if any(precedent.get(key) != value for key, value in attendu.items()):
+            logger.info("Grille du MNS ou paramètres de préparation modifiés : préparation complète du chantier")
+            return None
+        facteur = self.config.resolution / abs(grid[2][0])
+        if facteur < 1 or not math.isclose(facteur, round(facteur)):
+            logger.info(f"Résolution de travail non multiple du pixel du MNS ({facteur:.3f}) : "
+                        "préparation complète du chantier")
+            return None
+        return {tuple(int(v) for v in key.split('_')): value for key, value in precedent['blocks'].items()}
+
+    def _prepare_regions(self, pipeline, changed: Set[Tuple[int, int]], inputs: List[str],
+                         staged: List[str]) -> Tuple[int, int]:
+        """
+        Prépare de nouveau les seules régions modifiées du MNS, recopiées dans les entrées
+        GEMO précédentes (en attente)
+
+        Returns:
+            Nombre de dalles en X et en Y
+        """
+        from .script_gemaut import GEMAUTPipeline
+
+        with rasterio.open(self.config.mns_input) as src:
+            largeur, hauteur = src.width, src.height
+            facteur = int(round(self.config.resolution / abs(src.transform.a)))
+        # Halo : voisinage du filtre sol/sursol et dalle SAGA entière de part et d'autre
+        halo = 2 * self.config.radius_saga + self.config.tile_saga
+        align = facteur * self.config.tile_saga // math.gcd(facteur, self.config.tile_saga)
+        regions = self.source_regions(changed, self.source_block_size, halo, align, largeur, hauteur)
+        logger.info(f"{len(changed)} blocs du MNS modifiés -> {len(regions)} régions à préparer de nouveau")
+
+        for new, old in zip(staged, inputs):
+            shutil.copyfile(old, new)
+
+        staging_dir = os.path.dirname(staged[0])
+        for index, (coeur, region) in enumerate(regions):
+            r0, c0, r1, c1 = region
+            region_dir = os.path.join(staging_dir, f"region_{index}")
+            os.makedirs(region_dir)
+            crop = os.path.join(region_dir, os.path.basename(self.config.mns_input))
+            window = Window(c0, r0, c1 - c0, r1 - r0)
+            with rasterio.open(self.config.mns_input) as src:
+                profile = {
+                    'driver': 'GTiff', 'height': window.height, 'width': window.width, 'count': 1,
+                    'dtype': src.dtypes[0], 'crs': src.crs, 'transform': src.window_transform(window),
+                    'nodata': src.nodata
+                }
+                with rasterio.open(crop, 'w', **profile) as dst:
+                    dst.write(src.read(1, window=window), 1)
+
+            region_config = copy.copy(self.config)
+            region_config.mns_input = crop
+            region_config.work_dir = region_dir
+            region_config.scratch_backend = 'geotiff'
+            region_config.trace_file = None
+            region_config.metrics_file = None
+            region_config.metrics_port = None
+            region_config._setup_paths()
+            GEMAUTPipeline(region_config, configure_logging=False).prepare()
+
+            # Cœur de la région, en pixels de la grille de travail, recopié dans les entrées en attente
+            wr0, wc0 = coeur[0] // facteur, coeur[1] // facteur
+            for name, chemin in zip(GEMAUTPipeline.GEMO_INPUTS, staged):
+                with rasterio.open(region_config.temp_files[name]) as src, rasterio.open(chemin, 'r+') as dst:
+                    wr1 = min(-(-coeur[2] // facteur), r0 // facteur + src.height, dst.height)
+                    wc1 = min(-(-coeur[3] // facteur), c0 // facteur + src.width, dst.width)
+                    data = src.read(1, window=Window(wc0 - c0 // facteur, wr0 - r0 // facteur, wc1 - wc0, wr1 - wr0))
+                    dst.write(data, 1, window=Window(wc0, wr0, wc1 - wc0, wr1 - wr0))
+
+        if self.config.scratch_backend == 'chunks':
+            pipeline._build_scratch_stores()
+        pipeline._count_tiles()
+        return pipeline.tile_dims
+
+    def staging_path(self, name: str) -> str:
+        """Entrée GEMO de la nouvelle exécution, en attente jusqu'à la mise à jour du MNT"""
+        return os.path.join(self.config.tmp_dir, config.TEMP_DIRS['incremental'],
+                            os.path.basename(self.config.temp_files[name]))
+
+    def tile_path(self, x: int, y: int) -> str:
+        """MNT GEMO d'une dalle"""
+        return os.path.join(self.config.tmp_dir, f"Dalle_{x}_{y}", f"Out_MNT_{x}_{y}.tif")
+
+    def _check_previous_run(self) -> List[str]:
+        """Vérifie que l'exécution précédente a laissé ses entrées GEMO et le MNT"""
+        inputs = [self.config.temp_files['mns_sous_ech'],
+                  self.config.temp_files['masque_sous_ech'],
+                  self.config.temp_files['init_sous_ech']]
+        for path in inputs + [self.config.mnt_output]:
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"Fichier de l'exécution précédente introuvable: {path} "
+                    "(lancer d'abord le pipeline complet sans --clean)")
+        return inputs
+
+    def run(self) -> Set[Tuple[int, int]]:
+        """
+        Met à jour le MNT existant
+
+        Returns:
+            Ensemble des dalles (x, y) recalculées
+        """
+        from .script_gemaut import GEMAUTPipeline
+        from .seam_repair import SeamRepairer
+        from .tile_processor import TileAssembler
+
+        if self.config.tile_plan != 'grid':
+            raise ValueError("La mise à jour incrémentale suppose la grille uniforme (tile_plan 'grid') : "
+                             "le plan quadtree dépend du MNS, relancer le pipeline complet")
+
+        start_time = time.time()
+        inputs = self._check_previous_run()
+        old_grid = self.grid_signature(inputs[0])
+        old_hashes = self.compute_block_hashes(inputs, self.block_size)
+
+        # Nouvelles entrées GEMO préparées à part : celles de l'exécution précédente restent la
+        # référence des empreintes tant que le MNT n'est pas mis à jour
+        staging_dir = os.path.join(self.config.tmp_dir, config.TEMP_DIRS['incremental'])
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        staged_config = copy.copy(self.config)
+        staged_config.temp_files = {**self.config.temp_files,
+                                    **{name: self.staging_path(name) for name in GEMAUTPipeline.GEMO_INPUTS}}
+        staged = [staged_config.temp_files[name] for name in GEMAUTPipeline.GEMO_INPUTS]
+
+        pipeline = GEMAUTPipeline(staged_config)
+        logger.info(f"🔁 Mise à jour incrémentale du MNT {self.config.mnt_output}")
+
+        # Régions modifiées du MNS source : seules celles-ci sont préparées de nouveau
+        source_hashes = self.compute_block_hashes([self.config.mns_input], self.source_block_size)
+        previous_source = self._previous_source_hashes(self.grid_signature(self.config.mns_input))
+        if previous_source is None:
+            nbre_dalle_x, nbre_dalle_y = pipeline.prepare()
+        else:
+            source_changed = self.changed_blocks(previous_source, source_hashes)
+            if not source_changed:
+                shutil.rmtree(staging_dir)
+                logger.info("MNS inchangé : le MNT existant est à jour")
+                return set()
+            nbre_dalle_x, nbre_dalle_y = self._prepare_regions(pipeline, source_changed, inputs, staged)
+
+        if self.grid_signature(staged[0]) != old_grid:
+            raise ValueError("La grille de travail a changé (emprise, résolution ou CRS) : relancer le pipeline complet")
+
+        largeur, hauteur = old_grid[0], old_grid[1]
+        changed = self.changed_blocks(old_hashes, self.compute_block_hashes(staged, self.block_size))
+        if not changed:
+            shutil.rmtree(staging_dir)
+            self.write_source_hashes(self.config, source_hashes, self.source_block_size,
+                                     self.config.mask_file, self.config.init_file)
+            logger.info("Aucun bloc modifié : le MNT existant est à jour")
+            return set()
+
+        tiles = self.affected_tiles(changed, self.block_size, nbre_dalle_x, nbre_dalle_y,
+                                    self.config.tile_size, self.config.pad_size, largeur, hauteur)
+        logger.info(f"{len(changed)}/{len(old_hashes)} blocs modifiés -> "
+                    f"{len(tiles)}/{nbre_dalle_x * nbre_dalle_y} dalles à recalculer")
+
+        missing = [(x, y) for x in range(nbre_dalle_x) for y in range(nbre_dalle_y)
+                   if (x, y) not in tiles and not os.path.exists(self.tile_path(x, y))]
+        if missing:
+            raise FileNotFoundError(f"{len(missing)} dalles de l'exécution précédente manquantes "
+                                    "(lancer d'abord le pipeline complet sans --clean)")
+
+        pipeline._cut_tiles(tiles=tiles)
+        pipeline._run_gemo_parallel(nbre_dalle_x, nbre_dalle_y, tiles=tiles)
+
+        # Seules les fenêtres des dalles recalculées changent dans la mosaïque
+        pas = self.config.tile_size - self.config.pad_size
+        mnt_tmp = self.config.temp_files['mnt_out_tmp']
+        with rasterio.open(self.config.mnt_output, 'r+') as dst, \
+             rasterio.open(staged[0]) as src_mns:
+            dst_tmp = rasterio.open(mnt_tmp, 'r+') if os.path.exists(mnt_tmp) else None
+            try:
+                for x, y in sorted(tiles):
+                    window = Window(x * pas, y * pas, min(self.config.tile_size, largeur - x * pas),
+                                    min(self.config.tile_size, hauteur - y * pas))
+                    mosaique = TileAssembler.assemble_window(
+                        self.tile_path, nbre_dalle_x, nbre_dalle_y, self.config.tile_size,
+                        self.config.pad_size, largeur, hauteur, window)
+                    if dst_tmp is not None:
+                        dst_tmp.write(mosaique, 1, window=window)
+                    mns = src_mns.read(1, window=window)
+                    dst.write(np.where(mns == self.config.nodata_ext, self.config.nodata_ext, mosaique)
+                              .astype(np.float32), 1, window=window)
+            finally:
+                if dst_tmp is not None:
+                    dst_tmp.close()
+
+        if self.config.seam_repair:
+            # Raccords des dalles recalculées repris dans le MNT livré (nodata fixé)
+            SeamRepairer.repair(self.tile_path, nbre_dalle_x, nbre_dalle_y, self.config.tile_size,
+                                self.config.pad_size, self.config.mnt_output, staged[0], staged[1],
+                                self.config.get_gemo_params(), self.config.seam_threshold,
+                                self.config.cpu_count, tiles=tiles)
+
+        # MNT à jour : les nouvelles entrées deviennent la référence de la mise à jour suivante
+        for new, old in zip(staged, inputs):
+            os.replace(new, old)
+        shutil.rmtree(staging_dir)
+        self.write_source_hashes(self.config, source_hashes, self.source_block_size,
+                                 self.config.mask_file, self.config.init_file)
+
+        logger.info(f"✅ MNT mis à jour: {len(tiles)} dalles recalculées en {time.time() - start_time:.2f}s")
+        return tiles
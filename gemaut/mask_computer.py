@@ -3,7 +3,8 @@
 
 """
 Module pour le calcul automatique de masques sol/sursol
-Supporte SAGA et PDAL comme méthodes d'extraction
+Supporte SAGA, PDAL et un filtre NumPy intégré comme méthodes d'extraction
+Les méthodes sont fournies par le registre mask_engines
 """
 
 import os
@@ -13,22 +14,7 @@ from loguru import logger
 from typing import Dict, Optional, Tuple
 import subprocess
 from . import config
-
-# Import des modules d'intégration existants
-try:
-    from .saga_integration import SAGAIntegration
-    SAGA_AVAILABLE = True
-except ImportError:
-    SAGA_AVAILABLE = False
-    logger.warning("Module SAGA non disponible")
-
-try:
-    # Import direct de PDAL sans dépendre d'un chemin codé en dur
-    from .pdal_integration import PDALIntegration
-    PDAL_AVAILABLE = True
-except ImportError:
-    PDAL_AVAILABLE = False
-    logger.warning("⚠️ Module PDAL non disponible")
+from . import mask_engines
 
 
 class MaskComputer:
@@ -40,34 +26,15 @@ class MaskComputer:
         logger.info(f"Méthodes disponibles: {', '.join(self.available_methods)}")
     
     def _check_available_methods(self) -> list:
-        """Vérifie quelles méthodes sont disponibles"""
+        """Vérifie quelles méthodes sont disponibles (sondes des binaires en cache)"""
         methods = []
         
-        if SAGA_AVAILABLE:
-            try:
-                saga_instance = SAGAIntegration()
-                if saga_instance.validate_saga_installation():
-                    methods.append('saga')
-                    logger.info("✅ SAGA disponible et fonctionnel")
-                else:
-                    logger.warning("⚠️ SAGA détecté mais non fonctionnel")
-            except Exception as e:
-                logger.warning(f"⚠️ SAGA non fonctionnel: {e}")
-        else:
-            logger.warning("⚠️ Module SAGA non disponible")
-        
-        if PDAL_AVAILABLE:
-            try:
-                pdal_instance = PDALIntegration()
-                if pdal_instance._check_pdal_available():
-                    methods.append('pdal')
-                    logger.info("✅ PDAL disponible et fonctionnel")
-                else:
-                    logger.warning("⚠️ PDAL détecté mais non fonctionnel")
-            except Exception as e:
-                logger.warning(f"⚠️ PDAL non fonctionnel: {e}")
-        else:
-            logger.warning("⚠️ Module PDAL non disponible")
+        for name in mask_engines.get_engine_names():
+            if mask_engines.is_engine_available(name):
+                methods.append(name)
+                logger.info(f"✅ {name.upper()} disponible et fonctionnel")
+            else:
+                logger.warning(f"⚠️ {name.upper()} non disponible")
         
         if not methods:
             logger.error("❌ Aucune méthode d'extraction disponible!")
@@ -77,7 +44,7 @@ class MaskComputer:
     
     def compute_mask(self, mns_file: str, output_mask_file: str, 
                     work_dir: str, method: str = 'auto',
-                    cpu_count: int = 4, params: Optional[Dict] = None) -> str:
+                    cpu_count: int = 4, params: Optional[Dict] = None, executor=None) -> str:
         """
         Calcule un masque sol/sursol avec la méthode spécifiée
         
@@ -85,9 +52,10 @@ class MaskComputer:
             mns_file: Fichier MNS d'entrée
             output_mask_file: Fichier de sortie du masque
             work_dir: Répertoire de travail
-            method: Méthode à utiliser ('saga', 'pdal', ou 'auto')
+            method: Méthode à utiliser ('saga', 'pdal', 'numpy' ou 'auto')
             cpu_count: Nombre de CPUs à utiliser
             params: Paramètres spécifiques à la méthode
+            executor: ExecutorService du pipeline, transmis au moteur (workers partagés)
             
         Returns:
             Chemin vers le fichier masque généré
@@ -115,12 +83,8 @@ class MaskComputer:
         start_time = time.time()
         
         try:
-            if method == 'saga':
-                mask_file = self._compute_with_saga(mns_file, output_mask_file, work_dir, cpu_count, params)
-            elif method == 'pdal':
-                mask_file = self._compute_with_pdal(mns_file, output_mask_file, work_dir, cpu_count, params)
-            else:
-                raise ValueError(f"Méthode non supportée: {method}")
+            mask_file = self._compute_with_engine(method, mns_file, output_mask_file, work_dir, cpu_count, params,
+                                                 executor)
             
             execution_time = time.time() - start_time
             logger.info(f"✅ Masque calculé avec succès en {execution_time:.2f}s")
@@ -158,40 +122,31 @@ class MaskComputer:
                 'csf_hdiff': config.PDAL_CSF_HDIFF,                       # 0.2
                 'csf_smooth': config.PDAL_CSF_SMOOTH,                     # True
             }
+        elif method == 'numpy':
+            return {
+                'radius': 100.0,      # Rayon de la plus grande fenêtre, en pixels
+                'no_data_max': 32768, # NoData max du MNS préparé pour le calcul de masque
+                'pente': 15.0,        # Pente de 15° (paramètre GEMAUT)
+                'dh0': config.NUMPY_PMF_DH0,
+                'dh_max': config.NUMPY_PMF_DH_MAX,
+                'block_size': config.NUMPY_PMF_BLOCK_SIZE,
+            }
         else:
-            raise ValueError(f"Méthode non supportée: {method}")
-    
-    def _compute_with_saga(self, mns_file: str, output_mask_file: str, 
-                          work_dir: str, cpu_count: int, params: Dict) -> str:
-        """Calcule le masque avec SAGA"""
-        logger.info("🔧 Utilisation de SAGA pour l'extraction...")
-        
-        # Créer le répertoire de sortie si nécessaire
-        os.makedirs(os.path.dirname(output_mask_file), exist_ok=True)
-        
-        # Calculer le masque avec la méthode statique
-        SAGAIntegration.compute_mask_with_saga(
-            mns_file=mns_file,
-            output_mask_file=output_mask_file,
-            saga_work_dir=work_dir,
-            cpu_count=cpu_count,
-            saga_params=params
-        )
-        
-        return output_mask_file
+            # Moteurs enregistrés hors de GEMAUT
+            return mask_engines.get_default_params(method)
     
-    def _compute_with_pdal(self, mns_file: str, output_mask_file: str, 
-                          work_dir: str, cpu_count: int, params: Dict) -> str:
-        """Calcule le masque avec PDAL"""
-        logger.info("🔧 Utilisation de PDAL pour l'extraction...")
-        
-        pdal_instance = PDALIntegration()
+    def _compute_with_engine(self, method: str, mns_file: str, output_mask_file: str, 
+                            work_dir: str, cpu_count: int, params: Dict, executor=None) -> str:
+        """Calcule le masque avec le moteur enregistré pour la méthode"""
+        logger.info(f"🔧 Utilisation de {method.upper()} pour l'extraction...")
         
         # Créer le répertoire de sortie si nécessaire
-        os.makedirs(os.path.dirname(output_mask_file), exist_ok=True)
+        os.makedirs(os.path.dirname(output_mask_file) or '.', exist_ok=True)
         
-        # Calculer le masque
-        pdal_instance.compute_mask(
+        engine = mask_engines.create_engine(method)
+        # Attribut plutôt que paramètre : les moteurs enregistrés hors de GEMAUT gardent leur signature
+        engine.executor = executor
+        engine.compute_mask(
             mns_file=mns_file,
             output_mask_file=output_mask_file,
             work_dir=work_dir,
@@ -207,6 +162,7 @@ class MaskComputer:
             'available_methods': self.available_methods,
             'saga_available': 'saga' in self.available_methods,
             'pdal_available': 'pdal' in self.available_methods,
+            'numpy_available': 'numpy' in self.available_methods,
             'recommended_method': 'saga' if 'saga' in self.available_methods else ('pdal' if 'pdal' in self.available_methods else None)
         }
         
@@ -224,6 +180,13 @@ class MaskComputer:
                 'disadvantages': ['Plus récent', 'Paramètres à optimiser']
             }
         
+        if 'numpy' in self.available_methods:
+            info['numpy_info'] = {
+                'description': 'Filtre morphologique progressif NumPy/SciPy',
+                'advantages': ['Aucune dépendance externe', 'Pas de fichiers intermédiaires', 'Parallélisé par blocs'],
+                'disadvantages': ['Sensible aux seuils de hauteur', 'Paramètres à optimiser']
+            }
+        
         return info
 
 
@@ -238,7 +201,7 @@ def compute_mask_auto(mns_file: str, output_mask_file: str, work_dir: str,
         mns_file: Fichier MNS d'entrée
         output_mask_file: Fichier de sortie du masque
         work_dir: Répertoire de travail
-        method: Méthode à utiliser ('saga', 'pdal', ou 'auto')
+        method: Méthode à utiliser ('saga', 'pdal', 'numpy' ou 'auto')
         cpu_count: Nombre de CPUs à utiliser
         params: Paramètres spécifiques à la méthode
         
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registre des moteurs de calcul de masque sol/sursol
+Les modules d'intégration ne sont importés qu'à l'utilisation, et la détection des
+binaires externes (saga_cmd, pdal) est mise en cache sur disque, par chemin et date
+de modification du binaire : la sonde n'est lancée qu'une fois par installation.
+Seuls les binaires fonctionnels sont enregistrés : un échec (bibliothèque manquante,
+timeout) dépend de l'environnement plus que du binaire et la sonde est relancée au
+processus suivant.
+"""
+
+import importlib
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+CACHE_FILENAME = 'mask_engines.json'
+PROBE_TIMEOUT = 10
+
+
+@dataclass
+class MaskEngineSpec:
+    """Description d'un moteur de masque enregistré"""
+    name: str
+    target: str                                  # "module:Classe", importé à la demande
+    binary: Optional[str] = None                 # binaire externe requis
+    version_args: Tuple[str, ...] = ('--version',)
+    modules: Tuple[str, ...] = ()                # modules Python requis (vérifiés sans import)
+    default_params: Dict = field(default_factory=dict)
+
+
+_ENGINES: Dict[str, MaskEngineSpec] = {}
+# Résultats de sonde déjà connus dans ce processus
+_probes: Dict[str, Dict] = {}
+
+
+def register_engine(name: str, target: str, binary: Optional[str] = None,
+                    version_args: Tuple[str, ...] = ('--version',),
+                    modules: Tuple[str, ...] = (),
+                    default_params: Optional[Dict] = None) -> None:
+    """
+    Enregistre un moteur de masque
+
+    Args:
+        name: Nom de la méthode (valeur de --mask-method)
+        target: Classe implémentant compute_mask, sous la forme "module:Classe"
+        binary: Binaire externe dont la présence conditionne la disponibilité
+        version_args: Arguments de la sonde du binaire
+        modules: Modules Python requis
+        default_params: Paramètres par défaut de la méthode
+    """
+    _ENGINES[name] = MaskEngineSpec(name, target, binary, tuple(version_args),
+                                    tuple(modules), dict(default_params or {}))
+
+
+def get_engine_names() -> List[str]:
+    """Noms des moteurs enregistrés, dans l'ordre d'enregistrement"""
+    return list(_ENGINES)
+
+
+def get_engine_spec(name: str) -> MaskEngineSpec:
+    """Retourne la description d'un moteur enregistré"""
+    if name not in _ENGINES:
+        raise ValueError(f"Moteur de masque inconnu: {name}. Moteurs enregistrés: {', '.join(_ENGINES)}")
+    return _ENGINES[name]
+
+
+def get_cache_path() -> str:
+    """Chemin du cache de capacités ($GEMAUT_CACHE_DIR, sinon $XDG_CACHE_HOME/gemaut ou ~/.cache/gemaut)"""
+    cache_dir = os.environ.get('GEMAUT_CACHE_DIR')
+    if not cache_dir:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        cache_dir = os.path.join(base, 'gemaut')
+    return os.path.join(cache_dir, CACHE_FILENAME)
+
+
+def _load_cache() -> Dict:
+    try:
+        with open(get_cache_path(), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache: Dict) -> None:
+    """Écriture atomique du cache ; un cache non inscriptible n'empêche pas le traitement"""
+    cache_path = get_cache_path()
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"⚠️ Cache des moteurs de masque non enregistré ({cache_path}): {e}")
+
+
+def probe_binary(binary: str, version_args: Tuple[str, ...] = ('--version',)) -> Dict:
+    """
+    Détecte un binaire externe, avec cache disque par chemin résolu et date de modification
+    (un échec n'est mémorisé que dans le processus courant)
+
+    Returns:
+        {'available': bool, 'path': str ou None, 'version': str}
+    """
+    path = shutil.which(binary)
+    if path is None:
+        return {'available': False, 'path': None, 'version': ''}
+    path = os.path.realpath(path)
+    mtime_ns = os.stat(path).st_mtime_ns
+    key = f"{path}|{' '.join(version_args)}"
+
+    probe = _probes.get(key)
+    if probe is not None and probe['mtime_ns'] == mtime_ns:
+        return probe
+
+    cache = _load_cache()
+    probe = cache.get(key)
+    if probe is None or probe.get('mtime_ns') != mtime_ns or not probe.get('available'):
+        try:
+            result = subprocess.run([path, *version_args], capture_output=True, text=True,
+                                    timeout=PROBE_TIMEOUT)
+            available = result.returncode == 0
+            version = (result.stdout or result.stderr).strip()
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"⚠️ Sonde de {path} en échec: {e}")
+            available, version = False, ''
+        probe = {'available': available, 'path': path, 'version': version, 'mtime_ns': mtime_ns}
+        if available:
+            cache[key] = probe
+            _save_cache(cache)
+        elif cache.pop(key, None) is not None:
+            _save_cache(cache)
+        logger.debug(f"Sonde de {path}: {'disponible' if available else 'non fonctionnel'}")
+
+    _probes[key] = probe
+    return probe
+
+
+def is_engine_available(name: str) -> bool:
+    """Un moteur est disponible si ses modules Python et son binaire éventuel sont présents"""
+    spec = get_engine_spec(name)
+    for module in spec.modules:
+        if importlib.util.find_spec(module) is None:
+            return False
+    if spec.binary is not None:
+        return probe_binary(spec.binary, spec.version_args)['available']
+    return True
+
+
+def available_engines() -> List[str]:
+    """Noms des moteurs disponibles"""
+    return [name for name in _ENGINES if is_engine_available(name)]
+
+
+def create_engine(name: str):
+    """Importe la classe du moteur et en retourne une instance"""
+    module_name, class_name = get_engine_spec(name).target.split(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def get_default_params(name: str) -> Dict:
+    """Copie des paramètres par défaut enregistrés pour un moteur"""
+    return dict(get_engine_spec(name).default_params)
+
+
+# Moteurs fournis avec GEMAUT
+register_engine('saga', 'gemaut.saga_integration:SAGAIntegration', binary='saga_cmd')
+register_engine('pdal', 'gemaut.pdal_integration:PDALIntegration', binary='pdal')
+register_engine('numpy', 'gemaut.numpy_ground_filter:NumpyGroundFilter', modules=('scipy',))
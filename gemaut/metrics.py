@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Métriques d'avancement d'un chantier au format d'exposition Prometheus
+Un chantier national dure des heures et les barres tqdm de la console ne se surveillent
+pas : l'étape en cours, les tuiles GEMO terminées, leur débit, l'ETA, l'occupation des
+workers, l'espace du répertoire de travail et la mémoire résidente du chantier sont
+publiés dans un fichier texte (collecteur textfile de node_exporter, réécrit toutes les
+METRICS_INTERVAL secondes) et/ou sur un point HTTP local /metrics. L'horodatage du dernier
+progrès permet d'alerter sur un chantier bloqué.
+"""
+
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from . import config
+
+
+class ProductionMetrics:
+    """État d'avancement du chantier, exporté périodiquement"""
+
+    def __init__(self, work_dir: str, textfile: Optional[str] = None, port: Optional[int] = None,
+                 interval: float = config.METRICS_INTERVAL, host: str = config.METRICS_HOST):
+        """
+        Args:
+            work_dir: répertoire de travail (espace disque mesuré)
+            textfile: fichier .prom réécrit à chaque intervalle (remplacement atomique)
+            port: port du point HTTP /metrics (0 : port libre choisi par le système)
+            interval: période de mesure et d'écriture, en secondes
+        """
+        self.work_dir = work_dir
+        self.textfile = textfile
+        self.port = port
+        self.interval = interval
+        self.host = host
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.last_progress = self.start_time
+        self.stages: Dict[str, float] = {}      # étape -> début (en cours)
+        self.durations: Dict[str, float] = {}   # étape -> durée (terminée)
+        self.tiles_total = 0
+        self.tiles_done = 0
+        self.tiles_failed = 0
+        self.tiles_start: Optional[float] = None
+        self.wave_base = (0, 0)                 # tuiles terminées et en échec des vagues précédentes
+        self.busy_ratio = 0.0
+        self.system = {'scratch': 0, 'free': 0, 'rss': 0}
+        self.server = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    # Mises à jour (étapes et GEMO)
+
+    def stage_started(self, name: str) -> None:
+        with self.lock:
+            self.stages[name] = time.time()
+            self.last_progress = time.time()
+
+    def stage_finished(self, name: str) -> None:
+        with self.lock:
+            start = self.stages.pop(name, time.time())
+            self.durations[name] = time.time() - start
+            self.last_progress = time.time()
+
+    def tiles_started(self, total: int) -> None:
+        """Début d'une vague de tuiles GEMO (s'ajoute aux vagues précédentes du chantier)"""
+        with self.lock:
+            self.tiles_total += total
+            self.wave_base = (self.tiles_done, self.tiles_failed)
+            if self.tiles_start is None:
+                self.tiles_start = time.time()
+
+    def tiles_progress(self, done: int, failed: int, running: int, workers: int) -> None:
+        """
+        Args:
+            done, failed: tuiles de la vague en cours au résultat définitif (dont en échec)
+            running: tentatives GEMO en cours ; workers : tentatives simultanées possibles
+        """
+        with self.lock:
+            done, failed = self.wave_base[0] + done, self.wave_base[1] + failed
+            if done > self.tiles_done:
+                self.last_progress = time.time()
+            self.tiles_done, self.tiles_failed = done, failed
+            self.busy_ratio = min(running, workers) / workers if workers else 0.0
+
+    # Mesures du nœud
+
+    @staticmethod
+    def directory_size(path: str) -> int:
+        """Taille des fichiers d'un répertoire, sous-répertoires compris (octets)"""
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    # Fichier temporaire supprimé pendant le parcours
+                    continue
+        return total
+
+    @staticmethod
+    def process_tree_rss(pid: Optional[int] = None) -> int:
+        """Mémoire résidente d'un processus et de ses descendants (workers, commandes externes), 0 hors Linux"""
+        pid = pid if pid is not None else os.getpid()
+        children: Dict[int, List[int]] = {}
+        rss: Dict[int, int] = {}
+        page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        try:
+            entries = [e for e in os.listdir('/proc') if e.isdigit()]
+        except OSError:
+            return 0
+        for entry in entries:
+            try:
+                with open(f"/proc/{entry}/stat", 'r') as f:
+                    # Le nom de la commande (2e champ) peut contenir des espaces
+                    fields = f.read().rsplit(')', 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            # Champs après le nom : état (3), ppid (4), ..., rss en pages (24)
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            rss[int(entry)] = int(fields[21]) * page_size
+        total, todo = 0, [pid]
+        while todo:
+            current = todo.pop()
+            total += rss.get(current, 0)
+            todo.extend(children.get(current, []))
+        return total
+
+    def sample(self) -> None:
+        """Mesure l'espace disque et la mémoire (coûteux : une fois par intervalle)"""
+        system = {'scratch': 0, 'free': 0, 'rss': ProductionMetrics.process_tree_rss()}
+        if os.path.isdir(self.work_dir):
+            system['scratch'] = ProductionMetrics.directory_size(self.work_dir)
+            system['free'] = shutil.disk_usage(self.work_dir).free
+        with self.lock:
+            self.system = system
+
+    # Export
+
+    @staticmethod
+    def _label(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def render(self) -> str:
+        """Métriques au format d'exposition texte Prometheus"""
+        now = time.time()
+        with self.lock:
+            rate = 0.0
+            if self.tiles_start is not None and now > self.tiles_start:
+                rate = self.tiles_done / (now - self.tiles_start)
+            remaining = max(0, self.tiles_total - self.tiles_done)
+            eta = remaining / rate if rate > 0 else (0.0 if remaining == 0 else -1.0)
+            gauges: List[Tuple[str, str, list]] = [
+                ('gemaut_start_time_seconds', "Début du chantier (epoch)", [('', self.start_time)]),
+                ('gemaut_last_progress_timestamp_seconds', "Dernier progrès : étape ou tuile terminée (epoch)",
+                 [('', self.last_progress)]),
+                ('gemaut_stage_running', "Étapes en cours (1) et terminées (0)",
+                 [(f'{{stage="{self._label(n)}"}}', 1) for n in sorted(self.stages)]
+                 + [(f'{{stage="{self._label(n)}"}}', 0) for n in sorted(self.durations) if n not in self.stages]),
+                ('gemaut_stage_duration_seconds', "Durée des étapes terminées",
+                 [(f'{{stage="{self._label(n)}"}}', d) for n, d in sorted(self.durations.items())]),
+                ('gemaut_tiles_total', "Tuiles GEMO à traiter", [('', self.tiles_total)]),
+                ('gemaut_tiles_done', "Tuiles GEMO au résultat définitif", [('', self.tiles_done)]),
+                ('gemaut_tiles_failed', "Tuiles GEMO en échec après les reprises", [('', self.tiles_failed)]),
+                ('gemaut_tiles_per_second', "Débit moyen des tuiles GEMO depuis le lancement de GEMO",
+                 [('', rate)]),
+                ('gemaut_eta_seconds', "Temps restant estimé pour GEMO (-1 : inconnu)", [('', eta)]),
+                ('gemaut_workers_busy_ratio', "Part des workers GEMO occupés", [('', self.busy_ratio)]),
+                ('gemaut_scratch_bytes', "Taille du répertoire de travail", [('', self.system['scratch'])]),
+                ('gemaut_scratch_free_bytes', "Espace libre du système de fichiers du répertoire de travail",
+                 [('', self.system['free'])]),
+                ('gemaut_rss_bytes', "Mémoire résidente du chantier, workers et commandes compris",
+                 [('', self.system['rss'])]),
+            ]
+        lines = []
+        for name, help_text, samples in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self) -> None:
+        """Réécrit le fichier texte en une fois (jamais lu à moitié par le collecteur)"""
+        tmp = f"{self.textfile}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, self.textfile)
+
+    def _export(self) -> None:
+        try:
+            self.sample()
+            if self.textfile:
+                self.write_textfile()
+        except OSError as e:
+            # La surveillance ne doit jamais interrompre le chantier
+            logger.warning(f"⚠️ Métriques non exportées: {e}")
+
+    def _loop(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self._export()
+
+    def start(self) -> None:
+        """Démarre l'écriture périodique et le point HTTP"""
+        self._export()
+        if self.port is not None:
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ('/', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body = metrics.render().encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            self.port = self.server.server_address[1]
+            logger.info(f"📈 Métriques publiées sur http://{self.host}:{self.port}/metrics")
+        if self.textfile:
+            logger.info(f"📈 Métriques écrites dans {self.textfile} toutes les {self.interval:g}s")
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Dernière écriture (état final du chantier) puis arrêt"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self._export()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
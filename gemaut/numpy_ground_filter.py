@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module d'extraction du sol en NumPy/SciPy, sans binaire externe
+Filtre morphologique progressif (Zhang et al., 2003) calculé par blocs avec halo
+Génère directement un masque binaire (0=sol, 1=sursol) sur la grille du MNS
+"""
+
+import math
+import os
+import signal
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import numpy as np
+import rasterio
+from loguru import logger
+from rasterio.windows import Window
+from scipy import ndimage
+
+from . import config
+from .ground_extraction_interface import GroundExtractionInterface
+from .tracing import Tracer
+
+
+# MNS ouvert une seule fois par worker (rouvert si un autre MNS est demandé : workers partagés)
+_src_mns = None
+
+# Valeur de remplacement du no_data : jamais retenue par l'érosion, identique pour tous les blocs
+_VALEUR_HAUTE = np.float32(3.0e38)
+
+
+def _init_worker(mns_file: str) -> None:
+    """Initialise un worker : ignore SIGINT, pas de logs, ouvre le MNS une seule fois"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.remove()
+    _ouvrir_mns(mns_file)
+
+
+def _ouvrir_mns(mns_file: str):
+    """MNS ouvert par ce worker"""
+    global _src_mns
+    if _src_mns is None or _src_mns.name != mns_file:
+        if _src_mns is not None:
+            _src_mns.close()
+        _src_mns = rasterio.open(mns_file)
+    return _src_mns
+
+
+def tailles_fenetres(radius: int) -> List[int]:
+    """
+    Tailles des fenêtres d'ouverture (croissance exponentielle 3, 5, 9, 17, ...)
+    jusqu'à la fenêtre de rayon radius (en pixels), toujours incluse
+    """
+    taille_max = 2 * int(radius) + 1
+    tailles = []
+    k = 1
+    while 2 ** k + 1 < taille_max:
+        tailles.append(2 ** k + 1)
+        k += 1
+    tailles.append(taille_max)
+    return tailles
+
+
+def seuils_hauteur(tailles: List[int], resolution: float, pente: float,
+                   dh0: float, dh_max: float) -> List[float]:
+    """Seuils de hauteur par fenêtre : dh0 puis dh0 + tan(pente) * (w_k - w_k-1) * résolution, bornés par dh_max"""
+    s = math.tan(math.radians(pente))
+    seuils = [dh0]
+    for precedente, taille in zip(tailles[:-1], tailles[1:]):
+        seuils.append(min(dh_max, dh0 + s * (taille - precedente) * resolution))
+    return seuils
+
+
+def filtre_morphologique_progressif(z: np.ndarray, tailles: List[int], seuils: List[float],
+                                    invalide: np.ndarray = None) -> np.ndarray:
+    """
+    Classe un bloc de MNS en sol (0) / sursol (1) par ouvertures successives
+
+    Un pixel est sursol dès que l'ouverture de taille w_k l'abaisse de plus de dh_k
+    par rapport à la surface ouverte précédente. Les pixels invalides sont exclus de
+    l'ouverture (remplacés par une valeur haute) et classés sursol.
+    """
+    surface = z.astype(np.float32, copy=True)
+    if invalide is None:
+        invalide = ~np.isfinite(surface)
+    if invalide.all():
+        return np.ones(z.shape, dtype=np.uint8)
+    surface[invalide] = _VALEUR_HAUTE
+
+    sursol = invalide.copy()
+    for taille, seuil in zip(tailles, seuils):
+        # les carrés emboîtés rendent l'ouverture de l'ouverture égale à l'ouverture du MNS
+        ouverte = ndimage.grey_opening(surface, size=(taille, taille), mode='nearest')
+        sursol |= (surface - ouverte) > seuil
+        surface = ouverte
+    return sursol.astype(np.uint8)
+
+
+def _traiter_bloc(args: Tuple) -> Tuple[int, int, np.ndarray]:
+    """Classe un bloc du MNS lu avec son halo et renvoie le cœur du bloc"""
+    mns_file, row_off, col_off, hauteur, largeur, halo, no_data, tailles, seuils = args
+    debut = time.time()
+    src = _ouvrir_mns(mns_file)
+
+    r0 = max(0, row_off - halo)
+    c0 = max(0, col_off - halo)
+    r1 = min(src.height, row_off + hauteur + halo)
+    c1 = min(src.width, col_off + largeur + halo)
+    z = src.read(1, window=Window(c0, r0, c1 - c0, r1 - r0))
+
+    invalide = ~np.isfinite(z)
+    if no_data is not None:
+        invalide |= (z == no_data)
+
+    masque = filtre_morphologique_progressif(z, tailles, seuils, invalide)
+    Tracer.record('masque', 'bloc', debut, time.time(), ligne=row_off, colonne=col_off)
+    return row_off, col_off, masque[row_off - r0:row_off - r0 + hauteur, col_off - c0:col_off - c0 + largeur]
+
+
+class NumpyGroundFilter(GroundExtractionInterface):
+    """Extraction du sol par filtre morphologique progressif (NumPy/SciPy)"""
+
+    def compute_mask(self, mns_file: str, output_mask_file: str,
+                     work_dir: str, cpu_count: int,
+                     params: Dict) -> None:
+        """
+        Calcule le masque sol/sursol par blocs avec halo, en parallèle
+
+        Args:
+            mns_file: Chemin vers le fichier MNS
+            output_mask_file: Chemin de sortie pour le masque
+            work_dir: Répertoire de travail (non utilisé : aucun fichier intermédiaire)
+            cpu_count: Nombre de CPUs à utiliser
+            params: Paramètres (radius en pixels, pente en degrés, no_data_max,
+                    et optionnellement dh0, dh_max, block_size)
+        """
+        self.validate_cpu_count(cpu_count)
+        self.validate_params(params)
+        self.validate_output_path(output_mask_file)
+
+        logger.info("🚀 Démarrage de l'extraction avec le filtre morphologique NumPy")
+        start_time = time.time()
+
+        block_size = int(params.get('block_size', config.NUMPY_PMF_BLOCK_SIZE))
+        dh0 = params.get('dh0', config.NUMPY_PMF_DH0)
+        dh_max = params.get('dh_max', config.NUMPY_PMF_DH_MAX)
+
+        with rasterio.open(mns_file) as src:
+            profile = src.profile
+            hauteur, largeur = src.height, src.width
+            resolution = self._resolution_metrique(src)
+
+        tailles = tailles_fenetres(params['radius'])
+        seuils = seuils_hauteur(tailles, resolution, params['pente'], dh0, dh_max)
+        # l'ouverture de taille w dépend des pixels à 2 * (w // 2) : le halo rend les blocs indépendants
+        halo = 2 * (tailles[-1] // 2)
+        logger.info(f"Fenêtres: {tailles} - Seuils: {[round(s, 2) for s in seuils]} - Halo: {halo} px")
+
+        tasks = [
+            (mns_file, r, c, min(block_size, hauteur - r), min(block_size, largeur - c), halo,
+             params.get('no_data_max'), tailles, seuils)
+            for r in range(0, hauteur, block_size)
+            for c in range(0, largeur, block_size)
+        ]
+
+        profile.update(driver='GTiff', dtype=np.uint8, count=1, nodata=None,
+                       compress='lzw', tiled=False, blockxsize=None, blockysize=None)
+        with rasterio.open(output_mask_file, 'w', **profile) as dst:
+            def ecrire(pool):
+                for row_off, col_off, bloc in pool.imap_unordered(_traiter_bloc, tasks):
+                    dst.write(bloc, 1, window=Window(col_off, row_off, bloc.shape[1], bloc.shape[0]))
+
+            if self.executor is not None:
+                ecrire(self.executor.cpu)
+            else:
+                with Pool(processes=min(cpu_count, len(tasks)), initializer=_init_worker,
+                          initargs=(mns_file,)) as pool:
+                    ecrire(pool)
+
+        elapsed_time = time.time() - start_time
+        logger.info(f"✅ NumPy: masque calculé en {elapsed_time:.2f}s ({len(tasks)} blocs)")
+
+    @staticmethod
+    def _resolution_metrique(src) -> float:
+        """Résolution en mètres (approximation au centre du MNS pour un CRS géographique)"""
+        resolution = abs(src.res[0])
+        if src.crs is not None and src.crs.is_geographic:
+            center_y = src.transform.f + (src.transform.e * src.height / 2)
+            resolution *= 111320 * math.cos(math.radians(center_y))
+        return resolution
+
+    def validate_installation(self) -> bool:
+        """Toujours disponible : ne dépend que de NumPy, SciPy et rasterio"""
+        return True
+
+    def get_version(self) -> str:
+        """Versions de NumPy et SciPy utilisées"""
+        import scipy
+        return f"numpy {np.__version__}, scipy {scipy.__version__}"
+
+    def check_dependencies(self) -> Dict[str, bool]:
+        """Vérifie les dépendances nécessaires"""
+        return {'numpy': True, 'scipy': True, 'rasterio': True}
+
+    def log_environment(self) -> None:
+        """Enregistre les informations sur l'environnement"""
+        logger.info("=== Informations environnement NumPy ===")
+        logger.info(f"Version: {self.get_version()}")
+        logger.info(f"CPU disponibles: {os.cpu_count()}")
+        logger.info("========================================")
+
+    def get_required_params(self) -> list:
+        """Retourne la liste des paramètres requis"""
+        return ['radius', 'pente', 'no_data_max']
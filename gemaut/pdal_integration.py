@@ -18,6 +18,8 @@ import json
 import subprocess
 
 from .ground_extraction_interface import GroundExtractionInterface
+from .mask_engines import probe_binary
+from .tracing import Tracer
 
 
 class PDALIntegration(GroundExtractionInterface):
@@ -54,13 +56,8 @@ class PDALIntegration(GroundExtractionInterface):
             raise
     
     def _check_pdal_available(self) -> bool:
-        """Vérifie si PDAL est disponible dans le système"""
-        try:
-            result = subprocess.run(['pdal', '--version'], 
-                                  capture_output=True, text=True, check=False)
-            return result.returncode == 0
-        except FileNotFoundError:
-            return False
+        """Vérifie si PDAL est disponible dans le système (sonde mise en cache)"""
+        return probe_binary('pdal')['available']
     
     def compute_mask_with_pdal_pipeline(self, mns_file: str, output_mask_file: str, work_dir: str, params: Dict) -> None:
         """
@@ -98,7 +95,8 @@ class PDALIntegration(GroundExtractionInterface):
             # Exécuter la pipeline PDAL
             logger.info("⚡ Exécution de la pipeline PDAL...")
             cmd = ['pdal', 'pipeline', pipeline_file]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            with Tracer.span('pdal', 'commande', command=' '.join(cmd)):
+                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
             
             if result.stdout:
                 logger.debug(f"Sortie PDAL: {result.stdout}")
@@ -269,27 +267,19 @@ class PDALIntegration(GroundExtractionInterface):
     
     def validate_installation(self) -> bool:
         """Vérifie si PDAL est correctement installé"""
-        try:
-            result = subprocess.run(['pdal', '--version'],
-                                  capture_output=True, text=True, check=False)
-            if result.returncode == 0:
-                logger.info("PDAL détecté et fonctionnel")
-                return True
-            else:
-                logger.warning("PDAL non disponible")
-                return False
-        except FileNotFoundError:
+        probe = probe_binary('pdal')
+        if probe['available']:
+            logger.info("PDAL détecté et fonctionnel")
+        elif probe['path'] is None:
             logger.warning("PDAL non installé")
-            return False
+        else:
+            logger.warning("PDAL non disponible")
+        return probe['available']
     
     def get_version(self) -> str:
         """Obtient la version de PDAL installée"""
-        try:
-            result = subprocess.run(['pdal', '--version'], 
-                                  capture_output=True, text=True, check=True)
-            return result.stdout.strip()
-        except Exception:
-            return "PDAL non disponible"
+        probe = probe_binary('pdal')
+        return probe['version'] if probe['available'] else "PDAL non disponible"
     
     def check_dependencies(self) -> Dict[str, bool]:
         """Vérifie les dépendances PDAL nécessaires"""
@@ -300,12 +290,7 @@ class PDALIntegration(GroundExtractionInterface):
         }
         
         # Vérifier PDAL
-        try:
-            result = subprocess.run(['pdal', '--version'], 
-                                  capture_output=True, text=True, check=False)
-            dependencies['pdal'] = result.returncode == 0
-        except FileNotFoundError:
-            pass
+        dependencies['pdal'] = probe_binary('pdal')['available']
         
         # Vérifier GDAL
         try:
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Exécution des commandes externes (saga_cmd, gdalwarp, main_GEMAUT_unit) avec asyncio
+Les commandes sont lancées directement (liste d'arguments, sans shell) par une boucle asyncio
+du processus courant : une commande en cours ne bloque ni un worker Python ni un shell. La
+concurrence est bornée par un sémaphore, chaque commande a son timeout (COMMAND_TIMEOUTS par
+défaut) et seule la fin de sa sortie d'erreur est conservée (PROCESS_STDERR_MAX_BYTES).
+Un runner démarré (start) garde sa boucle dans un thread : des commandes soumises depuis
+plusieurs threads (submit, tuiles GEMO du moteur natif) partagent alors un même sémaphore.
+"""
+
+import asyncio
+import os
+import resource
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from loguru import logger
+from tqdm import tqdm
+
+from . import config
+from .tracing import Tracer
+
+
+@dataclass
+class CommandResult:
+    """Résultat d'une commande externe"""
+    argv: List[str]
+    returncode: int
+    reason: Optional[str] = None       # None, 'timeout' ou 'annulée'
+    stderr: str = ''                   # fin de la sortie d'erreur
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and self.reason is None
+
+    @property
+    def command(self) -> str:
+        return ' '.join(self.argv)
+
+
+class ProcessRunner:
+    """Commandes externes en parallèle, au plus max_concurrency à la fois"""
+
+    # Intervalle de surveillance du timeout et du fichier d'annulation (s)
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, max_concurrency: int, stderr_limit: int = config.PROCESS_STDERR_MAX_BYTES,
+                 data_limit: Optional[int] = None):
+        """
+        Args:
+            data_limit: plafond RLIMIT_DATA de chaque commande, en octets (aucun si None)
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"Concurrence invalide: {max_concurrency}")
+        self.max_concurrency = max_concurrency
+        self.stderr_limit = stderr_limit
+        self.data_limit = data_limit
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def default_timeout(argv: Sequence[str]) -> Optional[float]:
+        """Timeout configuré pour l'exécutable de la commande (COMMAND_TIMEOUTS), None sinon"""
+        return config.COMMAND_TIMEOUTS.get(os.path.basename(argv[0]))
+
+    async def run(self, argv: Sequence[str], timeout: Optional[float] = None,
+                  cancel_file: Optional[str] = None, stdout_file: Optional[str] = None) -> CommandResult:
+        """
+        Exécute une commande (sans limite de concurrence : voir run_all)
+
+        La commande tourne dans son propre groupe de processus, tué en entier en cas de
+        dépassement ou d'annulation.
+
+        Args:
+            timeout: durée maximale en secondes (None : timeout configuré, 0 : pas de limite)
+            cancel_file: la commande est tuée dès que ce fichier existe
+            stdout_file: fichier recevant la sortie standard (ignorée par défaut)
+        """
+        argv = [str(arg) for arg in argv]
+        if timeout is None:
+            timeout = ProcessRunner.default_timeout(argv)
+        start = time.monotonic()
+        wall_start = time.time()
+        stdout = open(stdout_file, 'wb') if stdout_file else asyncio.subprocess.DEVNULL
+        try:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *argv, stdin=asyncio.subprocess.DEVNULL, stdout=stdout,
+                    stderr=asyncio.subprocess.PIPE, start_new_session=True)
+            except OSError as e:
+                return CommandResult(argv, 127, stderr=str(e), duration=time.monotonic() - start)
+            if self.data_limit is not None:
+                self._limit_data(proc.pid)
+            stderr = asyncio.ensure_future(self._read_tail(proc.stderr))
+            waiter = asyncio.ensure_future(proc.wait())
+            reason = None
+            try:
+                while True:
+                    done, _ = await asyncio.wait({waiter}, timeout=ProcessRunner.POLL_INTERVAL)
+                    if done:
+                        break
+                    if timeout and time.monotonic() - start > timeout:
+                        reason = 'timeout'
+                    elif cancel_file and os.path.exists(cancel_file):
+                        reason = 'annulée'
+                    else:
+                        continue
+                    ProcessRunner._kill(proc.pid)
+                    break
+            except asyncio.CancelledError:
+                # Runner arrêté pendant la commande (close) : elle ne doit pas lui survivre
+                ProcessRunner._kill(proc.pid)
+                raise
+            returncode = await waiter
+            # Une ligne par commande (PID) : plusieurs commandes tournent dans le même thread
+            Tracer.record(os.path.basename(argv[0]), 'commande', wall_start, time.time(), tid=proc.pid,
+                          command=' '.join(argv), returncode=returncode, reason=reason)
+            return CommandResult(argv, returncode, reason, await stderr, time.monotonic() - start)
+        finally:
+            if stdout_file:
+                stdout.close()
+
+    @staticmethod
+    def _kill(pid: int) -> None:
+        """Tue le groupe de processus d'une commande"""
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def _limit_data(self, pid: int) -> None:
+        """Plafonne la mémoire de la commande lancée (avant ses allocations : lecture des entrées)"""
+        _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+        limit = self.data_limit if hard == resource.RLIM_INFINITY else min(self.data_limit, hard)
+        try:
+            resource.prlimit(pid, resource.RLIMIT_DATA, (limit, hard))
+        except (OSError, AttributeError) as e:
+            # Commande déjà terminée, ou plateforme sans prlimit
+            logger.debug(f"Plafond mémoire non appliqué au processus {pid}: {e}")
+    
+    async def _read_tail(self, stream) -> str:
+        """Lit un flux jusqu'au bout en ne gardant que ses stderr_limit derniers octets"""
+        tail = bytearray()
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            tail += chunk
+            if len(tail) > self.stderr_limit:
+                del tail[:len(tail) - self.stderr_limit]
+        return tail.decode(errors='replace')
+
+    async def _run_all(self, commands: List[Sequence[str]], timeout: Optional[float],
+                       progress: Optional[tqdm]) -> List[CommandResult]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(argv):
+            async with semaphore:
+                result = await self.run(argv, timeout)
+            if progress is not None:
+                progress.update()
+            return result
+
+        return await asyncio.gather(*(bounded(argv) for argv in commands))
+
+    def run_all(self, commands: List[Sequence[str]], timeout: Optional[float] = None,
+                desc: Optional[str] = None) -> List[CommandResult]:
+        """
+        Exécute des commandes, au plus max_concurrency à la fois
+
+        Args:
+            timeout: durée maximale de chaque commande (None : timeout configuré)
+            desc: libellé de la barre de progression (pas de barre si None)
+
+        Returns:
+            Résultats, dans l'ordre des commandes
+        """
+        progress = tqdm(total=len(commands), desc=desc) if desc else None
+        try:
+            return asyncio.run(self._run_all(commands, timeout, progress))
+        finally:
+            if progress is not None:
+                progress.close()
+
+    def start(self) -> 'ProcessRunner':
+        """Démarre la boucle du runner dans un thread (voir submit)"""
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever, name='process-runner', daemon=True)
+            self.thread.start()
+        return self
+    
+    async def _bounded(self, argv, timeout, cancel_file, stdout_file) -> CommandResult:
+        # Créé dans la boucle du runner, seul thread qui l'utilise
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.semaphore:
+            return await self.run(argv, timeout, cancel_file, stdout_file)
+    
+    def submit(self, argv: Sequence[str], timeout: Optional[float] = None, cancel_file: Optional[str] = None,
+               stdout_file: Optional[str] = None) -> Future:
+        """
+        Soumet une commande à la boucle du runner démarré, depuis n'importe quel thread (voir run)
+        
+        Returns:
+            Future dont result() renvoie le CommandResult ; au plus max_concurrency commandes
+            soumises tournent à la fois
+        """
+        if self.loop is None:
+            raise RuntimeError("ProcessRunner non démarré (start)")
+        return asyncio.run_coroutine_threadsafe(self._bounded(argv, timeout, cancel_file, stdout_file), self.loop)
+    
+    @staticmethod
+    async def _cancel_all() -> None:
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def close(self) -> None:
+        """Arrête la boucle du runner ; les commandes encore en cours sont tuées"""
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(ProcessRunner._cancel_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop, self.thread, self.semaphore = None, None, None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    @staticmethod
+    def run_command(argv: Sequence[str], timeout: Optional[float] = None, cancel_file: Optional[str] = None,
+                    stdout_file: Optional[str] = None) -> CommandResult:
+        """Exécute une seule commande et attend sa fin (voir run)"""
+        return asyncio.run(ProcessRunner(1).run(argv, timeout, cancel_file, stdout_file))
+
+    @staticmethod
+    def log_failures(results: List[CommandResult], label: str) -> int:
+        """Journalise les commandes en échec avec la fin de leur sortie d'erreur ; renvoie leur nombre"""
+        failures = [r for r in results if not r.ok]
+        for result in failures:
+            detail = result.reason or f"code {result.returncode}"
+            logger.warning(f"⚠️ {label} en échec ({detail}): {result.command}")
+            if result.stderr.strip():
+                logger.warning(f"   {result.stderr.strip().splitlines()[-1]}")
+        return len(failures)
@@ -11,15 +11,26 @@ import subprocess
 from loguru import logger
 from typing import Dict
 from SAGA.script_saga_ground_extraction import main_saga_ground_extraction
+from .mask_engines import probe_binary
 
 
 class SAGAIntegration:
     """Classe pour l'intégration avec SAGA"""
     
+    # ExecutorService du pipeline, affecté par MaskComputer (voir GroundExtractionInterface)
+    executor = None
+    
+    def compute_mask(self, mns_file: str, output_mask_file: str, 
+                    work_dir: str, cpu_count: int,
+                    params: Dict) -> None:
+        """Point d'entrée commun aux moteurs de masque (voir mask_engines)"""
+        SAGAIntegration.compute_mask_with_saga(mns_file, output_mask_file, work_dir, cpu_count, params,
+                                               self.executor)
+    
     @staticmethod
     def compute_mask_with_saga(mns_file: str, output_mask_file: str, 
                               saga_work_dir: str, cpu_count: int,
-                              saga_params: Dict) -> None:
+                              saga_params: Dict, executor=None) -> None:
         """
         Calcule automatiquement le masque sol/sursol avec SAGA
         
@@ -29,6 +40,8 @@ class SAGAIntegration:
             saga_work_dir: Répertoire de travail pour SAGA
             cpu_count: Nombre de CPUs à utiliser
             saga_params: Paramètres SAGA (radius, tile, no_data_max, pente)
+            executor: ExecutorService du pipeline (dallage sur la voie de calcul, assemblage sur
+                      la voie d'E/S) ; pools créés par le script SAGA si None
         """
         try:
             logger.info("Calcul automatique du masque avec SAGA")
@@ -49,7 +62,8 @@ class SAGAIntegration:
                 saga_params['radius'],
                 saga_params['tile'],
                 saga_params['no_data_max'],
-                saga_params['pente']
+                saga_params['pente'],
+                executor=executor
             )
             
             logger.info(f"Masque SAGA calculé avec succès: {output_mask_file}")
@@ -63,40 +77,21 @@ class SAGAIntegration:
     
     @staticmethod
     def validate_saga_installation() -> bool:
-        """Vérifie si SAGA est correctement installé"""
-        try:
-            # Tenter d'exécuter une commande SAGA simple
-            result = subprocess.run(['saga_cmd', '--version'], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                logger.info("SAGA détecté et fonctionnel")
-                return True
-            else:
-                logger.warning("SAGA détecté mais retourne un code d'erreur")
-                return False
-        except FileNotFoundError:
+        """Vérifie si SAGA est correctement installé (sonde mise en cache)"""
+        probe = probe_binary('saga_cmd')
+        if probe['available']:
+            logger.info("SAGA détecté et fonctionnel")
+        elif probe['path'] is None:
             logger.error("SAGA non trouvé dans le PATH")
-            return False
-        except subprocess.TimeoutExpired:
-            logger.error("Timeout lors de la vérification de SAGA")
-            return False
-        except Exception as e:
-            logger.error(f"Erreur lors de la vérification de SAGA: {e}")
-            return False
+        else:
+            logger.warning("SAGA détecté mais retourne un code d'erreur")
+        return probe['available']
     
     @staticmethod
     def get_saga_version() -> str:
         """Obtient la version de SAGA installée"""
-        try:
-            result = subprocess.run(['saga_cmd', '--version'], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                return result.stdout.strip()
-            else:
-                return "Version inconnue"
-        except Exception as e:
-            logger.error(f"Erreur lors de l'obtention de la version SAGA: {e}")
-            return "Version inconnue"
+        probe = probe_binary('saga_cmd')
+        return probe['version'] if probe['available'] else "Version inconnue"
     
     @staticmethod
     def check_saga_dependencies() -> Dict[str, bool]:
@@ -108,12 +103,7 @@ class SAGAIntegration:
         }
         
         # Vérifier saga_cmd
-        try:
-            result = subprocess.run(['saga_cmd', '--version'], 
-                                  capture_output=True, text=True, timeout=10)
-            dependencies['saga_cmd'] = result.returncode == 0
-        except:
-            pass
+        dependencies['saga_cmd'] = probe_binary('saga_cmd')['available']
         
         # Vérifier gdal
         try:
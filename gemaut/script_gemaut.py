@@ -11,25 +11,44 @@ import os
 import time
 import shutil
 import argparse
+from contextlib import contextmanager
 from loguru import logger
 
 # Import des modules refactorisés
+# image_utils, tile_processor et gemo_executor (rasterio, scipy, tqdm) sont importés
+# dans les étapes qui les utilisent : --help et --create-config restent immédiats
 from . import config
 from .gemaut_config import GEMAUTConfig
-from . import image_utils
-from . import tile_processor
-from . import gemo_executor
-from . import saga_integration
-
-from pprint import pprint
 
 class GEMAUTPipeline:
     """Pipeline principal GEMAUT refactorisé"""
     
-    def __init__(self, config: GEMAUTConfig):
-        """Initialise le pipeline avec la configuration"""
+    # Entrées GEMO sous-échantillonnées, dans l'ordre attendu par le découpage
+    GEMO_INPUTS = ('mns_sous_ech', 'masque_sous_ech', 'init_sous_ech')
+    
+    def __init__(self, config: GEMAUTConfig, configure_logging: bool = True, executor=None):
+        """
+        Initialise le pipeline avec la configuration
+        
+        Args:
+            configure_logging: False quand le logging est déjà configuré par l'appelant (mode batch)
+            executor: ExecutorService partagé (mode batch) ; à défaut run() crée celui du chantier
+        """
         self.config = config
-        self.setup_logging()
+        # Workers partagés par les étapes (voir executor_service)
+        self.executor = executor
+        # Métriques d'avancement publiées pendant run() (voir metrics)
+        self.metrics = None
+        # Présence de données valides par tuile, établie au découpage
+        self.tile_has_data = None
+        # Plan de tuilage quadtree (None : grille uniforme)
+        self.tile_plan = None
+        # Nombre de dalles en X et en Y, établi à l'étape 7
+        self.tile_dims = None
+        # Masque et INIT fournis par l'utilisateur (le calcul du masque remplace config.mask_file)
+        self.provided_inputs = (config.mask_file, config.init_file)
+        if configure_logging:
+            self.setup_logging()
         self.config.create_directories()
         
     def setup_logging(self):
@@ -46,7 +65,7 @@ class GEMAUTPipeline:
             logger.add(sys.stderr, level=config.LOG_LEVEL, format=config.LOG_FORMAT)
     
     def run(self):
-        """Exécute le pipeline complet"""
+        """Exécute le pipeline complet : graphe des étapes 0 à 12 (voir stage_graph)"""
         start_time = time.time()
         start_time_str = time.strftime("%d-%m-%Y %H:%M:%S", time.localtime(start_time))
         
@@ -54,52 +73,12 @@ class GEMAUTPipeline:
             logger.info(config.INFO_MESSAGES['start'].format(start_time=start_time_str))
             logger.info(f"Configuration: {self.config.to_dict()}")
             
-            # Étape 0: Vérification de la compatibilité MNS/Masque
-            self._validate_input_compatibility()
-            
-            # Étape 1: Remplissage des trous dans MNS
-            self._fill_holes_in_mns()
-            
-            # Étape 2: Remplacement des valeurs NoData max
-            self._replace_nodata_max()
-            
-            # Étape 3: Calcul ou utilisation du masque
-            self._process_mask()
-            
-            # Étape 4: Traitement du masque pour GEMO
-            logger.info("🚀 Étape 4: Traitement du masque pour GEMO")
-            self._prepare_mask_for_gemo()
-            
-            # Étape 5: Gestion des valeurs NoData externes et internes
-            logger.info("🚀 Étape 5: Gestion des valeurs NoData externes et internes")
-            self._handle_nodata_values()
-            
-            # Étape 6: Sous-échantillonnage
-            logger.info("🚀 Étape 6: Sous-échantillonnage")
-            self._resample_data()
+            # Préparation (0 à 7), découpage (8), GEMO (9), assemblage et finalisation (10 à 12)
+            with self._tracing(), self._metrics_scope(), self._executor_scope():
+                self._run_stages(self._preparation_stages() + self._processing_stages()
+                                 + self._finalization_stages())
             
-            # Étape 7: Calcul du nombre de dalles
-            nbre_dalle_x, nbre_dalle_y = self._calculate_tile_count()
-
-            # Étape 8: Découpage des dalles
-            self._cut_tiles()
-            
-            # Étape 9: Exécution de GEMO en parallèle
-            self._run_gemo_parallel(nbre_dalle_x, nbre_dalle_y)
-
-            # Étape 10: Assemblage final
-            self._assemble_final_result(nbre_dalle_x, nbre_dalle_y)
-
-            # Étape 11: Application du masque NoData final
-            self._apply_final_nodata_mask()
-
-            # Étape 12: Nettoyage (optionnel)
-            if self.config.clean_temp:
-                self._cleanup_temp_files()
-            
-            # Calcul et affichage du temps total
             self._log_completion_time(start_time)
-            
             logger.info(config.INFO_MESSAGES['end'])
             
         except Exception as e:
@@ -109,8 +88,156 @@ class GEMAUTPipeline:
             logger.error(f"Traceback complet:\n{traceback.format_exc()}")
             raise
     
+    def prepare(self):
+        """
+        Étapes 0 à 7 : préparation du MNS et du masque, sous-échantillonnage
+        
+        Returns:
+            Nombre de dalles en X et en Y
+        """
+        self._run_stages(self._preparation_stages())
+        return self.tile_dims
+    
+    def finalize(self, nbre_dalle_x, nbre_dalle_y, start_time):
+        """Étapes 10 à 12 : assemblage, masque NoData final et nettoyage"""
+        self.tile_dims = (nbre_dalle_x, nbre_dalle_y)
+        self._run_stages(self._finalization_stages())
+        
+        # Calcul et affichage du temps total
+        self._log_completion_time(start_time)
+        
+        logger.info(config.INFO_MESSAGES['end'])
+    
+    @contextmanager
+    def _tracing(self):
+        """
+        Trace d'exécution du chantier (--trace), activée avant la création des workers
+        qui en héritent ; exportée au format Chrome trace à la fin, même après une erreur
+        """
+        if not self.config.trace_file:
+            yield
+            return
+        from .tracing import Tracer
+        spans_dir = os.path.join(self.config.work_dir, config.TRACE_SPANS_DIR)
+        shutil.rmtree(spans_dir, ignore_errors=True)
+        Tracer.start(spans_dir)
+        try:
+            yield
+        finally:
+            Tracer.stop()
+            try:
+                Tracer.export(spans_dir, self.config.trace_file)
+            except OSError as e:
+                logger.warning(f"⚠️ Trace d'exécution non exportée: {e}")
+            shutil.rmtree(spans_dir, ignore_errors=True)
+    
+    @contextmanager
+    def _metrics_scope(self):
+        """Métriques d'avancement du chantier (--metrics-file, --metrics-port), état final écrit à la fin"""
+        if not self.config.metrics_file and self.config.metrics_port is None:
+            yield
+            return
+        from .metrics import ProductionMetrics
+        try:
+            with ProductionMetrics(self.config.work_dir, self.config.metrics_file,
+                                   self.config.metrics_port) as self.metrics:
+                yield
+        finally:
+            self.metrics = None
+    
+    @contextmanager
+    def _executor_scope(self):
+        """Service d'exécution du chantier, créé avant les étapes sauf s'il est fourni (mode batch)"""
+        if self.executor is not None:
+            yield self.executor
+            return
+        from .executor_service import ExecutorService
+        try:
+            with ExecutorService(self.config.cpu_count) as self.executor:
+                yield self.executor
+        finally:
+            self.executor = None
+    
+    def _cpu_pool(self):
+        """Voie de calcul du service d'exécution, None sans service (pool créé par l'étape)"""
+        return self.executor.cpu if self.executor is not None else None
+    
+    def _run_stages(self, stages):
+        """Exécute des étapes selon leurs dépendances dans le budget de CPU du chantier"""
+        from .stage_graph import StageGraph
+        StageGraph(stages, self.config.cpu_count, self.metrics).run()
+    
+    def _mask_cpus(self):
+        """CPU du calcul de masque : un CPU reste libre pour les étapes séquentielles qui peuvent l'accompagner"""
+        return max(1, self.config.cpu_count - 1)
+    
+    def _preparation_stages(self):
+        """
+        Étapes 0 à 7, entrées et sorties déclarées : le MNS comblé est sous-échantillonné
+        pendant le calcul du masque (qui ne lit que mns4saga), le masque est sous-échantillonné
+        pendant la préparation de INIT
+        """
+        from .stage_graph import Stage
+        cpus = self.config.cpu_count
+        mask_inputs = ('mns4saga',) if self.config.mask_file is None else ()
+        init_inputs = ('mns_sous_ech',) if self.config.init_file is None else ()
+        stages = [
+            # Étape 0: Vérification de la compatibilité MNS/Masque
+            Stage('compatibilite', self._validate_input_compatibility, outputs=('compatibilite',)),
+            # Étapes 1 et 2: Remplissage des trous et remplacement des valeurs NoData max du MNS
+            Stage('trous_mns', self._fill_holes_in_mns, outputs=('mns_sans_trou',)),
+            Stage('nodata_max', self._replace_nodata_max, ('mns_sans_trou',), ('mns4saga',)),
+            # Étape 3: Calcul ou utilisation du masque
+            Stage('masque', self._process_mask, mask_inputs + ('compatibilite',), ('masque',),
+                  cpus=self._mask_cpus() if mask_inputs else 1),
+            # Étapes 4 et 5: Traitement du masque pour GEMO, NoData externes et internes
+            Stage('masque_gemo', self._prepare_mask_for_gemo, ('masque',), ('masque_4gemo',)),
+            Stage('masque_nodata', self._handle_nodata_values, ('masque_4gemo',), ('masque_nodata',)),
+            # Étape 6: Sous-échantillonnage
+            Stage('sous_ech_mns', self._resample_mns, ('mns_sans_trou',), ('mns_sous_ech',)),
+            Stage('sous_ech_masque', self._resample_mask, ('masque_nodata',), ('masque_sous_ech',)),
+            Stage('init', self._prepare_init, init_inputs, ('init_sous_ech',)),
+        ]
+        if self.config.scratch_backend == 'chunks':
+            stages.append(Stage('blocs', self._build_scratch_stores, self.GEMO_INPUTS, ('blocs',), cpus))
+        # Étape 7: Calcul du nombre de dalles
+        stages.append(Stage('dalles', self._count_tiles, ('mns_sous_ech', 'masque_sous_ech'), ('dalles',)))
+        return stages
+    
+    def _processing_stages(self):
+        """Étapes 8 et 9 : découpage des dalles et GEMO en parallèle"""
+        from .stage_graph import Stage
+        cpus = self.config.cpu_count
+        cut_inputs = self.GEMO_INPUTS + ('dalles',) + (('blocs',) if self.config.scratch_backend == 'chunks' else ())
+        return [
+            Stage('decoupage', self._cut_tiles, cut_inputs, ('tuiles',), cpus),
+            Stage('gemo', lambda: self._run_gemo_parallel(*self.tile_dims), ('tuiles',), ('mnt_tuiles',), cpus),
+        ]
+    
+    def _finalization_stages(self):
+        """Étapes 10 à 12 : assemblage (et reprise des raccords), masque NoData final, nettoyage"""
+        from .stage_graph import Stage
+        cpus = self.config.cpu_count
+        # Étape 10: Assemblage final
+        stages = [Stage('assemblage', lambda: self._assemble_final_result(*self.tile_dims),
+                        ('mnt_tuiles',), ('mnt_out_tmp',), cpus)]
+        mosaic = 'mnt_out_tmp'
+        if self.config.seam_repair:
+            stages.append(Stage('raccords', lambda: self._repair_seams(*self.tile_dims),
+                                ('mnt_out_tmp',), ('mnt_raccords',), cpus))
+            mosaic = 'mnt_raccords'
+        # Étape 11: Application du masque NoData final
+        stages.append(Stage('nodata_final', self._apply_final_nodata_mask, (mosaic,), ('mnt_output',)))
+        # Étape 12: Nettoyage (optionnel), ou empreintes du MNS pour la mise à jour incrémentale
+        if self.config.clean_temp:
+            stages.append(Stage('nettoyage', self._cleanup_temp_files, ('mnt_output',)))
+        else:
+            stages.append(Stage('empreintes_mns', self._save_source_hashes, ('mnt_output',)))
+        return stages
+    
     def _validate_input_compatibility(self):
         """Vérifie la compatibilité entre le MNS et le masque"""
+        from . import image_utils
         if self.config.mask_file is None:
             logger.info("Aucun fichier masque fourni, la vérification sera effectuée après calcul du masque")
             return
@@ -145,6 +272,7 @@ class GEMAUTPipeline:
     
     def _fill_holes_in_mns(self):
         """Remplit les trous dans le MNS"""
+        from . import image_utils
         logger.info(config.INFO_MESSAGES['holes_filling'])
         image_utils.HoleFiller.fill_holes_simple(
             self.config.mns_input,
@@ -155,6 +283,7 @@ class GEMAUTPipeline:
     
     def _replace_nodata_max(self):
         """Remplace les valeurs NoData max dans MNS"""
+        from . import image_utils
         logger.info(config.INFO_MESSAGES['nodata_replacement'])
         image_utils.DataReplacer.replace_nodata_max(
             self.config.temp_files['mns_sans_trou'],
@@ -165,6 +294,7 @@ class GEMAUTPipeline:
     
     def _process_mask(self):
         """Traite le masque (calcul automatique ou utilisation du fichier fourni)"""
+        from . import image_utils
         if self.config.mask_file is None:
             if self.config.auto_mask_computation:
                 logger.info("Calcul automatique du masque sol/sursol...")
@@ -190,6 +320,8 @@ class GEMAUTPipeline:
                         params = self.config.get_saga_params()
                     elif self.config.mask_method == 'pdal':
                         params = self.config.get_pdal_params()
+                    elif self.config.mask_method == 'numpy':
+                        params = self.config.get_numpy_params()
                     else:
                         raise ValueError(f"Méthode non supportée: {self.config.mask_method}")
                     
@@ -199,8 +331,9 @@ class GEMAUTPipeline:
                         output_mask_file=output_mask_file,
                         work_dir=self.config.work_dir,
                         method=self.config.mask_method,
-                        cpu_count=self.config.cpu_count,
-                        params=params
+                        cpu_count=self._mask_cpus(),
+                        params=params,
+                        executor=self.executor
                     )
                     
                     # Pour SAGA, sauvegarder le masque brut avant correction
@@ -260,6 +393,8 @@ class GEMAUTPipeline:
 
     def _prepare_mask_for_gemo(self):
         """Prépare le masque pour GEMO"""
+        from . import image_utils
+        logger.info("🚀 Étape 4: Traitement du masque pour GEMO")
         logger.info(config.INFO_MESSAGES['mask_labeling'])
         image_utils.MaskProcessor.set_groundval_mask_to_0(
             self.config.mask_file,
@@ -269,6 +404,8 @@ class GEMAUTPipeline:
     
     def _handle_nodata_values(self):
         """Gère les valeurs NoData externes et internes"""
+        from . import image_utils
+        logger.info("🚀 Étape 5: Gestion des valeurs NoData externes et internes")
         logger.info(config.INFO_MESSAGES['nodata_management'])
         image_utils.MaskProcessor.set_nodata_extern_to_nodata_intern_mask(
             self.config.temp_files['masque_4gemo'],
@@ -279,8 +416,10 @@ class GEMAUTPipeline:
             self.config.nodata_interne_mask
         )
     
-    def _resample_data(self):
-        """Rééchantillonne les données à la résolution de travail"""
+    def _resample_mns(self):
+        """Rééchantillonne le MNS comblé à la résolution de travail"""
+        from . import image_utils, gemo_executor
+        logger.info("🚀 Étape 6: Sous-échantillonnage")
         logger.info(config.INFO_MESSAGES['subsampling'].format(reso=self.config.resolution))
         
         # Rééchantillonnage du MNS
@@ -300,8 +439,10 @@ class GEMAUTPipeline:
             self.config.nodata_ext
         )
         shutil.move(mns_sous_ech_filled, self.config.temp_files['mns_sous_ech'])
-        
-        # Rééchantillonnage du masque
+    
+    def _resample_mask(self):
+        """Rééchantillonne le masque GEMO à la résolution de travail"""
+        from . import gemo_executor
         gemo_executor.GDALProcessor.resample_mask(
             self.config.temp_files['masque_nodata'],
             self.config.temp_files['masque_sous_ech'],
@@ -316,7 +457,10 @@ class GEMAUTPipeline:
         #     shutil.copy2(self.config.temp_files['masque_sous_ech'], mask_corrige_saga)
         #     logger.info(f"💾 Masque SAGA corrigé sauvegardé: {mask_corrige_saga}")
         #     logger.info("   Ce fichier est géographiquement aligné avec le MNS")
-        
+    
+    def _prepare_init(self):
+        """Prépare l'initialisation GEMO à la résolution de travail"""
+        from . import gemo_executor
         # Initialisation GEMO : même surface que le MNS comblé sous-échantillonné.
         # GEMO normalise INIT avec le min/max du MNS (GEA.cpp) : des -32767 dans INIT
         # produisent un point de départ aberrant pour l'optimiseur.
@@ -333,43 +477,162 @@ class GEMAUTPipeline:
                 self.config.nodata_ext
             )
     
+    def _scratch_path(self, name):
+        """Raster intermédiaire lu par le découpage et l'assemblage : ChunkStore en backend 'chunks'"""
+        if self.config.scratch_backend == 'chunks':
+            return self.config.temp_stores[name]
+        return self.config.temp_files[name]
+    
+    def _build_scratch_stores(self):
+        """Convertit une fois les entrées GEMO sous-échantillonnées en ChunkStore"""
+        from .chunk_store import ChunkStore
+        for name in self.GEMO_INPUTS:
+            ChunkStore.from_raster(self.config.temp_files[name], self.config.temp_stores[name],
+                                   config.CHUNK_STORE_CHUNK_SIZE).close()
+        logger.info(f"Entrées GEMO converties en blocs de {config.CHUNK_STORE_CHUNK_SIZE} px")
+    
+    def _count_tiles(self):
+        """Étape 7 : nombre de dalles, conservé pour le découpage, GEMO et l'assemblage"""
+        self.tile_dims = self._calculate_tile_count()
+    
     def _calculate_tile_count(self):
-        """Calcule le nombre de dalles"""
+        """
+        Calcule le nombre de dalles
+        
+        Avec le plan quadtree, dimensions de la grille de base du plan : les dalles à traiter
+        sont celles du plan (plan_tiles)
+        """
+        from . import tile_processor
         logger.info(config.INFO_MESSAGES['tiles_calculation'])
+        if self.config.tile_plan == 'quadtree':
+            from .tile_plan import TilePlanner
+            self.tile_plan = TilePlanner.build(
+                self.config.temp_files['mns_sous_ech'],
+                self.config.temp_files['masque_sous_ech'],
+                self.config.tile_size,
+                self.config.pad_size,
+                self.config.nodata_ext
+            )
+            if self.tile_plan is not None:
+                self.tile_plan.save(self.config.tile_plan_file)
+                return self.tile_plan.nx, self.tile_plan.ny
         return tile_processor.TileCalculator.get_tile_dimensions(
             self.config.temp_files['mns_sous_ech'],
             self.config.tile_size,
             self.config.pad_size
         )
     
-    def _cut_tiles(self):
-        """Découpe le chantier en tuiles"""
+    def plan_tiles(self):
+        """Dalles du plan quadtree, None pour la grille uniforme (toutes les dalles)"""
+        return set(self.tile_plan) if self.tile_plan is not None else None
+    
+    def _use_shared_memory(self):
+        """Les entrées GEMO sont-elles chargées en mémoire partagée pour le découpage ?"""
+        if self.config.shared_memory != 'auto':
+            return self.config.shared_memory == 'on'
+        from .shared_rasters import available_memory, rasters_size
+        size = rasters_size(self.config.temp_files[name] for name in self.GEMO_INPUTS)
+        return size <= config.SHARED_MEMORY_MAX_RAM_FRACTION * available_memory()
+    
+    def _cut_tiles(self, pool=None, tiles=None):
+        """Découpe le chantier en tuiles (pool : voie de calcul du service par défaut, tiles : sous-ensemble de dalles)"""
+        from . import tile_processor
         logger.info(config.INFO_MESSAGES['tiles_cutting'])
-        tile_processor.TileCutter.cut_workspace(
-            self.config.temp_files['mns_sous_ech'],
-            self.config.temp_files['masque_sous_ech'],
-            self.config.temp_files['init_sous_ech'],
-            self.config.tile_size,
-            self.config.pad_size,
-            self.config.nodata_ext,
-            self.config.tmp_dir,
-            self.config.cpu_count
-        )
+        pool = pool if pool is not None else self._cpu_pool()
+        
+        def cut(sources):
+            return tile_processor.TileCutter.cut_workspace(
+                *sources,
+                self.config.tile_size,
+                self.config.pad_size,
+                self.config.nodata_ext,
+                self.config.tmp_dir,
+                self.config.cpu_count,
+                pool=pool,
+                tiles=tiles,
+                plan=self.tile_plan
+            )
+        
+        if self._use_shared_memory():
+            # Chargées une fois par le principal, lues sans copie par les workers
+            from .shared_rasters import SharedRasterSet
+            with SharedRasterSet() as shared:
+                sources = [shared.load(name, self.config.temp_files[name]) for name in self.GEMO_INPUTS]
+                logger.info("Entrées GEMO chargées en mémoire partagée pour le découpage")
+                self.tile_has_data = cut(sources)
+        else:
+            self.tile_has_data = cut([self._scratch_path(name) for name in self.GEMO_INPUTS])
     
-    def _run_gemo_parallel(self, nbre_dalle_x, nbre_dalle_y):
-        """Exécute GEMO en parallèle"""
+    def _run_gemo_parallel(self, nbre_dalle_x, nbre_dalle_y, tiles=None, slots=None):
+        """
+        Exécute GEMO en parallèle (tiles : sous-ensemble de dalles à traiter)
+        
+        slots : plafond de tentatives partagé par les chantiers d'un batch (voir batch) ; le
+        budget mémoire, mesuré pour un seul chantier, ne s'applique pas dans ce cas
+        """
+        from . import gemo_executor
+        from .gemo_stats import GemoTelemetry
         logger.info(config.INFO_MESSAGES['gemo_execution'])
+        gemo_params = self.config.get_gemo_params()
+        memory_policy = self.config.get_memory_policy() if slots is None else {'fraction': 0, 'worker_rlimit': False}
+        engine = gemo_params.get('engine', config.DEFAULT_GEMO_ENGINE)
+        native = engine not in gemo_executor.GEMOExecutor.INPROCESS_ENGINES
+        pool, runner = None, None
+        if self.executor is not None and native:
+            # main_GEMAUT_unit lancé par le runner du service, sans occuper de worker ; avec un
+            # plafond mémoire, run_gemo_parallel crée un runner qui l'applique à chaque commande
+            pool = self.executor.io
+            if not memory_policy['worker_rlimit']:
+                runner = self.executor.commands
+        elif self.executor is not None and not memory_policy['worker_rlimit']:
+            # Le plafond mémoire par worker exige des workers dédiés, créés par run_gemo_parallel
+            pool = self.executor.lane(io_bound=engine == 'extension')
         gemo_executor.GEMOExecutor.run_gemo_parallel(
             self.config.tmp_dir,
             nbre_dalle_x,
             nbre_dalle_y,
-            self.config.get_gemo_params(),
-            self.config.cpu_count
+            gemo_params,
+            self.config.cpu_count,
+            pool=pool,
+            tiles=tiles if tiles is not None else self.plan_tiles(),
+            has_data=self.tile_has_data,
+            retry_policy=self.config.get_retry_policy(),
+            manifest_file=self.config.incident_manifest,
+            telemetry=GemoTelemetry.from_config(self.config, self.tile_plan),
+            memory_policy=memory_policy,
+            metrics=self.metrics,
+            runner=runner,
+            slots=slots
         )
     
     def _assemble_final_result(self, nbre_dalle_x, nbre_dalle_y):
         """Assemble le résultat final"""
+        from . import tile_processor
         logger.info(config.INFO_MESSAGES['final_assembly'])
+        if self.config.scratch_backend == 'chunks':
+            tile_processor.TileAssembler.assemble_to_store(
+                self.config.tmp_dir,
+                nbre_dalle_x,
+                nbre_dalle_y,
+                self.config.tile_size,
+                self.config.pad_size,
+                self.config.temp_stores['mns_sous_ech'],
+                self.config.temp_stores['mnt_out_tmp'],
+                self.config.cpu_count,
+                config.CHUNK_STORE_CHUNK_SIZE,
+                pool=self._cpu_pool(),
+                plan=self.tile_plan
+            )
+            return
+        if self.tile_plan is not None:
+            tile_processor.TileAssembler.assemble_plan(
+                self.config.tmp_dir,
+                self.tile_plan,
+                self.config.temp_files['mns_sous_ech'],
+                self.config.temp_files['mnt_out_tmp'],
+                config.CHUNK_STORE_CHUNK_SIZE
+            )
+            return
         tile_processor.TileAssembler.assemble_tiles(
             self.config.tmp_dir,
             nbre_dalle_x,
@@ -377,15 +640,48 @@ class GEMAUTPipeline:
             self.config.temp_files['mnt_out_tmp']
         )
     
+    def _repair_seams(self, nbre_dalle_x, nbre_dalle_y):
+        """Reprend les raccords de la mosaïque assemblée où les tuiles voisines divergent"""
+        from functools import partial
+        from .seam_repair import SeamRepairer
+        from .tile_processor import TileAssembler
+        SeamRepairer.repair(
+            partial(TileAssembler.tile_mnt_path, self.config.tmp_dir),
+            nbre_dalle_x,
+            nbre_dalle_y,
+            self.config.tile_size,
+            self.config.pad_size,
+            self._scratch_path('mnt_out_tmp'),
+            self._scratch_path('mns_sous_ech'),
+            self._scratch_path('masque_sous_ech'),
+            self.config.get_gemo_params(),
+            self.config.seam_threshold,
+            self.config.cpu_count,
+            pool=self._cpu_pool(),
+            plan=self.tile_plan
+        )
+    
     def _apply_final_nodata_mask(self):
         """Applique le masque NoData final"""
+        from . import image_utils
         image_utils.DataReplacer.set_nodata_extern_to_final_gemo_dtm(
-            self.config.temp_files['mnt_out_tmp'],
-            self.config.temp_files['mns_sous_ech'],
+            self._scratch_path('mnt_out_tmp'),
+            self._scratch_path('mns_sous_ech'),
             self.config.mnt_output,
             self.config.nodata_ext
         )
     
+    def _save_source_hashes(self):
+        """Empreintes par bloc du MNS source, référence de --incremental pour les régions à préparer"""
+        from .incremental import IncrementalUpdater
+        block_size = config.INCREMENTAL_SOURCE_BLOCK_SIZE
+        IncrementalUpdater.write_source_hashes(
+            self.config,
+            IncrementalUpdater.compute_block_hashes([self.config.mns_input], block_size),
+            block_size,
+            *self.provided_inputs
+        )
+    
     def _cleanup_temp_files(self):
         """Nettoie les fichiers temporaires"""
         logger.info(config.INFO_MESSAGES['cleanup'])
@@ -424,17 +720,26 @@ Auteur: Nicolas Champion - nicolas.champion@ign.fr""",
    gemaut --config config.yaml
 
 2. Avec arguments de ligne de commande:
-   gemaut --mns /chem/vers/MNS_in.tif --out /chem/vers/MNT.tif --reso 4 --cpu 24 --RepTra /chem/vers/RepTra [--sigma 0.5] [--regul 0.01] [--tile 300] [--pad 120] [--norme hubertukey] [--nodata_ext -32768] [--nodata_int -32767] [--init /chem/vers/MNS_in.tif] [--masque /chem/vers/MASQUE_GEMO.tif] [--groundval 0] [--auto-mask] [--mask-method saga|pdal|auto] [--clean]
+   gemaut --mns /chem/vers/MNS_in.tif --out /chem/vers/MNT.tif --reso 4 --cpu 24 --RepTra /chem/vers/RepTra [--sigma 0.5] [--regul 0.01] [--tile 300] [--pad 120] [--tile-plan grid|quadtree] [--seam-repair] [--seam-threshold 0.5] [--norme hubertukey] [--gemo-engine native|extension|sparse|multigrid] [--sparse-method auto|direct|cg] [--max-iter 30000] [--tol-grad 1e-3] [--step 0.01] [--tol-line 1e-4] [--solver-budget fixed|adaptive] [--fast-path off|budget|smooth] [--fast-path-check 0.1] [--tile-timeout 600] [--retries 2] [--no-speculation] [--memory-fraction 0.8] [--worker-rlimit] [--scratch geotiff|chunks] [--shared-memory auto|on|off] [--trace /chem/vers/trace.json] [--metrics-file /chem/vers/gemaut.prom] [--metrics-port 9108] [--nodata_ext -32768] [--nodata_int -32767] [--init /chem/vers/MNS_in.tif] [--masque /chem/vers/MASQUE_GEMO.tif] [--groundval 0] [--auto-mask] [--mask-method saga|pdal|numpy|auto] [--clean]
 
 3. Créer un template de configuration:
    gemaut --create-config config.yaml
 
+   Mode batch (manifeste YAML ou CSV de chantiers, pool de workers partagé):
+   gemaut --batch chantiers.yaml --cpu 24
+
+   Mise à jour incrémentale après recorrélation d'une partie du MNS (RepTra et MNT de l'exécution précédente):
+   gemaut --mns MNS_nouveau.tif --out MNT.tif --reso 4 --cpu 24 --RepTra /chem/vers/RepTra --incremental
+
 4. Calcul automatique de masque:
    # Avec SAGA (méthode traditionnelle)
    gemaut --mns MNS.tif --out MNT.tif --reso 4 --cpu 24 --RepTra /tmp --mask-method saga --auto-mask
    
    # Avec PDAL (plus rapide, algorithme CSF)
    gemaut --mns MNS.tif --out MNT.tif --reso 4 --cpu 24 --RepTra /tmp --mask-method pdal --auto-mask
+   
+   # Avec le filtre NumPy intégré (sans binaire externe)
+   gemaut --mns MNS.tif --out MNT.tif --reso 4 --cpu 24 --RepTra /tmp --mask-method numpy --auto-mask
 
 IMPORTANT: Le MNS doit avoir des valeurs de no_data différentes pour les bords de chantier [no_data_ext] et les trous à l'intérieur du chantier [no_data_int] là où la corrélation a échoué par exemple
     
@@ -448,6 +753,7 @@ Any Questions, please contact me at nicolas.champion@ign.fr
     mode_group = parser.add_mutually_exclusive_group(required=False)
     mode_group.add_argument("--config", type=str, help="fichier de configuration YAML")
     mode_group.add_argument("--create-config", type=str, help="créer un template de configuration YAML")
+    mode_group.add_argument("--batch", type=str, help="manifeste YAML/CSV de chantiers (champs de GEMAUTConfig) traités avec un pool partagé")
     
     # Arguments pour le mode ligne de commande (optionnels si --config est utilisé)
     parser.add_argument("--mns", type=str, help="input DSM")
@@ -476,14 +782,55 @@ Any Questions, please contact me at nicolas.champion@ign.fr
     parser.add_argument("--regul", type=float, default=config.DEFAULT_REGUL, help="regul / rigidité de la nappe")
     parser.add_argument("--tile", type=int, default=config.DEFAULT_TILE_SIZE, help="taille de la tuile")
     parser.add_argument("--pad", type=int, default=config.DEFAULT_PAD_SIZE, help="recouvrement entre tuiles")
+    parser.add_argument("--tile-plan", choices=config.TILE_PLANS, default=config.DEFAULT_TILE_PLAN,
+                       help="plan de tuilage : grid (dalles uniformes de --tile), ou quadtree (dalles fusionnées jusqu'à 4x4 dans les régions peu coûteuses, demi-dalles dans les régions complexes)")
+    parser.add_argument("--seam-repair", action='store_true',
+                       help="reprendre après l'assemblage les raccords où les tuiles voisines divergent (permet un --pad de 20 à 40)")
+    parser.add_argument("--seam-threshold", type=float, default=config.DEFAULT_SEAM_THRESHOLD,
+                       help="écart (m) entre tuiles voisines au-delà duquel un raccord est repris")
     parser.add_argument("--norme", type=str, default=config.DEFAULT_NORME, help="choix entre les normes")
+    parser.add_argument("--gemo-engine", choices=config.GEMO_ENGINES, default=config.DEFAULT_GEMO_ENGINE,
+                       help="moteur GEMO : native (main_GEMAUT_unit, gradient conjugué GSL), extension (même solveur via le module _gemo, sans processus par tuile), sparse (moindres carrés repondérés creux) ou multigrid (moindres carrés repondérés multigrille, grandes tuiles)")
+    parser.add_argument("--sparse-method", choices=config.SPARSE_METHODS, default=config.DEFAULT_SPARSE_METHOD,
+                       help="résolution des systèmes du moteur sparse : direct (factorisation), cg (gradient conjugué préconditionné) ou auto")
+    parser.add_argument("--max-iter", type=int, default=config.DEFAULT_GEMO_MAX_ITER, help="nombre maximal d'itérations du solveur GEMO par tuile")
+    parser.add_argument("--tol-grad", type=float, default=config.DEFAULT_GEMO_TOL_GRAD, help="seuil d'arrêt sur la norme du gradient du solveur GEMO")
+    parser.add_argument("--step", type=float, default=config.DEFAULT_GEMO_STEP, help="pas initial de la recherche linéaire du solveur GEMO")
+    parser.add_argument("--tol-line", type=float, default=config.DEFAULT_GEMO_TOL_LINE, help="tolérance de la recherche linéaire du solveur GEMO")
+    parser.add_argument("--solver-budget", choices=config.SOLVER_BUDGETS, default=config.DEFAULT_SOLVER_BUDGET,
+                       help="budget du solveur GEMO : fixed (valeurs ci-dessus), ou adaptive (proportionné aux pixels valides de chaque tuile)")
+    parser.add_argument("--fast-path", choices=config.FAST_PATHS, default=config.DEFAULT_FAST_PATH,
+                       help="raccourcis des tuiles triviales (tout sol, presque tout sursol ou hors zone) : off, budget (budget de solveur réduit) ou smooth (MNS lissé pour les tuiles tout sol, budget réduit pour les autres)")
+    parser.add_argument("--fast-path-check", type=float, default=config.DEFAULT_FAST_PATH_CHECK,
+                       help="fraction des tuiles raccourcies recalculées avec le solveur complet pour mesurer l'écart (0 à 1)")
+    parser.add_argument("--tile-timeout", type=float, default=config.DEFAULT_TILE_TIMEOUT, help="durée maximale d'une tentative GEMO par tuile en secondes (0: sans limite)")
+    parser.add_argument("--retries", type=int, default=config.DEFAULT_MAX_RETRIES, help="reprises d'une tuile GEMO en échec, avec paramètres de repli")
+    parser.add_argument("--no-speculation", action='store_true', help="ne pas relancer en parallèle les tuiles plus lentes que le p95")
+    parser.add_argument("--memory-fraction", type=float, default=config.DEFAULT_MEMORY_FRACTION,
+                       help="fraction de MemAvailable allouée aux tuiles GEMO simultanées, d'après la mémoire estimée de chaque tuile (0: sans contrôle)")
+    parser.add_argument("--worker-rlimit", action='store_true',
+                       help="plafonner la mémoire de chaque worker ou commande GEMO (RLIMIT_DATA) : une tuile sous-estimée échoue et est reprise au lieu de faire swapper le nœud")
+    parser.add_argument("--scratch", choices=config.SCRATCH_BACKENDS, default=config.DEFAULT_SCRATCH_BACKEND,
+                       help="stockage des rasters intermédiaires : geotiff, ou chunks (blocs .npy mappés en mémoire, écriture parallèle)")
+    parser.add_argument("--shared-memory", choices=config.SHARED_MEMORY_MODES, default=config.DEFAULT_SHARED_MEMORY,
+                       help="charger les entrées GEMO en mémoire partagée pour le découpage seulement (auto: si elles tiennent en RAM ; défaut: off)")
+    parser.add_argument("--trace", type=str, default=None, metavar="FICHIER.json",
+                       help="exporter la chronologie des étapes, tuiles et commandes externes au format Chrome trace")
+    parser.add_argument("--metrics-file", type=str, default=None, metavar="FICHIER.prom",
+                       help="publier l'avancement du chantier au format Prometheus dans ce fichier (collecteur textfile)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                       help="publier l'avancement du chantier sur http://127.0.0.1:PORT/metrics")
     parser.add_argument("--clean", action='store_true', help="supprimer les fichiers temporaires")
+    parser.add_argument("--incremental", action='store_true', 
+                       help="ne recalculer que les dalles touchées par la modification du MNS (RepTra de l'exécution précédente, MNT mis à jour sur place) ; "
+                            "masque et sous-échantillonnage ne sont repris que sur les régions modifiées du MNS élargies d'un halo, "
+                            "tout le chantier l'est si le masque ou INIT sont fournis ou si les paramètres de préparation ont changé")
     parser.add_argument("--verbose", action='store_true', help="afficher les messages dans la console en plus du fichier de log")
     
     args = parser.parse_args()
     
     # Validation pour le mode ligne de commande
-    if not args.config and not args.create_config:
+    if not args.config and not args.create_config and not args.batch:
         # Vérifier que tous les arguments obligatoires sont présents
         required_args = ['mns', 'out', 'reso', 'cpu', 'RepTra']
         missing_args = [arg for arg in required_args if not getattr(args, arg)]
@@ -510,6 +857,14 @@ def main():
             print("Modifiez ce fichier selon vos besoins, puis utilisez 'gemaut --config' pour l'exécuter.")
             return
         
+        if args.batch:
+            # Mode batch : plusieurs chantiers, un seul pool de workers
+            from .batch import run_batch
+            reports = run_batch(args.batch, args.cpu, args.verbose)
+            if any(report['status'] != 'succès' for report in reports):
+                sys.exit(1)
+            return
+        
         if args.config:
             # Mode fichier de configuration YAML
             from .config_manager import ConfigManager
@@ -535,11 +890,39 @@ def main():
                 regul=args.regul,
                 tile_size=args.tile,
                 pad_size=args.pad,
+                tile_plan=args.tile_plan,
+                seam_repair=args.seam_repair,
+                seam_threshold=args.seam_threshold,
                 norme=args.norme,
+                gemo_engine=args.gemo_engine,
+                sparse_method=args.sparse_method,
+                max_iter=args.max_iter,
+                tol_grad=args.tol_grad,
+                step=args.step,
+                tol_line=args.tol_line,
+                solver_budget=args.solver_budget,
+                fast_path=args.fast_path,
+                fast_path_check=args.fast_path_check,
+                tile_timeout=args.tile_timeout,
+                max_retries=args.retries,
+                speculation=not args.no_speculation,
+                memory_fraction=args.memory_fraction,
+                worker_rlimit=args.worker_rlimit,
+                scratch_backend=args.scratch,
+                shared_memory=args.shared_memory,
+                trace_file=args.trace,
+                metrics_file=args.metrics_file,
+                metrics_port=args.metrics_port,
                 clean_temp=args.clean,
                 verbose=args.verbose
             )
         
+        if args.incremental:
+            # Mise à jour incrémentale du MNT existant
+            from .incremental import IncrementalUpdater
+            IncrementalUpdater(config_obj).run()
+            return
+        
         # Créer et exécuter le pipeline
         pipeline = GEMAUTPipeline(config_obj)
         pipeline.run()
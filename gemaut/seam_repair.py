@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Reprise des raccords entre tuiles après l'assemblage
+La fusion linéaire de TileAssembler ne masque le désaccord entre deux tuiles voisines que si
+leur recouvrement (pad_size) est large. Après l'assemblage, l'écart entre les MNT des deux
+tuiles est mesuré dans chaque recouvrement, par tronçons de SEAM_REPAIR_SEGMENT pixels le long
+du raccord ; les tronçons dont l'écart dépasse le seuil sont re-minimisés (moteur creux) sur une
+fenêtre étroite à cheval sur le raccord, élargie de SEAM_REPAIR_MARGIN pixels, avec le MNT
+assemblé comme initialisation et comme condition aux limites (bord de la fenêtre fixé).
+Le recouvrement peut alors être réduit à quelques dizaines de pixels.
+"""
+
+from multiprocessing import Pool
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+from rasterio.windows import Window
+
+from . import config
+from .chunk_store import open_raster
+from .tile_plan import TilePlan
+from .tracing import Tracer
+
+# Largeur du bord fixé d'une fenêtre : les différences secondes portent sur trois pixels
+BORD_FIXE = 2
+
+
+class SeamRepairer:
+    """Détection et reprise des raccords visibles de la mosaïque"""
+
+    @staticmethod
+    def seam_profile(tile_path: Callable, tile_a: Tuple[int, int], tile_b: Tuple[int, int],
+                     axis: int, rows: Tuple[int, int], cols: Tuple[int, int], plan: TilePlan,
+                     no_data_value: float) -> np.ndarray:
+        """
+        Écart maximal |MNT a - MNT b| en travers du recouvrement, pour chaque position le long du raccord
+
+        Args:
+            tile_path: fonction (x, y) -> chemin du MNT de la dalle
+            axis: 1 pour un raccord vertical (dalles voisines en X), 0 pour un raccord horizontal
+            rows, cols: recouvrement des deux dalles dans la grille du chantier
+            plan: plan de tuilage (emprise des dalles)
+        """
+        valeurs = []
+        for x, y in (tile_a, tile_b):
+            col_off, row_off, _, _ = plan.window(x, y)
+            window = Window(cols[0] - col_off, rows[0] - row_off, cols[1] - cols[0], rows[1] - rows[0])
+            with open_raster(tile_path(x, y)) as src:
+                valeurs.append(src.read(1, window=window).astype(np.float64))
+        a, b = valeurs
+        valide = np.isfinite(a) & np.isfinite(b) & (a != no_data_value) & (b != no_data_value)
+        return np.where(valide, np.abs(a - b), 0.).max(axis=axis)
+
+    @staticmethod
+    def find_seams(tile_path: Callable, nbre_dalle_x: int, nbre_dalle_y: int, tile_size: int, pad_size: int,
+                   largeur: int, hauteur: int, threshold: float, no_data_value: float,
+                   tiles: Optional[Set[Tuple[int, int]]] = None, plan: Optional[TilePlan] = None) -> List[Dict]:
+        """
+        Tronçons de raccord dont l'écart entre tuiles dépasse threshold
+
+        Les tronçons consécutifs d'un même raccord sont regroupés en une fenêtre.
+
+        Args:
+            largeur, hauteur: dimensions du chantier découpé
+            tiles: ne considérer que les raccords de ces dalles (toutes si None)
+            plan: TilePlan du chantier (tile_plan 'quadtree') ; grille uniforme si None
+
+        Returns:
+            Liste de {'axis', 'tiles', 'discrepancy' (m), 'window' (Window du chantier)}
+        """
+        if plan is None:
+            plan = TilePlan(largeur, hauteur, tile_size - pad_size, pad_size,
+                            {(x, y): 1 for x in range(nbre_dalle_x) for y in range(nbre_dalle_y)})
+        segment, marge = config.SEAM_REPAIR_SEGMENT, config.SEAM_REPAIR_MARGIN
+        seams = []
+        for tile_a, tile_b, axis in plan.neighbours():
+            if tiles is not None and tile_a not in tiles and tile_b not in tiles:
+                continue
+            col_a, row_a, largeur_a, hauteur_a = plan.window(*tile_a)
+            col_b, row_b, largeur_b, hauteur_b = plan.window(*tile_b)
+            rows = (max(row_a, row_b), min(row_a + hauteur_a, row_b + hauteur_b))
+            cols = (max(col_a, col_b), min(col_a + largeur_a, col_b + largeur_b))
+            if rows[0] >= rows[1] or cols[0] >= cols[1]:
+                continue
+            profil = SeamRepairer.seam_profile(tile_path, tile_a, tile_b, axis, rows, cols, plan, no_data_value)
+
+            # Intervalle le long du raccord (lignes pour un raccord vertical) et en travers
+            long, travers, total_long, total_travers = (rows, cols, hauteur, largeur) if axis == 1 \
+                else (cols, rows, largeur, hauteur)
+            ecarts = [profil[i:i + segment].max() for i in range(0, profil.size, segment)]
+            i = 0
+            while i < len(ecarts):
+                if ecarts[i] <= threshold:
+                    i += 1
+                    continue
+                j = i
+                while j < len(ecarts) and ecarts[j] > threshold:
+                    j += 1
+                debut = max(0, long[0] + i * segment - marge)
+                fin = min(total_long, long[0] + min(j * segment, profil.size) + marge)
+                bas, haut = max(0, travers[0] - marge), min(total_travers, travers[1] + marge)
+                window = Window(bas, debut, haut - bas, fin - debut) if axis == 1 \
+                    else Window(debut, bas, fin - debut, haut - bas)
+                seams.append({'axis': axis, 'tiles': (tile_a, tile_b),
+                              'discrepancy': float(max(ecarts[i:j])), 'window': window})
+                i = j
+        return seams
+
+    @staticmethod
+    def repair_window(args: Tuple) -> Tuple[Window, Optional[np.ndarray], Dict]:
+        """
+        Re-minimise l'énergie GEMO sur une fenêtre de la mosaïque, bord fixé
+        Conçue pour être utilisée avec multiprocessing : la fenêtre corrigée est renvoyée,
+        l'écriture est faite par l'appelant
+
+        Returns:
+            (fenêtre, MNT corrigé float32 ou None si la fenêtre est sans données, statistiques)
+        """
+        from .gemo_sparse import SparseGEMOSolver
+
+        mosaic_file, mns_file, masque_file, window, gemo_params = args
+        with Tracer.span('raccord', 'fenêtre', ligne=int(window.row_off), colonne=int(window.col_off)):
+            no_data_value = gemo_params['no_data_value']
+            with open_raster(mosaic_file) as src:
+                mnt = src.read(1, window=window).astype(np.float64)
+                largeur, hauteur = src.width, src.height
+            with open_raster(mns_file) as src:
+                mne = src.read(1, window=window)
+            with open_raster(masque_file) as src:
+                masque = src.read(1, window=window)
+
+            # Bord de la fenêtre fixé, sauf le long des bords du chantier
+            fixe = mne == no_data_value
+            if fixe.all():
+                return window, None, {}
+            r0, c0 = int(window.row_off), int(window.col_off)
+            if r0 > 0:
+                fixe[:BORD_FIXE] = True
+            if c0 > 0:
+                fixe[:, :BORD_FIXE] = True
+            if r0 + mnt.shape[0] < hauteur:
+                fixe[-BORD_FIXE:] = True
+            if c0 + mnt.shape[1] < largeur:
+                fixe[:, -BORD_FIXE:] = True
+
+            # Fenêtres étroites : factorisation directe, insensible au rappel fort du bord fixé
+            solver = SparseGEMOSolver(gemo_params['sigma'], gemo_params['lambda'], gemo_params['norme'], no_data_value,
+                                      gemo_params.get('tol_grad', config.DEFAULT_GEMO_TOL_GRAD), method='direct')
+            repris, stats = solver.solve(mne, masque, mnt, fixed=fixe)
+            return window, np.where(fixe, mnt, repris).astype(np.float32), stats
+
+    @staticmethod
+    def waves(windows: List[Window]) -> List[List[int]]:
+        """Regroupe les fenêtres en vagues de fenêtres disjointes (indices), traitées en parallèle"""
+        def disjointes(a, b):
+            return (a.col_off + a.width <= b.col_off or b.col_off + b.width <= a.col_off or
+                    a.row_off + a.height <= b.row_off or b.row_off + b.height <= a.row_off)
+
+        vagues = []
+        for i, window in enumerate(windows):
+            for vague in vagues:
+                if all(disjointes(window, windows[j]) for j in vague):
+                    vague.append(i)
+                    break
+            else:
+                vagues.append([i])
+        return vagues
+
+    @staticmethod
+    def repair(tile_path: Callable, nbre_dalle_x: int, nbre_dalle_y: int, tile_size: int, pad_size: int,
+               mosaic_file: str, mns_file: str, masque_file: str, gemo_params: Dict, threshold: float,
+               cpu_count: int, tiles: Optional[Set[Tuple[int, int]]] = None, pool=None,
+               plan: Optional[TilePlan] = None) -> List[Dict]:
+        """
+        Détecte et reprend les raccords de la mosaïque (modifiée sur place)
+
+        Args:
+            tile_path: fonction (x, y) -> chemin du MNT de la dalle
+            mosaic_file: mosaïque assemblée (GeoTIFF ou ChunkStore), grille du MNS sous-échantillonné
+            mns_file, masque_file: entrées GEMO sous-échantillonnées
+            threshold: écart (m) entre tuiles voisines au-delà duquel un raccord est repris
+            tiles: ne reprendre que les raccords de ces dalles (toutes si None)
+            pool: Pool de workers existant ; à défaut un pool de cpu_count workers est créé
+            plan: TilePlan du chantier (tile_plan 'quadtree') ; grille uniforme si None
+
+        Returns:
+            Raccords repris (voir find_seams)
+        """
+        with open_raster(mosaic_file) as src:
+            largeur, hauteur = src.width, src.height
+        seams = SeamRepairer.find_seams(tile_path, nbre_dalle_x, nbre_dalle_y, tile_size, pad_size,
+                                        largeur, hauteur, threshold, gemo_params['no_data_value'], tiles, plan)
+        if not seams:
+            logger.info(f"🧵 Aucun raccord au-delà de {threshold} m")
+            return seams
+        logger.info(f"🧵 {len(seams)} raccords à reprendre (écart max {max(s['discrepancy'] for s in seams):.2f} m)")
+
+        windows = [seam['window'] for seam in seams]
+
+        def run(pool):
+            # Fenêtres d'une vague disjointes : lues avant toute écriture de la vague
+            for vague in SeamRepairer.waves(windows):
+                params = [(mosaic_file, mns_file, masque_file, windows[i], gemo_params) for i in vague]
+                results = list(pool.imap_unordered(SeamRepairer.repair_window, params)) \
+                    if pool is not None else [SeamRepairer.repair_window(p) for p in params]
+                with open_raster(mosaic_file, 'r+') as dst:
+                    for window, patch, _ in results:
+                        if patch is not None:
+                            dst.write(patch, 1, window=window)
+
+        if pool is not None or cpu_count <= 1:
+            run(pool)
+        else:
+            from .tile_processor import TileCutter
+            with Pool(processes=min(cpu_count, len(windows)), initializer=TileCutter.init_worker) as pool:
+                run(pool)
+
+        logger.info(f"✅ {len(seams)} raccords repris")
+        return seams
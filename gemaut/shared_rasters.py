@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rasters de travail en mémoire partagée pour les pools de workers
+Le processus principal charge une fois le MNS, le masque et l'INIT sous-échantillonnés
+dans des blocs multiprocessing.shared_memory ; les workers en prennent des vues NumPy
+sans copie au lieu de rouvrir et décoder les fichiers à chaque tâche.
+"""
+
+import os
+import uuid
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+from loguru import logger
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from rasterio.windows import Window
+from rasterio.windows import transform as window_transform
+
+
+@dataclass(frozen=True)
+class SharedRasterSpec:
+    """Description picklable d'un raster placé en mémoire partagée (transmise aux workers)"""
+    shm_name: str
+    group: str                       # identifiant du SharedRasterSet (un par chantier)
+    width: int
+    height: int
+    dtype: str
+    transform: Tuple[float, ...]
+    crs: Optional[str]
+    nodata: Optional[float]
+
+
+# Vues déjà attachées dans ce processus : {shm_name: (SharedMemory, ndarray)}
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+_attached_group: Optional[str] = None
+
+
+def attach(spec: SharedRasterSpec) -> np.ndarray:
+    """
+    Vue NumPy (lecture seule) d'un raster partagé, attachée une seule fois par worker
+
+    Les attachements d'un autre chantier (pool partagé du mode batch) sont libérés
+    dès qu'un raster d'un nouveau chantier est demandé.
+    """
+    global _attached_group
+    if spec.group != _attached_group:
+        detach_all()
+        _attached_group = spec.group
+
+    entry = _attached.get(spec.shm_name)
+    if entry is None:
+        shm = shared_memory.SharedMemory(name=spec.shm_name)
+        array = np.ndarray((spec.height, spec.width), dtype=spec.dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        entry = (shm, array)
+        _attached[spec.shm_name] = entry
+    return entry[1]
+
+
+def detach_all() -> None:
+    """Libère les attachements de ce processus (sans détruire les blocs)"""
+    global _attached_group
+    blocks = [shm for shm, _ in _attached.values()]
+    _attached.clear()
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError:
+            # une vue est encore référencée : le bloc sera libéré avec elle
+            pass
+    _attached_group = None
+
+
+def available_memory() -> int:
+    """Mémoire physique disponible en octets (0 si inconnue)"""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def rasters_size(file_paths) -> int:
+    """Taille en mémoire (octets) de la première bande de chaque raster"""
+    total = 0
+    for path in file_paths:
+        with rasterio.open(path) as src:
+            total += src.width * src.height * np.dtype(src.dtypes[0]).itemsize
+    return total
+
+
+class SharedRasterView:
+    """
+    Raster partagé vu comme un dataset rasterio (read, profile, window_transform...)
+
+    read() renvoie une vue sans copie de la fenêtre demandée.
+    """
+
+    def __init__(self, spec: SharedRasterSpec):
+        self.spec = spec
+        self.width = spec.width
+        self.height = spec.height
+        self.count = 1
+        self.dtype = spec.dtype
+        self.nodata = spec.nodata
+        self.transform = Affine(*spec.transform)
+        self.crs = CRS.from_wkt(spec.crs) if spec.crs else None
+        self._array = attach(spec)
+
+    def read(self, indexes: int = 1, window: Optional[Window] = None) -> np.ndarray:
+        if window is None:
+            return self._array
+        r0, c0 = int(window.row_off), int(window.col_off)
+        return self._array[r0:r0 + int(window.height), c0:c0 + int(window.width)]
+
+    def window_transform(self, window: Window) -> Affine:
+        return window_transform(window, self.transform)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.height, self.width)
+
+    @property
+    def dtypes(self) -> Tuple[str]:
+        return (self.dtype,)
+
+    @property
+    def meta(self) -> Dict:
+        return {
+            'driver': 'GTiff',
+            'dtype': self.dtype,
+            'nodata': self.nodata,
+            'width': self.width,
+            'height': self.height,
+            'count': 1,
+            'crs': self.crs,
+            'transform': self.transform
+        }
+
+    @property
+    def profile(self) -> Dict:
+        return self.meta
+
+    def close(self) -> None:
+        """Les vues restent attachées pour les tâches suivantes du worker"""
+
+    def __enter__(self) -> 'SharedRasterView':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class SharedRasterSet:
+    """
+    Rasters d'un chantier chargés en mémoire partagée par le processus principal
+
+    À utiliser comme gestionnaire de contexte : les blocs sont détruits à la sortie.
+    """
+
+    def __init__(self):
+        self.group = uuid.uuid4().hex[:12]
+        self.specs: Dict[str, SharedRasterSpec] = {}
+        self._blocks = []
+
+    def load(self, name: str, file_path: str) -> SharedRasterSpec:
+        """Charge la première bande d'un raster (lecture par le principal uniquement)"""
+        with rasterio.open(file_path) as src:
+            dtype = np.dtype(src.dtypes[0])
+            shm = shared_memory.SharedMemory(create=True, size=max(1, src.width * src.height * dtype.itemsize))
+            self._blocks.append(shm)
+            array = np.ndarray((src.height, src.width), dtype=dtype, buffer=shm.buf)
+            src.read(1, out=array)
+            spec = SharedRasterSpec(shm.name, self.group, src.width, src.height, dtype.name,
+                                    tuple(src.transform)[:6], src.crs.to_wkt() if src.crs else None,
+                                    src.nodata)
+        self.specs[name] = spec
+        return spec
+
+    def close(self) -> None:
+        """Détruit les blocs partagés"""
+        for shm in self._blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+        logger.debug(f"Mémoire partagée du chantier {self.group} libérée")
+
+    def __enter__(self) -> 'SharedRasterSet':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
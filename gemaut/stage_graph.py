@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Graphe d'étapes du pipeline GEMAUT
+Chaque étape déclare les fichiers intermédiaires qu'elle lit (inputs) et qu'elle produit
+(outputs), et le nombre de CPU qu'elle occupe. Une étape est prête dès que les étapes
+produisant ses entrées sont terminées ; l'ordonnanceur lance en parallèle (threads : les
+étapes attendent GDAL, des commandes externes ou les workers du service d'exécution) les étapes
+prêtes qui tiennent dans le budget de CPU, par exemple le sous-échantillonnage du MNS pendant
+le calcul du masque. Le chemin critique (plus longue chaîne de dépendances, en durée
+mesurée) est écrit dans le journal.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from loguru import logger
+
+from .tracing import Tracer
+
+
+@dataclass
+class Stage:
+    """Étape du pipeline"""
+    name: str
+    func: Callable[[], None]
+    inputs: Tuple[str, ...] = ()      # fichiers lus (ceux qu'aucune étape ne produit sont des entrées du chantier)
+    outputs: Tuple[str, ...] = ()     # fichiers produits
+    cpus: int = 1                     # CPU occupés pendant l'étape
+    start: float = 0.0
+    end: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class StageGraph:
+    """Ordonnancement des étapes selon leurs dépendances, dans un budget de CPU"""
+
+    def __init__(self, stages: List[Stage], cpu_budget: int, metrics=None):
+        """
+        Args:
+            stages: étapes, dans l'ordre de priorité quand plusieurs sont prêtes
+            cpu_budget: CPU partagés par les étapes simultanées
+            metrics: ProductionMetrics informé du début et de la fin des étapes (voir metrics)
+
+        Raises:
+            ValueError: nom d'étape en double, fichier produit par deux étapes ou cycle
+        """
+        self.stages = stages
+        self.cpu_budget = max(1, cpu_budget)
+        self.metrics = metrics
+        producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"{output} produit par les étapes {producers[output]} et {stage.name}")
+                producers[output] = stage.name
+        if len({stage.name for stage in stages}) != len(stages):
+            raise ValueError("Noms d'étapes en double")
+        # Étapes dont dépend chaque étape
+        self.dependencies: Dict[str, set] = {
+            stage.name: {producers[i] for i in stage.inputs if i in producers} for stage in stages
+        }
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, done = [], set()
+        while len(order) < len(self.stages):
+            ready = [s.name for s in self.stages if s.name not in done and self.dependencies[s.name] <= done]
+            if not ready:
+                raise ValueError(f"Cycle de dépendances entre les étapes "
+                                 f"{', '.join(s.name for s in self.stages if s.name not in done)}")
+            order += ready
+            done.update(ready)
+        return order
+
+    def run(self) -> None:
+        """
+        Exécute toutes les étapes
+
+        Une étape prête est lancée si ses CPU tiennent dans le budget restant ; une étape qui
+        demande plus que le budget entier est lancée seule. Après l'échec d'une étape, plus
+        aucune n'est lancée : les étapes en cours se terminent puis l'erreur est propagée.
+        """
+        by_name = {stage.name: stage for stage in self.stages}
+        done, started = set(), set()
+        running = {}                     # Future -> (étape, CPU réservés)
+        free = self.cpu_budget
+        error = None
+        t0 = time.time()
+
+        def execute(stage):
+            stage.start = time.time()
+            if self.metrics is not None:
+                self.metrics.stage_started(stage.name)
+            try:
+                stage.func()
+            finally:
+                stage.end = time.time()
+                Tracer.record(stage.name, 'étape', stage.start, stage.end, cpus=stage.cpus)
+                if self.metrics is not None:
+                    self.metrics.stage_finished(stage.name)
+
+        with ThreadPoolExecutor(max_workers=len(self.stages) or 1) as executor:
+            while len(done) < len(self.stages) and (error is None or running):
+                if error is None:
+                    for name in self.order:
+                        stage = by_name[name]
+                        if name in started or not self.dependencies[name] <= done:
+                            continue
+                        need = min(stage.cpus, self.cpu_budget)
+                        if need > free and running:
+                            continue
+                        started.add(name)
+                        free -= need
+                        logger.debug(f"▶️ Étape {name} ({need} CPU)")
+                        running[executor.submit(execute, stage)] = (stage, need)
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, need = running.pop(future)
+                    free += need
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Étape {stage.name} en échec: {e}")
+                        error = error or e
+                        continue
+                    done.add(stage.name)
+                    logger.debug(f"✔️ Étape {stage.name} terminée en {stage.duration:.1f}s")
+
+        if error is not None:
+            raise error
+        self.log_report(time.time() - t0)
+
+    def critical_path(self) -> List[Stage]:
+        """Plus longue chaîne de dépendances, en durée mesurée des étapes"""
+        by_name = {stage.name: stage for stage in self.stages}
+        longest, previous = {}, {}
+        for name in self.order:
+            parents = self.dependencies[name]
+            parent = max(parents, key=lambda p: longest[p]) if parents else None
+            longest[name] = by_name[name].duration + (longest[parent] if parent else 0.0)
+            previous[name] = parent
+        if not longest:
+            return []
+        name = max(longest, key=longest.get)
+        path = []
+        while name is not None:
+            path.append(by_name[name])
+            name = previous[name]
+        return path[::-1]
+
+    def log_report(self, elapsed: float) -> None:
+        """Durées des étapes et chemin critique"""
+        path = self.critical_path()
+        total = sum(stage.duration for stage in self.stages)
+        logger.info(f"🧭 {len(self.stages)} étapes en {elapsed:.1f}s ({total:.1f}s cumulées, "
+                    f"budget de {self.cpu_budget} CPU)")
+        logger.info(f"🧭 Chemin critique ({sum(s.duration for s in path):.1f}s): "
+                    + " → ".join(f"{s.name} ({s.duration:.1f}s)" for s in path))
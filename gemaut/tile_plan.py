@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Plan de tuilage adaptatif (tile_plan 'quadtree')
+Le chantier est couvert par une grille de base de cellules de step = (tile_size - pad_size) / 2
+pixels ; une dalle est un carré de span x span cellules (span puissance de 2), élargi de
+pad_size pixels à droite et en bas comme les dalles de la grille uniforme. Le coût GEMO de
+chaque cellule est estimé d'après le MNS et le masque (pixels de la zone, part de sursol,
+dénivelé) ; un quadtree fusionne les régions peu coûteuses (hors zone, sol plat) en dalles
+jusqu'à 2^TILE_PLAN_MERGE_LEVELS fois plus larges que la dalle nominale et subdivise les
+régions complexes en demi-dalles, pour équilibrer le travail par dalle et réduire le nombre
+de recouvrements.
+Une dalle est identifiée par sa cellule en haut à gauche (x, y) : répertoires Dalle_{x}_{y},
+clés de l'exécuteur et de la télémétrie inchangés.
+"""
+
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from . import config
+from .chunk_store import open_raster
+
+
+class TilePlan:
+    """Dalles carrées alignées sur une grille de base de cellules"""
+
+    def __init__(self, largeur: int, hauteur: int, step: int, pad_size: int, spans: Dict[Tuple[int, int], int]):
+        """
+        Args:
+            largeur, hauteur: dimensions du chantier découpé
+            step: côté (px) d'une cellule de la grille de base
+            pad_size: recouvrement (px) entre dalles voisines
+            spans: côté, en cellules, de chaque dalle {(x, y): span}
+        """
+        self.largeur = largeur
+        self.hauteur = hauteur
+        self.step = step
+        self.pad_size = pad_size
+        self.spans = dict(spans)
+        # Nombre de cellules : même formule que TileCalculator.get_tile_dimensions
+        self.nx = max(1, (largeur - pad_size + step - 1) // step)
+        self.ny = max(1, (hauteur - pad_size + step - 1) // step)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return iter(sorted(self.spans, key=lambda key: (key[1], key[0])))
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __contains__(self, key) -> bool:
+        return key in self.spans
+
+    def cells(self, x: int, y: int) -> Tuple[int, int, int, int]:
+        """Cellules [x0, x1) x [y0, y1) couvertes par la dalle (x, y)"""
+        span = self.spans[(x, y)]
+        return x, min(x + span, self.nx), y, min(y + span, self.ny)
+
+    def window(self, x: int, y: int) -> Tuple[int, int, int, int]:
+        """(col_off, row_off, width, height) de la dalle (x, y) sur le chantier"""
+        x0, x1, y0, y1 = self.cells(x, y)
+        col_off, row_off = x0 * self.step, y0 * self.step
+        return (col_off, row_off,
+                min((x1 - x0) * self.step + self.pad_size, self.largeur - col_off),
+                min((y1 - y0) * self.step + self.pad_size, self.hauteur - row_off))
+
+    def cell_index(self) -> np.ndarray:
+        """Indice (dans l'ordre de l'itération) de la dalle couvrant chaque cellule"""
+        index = np.full((self.ny, self.nx), -1, dtype=np.int64)
+        for i, (x, y) in enumerate(self):
+            x0, x1, y0, y1 = self.cells(x, y)
+            index[y0:y1, x0:x1] = i
+        return index
+
+    def neighbours(self) -> List[Tuple[Tuple[int, int], Tuple[int, int], int]]:
+        """
+        Couples de dalles partageant un côté dans la grille de base
+
+        Returns:
+            Liste de (dalle a, dalle b, axe) : axe 1 si b est à droite de a, 0 si b est en dessous
+        """
+        keys = list(self)
+        index = self.cell_index()
+        pairs = []
+        for x, y in keys:
+            x0, x1, y0, y1 = self.cells(x, y)
+            if x1 < self.nx:
+                pairs += [((x, y), keys[i], 1) for i in sorted(set(index[y0:y1, x1]))]
+            if y1 < self.ny:
+                pairs += [((x, y), keys[i], 0) for i in sorted(set(index[y1, x0:x1]))]
+        return pairs
+
+    def intersecting(self, col_off: int, row_off: int, width: int, height: int) -> List[Tuple[int, int]]:
+        """Dalles dont l'emprise recoupe une fenêtre du chantier"""
+        result = []
+        for key in self:
+            c0, r0, w, h = self.window(*key)
+            if c0 < col_off + width and col_off < c0 + w and r0 < row_off + height and row_off < r0 + h:
+                result.append(key)
+        return result
+
+    @staticmethod
+    def grid(largeur: int, hauteur: int, tile_size: int, pad_size: int) -> 'TilePlan':
+        """Plan de la grille uniforme de TileCalculator"""
+        plan = TilePlan(largeur, hauteur, tile_size - pad_size, pad_size, {})
+        plan.spans = {(x, y): 1 for x in range(plan.nx) for y in range(plan.ny)}
+        return plan
+
+    def to_dict(self) -> Dict:
+        return {'largeur': self.largeur, 'hauteur': self.hauteur, 'step': self.step, 'pad_size': self.pad_size,
+                'tiles': [[x, y, self.spans[(x, y)]] for x, y in self]}
+
+    def save(self, path: str) -> None:
+        """Enregistre le plan en JSON (répertoire de travail)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @staticmethod
+    def load(path: str) -> 'TilePlan':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return TilePlan(data['largeur'], data['hauteur'], data['step'], data['pad_size'],
+                        {(x, y): span for x, y, span in data['tiles']})
+
+
+class TilePlanner:
+    """Estimation du coût GEMO par cellule et construction du quadtree"""
+
+    @staticmethod
+    def estimate_costs(mns_file: str, masque_file: str, step: int, pad_size: int,
+                       no_data_value: float) -> np.ndarray:
+        """
+        Coût GEMO estimé de chaque cellule de la grille de base, en pixels équivalents
+
+        Un pixel hors zone (masque 11 ou nodata) coûte TILE_PLAN_PIXEL_COST ; un pixel de la zone
+        coûte 1, plus la part de sursol de la cellule, plus son dénivelé rapporté à
+        TILE_PLAN_RELIEF_REF (au plus 1).
+
+        Returns:
+            Tableau (ny, nx) des coûts
+        """
+        with open_raster(mns_file) as src:
+            mne = src.read(1)
+        with open_raster(masque_file) as src:
+            masque = src.read(1)
+        hauteur, largeur = mne.shape
+        nx = max(1, (largeur - pad_size + step - 1) // step)
+        ny = max(1, (hauteur - pad_size + step - 1) // step)
+
+        zone = (masque != config.NODATA_INTERNE_MASK) & (mne != no_data_value)
+        costs = np.zeros((ny, nx))
+        for cy in range(ny):
+            for cx in range(nx):
+                # La dernière cellule couvre aussi la bande de recouvrement du bord du chantier
+                lignes = slice(cy * step, (cy + 1) * step if cy < ny - 1 else hauteur)
+                colonnes = slice(cx * step, (cx + 1) * step if cx < nx - 1 else largeur)
+                cellule = zone[lignes, colonnes]
+                n_zone = int(cellule.sum())
+                costs[cy, cx] = cellule.size * config.TILE_PLAN_PIXEL_COST
+                if n_zone:
+                    sursol = float((masque[lignes, colonnes][cellule] != 0).mean())
+                    z = mne[lignes, colonnes][cellule]
+                    relief = float(np.percentile(z, 95) - np.percentile(z, 5))
+                    costs[cy, cx] += n_zone * (1 + sursol + min(1., relief / config.TILE_PLAN_RELIEF_REF))
+        return costs
+
+    @staticmethod
+    def quadtree(costs: np.ndarray, largeur: int, hauteur: int, step: int, pad_size: int,
+                 max_span: int, target: float) -> TilePlan:
+        """
+        Découpe récursive : une dalle de span cellules est retenue si son coût ne dépasse pas
+        target (ou si span vaut 1), sinon elle est divisée en quatre
+
+        Args:
+            costs: coût de chaque cellule (voir estimate_costs)
+            max_span: côté maximal (cellules, puissance de 2) d'une dalle
+            target: coût maximal d'une dalle
+        """
+        ny, nx = costs.shape
+        spans = {}
+
+        def split(x, y, span):
+            if x >= nx or y >= ny:
+                return
+            if span == 1 or costs[y:y + span, x:x + span].sum() <= target:
+                spans[(x, y)] = span
+                return
+            half = span // 2
+            for dy in (0, half):
+                for dx in (0, half):
+                    split(x + dx, y + dy, half)
+
+        for y in range(0, ny, max_span):
+            for x in range(0, nx, max_span):
+                split(x, y, max_span)
+        return TilePlan(largeur, hauteur, step, pad_size, spans)
+
+    @staticmethod
+    def build(mns_file: str, masque_file: str, tile_size: int, pad_size: int,
+              no_data_value: float) -> Optional[TilePlan]:
+        """
+        Plan quadtree d'un chantier : demi-dalles nominales au plus fin, dalles de
+        2^TILE_PLAN_MERGE_LEVELS dalles nominales de côté au plus grossier
+
+        Returns:
+            Le plan, ou None si la dalle nominale est trop petite pour être subdivisée
+        """
+        step = (tile_size - pad_size) // 2
+        if step < 1:
+            logger.warning(f"Plan quadtree impossible (tile_size={tile_size}, pad_size={pad_size}) : grille uniforme")
+            return None
+        costs = TilePlanner.estimate_costs(mns_file, masque_file, step, pad_size, no_data_value)
+        with open_raster(mns_file) as src:
+            largeur, hauteur = src.width, src.height
+        max_span = 2 ** (config.TILE_PLAN_MERGE_LEVELS + 1)
+        target = config.TILE_PLAN_TARGET_COST * (2 * step) ** 2
+        plan = TilePlanner.quadtree(costs, largeur, hauteur, step, pad_size, max_span, target)
+
+        spans = np.array(list(plan.spans.values()))
+        tile_costs = [costs[y:y + s, x:x + s].sum() for (x, y), s in plan.spans.items()]
+        logger.info(f"🌳 Plan quadtree: {len(plan)} dalles ({int((spans < 2).sum())} demi-dalles, "
+                    f"{int((spans == 2).sum())} nominales, {int((spans > 2).sum())} fusionnées), "
+                    f"coût max/médian {max(tile_costs) / max(1e-9, np.median(tile_costs)):.1f}")
+        return plan
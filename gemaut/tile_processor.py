@@ -8,15 +8,19 @@ Gère le découpage des grandes images en tuiles et leur assemblage final
 
 import os
 import signal
+import time
 import numpy as np
 import rasterio
 from rasterio.windows import Window, from_bounds
 from multiprocessing import Pool
 from tqdm import tqdm
 import random
+from functools import partial
 from loguru import logger
 from typing import Tuple, List, Dict
 from . import image_utils
+from .chunk_store import ChunkStore, open_raster
+from .tracing import Tracer
 
 
 class TileCalculator:
@@ -72,90 +76,139 @@ class TileCutter:
         logger.remove()
     
     @staticmethod
-    def cut_tile(args: Tuple) -> None:
+    def cut_tile(args: Tuple) -> Tuple[int, int, bool]:
         """
         Découpe une tuile spécifique d'une image
         Conçue pour être utilisée avec multiprocessing
+        
+        Les sources sont des chemins (GeoTIFF ou ChunkStore) ou des SharedRasterSpec
+        (mémoire partagée) : voir chunk_store.open_raster.
+        
+        Returns:
+            (colonne, ligne, présence de données valides dans le MNS de la tuile)
         """
         mns_file, masque_file, init_file, col_dalle, lig_dalle, x_offset, y_offset, l_dalle, h_dalle, no_data_value, rep_travail_tmp = args
         
-        try:
-            # Créer le répertoire de la dalle
-            rep_dalle_xy = os.path.join(rep_travail_tmp, f"Dalle_{col_dalle}_{lig_dalle}")
-            os.makedirs(rep_dalle_xy, exist_ok=True)
+        with Tracer.span('découpage', 'tuile', x=col_dalle, y=lig_dalle):
+            try:
+                # Créer le répertoire de la dalle
+                rep_dalle_xy = os.path.join(rep_travail_tmp, f"Dalle_{col_dalle}_{lig_dalle}")
+                os.makedirs(rep_dalle_xy, exist_ok=True)
             
-            # Lire les trois images avec rasterio
-            with rasterio.open(mns_file) as mns_src, \
-                 rasterio.open(masque_file) as masque_src, \
-                 rasterio.open(init_file) as init_src:
+                # Lire les trois images (GeoTIFF ou ChunkStore du backend 'chunks')
+                with open_raster(mns_file) as mns_src, \
+                     open_raster(masque_file) as masque_src, \
+                     open_raster(init_file) as init_src:
                 
-                # Lire les dalles
-                mns_dalle = mns_src.read(1, window=Window(x_offset, y_offset, l_dalle, h_dalle))
-                masque_dalle = masque_src.read(1, window=Window(x_offset, y_offset, l_dalle, h_dalle))
-                init_dalle = init_src.read(1, window=Window(x_offset, y_offset, l_dalle, h_dalle))
+                    # Lire les dalles
+                    mns_dalle = mns_src.read(1, window=Window(x_offset, y_offset, l_dalle, h_dalle))
+                    masque_dalle = masque_src.read(1, window=Window(x_offset, y_offset, l_dalle, h_dalle))
+                    init_dalle = init_src.read(1, window=Window(x_offset, y_offset, l_dalle, h_dalle))
                 
-                # Créer et sauvegarder les trois dalles
-                fichiers_dalles = {
-                    "mns": os.path.join(rep_dalle_xy, f"Out_MNS_{col_dalle}_{lig_dalle}.tif"),
-                    "masque": os.path.join(rep_dalle_xy, f"Out_MASQUE_{col_dalle}_{lig_dalle}.tif"),
-                    "init": os.path.join(rep_dalle_xy, f"Out_INIT_{col_dalle}_{lig_dalle}.tif")
-                }
+                    # Créer et sauvegarder les trois dalles
+                    fichiers_dalles = {
+                        "mns": os.path.join(rep_dalle_xy, f"Out_MNS_{col_dalle}_{lig_dalle}.tif"),
+                        "masque": os.path.join(rep_dalle_xy, f"Out_MASQUE_{col_dalle}_{lig_dalle}.tif"),
+                        "init": os.path.join(rep_dalle_xy, f"Out_INIT_{col_dalle}_{lig_dalle}.tif")
+                    }
                 
-                # Sauvegarder les dalles
-                for name, dalle, src in zip(fichiers_dalles.keys(), 
-                                          [mns_dalle, masque_dalle, init_dalle], 
-                                          [mns_src, masque_src, init_src]):
-                    profil = src.profile
-                    profil.update({
-                        'height': h_dalle,
-                        'width': l_dalle,
-                        'transform': src.window_transform(Window(x_offset, y_offset, l_dalle, h_dalle))
-                    })
+                    # Sauvegarder les dalles
+                    for name, dalle, src in zip(fichiers_dalles.keys(), 
+                                              [mns_dalle, masque_dalle, init_dalle], 
+                                              [mns_src, masque_src, init_src]):
+                        profil = src.profile
+                        profil.update({
+                            'height': h_dalle,
+                            'width': l_dalle,
+                            'transform': src.window_transform(Window(x_offset, y_offset, l_dalle, h_dalle))
+                        })
                     
-                    image_utils.RasterProcessor.save_raster(dalle, fichiers_dalles[name], profil)
+                        image_utils.RasterProcessor.save_raster(dalle, fichiers_dalles[name], profil)
+                
+                    # Évite à GEMOExecutor de relire la tuile pour ce test
+                    return col_dalle, lig_dalle, bool(np.any(mns_dalle != no_data_value))
                     
-        except Exception as e:
-            logger.error(f"Erreur lors du découpage de la dalle {col_dalle}_{lig_dalle}: {e}")
-            raise
+            except Exception as e:
+                logger.error(f"Erreur lors du découpage de la dalle {col_dalle}_{lig_dalle}: {e}")
+                raise
     
     @staticmethod
-    def cut_workspace(mns_file: str, masque_file: str, init_file: str, 
-                     tile_size: int, pad_size: int, no_data_value: float, 
-                     rep_travail_tmp: str, cpu_count: int) -> None:
-        """Découpe un chantier complet en tuiles"""
-        with rasterio.open(mns_file) as mns_src:
+    def build_tile_params(mns_file: str, masque_file: str, init_file: str, 
+                          tile_size: int, pad_size: int, no_data_value: float, 
+                          rep_travail_tmp: str, tiles=None, plan=None) -> List[Tuple]:
+        """
+        Prépare les arguments de cut_tile pour chaque dalle du chantier
+        
+        Args:
+            tiles: ensemble de couples (x, y) à découper ; toutes les dalles si None
+            plan: TilePlan du chantier (tile_plan 'quadtree') ; grille uniforme si None
+        """
+        if plan is not None:
+            return [(mns_file, masque_file, init_file, x, y, *plan.window(x, y), no_data_value, rep_travail_tmp)
+                    for x, y in plan if tiles is None or (x, y) in tiles]
+        
+        with open_raster(mns_file) as mns_src:
             largeur = mns_src.width
             hauteur = mns_src.height
-            
-            # Calculer le pas entre les dalles
-            pas_x = tile_size - pad_size
-            pas_y = tile_size - pad_size
-            
-            # Calculer le nombre de dalles
-            nbre_dalle_x = (largeur - pad_size + pas_x - 1) // pas_x
-            nbre_dalle_y = (hauteur - pad_size + pas_y - 1) // pas_y
-            
-            # Créer une liste des paramètres pour chaque dalle
-            params = []
-            for x in range(nbre_dalle_x):
-                for y in range(nbre_dalle_y):
-                    # Calculer la position pour chaque dalle
-                    x_offset = x * pas_x
-                    y_offset = y * pas_y
-                    
-                    # Calculer la largeur et hauteur de chaque bloc
-                    l_bloc = min(tile_size, largeur - x_offset)
-                    h_bloc = min(tile_size, hauteur - y_offset)
-                    
-                    # Ajouter les paramètres
-                    params.append((mns_file, masque_file, init_file, x, y, 
-                                 x_offset, y_offset, l_bloc, h_bloc, 
-                                 no_data_value, rep_travail_tmp))
-            
-            # Utiliser multiprocessing pour traiter les dalles
+        
+        # Calculer le pas entre les dalles
+        pas_x = tile_size - pad_size
+        pas_y = tile_size - pad_size
+        
+        # Calculer le nombre de dalles
+        nbre_dalle_x = (largeur - pad_size + pas_x - 1) // pas_x
+        nbre_dalle_y = (hauteur - pad_size + pas_y - 1) // pas_y
+        
+        # Créer une liste des paramètres pour chaque dalle
+        params = []
+        for x in range(nbre_dalle_x):
+            for y in range(nbre_dalle_y):
+                if tiles is not None and (x, y) not in tiles:
+                    continue
+                
+                # Calculer la position pour chaque dalle
+                x_offset = x * pas_x
+                y_offset = y * pas_y
+                
+                # Calculer la largeur et hauteur de chaque bloc
+                l_bloc = min(tile_size, largeur - x_offset)
+                h_bloc = min(tile_size, hauteur - y_offset)
+                
+                # Ajouter les paramètres
+                params.append((mns_file, masque_file, init_file, x, y, 
+                             x_offset, y_offset, l_bloc, h_bloc, 
+                             no_data_value, rep_travail_tmp))
+        return params
+    
+    @staticmethod
+    def cut_workspace(mns_file: str, masque_file: str, init_file: str, 
+                     tile_size: int, pad_size: int, no_data_value: float, 
+                     rep_travail_tmp: str, cpu_count: int, pool=None, tiles=None, plan=None) -> Dict[Tuple[int, int], bool]:
+        """
+        Découpe un chantier complet en tuiles
+        
+        Args:
+            pool: Pool de workers existant (service d'exécution du pipeline, mode batch) ; à défaut
+                  un pool de cpu_count workers est créé pour ce chantier
+            tiles: ensemble de couples (x, y) à découper ; toutes les dalles si None
+            plan: TilePlan du chantier (tile_plan 'quadtree') ; grille uniforme si None
+        
+        Returns:
+            Présence de données valides par tuile {(x, y): bool}
+        """
+        params = TileCutter.build_tile_params(mns_file, masque_file, init_file, tile_size, pad_size,
+                                              no_data_value, rep_travail_tmp, tiles, plan)
+        
+        # Utiliser multiprocessing pour traiter les dalles
+        if pool is not None:
+            results = list(tqdm(pool.imap_unordered(TileCutter.cut_tile, params), 
+                              total=len(params), desc="- Traitement des dalles -"))
+        else:
             with Pool(processes=cpu_count, initializer=TileCutter.init_worker) as pool:
                 results = list(tqdm(pool.imap_unordered(TileCutter.cut_tile, params), 
                                   total=len(params), desc="- Traitement des dalles -"))
+        
+        return {(x, y): has_data for x, y, has_data in results}
 
 
 class TileAssembler:
@@ -194,6 +247,204 @@ class TileAssembler:
         
         return window1, window2
     
+    @staticmethod
+    def feather_weights(index: int, nbre_dalles: int, pas: int, tile_size: int, total: int,
+                        start: int, stop: int) -> Tuple[int, int, np.ndarray]:
+        """
+        Poids de la dalle index le long d'un axe, sur l'intervalle [start, stop)
+        
+        Même rampe linéaire que assemble_tiles : 1 hors recouvrement, linspace(0, 1) dans le
+        recouvrement avec la dalle précédente, 1 - linspace(0, 1) avec la suivante.
+        
+        Returns:
+            (lo, hi, poids) : intervalle couvert par la dalle et poids sur cet intervalle
+        """
+        def extent(i):
+            offset = i * pas
+            return offset, offset + min(tile_size, total - offset)
+        
+        debut, fin = extent(index)
+        lo, hi = max(start, debut), min(stop, fin)
+        if lo >= hi:
+            return lo, lo, np.empty(0)
+        
+        poids = np.ones(fin - debut)
+        if index > 0:
+            fin_prec = min(extent(index - 1)[1], fin)
+            poids[:fin_prec - debut] = np.linspace(0, 1, fin_prec - debut)
+        if index < nbre_dalles - 1:
+            debut_suiv, fin_suiv = extent(index + 1)
+            fin_recouv = min(fin, fin_suiv)
+            poids[debut_suiv - debut:fin_recouv - debut] = 1 - np.linspace(0, 1, fin_recouv - debut_suiv)
+        return lo, hi, poids[lo - debut:hi - debut]
+    
+    @staticmethod
+    def assemble_window(tile_path, nbre_dalle_x: int, nbre_dalle_y: int, tile_size: int,
+                        pad_size: int, largeur: int, hauteur: int, window: Window) -> np.ndarray:
+        """
+        Calcule une fenêtre de la mosaïque finale sans assembler tout le chantier
+        
+        Reproduit assemble_tiles (fusion horizontale par ligne de dalles arrondie en float32,
+        puis fusion verticale) en ne lisant que les dalles qui recouvrent la fenêtre.
+        
+        Args:
+            tile_path: fonction (x, y) -> chemin du MNT de la dalle
+            largeur, hauteur: dimensions du chantier découpé
+            window: fenêtre de la mosaïque à calculer
+        """
+        pas = tile_size - pad_size
+        r0, c0 = int(window.row_off), int(window.col_off)
+        r1, c1 = r0 + int(window.height), c0 + int(window.width)
+        
+        mosaique = np.zeros((r1 - r0, c1 - c0))
+        for y in range(nbre_dalle_y):
+            lig_lo, lig_hi, poids_y = TileAssembler.feather_weights(y, nbre_dalle_y, pas, tile_size, hauteur, r0, r1)
+            if lig_lo >= lig_hi:
+                continue
+            
+            # Ligne de dalles fusionnée horizontalement, arrondie comme ligne_mosaic_{y}.tif
+            ligne = np.zeros((lig_hi - lig_lo, c1 - c0))
+            for x in range(nbre_dalle_x):
+                col_lo, col_hi, poids_x = TileAssembler.feather_weights(x, nbre_dalle_x, pas, tile_size, largeur, c0, c1)
+                if col_lo >= col_hi:
+                    continue
+                with rasterio.open(tile_path(x, y)) as src:
+                    dalle = src.read(1, window=Window(col_lo - x * pas, lig_lo - y * pas,
+                                                      col_hi - col_lo, lig_hi - lig_lo))
+                ligne[:, col_lo - c0:col_hi - c0] += dalle * poids_x
+            ligne = ligne.astype(np.float32)
+            
+            mosaique[lig_lo - r0:lig_hi - r0, :] += ligne * poids_y[:, np.newaxis]
+        
+        return mosaique.astype(np.float32)
+    
+    @staticmethod
+    def ramp_weights(debut: int, fin: int, total: int, pad_size: int, lo: int, hi: int) -> np.ndarray:
+        """
+        Poids d'une dalle d'un plan de tuilage le long d'un axe, sur l'intervalle [lo, hi)
+        
+        Rampe linéaire sur les pad_size premiers (derniers) pixels de la dalle, sauf au bord du
+        chantier ; centrée sur les pixels pour que les poids de deux dalles voisines se
+        complètent sans s'annuler.
+        """
+        p = np.arange(lo, hi) + 0.5
+        poids = np.ones(hi - lo)
+        if pad_size > 0:
+            if debut > 0:
+                poids = np.minimum(poids, (p - debut) / pad_size)
+            if fin < total:
+                poids = np.minimum(poids, (fin - p) / pad_size)
+        return poids
+    
+    @staticmethod
+    def assemble_plan_window(tile_path, plan, window: Window) -> np.ndarray:
+        """
+        Calcule une fenêtre de la mosaïque d'un plan de tuilage (tile_plan 'quadtree')
+        
+        Moyenne des dalles qui recouvrent chaque pixel, pondérée par le produit de leurs rampes
+        en X et en Y (ramp_weights) : dalles de tailles différentes, voisins multiples.
+        
+        Args:
+            tile_path: fonction (x, y) -> chemin du MNT de la dalle
+            plan: TilePlan du chantier
+            window: fenêtre de la mosaïque à calculer
+        """
+        r0, c0 = int(window.row_off), int(window.col_off)
+        r1, c1 = r0 + int(window.height), c0 + int(window.width)
+        somme = np.zeros((r1 - r0, c1 - c0))
+        poids_total = np.zeros((r1 - r0, c1 - c0))
+        for x, y in plan.intersecting(c0, r0, c1 - c0, r1 - r0):
+            col_off, row_off, largeur, hauteur = plan.window(x, y)
+            col_lo, col_hi = max(c0, col_off), min(c1, col_off + largeur)
+            lig_lo, lig_hi = max(r0, row_off), min(r1, row_off + hauteur)
+            poids = np.outer(
+                TileAssembler.ramp_weights(row_off, row_off + hauteur, plan.hauteur, plan.pad_size, lig_lo, lig_hi),
+                TileAssembler.ramp_weights(col_off, col_off + largeur, plan.largeur, plan.pad_size, col_lo, col_hi))
+            with rasterio.open(tile_path(x, y)) as src:
+                dalle = src.read(1, window=Window(col_lo - col_off, lig_lo - row_off,
+                                                  col_hi - col_lo, lig_hi - lig_lo))
+            somme[lig_lo - r0:lig_hi - r0, col_lo - c0:col_hi - c0] += dalle * poids
+            poids_total[lig_lo - r0:lig_hi - r0, col_lo - c0:col_hi - c0] += poids
+        return (somme / np.maximum(poids_total, 1e-12)).astype(np.float32)
+    
+    @staticmethod
+    def assemble_plan(rep_travail_tmp: str, plan, reference_file: str, chem_mnt_out: str,
+                      chunk_size: int) -> None:
+        """
+        Assemble les dalles d'un plan de tuilage dans un GeoTIFF, par bandes de chunk_size lignes
+        
+        Args:
+            reference_file: raster de la grille de travail (géoréférencement)
+        """
+        with open_raster(reference_file) as ref:
+            profile = {'driver': 'GTiff', 'dtype': 'float32', 'count': 1, 'width': ref.width,
+                       'height': ref.height, 'crs': ref.crs, 'transform': ref.transform}
+        tile_path = partial(TileAssembler.tile_mnt_path, rep_travail_tmp)
+        with rasterio.open(chem_mnt_out, 'w', **profile) as dst:
+            for r0 in tqdm(range(0, plan.hauteur, chunk_size), desc="Assemblage du plan de tuilage"):
+                window = Window(0, r0, plan.largeur, min(chunk_size, plan.hauteur - r0))
+                with Tracer.span('assemblage', 'bande', ligne=r0, hauteur=window.height):
+                    dst.write(TileAssembler.assemble_plan_window(tile_path, plan, window), 1, window=window)
+        logger.info(f"Mosaïque finale sauvegardée sous {chem_mnt_out} ({len(plan)} dalles)")
+    
+    @staticmethod
+    def tile_mnt_path(rep_travail_tmp: str, x: int, y: int) -> str:
+        """MNT GEMO d'une dalle"""
+        return os.path.join(rep_travail_tmp, f"Dalle_{x}_{y}", f"Out_MNT_{x}_{y}.tif")
+    
+    @staticmethod
+    def assemble_band(args: Tuple) -> int:
+        """
+        Calcule une bande de lignes de la mosaïque et l'écrit dans le ChunkStore de sortie
+        Conçue pour être utilisée avec multiprocessing : les bandes sont disjointes
+        """
+        rep_travail_tmp, nbre_dalle_x, nbre_dalle_y, tile_size, pad_size, store_path, row_off, height, plan = args
+        tile_path = partial(TileAssembler.tile_mnt_path, rep_travail_tmp)
+        with Tracer.span('assemblage', 'bande', ligne=row_off, hauteur=height), \
+             ChunkStore(store_path, 'r+') as store:
+            window = Window(0, row_off, store.width, height)
+            if plan is not None:
+                bande = TileAssembler.assemble_plan_window(tile_path, plan, window)
+            else:
+                bande = TileAssembler.assemble_window(tile_path, nbre_dalle_x, nbre_dalle_y, tile_size, pad_size,
+                                                      store.width, store.height, window)
+            store.write(bande, 1, window=window)
+        return row_off
+    
+    @staticmethod
+    def assemble_to_store(rep_travail_tmp: str, nbre_dalle_x: int, nbre_dalle_y: int,
+                          tile_size: int, pad_size: int, reference_file: str, store_path: str,
+                          cpu_count: int, chunk_size: int, pool=None, plan=None) -> None:
+        """
+        Assemble les tuiles directement dans un ChunkStore (backend 'chunks')
+        
+        Même résultat que assemble_tiles, sans mosaïques de ligne intermédiaires : chaque worker
+        calcule une bande de chunk_size lignes et l'écrit dans ses propres blocs.
+        
+        Args:
+            reference_file: raster de la grille de travail (dimensions et géoréférencement)
+            pool: Pool de workers existant ; à défaut un pool de cpu_count workers est créé
+            plan: TilePlan du chantier (tile_plan 'quadtree') ; grille uniforme si None
+        """
+        with open_raster(reference_file) as ref:
+            largeur, hauteur, transform, crs = ref.width, ref.height, ref.transform, ref.crs
+        ChunkStore.create(store_path, largeur, hauteur, 'float32', transform, crs,
+                          chunk_size=chunk_size).close()
+        
+        params = [(rep_travail_tmp, nbre_dalle_x, nbre_dalle_y, tile_size, pad_size, store_path,
+                   r0, min(chunk_size, hauteur - r0), plan)
+                  for r0 in range(0, hauteur, chunk_size)]
+        
+        if pool is not None:
+            list(tqdm(pool.imap_unordered(TileAssembler.assemble_band, params),
+                      total=len(params), desc="Assemblage par bandes"))
+        else:
+            with Pool(processes=min(cpu_count, len(params)), initializer=TileCutter.init_worker) as pool:
+                list(tqdm(pool.imap_unordered(TileAssembler.assemble_band, params),
+                          total=len(params), desc="Assemblage par bandes"))
+        
+        logger.info(f"Mosaïque assemblée dans {store_path} ({len(params)} bandes)")
+    
     @staticmethod
     def assemble_tiles(rep_travail_tmp: str, nbre_dalle_x: int, nbre_dalle_y: int, 
                       chem_mnt_out: str) -> None:
@@ -204,6 +455,7 @@ class TileAssembler:
             # Assemblage horizontal (ligne par ligne)
             for y in range(nbre_dalle_y):
                 ligne_dalles = []
+                debut_ligne = time.time()
                 
                 for x in range(nbre_dalle_x):
                     chem_dalle = os.path.join(rep_travail_tmp, f"Dalle_{x}_{y}", f"Out_MNT_{x}_{y}.tif")
@@ -289,6 +541,7 @@ class TileAssembler:
                 with rasterio.open(output_path, 'w', **profile) as dst:
                     dst.write(ligne_mosaic, 1)
                 
+                Tracer.record('fusion', 'ligne', debut_ligne, time.time(), y=y)
                 pbar.update(1)
             
             # Assemblage vertical (toutes les lignes)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Trace d'exécution d'un chantier au format Chrome trace (chrome://tracing, Perfetto)
+Les durées cumulées du journal n'expliquent pas les CPU inoccupés (barrière entre étapes,
+tuile retardataire) : avec --trace, chaque étape, découpage de tuile, GEMO de tuile, bande
+ou fusion d'assemblage, reprise de raccord et commande externe est enregistré comme un
+intervalle (processus, thread, début, fin). Chaque processus ajoute ses intervalles à son
+propre fichier spans_<pid>.jsonl du répertoire de trace, transmis aux workers par la
+variable d'environnement GEMAUT_TRACE_DIR (héritée au fork) ; export() les fusionne en un
+seul fichier JSON à ouvrir dans un visualiseur de traces.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from loguru import logger
+
+
+class Tracer:
+    """Enregistrement des intervalles et export au format Chrome trace"""
+
+    # Répertoire des intervalles du chantier en cours (absent : trace désactivée)
+    ENV_VAR = 'GEMAUT_TRACE_DIR'
+
+    @staticmethod
+    def start(trace_dir: str) -> None:
+        """Active la trace pour ce processus et les workers créés ensuite"""
+        os.makedirs(trace_dir, exist_ok=True)
+        os.environ[Tracer.ENV_VAR] = trace_dir
+
+    @staticmethod
+    def stop() -> None:
+        os.environ.pop(Tracer.ENV_VAR, None)
+
+    @staticmethod
+    def enabled() -> bool:
+        return Tracer.ENV_VAR in os.environ
+
+    @staticmethod
+    def record(name: str, category: str, start: float, end: float, tid: Optional[int] = None, **args) -> None:
+        """
+        Enregistre un intervalle terminé (start, end : time.time())
+
+        Args:
+            tid: ligne du visualiseur (thread courant par défaut ; PID de la commande pour
+                 les commandes externes, qui se chevauchent dans un même thread)
+        """
+        trace_dir = os.environ.get(Tracer.ENV_VAR)
+        if trace_dir is None:
+            return
+        event = {
+            'name': name, 'cat': category, 'ph': 'X',
+            'ts': round(start * 1e6), 'dur': round(max(0.0, end - start) * 1e6),
+            'pid': os.getpid(), 'tid': tid if tid is not None else threading.get_native_id(),
+            'args': args,
+        }
+        try:
+            # Une ligne par écriture en ajout : les threads d'un processus ne s'entremêlent pas
+            with open(os.path.join(trace_dir, f"spans_{os.getpid()}.jsonl"), 'a') as f:
+                f.write(json.dumps(event, default=str) + '\n')
+        except OSError:
+            # Répertoire supprimé (fin de chantier) : la trace ne doit jamais faire échouer un calcul
+            pass
+
+    @staticmethod
+    @contextmanager
+    def span(name: str, category: str, **args):
+        """
+        Enregistre la durée du bloc ; le dictionnaire renvoyé complète les arguments de
+        l'intervalle (statut, résultat) avant sa fermeture
+        """
+        if not Tracer.enabled():
+            yield args
+            return
+        start = time.time()
+        try:
+            yield args
+        finally:
+            Tracer.record(name, category, start, time.time(), **args)
+
+    @staticmethod
+    def export(trace_dir: str, output_file: str, main_pid: Optional[int] = None) -> int:
+        """
+        Fusionne les intervalles de tous les processus en un fichier Chrome trace
+
+        Args:
+            main_pid: processus principal du chantier (nommé comme tel dans le visualiseur)
+
+        Returns:
+            Nombre d'intervalles exportés
+        """
+        events = []
+        for path in glob.glob(os.path.join(trace_dir, 'spans_*.jsonl')):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # Dernière ligne tronquée d'un worker interrompu
+                        continue
+        events.sort(key=lambda e: e['ts'])
+
+        main_pid = main_pid if main_pid is not None else os.getpid()
+        names: Dict[int, str] = {}
+        for event in events:
+            names.setdefault(event['pid'], 'GEMAUT' if event['pid'] == main_pid else f"worker {event['pid']}")
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': name}}
+                    for pid, name in names.items()]
+        metadata += [{'name': 'process_sort_index', 'ph': 'M', 'pid': pid, 'tid': 0,
+                      'args': {'sort_index': 0 if pid == main_pid else 1}} for pid in names]
+
+        with open(output_file, 'w') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f)
+        logger.info(f"🕒 Trace d'exécution: {len(events)} intervalles, {len(names)} processus → {output_file}")
+        return len(events)
@@ -173,7 +173,7 @@ install_gemo() {
     if [ -d "build" ]; then rm -rf build; fi
     mkdir build && cd build
     
-    cmake -DCMAKE_INSTALL_PREFIX="$GEMAUT_INSTALL_DIR" ..
+    cmake -DCMAKE_INSTALL_PREFIX="$GEMAUT_INSTALL_DIR" -DGEMO_PYTHON=ON ..
     make
     make install
     
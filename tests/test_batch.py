@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le mode batch (manifeste et pool partagé)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from multiprocessing import Pool
+from unittest import mock
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.batch import BatchRunner
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.script_gemaut import GEMAUTPipeline
+from gemaut.tile_processor import TileCutter
+
+# Remplaçant de main_GEMAUT_unit : tuile lente, note sa date de fin avec le chemin de sortie
+FAUX_GEMO = '''
+import os, shutil, sys, time
+mns, masque, init, out = sys.argv[1:5]
+time.sleep(0.4)
+shutil.copyfile(init, out)
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fins'), 'a') as f:
+    f.write(f"{out} {time.time()}\\n")
+'''
+
+
+class TestManifeste(unittest.TestCase):
+    """Lecture des manifestes YAML et CSV."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def ecrire(self, nom, contenu):
+        chemin = os.path.join(self.temp_dir, nom)
+        with open(chemin, 'w') as f:
+            f.write(contenu)
+        return chemin
+
+    def test_yaml_avec_defauts(self):
+        manifeste = self.ecrire('chantiers.yaml', (
+            "defaults:\n"
+            "  resolution: 4\n"
+            "  cpu_count: 8\n"
+            "  work_dir: RepTra\n"
+            "jobs:\n"
+            "  - {mns_input: a.tif, mnt_output: /data/a_mnt.tif}\n"
+            "  - {mns_input: b.tif, mnt_output: b_mnt.tif, sigma: 0.3}\n"))
+
+        jobs = BatchRunner.load_manifest(manifeste)
+
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(jobs[0]['mns_input'], os.path.join(self.temp_dir, 'a.tif'))
+        self.assertEqual(jobs[0]['mnt_output'], '/data/a_mnt.tif')
+        self.assertEqual(jobs[1]['work_dir'], os.path.join(self.temp_dir, 'RepTra'))
+        self.assertEqual(jobs[1]['sigma'], 0.3)
+        self.assertEqual(jobs[1]['resolution'], 4.0)
+
+    def test_csv_types(self):
+        manifeste = self.ecrire('chantiers.csv', (
+            "mns_input,mnt_output,work_dir,resolution,cpu_count,clean_temp,mask_file\n"
+            "a.tif,a_mnt.tif,w,2.5,4,oui,\n"))
+
+        job = BatchRunner.load_manifest(manifeste)[0]
+
+        self.assertEqual(job['resolution'], 2.5)
+        self.assertIsInstance(job['cpu_count'], int)
+        self.assertTrue(job['clean_temp'])
+        self.assertNotIn('mask_file', job)
+
+    def test_parametre_inconnu(self):
+        manifeste = self.ecrire('chantiers.yaml', "- {mns_input: a.tif, resolutoin: 4}\n")
+        with self.assertRaises(ValueError):
+            BatchRunner.load_manifest(manifeste)
+
+    def test_chantier_en_echec_n_arrete_pas_le_batch(self):
+        jobs = [{'mns_input': os.path.join(self.temp_dir, 'absent.tif'), 'mnt_output': 'x.tif',
+                 'resolution': 1.0, 'work_dir': self.temp_dir}]
+
+        reports = BatchRunner(jobs, 1).run()
+
+        self.assertEqual(reports[0]['status'], 'erreur')
+        self.assertIn('absent.tif', reports[0]['error'])
+
+
+class TestPoolPartage(unittest.TestCase):
+    """Le découpage doit fonctionner avec un pool fourni par l'appelant."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        profile = {
+            'driver': 'GTiff', 'height': 50, 'width': 40, 'count': 1, 'dtype': 'float32',
+            'crs': 'EPSG:2154', 'transform': from_origin(0, 50, 1, 1),
+        }
+        self.chemins = []
+        for nom in ('mns', 'masque', 'init'):
+            chemin = os.path.join(self.temp_dir, f"{nom}.tif")
+            with rasterio.open(chemin, 'w', **profile) as dst:
+                dst.write(np.random.default_rng(0).random((50, 40)).astype(np.float32), 1)
+            self.chemins.append(chemin)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_decoupage_avec_pool_fourni(self):
+        with Pool(processes=2, initializer=TileCutter.init_worker) as pool:
+            TileCutter.cut_workspace(*self.chemins, 20, 5, -32768, self.temp_dir, 2, pool=pool)
+            # le pool reste utilisable pour un autre chantier
+            self.assertEqual(pool.apply(abs, (-1,)), 1)
+
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "Dalle_1_2", "Out_MNS_1_2.tif")))
+
+
+class TestEnchainement(unittest.TestCase):
+    """Le chantier suivant est découpé pendant les tuiles GEMO du précédent."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.gemo_cmd = GEMOExecutor.GEMO_UNIT_CMD
+        script = os.path.join(self.temp_dir, "faux_gemo.py")
+        with open(script, 'w') as f:
+            f.write(FAUX_GEMO)
+        GEMOExecutor.GEMO_UNIT_CMD = f"{sys.executable} {script}"
+        profile = {'driver': 'GTiff', 'height': 35, 'width': 50, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': -32768}
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(np.random.default_rng(1).random((35, 50)).astype(np.float32) * 100, 1)
+        self.decoupes, self.assembles = {}, {}
+
+    def tearDown(self):
+        GEMOExecutor.GEMO_UNIT_CMD = self.gemo_cmd
+        shutil.rmtree(self.temp_dir)
+
+    def test_decoupage_pendant_les_tuiles_du_precedent(self):
+        test = self
+        decouper = GEMAUTPipeline._cut_tiles
+
+        # Entrées GEMO sous-échantillonnées prêtes (sans gdalwarp ni masque)
+        def preparer(pipeline):
+            for name in GEMAUTPipeline.GEMO_INPUTS:
+                shutil.copyfile(test.mns, pipeline.config.temp_files[name])
+            pipeline._count_tiles()
+            return pipeline.tile_dims
+
+        def decoupage(pipeline, *args, **kwargs):
+            decouper(pipeline, *args, **kwargs)
+            test.decoupes[pipeline.config.work_dir] = time.time()
+
+        def assemblage(pipeline, *args):
+            test.assembles[pipeline.config.work_dir] = time.time()
+
+        jobs = [{'mns_input': self.mns, 'mnt_output': os.path.join(self.temp_dir, f"mnt_{i}.tif"),
+                 'resolution': 1.0, 'work_dir': os.path.join(self.temp_dir, f"chantier_{i}"),
+                 'tile_size': 20, 'pad_size': 5, 'memory_fraction': 0} for i in range(3)]
+        with mock.patch.object(GEMAUTPipeline, 'prepare', preparer), \
+                mock.patch.object(GEMAUTPipeline, '_cut_tiles', decoupage), \
+                mock.patch.object(GEMAUTPipeline, 'finalize', assemblage):
+            reports = BatchRunner(jobs, 2).run()
+
+        self.assertEqual([r['status'] for r in reports], ['succès'] * 3)
+        fins = {}
+        with open(os.path.join(self.temp_dir, "fins")) as f:
+            for ligne in f:
+                sortie, fin = ligne.split()
+                chantier = next(job['work_dir'] for job in jobs if sortie.startswith(job['work_dir'] + os.sep))
+                fins.setdefault(chantier, []).append(float(fin))
+        for precedent, suivant in zip(jobs, jobs[1:]):
+            # 6 tuiles de 0,4 s sur 2 jetons : le suivant est découpé avant la dernière tuile
+            self.assertEqual(len(fins[precedent['work_dir']]), 6)
+            self.assertLess(self.decoupes[suivant['work_dir']], max(fins[precedent['work_dir']]))
+            self.assertGreaterEqual(self.assembles[precedent['work_dir']], max(fins[precedent['work_dir']]))
+        # Jetons partagés : jamais plus de 2 tuiles en même temps, tous chantiers confondus
+        instants = sorted(fin for liste in fins.values() for fin in liste)
+        for a, b in zip(instants, instants[2:]):
+            self.assertGreaterEqual(b - a, 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le backend de travail 'chunks' (ChunkStore)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from multiprocessing import Pool
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.chunk_store import ChunkStore, open_raster
+from gemaut.tile_processor import TileAssembler, TileCutter
+
+
+def ecrire_raster(chemin, data, x0=0, y0=1000, nodata=None):
+    profile = {
+        'driver': 'GTiff', 'height': data.shape[0], 'width': data.shape[1], 'count': 1,
+        'dtype': 'float32', 'crs': 'EPSG:2154', 'transform': from_origin(x0, y0, 1, 1), 'nodata': nodata,
+    }
+    with rasterio.open(chemin, 'w', **profile) as dst:
+        dst.write(data.astype(np.float32), 1)
+
+
+def ecrire_bande(args):
+    store_path, r0, hauteur = args
+    with ChunkStore(store_path, 'r+') as store:
+        store.write(np.full((hauteur, store.width), r0, dtype=np.float32), 1,
+                    window=Window(0, r0, store.width, hauteur))
+
+
+class TestChunkStore(unittest.TestCase):
+    """Lecture, écriture et conversion GeoTIFF"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = np.random.default_rng(0).random((45, 70)).astype(np.float32)
+        self.tif = os.path.join(self.temp_dir, "mns.tif")
+        ecrire_raster(self.tif, self.data, nodata=-32768)
+        self.store_path = os.path.join(self.temp_dir, "mns.chunks")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_conversion_et_lecture(self):
+        with ChunkStore.from_raster(self.tif, self.store_path, chunk_size=16) as store:
+            self.assertEqual(store.shape, (45, 70))
+            self.assertEqual(store.nodata, -32768)
+            np.testing.assert_array_equal(store.read(1), self.data)
+            np.testing.assert_array_equal(store.read(1, window=Window(10, 5, 40, 30)), self.data[5:35, 10:50])
+            with rasterio.open(self.tif) as src:
+                self.assertEqual(store.window_transform(Window(10, 5, 4, 4)),
+                                 src.window_transform(Window(10, 5, 4, 4)))
+
+    def test_lecture_sans_copie_dans_un_bloc(self):
+        with ChunkStore.from_raster(self.tif, self.store_path, chunk_size=16) as store:
+            vue = store.read(1, window=Window(17, 18, 10, 10))
+            self.assertTrue(np.shares_memory(vue, store._chunk(1, 1)))
+            self.assertFalse(vue.flags.writeable)
+
+    def test_ecriture_parallele_et_export(self):
+        with rasterio.open(self.tif) as src:
+            ChunkStore.create(self.store_path, src.width, src.height, 'float32', src.transform,
+                              src.crs, chunk_size=16).close()
+
+        bandes = [(self.store_path, r0, min(10, 45 - r0)) for r0 in range(0, 45, 10)]
+        with Pool(processes=3) as pool:
+            pool.map(ecrire_bande, bandes)
+
+        sortie = os.path.join(self.temp_dir, "export.tif")
+        with open_raster(self.store_path) as store:
+            store.to_geotiff(sortie, compress='lzw')
+        with rasterio.open(sortie) as src:
+            resultat = src.read(1)
+            self.assertEqual(src.crs.to_epsg(), 2154)
+        attendu = np.repeat(np.arange(0, 45, 10), 10)[:45].astype(np.float32)
+        np.testing.assert_array_equal(resultat, np.tile(attendu[:, np.newaxis], (1, 70)))
+
+    def test_lecture_seule(self):
+        with ChunkStore.from_raster(self.tif, self.store_path, chunk_size=16) as store:
+            with self.assertRaises(PermissionError):
+                store.write(np.zeros((2, 2), dtype=np.float32), 1, window=Window(0, 0, 2, 2))
+
+
+class TestPipelineChunks(unittest.TestCase):
+    """Découpage et assemblage identiques avec les deux backends"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.largeur, self.hauteur, self.tile, self.pad = 83, 71, 30, 9
+        pas = self.tile - self.pad
+        self.nx = (self.largeur - self.pad + pas - 1) // pas
+        self.ny = (self.hauteur - self.pad + pas - 1) // pas
+        self.rng = np.random.default_rng(2)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_decoupage_depuis_chunkstore(self):
+        data = self.rng.random((self.hauteur, self.largeur)) * 100
+        tif = os.path.join(self.temp_dir, "mns.tif")
+        ecrire_raster(tif, data)
+        store = os.path.join(self.temp_dir, "mns.chunks")
+        ChunkStore.from_raster(tif, store, chunk_size=32).close()
+
+        for source, rep in ((tif, "geotiff"), (store, "chunks")):
+            os.makedirs(os.path.join(self.temp_dir, rep))
+            params = TileCutter.build_tile_params(source, source, source, self.tile, self.pad,
+                                                  -32768, os.path.join(self.temp_dir, rep), tiles={(1, 2)})
+            TileCutter.cut_tile(params[0])
+
+        def lire(rep):
+            with rasterio.open(os.path.join(self.temp_dir, rep, "Dalle_1_2", "Out_MNS_1_2.tif")) as src:
+                return src.read(1), src.transform
+        (ref, ref_transform), (res, res_transform) = lire("geotiff"), lire("chunks")
+        np.testing.assert_array_equal(res, ref)
+        self.assertEqual(res_transform, ref_transform)
+
+    def test_assemblage_identique(self):
+        pas = self.tile - self.pad
+        for x in range(self.nx):
+            for y in range(self.ny):
+                ox, oy = x * pas, y * pas
+                dalle = self.rng.random((min(self.tile, self.hauteur - oy), min(self.tile, self.largeur - ox))) * 100
+                os.makedirs(os.path.join(self.temp_dir, f"Dalle_{x}_{y}"))
+                ecrire_raster(TileAssembler.tile_mnt_path(self.temp_dir, x, y), dalle, ox, 1000 - oy)
+
+        reference_tif = os.path.join(self.temp_dir, "mns.tif")
+        ecrire_raster(reference_tif, np.zeros((self.hauteur, self.largeur)))
+        chem_out = os.path.join(self.temp_dir, "mnt.tif")
+        TileAssembler.assemble_tiles(self.temp_dir, self.nx, self.ny, chem_out)
+        store = os.path.join(self.temp_dir, "mnt.chunks")
+        TileAssembler.assemble_to_store(self.temp_dir, self.nx, self.ny, self.tile, self.pad,
+                                        reference_tif, store, cpu_count=2, chunk_size=16)
+
+        with rasterio.open(chem_out) as src, open_raster(store) as res:
+            np.testing.assert_array_equal(res.read(1), src.read(1))
+            self.assertEqual(res.transform, src.transform)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le service d'exécution partagé par les étapes du pipeline."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.executor_service import ExecutorService
+from gemaut.gemaut_config import GEMAUTConfig
+from gemaut.numpy_ground_filter import NumpyGroundFilter
+from gemaut.script_gemaut import GEMAUTPipeline
+from gemaut.tile_processor import TileCutter
+from SAGA.script_saga_ground_extraction import Decouper_image_en_dalles
+
+NODATA = -32768
+
+
+def pid_et_option(nom):
+    return os.getpid(), os.environ.get(nom)
+
+
+class TestService(unittest.TestCase):
+    """Voies de calcul et d'E/S"""
+
+    def test_workers_initialises_une_fois(self):
+        with ExecutorService(2, {'GDAL_CACHEMAX': '64'}) as service:
+            self.assertEqual((service.cpu_count, service.io_threads), (2, 4))
+            premiers = service.cpu.map(pid_et_option, ['GDAL_CACHEMAX'] * 8)
+            seconds = service.cpu.map(pid_et_option, ['GDAL_CACHEMAX'] * 8)
+            self.assertEqual({option for _, option in premiers}, {'64'})
+            # Mêmes workers d'une étape à l'autre, pas de nouveau fork
+            pids = {pid for pid, _ in premiers + seconds}
+            self.assertLessEqual(len(pids), 2)
+            self.assertNotIn(os.getpid(), pids)
+            # Voie d'E/S : threads du processus courant
+            self.assertEqual(service.lane(io_bound=True).apply(os.getpid), os.getpid())
+        self.assertTrue(service.closed)
+        with self.assertRaises(ValueError):
+            ExecutorService(0)
+
+
+class TestEtapesSurLeService(unittest.TestCase):
+    """Résultats identiques avec les workers partagés et avec des pools dédiés"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = ExecutorService(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.close()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(5)
+        yy, xx = np.mgrid[0:60, 0:70]
+        data = (100 + 0.1 * xx + rng.normal(0, 0.05, xx.shape)).astype(np.float32)
+        data[20:30, 20:35] += 12
+        data[:5, :10] = NODATA
+        profile = {'driver': 'GTiff', 'height': 60, 'width': 70, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': NODATA}
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(data, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def lire(self, chemin):
+        with rasterio.open(chemin) as src:
+            return src.read(1)
+
+    def test_decoupage(self):
+        reps = []
+        for pool in (None, self.service.cpu):
+            rep = os.path.join(self.temp_dir, f"tuiles_{len(reps)}")
+            os.makedirs(rep)
+            reps.append((rep, TileCutter.cut_workspace(self.mns, self.mns, self.mns, 30, 5, NODATA, rep, 2,
+                                                       pool=pool)))
+        (rep_a, has_a), (rep_b, has_b) = reps
+        self.assertEqual(has_a, has_b)
+        for x, y in has_a:
+            nom = os.path.join(f"Dalle_{x}_{y}", f"Out_MNS_{x}_{y}.tif")
+            np.testing.assert_array_equal(self.lire(os.path.join(rep_a, nom)), self.lire(os.path.join(rep_b, nom)))
+
+    def test_masque_numpy(self):
+        params = {'radius': 8, 'pente': 15.0, 'no_data_max': NODATA, 'block_size': 32}
+        sorties = []
+        for executor in (None, self.service):
+            moteur = NumpyGroundFilter()
+            moteur.executor = executor
+            sortie = os.path.join(self.temp_dir, f"masque_{len(sorties)}.tif")
+            moteur.compute_mask(self.mns, sortie, self.temp_dir, 2, params)
+            sorties.append(self.lire(sortie))
+        np.testing.assert_array_equal(sorties[0], sorties[1])
+        self.assertTrue(sorties[1][25, 27])
+
+    def test_dallage_saga(self):
+        comptes = []
+        for pool in (None, self.service.cpu):
+            rep = os.path.join(self.temp_dir, f"dallage_{len(comptes)}")
+            comptes.append(Decouper_image_en_dalles(self.mns, 20, rep, 'DALLAGE_', 2, NODATA, pool=pool))
+            self.assertEqual(len(os.listdir(rep)), comptes[-1])
+        self.assertEqual(comptes[0], comptes[1])
+        self.assertEqual(comptes[0], 12)
+
+
+class TestPipeline(unittest.TestCase):
+    """Cycle de vie du service dans GEMAUTPipeline"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        profile = {'driver': 'GTiff', 'height': 10, 'width': 10, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1)}
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(np.zeros((10, 10), np.float32), 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def pipeline(self, executor=None):
+        cfg = GEMAUTConfig(mns_input=self.mns, mnt_output=os.path.join(self.temp_dir, "mnt.tif"), resolution=4,
+                           cpu_count=2, work_dir=os.path.join(self.temp_dir, "travail"))
+        return GEMAUTPipeline(cfg, configure_logging=False, executor=executor)
+
+    def test_service_du_chantier(self):
+        pipeline = self.pipeline()
+        self.assertIsNone(pipeline._cpu_pool())
+        with pipeline._executor_scope() as service:
+            self.assertIs(pipeline._cpu_pool(), service.cpu)
+            self.assertEqual(service.cpu_count, 2)
+        self.assertTrue(service.closed)
+        self.assertIsNone(pipeline.executor)
+
+    def test_service_fourni(self):
+        with ExecutorService(1) as service:
+            pipeline = self.pipeline(service)
+            with pipeline._executor_scope():
+                pass
+            # Le service du mode batch reste ouvert pour les chantiers suivants
+            self.assertFalse(service.closed)
+            self.assertIs(pipeline.executor, service)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
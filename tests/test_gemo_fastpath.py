@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour les raccourcis GEMO des tuiles triviales (classement, lissage, vérification)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut import config
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.gemo_fastpath import GEMOFastPath
+from gemaut.tile_processor import TileCutter
+
+NODATA = -32768
+
+
+class TestClassement(unittest.TestCase):
+    """Classes de tuiles et raccourcis associés"""
+
+    def setUp(self):
+        self.mne = np.full((20, 20), 100, np.float32)
+        self.masque = np.zeros((20, 20), np.uint8)
+
+    def test_classes(self):
+        self.assertEqual(GEMOFastPath.classify(self.mne, self.masque, NODATA)[0], 'sol')
+        # Pixels nodata du MNS hors zone : la tuile reste tout sol
+        self.mne[:5] = NODATA
+        self.masque[:5] = 11
+        classe, mesures = GEMOFastPath.classify(self.mne, self.masque, NODATA)
+        self.assertEqual(classe, 'sol')
+        self.assertAlmostEqual(mesures['domain_fraction'], 0.75)
+
+        self.masque[5:] = 255
+        self.masque[10, 10] = 0
+        self.assertEqual(GEMOFastPath.classify(self.mne, self.masque, NODATA)[0], 'sursol')
+        self.masque[10:] = 0
+        self.assertEqual(GEMOFastPath.classify(self.mne, self.masque, NODATA)[0], 'standard')
+        self.masque[:] = 11
+        self.masque[0, 0] = 0
+        self.assertEqual(GEMOFastPath.classify(self.mne, self.masque, NODATA)[0], 'hors_zone')
+
+    def test_choix_du_raccourci(self):
+        self.assertEqual(GEMOFastPath.choose('sol', 'off'), '')
+        self.assertEqual(GEMOFastPath.choose('standard', 'smooth'), '')
+        self.assertEqual(GEMOFastPath.choose('sol', 'smooth'), 'smooth')
+        self.assertEqual(GEMOFastPath.choose('sol', 'budget'), 'budget')
+        self.assertEqual(GEMOFastPath.choose('sursol', 'smooth'), 'budget')
+
+    def test_budget_reduit(self):
+        budget = {'max_iter': 30000, 'tol_grad': 1e-3}
+        self.assertEqual(GEMOFastPath.reduced_budget(budget),
+                         {'max_iter': int(30000 * config.GEMO_FASTPATH_BUDGET_FACTOR), 'tol_grad': 1e-3})
+        self.assertEqual(GEMOFastPath.reduced_budget({'max_iter': 1000})['max_iter'], config.GEMO_ADAPTIVE_MIN_ITER)
+        self.assertEqual(GEMOFastPath.reduced_budget({'max_iter': 100})['max_iter'], 100)
+
+    def test_tirage_de_verification(self):
+        tirees = sum(GEMOFastPath.should_check(x, y, 0.25) for x in range(40) for y in range(40))
+        self.assertTrue(300 < tirees < 500)
+        self.assertTrue(GEMOFastPath.should_check(3, 4, 1.0))
+        self.assertFalse(GEMOFastPath.should_check(3, 4, 0.0))
+
+
+class TestRaccourcisExecuteur(unittest.TestCase):
+    """Raccourcis appliqués par process_tile"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(1)
+        yy, xx = np.mgrid[0:50, 0:50]
+        mne = (100 + 0.3 * xx + 0.2 * yy + rng.normal(0, 0.1, xx.shape)).astype(np.float32)
+        mne[35:45, 35:45] += 10
+        mne[0, :3] = NODATA
+        # Bâtiment masqué dans la dalle 1_1 seulement : les trois autres sont tout sol
+        masque = np.zeros(mne.shape, np.uint8)
+        masque[35:45, 35:45] = 255
+        masque[0, :3] = 11
+        profile = {'driver': 'GTiff', 'height': 50, 'width': 50, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': NODATA}
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(mne, 1)
+        self.masque = os.path.join(self.temp_dir, "masque.tif")
+        with rasterio.open(self.masque, 'w', **dict(profile, dtype='uint8', nodata=11)) as dst:
+            dst.write(masque, 1)
+        self.rep = os.path.join(self.temp_dir, "tmp")
+        os.makedirs(self.rep)
+        self.has_data = TileCutter.cut_workspace(self.mns, self.masque, self.mns, 30, 10, NODATA, self.rep, 1)
+        self.gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA,
+                            'engine': 'sparse'}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_lissage_et_verification(self):
+        params = dict(self.gemo_params, fast_path='smooth', fast_path_check=1.0)
+        results = GEMOExecutor.run_gemo_parallel(self.rep, 2, 2, params, 1, has_data=self.has_data)
+        par_tuile = {(r.x, r.y): r for r in results}
+        self.assertTrue(all(r.status == 'succès' for r in results))
+        self.assertEqual(par_tuile[(1, 1)].tile_class, 'standard')
+        self.assertEqual(par_tuile[(1, 1)].fast_path, '')
+        self.assertEqual(par_tuile[(1, 1)].stats['engine'], 'sparse')
+        for key in ((0, 0), (1, 0), (0, 1)):
+            result = par_tuile[key]
+            self.assertEqual((result.tile_class, result.fast_path), ('sol', 'smooth'))
+            self.assertEqual(result.stats['engine'], 'smooth')
+            # Écart mesuré contre le solveur complet, sans fichier de référence résiduel
+            self.assertLess(result.stats['reference_rmse'], 1.0)
+            self.assertGreater(result.stats['reference_runtime'], 0)
+        self.assertFalse([f for f in os.listdir(os.path.join(self.rep, "Dalle_0_0")) if 'reference' in f])
+
+        with rasterio.open(os.path.join(self.rep, "Dalle_0_0", "Out_MNT_0_0.tif")) as src:
+            mnt = src.read(1)
+            self.assertEqual(src.dtypes[0], 'float64')
+        self.assertTrue(np.all(mnt[0, :3] == NODATA))
+        self.assertTrue(np.all(np.abs(mnt[1:, :] - 105) < 15))
+
+    def test_budget_reduit_sans_effet_sur_les_reprises(self):
+        params = dict(self.gemo_params, fast_path='budget', max_iter=20000)
+        result = GEMOExecutor.process_tile((0, 0, self.rep, params, True))
+        self.assertEqual(result.fast_path, 'budget')
+        self.assertEqual(result.budget['max_iter'], 2000)
+        reprise = GEMOExecutor.process_tile((0, 0, self.rep, dict(params, attempt=1), True))
+        self.assertEqual(reprise.tile_class, 'sol')
+        self.assertEqual(reprise.fast_path, '')
+        self.assertEqual(reprise.budget['max_iter'], 20000)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour les reprises, timeouts et copies spéculatives des tuiles GEMO."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut import config
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.tile_processor import TileCutter
+
+NODATA = -32768
+
+# Remplaçant de main_GEMAUT_unit : comportement par tuile lu dans control.json
+FAUX_GEMO = '''
+import json, os, shutil, sys, time
+mns, masque, init, out = sys.argv[1:5]
+norme = sys.argv[8]
+tuile = os.path.basename(out).split('.')[0][len('Out_MNT_'):]
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'control.json')) as f:
+    comportement = json.load(f).get(tuile, 'ok')
+appels = os.path.join(os.path.dirname(out), 'appels')
+with open(appels, 'a') as f:
+    f.write(norme + '\\n')
+with open(appels) as f:
+    nb_appels = len(f.readlines())
+if comportement == 'crash' or (comportement == 'crash_sauf_L2' and norme != 'L2'):
+    sys.exit(1)
+if comportement == 'bloque' or (comportement == 'lent_une_fois' and nb_appels == 1):
+    time.sleep(60)
+shutil.copyfile(init, out)
+'''
+
+
+class TestToleranceAuxPannes(unittest.TestCase):
+    """Dispatcher GEMO avec un exécutable de substitution"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.gemo_cmd = GEMOExecutor.GEMO_UNIT_CMD
+        self.min_samples = config.GEMO_SPECULATION_MIN_SAMPLES
+        script = os.path.join(self.temp_dir, "faux_gemo.py")
+        with open(script, 'w') as f:
+            f.write(FAUX_GEMO)
+        GEMOExecutor.GEMO_UNIT_CMD = f"{sys.executable} {script}"
+
+        # 35 x 50 pixels, dalles de 20 avec 5 de recouvrement : 3 x 2 dalles
+        data = np.random.default_rng(4).random((35, 50)).astype(np.float32) * 100
+        profile = {'driver': 'GTiff', 'height': 35, 'width': 50, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': NODATA}
+        chemin = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(chemin, 'w', **profile) as dst:
+            dst.write(data, 1)
+        self.rep = os.path.join(self.temp_dir, "tmp")
+        os.makedirs(self.rep)
+        self.has_data = TileCutter.cut_workspace(chemin, chemin, chemin, 20, 5, NODATA, self.rep, 2)
+        self.manifeste = os.path.join(self.temp_dir, "incidents.json")
+        self.gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA}
+
+    def tearDown(self):
+        GEMOExecutor.GEMO_UNIT_CMD = self.gemo_cmd
+        config.GEMO_SPECULATION_MIN_SAMPLES = self.min_samples
+        shutil.rmtree(self.temp_dir)
+
+    def controler(self, comportements):
+        with open(os.path.join(self.temp_dir, "control.json"), 'w') as f:
+            json.dump(comportements, f)
+
+    def lancer(self, **policy):
+        gemo_params = dict(self.gemo_params, timeout=policy.pop('timeout', None))
+        GEMOExecutor.run_gemo_parallel(self.rep, 3, 2, gemo_params, 2, has_data=self.has_data,
+                                       retry_policy=policy, manifest_file=self.manifeste)
+        with open(self.manifeste) as f:
+            return {t['tile']: t for t in json.load(f)['tiles']}
+
+    def test_reprise_avec_parametres_de_repli(self):
+        self.controler({'1_0': 'crash_sauf_L2'})
+        incidents = self.lancer(max_retries=2, fallbacks=[{}, {'norme': 'L2'}])
+
+        self.assertEqual(list(incidents), ['1_0'])
+        tentatives = incidents['1_0']['attempts']
+        self.assertEqual([t['status'] for t in tentatives], ['échec', 'échec', 'succès'])
+        self.assertEqual(tentatives[2]['params'], {'norme': 'L2'})
+        for x in range(3):
+            for y in range(2):
+                self.assertTrue(os.path.exists(os.path.join(self.rep, f"Dalle_{x}_{y}", f"Out_MNT_{x}_{y}.tif")))
+
+    def test_timeout_puis_echec_explicite(self):
+        self.controler({'2_1': 'bloque'})
+        debut = time.time()
+        with self.assertRaises(RuntimeError) as ctx:
+            self.lancer(max_retries=1, timeout=1)
+        self.assertLess(time.time() - debut, 20)
+        self.assertIn("2_1", str(ctx.exception))
+
+        with open(self.manifeste) as f:
+            incident = json.load(f)['tiles'][0]
+        self.assertEqual(incident['final_status'], 'timeout')
+        self.assertEqual([t['status'] for t in incident['attempts']], ['timeout', 'timeout'])
+        self.assertFalse(os.path.exists(os.path.join(self.rep, "Dalle_2_1", "Out_MNT_2_1.tif")))
+
+    def test_copie_speculative(self):
+        config.GEMO_SPECULATION_MIN_SAMPLES = 3
+        self.controler({'0_0': 'lent_une_fois'})
+        debut = time.time()
+        incidents = self.lancer(max_retries=0, speculation=True)
+        self.assertLess(time.time() - debut, 20)
+
+        statuts = {(t['speculative'], t['status']) for t in incidents['0_0']['attempts']}
+        self.assertEqual(statuts, {(True, 'succès'), (False, 'annulée')})
+        self.assertTrue(os.path.exists(os.path.join(self.rep, "Dalle_0_0", "Out_MNT_0_0.tif")))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le contrôle d'admission mémoire des tuiles GEMO."""
+
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import unittest
+from multiprocessing import Pool
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut import config
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.gemo_memory import GEMOMemory, MemoryAdmission
+from gemaut.tile_processor import TileCutter
+
+NODATA = -32768
+
+# Remplaçant de main_GEMAUT_unit : note son intervalle d'exécution
+FAUX_GEMO = '''
+import os, shutil, sys, time
+mns, masque, init, out = sys.argv[1:5]
+debut = time.time()
+time.sleep(0.3)
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intervalles'), 'a') as f:
+    f.write(f"{debut} {time.time()}\\n")
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parents'), 'a') as f:
+    f.write(f"{os.getppid()}\\n")
+shutil.copyfile(init, out)
+'''
+
+
+class TestEstimation(unittest.TestCase):
+    """Mémoire estimée des tuiles et budget"""
+
+    def test_tuile(self):
+        self.assertEqual(GEMOMemory.tile_bytes(300, 200, 'native'),
+                         300 * 200 * config.GEMO_MEMORY_BYTES_PER_PIXEL['native'] + config.GEMO_MEMORY_TILE_OVERHEAD)
+        self.assertGreater(GEMOMemory.tile_bytes(300, 300, 'sparse'), GEMOMemory.tile_bytes(300, 300, 'native'))
+        self.assertGreater(GEMOMemory.available(), 0)
+        self.assertEqual(GEMOMemory.budget(0), 0)
+        self.assertIsNone(MemoryAdmission.from_fraction(0))
+
+    def test_plafond_worker(self):
+        self.assertEqual(GEMOMemory.worker_limit(8 * 2**30, 8, 2**20),
+                         2**30 + config.GEMO_WORKER_BASELINE)
+        # Jamais sous la marge de la tuile la plus lourde
+        self.assertEqual(GEMOMemory.worker_limit(2**30, 8, 2**30),
+                         int(config.GEMO_RLIMIT_HEADROOM * 2**30) + config.GEMO_WORKER_BASELINE)
+
+    def test_admission(self):
+        admission = MemoryAdmission(250)
+        admission._estimates = {(x, 0, 'rep', None): taille for x, taille in enumerate((100, 100, 300))}
+        tasks = [(x, 0, 'rep', {}, True) for x in range(3)]
+        self.assertTrue(admission.admits(tasks[0], 0))
+        admission.acquire(tasks[0])
+        self.assertTrue(admission.admits(tasks[1], 1))
+        admission.acquire(tasks[1])
+        self.assertFalse(admission.admits(tasks[2], 2))
+        admission.release(tasks[0])
+        admission.release(tasks[1])
+        # Tuile plus lourde que le budget : admise seule
+        self.assertTrue(admission.admits(tasks[2], 0))
+        self.assertEqual((admission.used, admission.peak), (0, 200))
+
+    def test_plafond_applique(self):
+        limite = 64 * 2**20
+        with Pool(1, initializer=GEMOMemory.init_worker, initargs=(limite,)) as pool:
+            soft, _ = pool.apply(resource.getrlimit, (resource.RLIMIT_DATA,))
+            self.assertGreaterEqual(soft, limite)
+            with self.assertRaises(MemoryError):
+                pool.apply(np.ones, ((soft // 8 + 2**20,),))
+
+
+class TestAdmissionExecuteur(unittest.TestCase):
+    """Concurrence des tuiles limitée par le budget mémoire"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.gemo_cmd = GEMOExecutor.GEMO_UNIT_CMD
+        script = os.path.join(self.temp_dir, "faux_gemo.py")
+        with open(script, 'w') as f:
+            f.write(FAUX_GEMO)
+        GEMOExecutor.GEMO_UNIT_CMD = f"{sys.executable} {script}"
+
+        # 35 x 50 pixels, dalles de 20 avec 5 de recouvrement : 3 x 2 dalles
+        data = np.random.default_rng(4).random((35, 50)).astype(np.float32) * 100
+        profile = {'driver': 'GTiff', 'height': 35, 'width': 50, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': NODATA}
+        chemin = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(chemin, 'w', **profile) as dst:
+            dst.write(data, 1)
+        self.rep = os.path.join(self.temp_dir, "tmp")
+        os.makedirs(self.rep)
+        self.has_data = TileCutter.cut_workspace(chemin, chemin, chemin, 20, 5, NODATA, self.rep, 1)
+        self.gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA}
+
+    def tearDown(self):
+        GEMOExecutor.GEMO_UNIT_CMD = self.gemo_cmd
+        shutil.rmtree(self.temp_dir)
+
+    def intervalles(self):
+        with open(os.path.join(self.temp_dir, "intervalles")) as f:
+            return sorted(tuple(map(float, line.split())) for line in f)
+
+    def test_une_tuile_a_la_fois(self):
+        tasks = GEMOExecutor.build_tasks(self.rep, 3, 2, self.gemo_params, has_data=self.has_data)
+        tuile = GEMOMemory.task_bytes(tasks[0])
+        self.assertEqual(tuile, GEMOMemory.tile_bytes(20, 20, 'native'))
+        # Budget d'une tuile et demie : les 3 workers n'exécutent qu'une tuile à la fois
+        admission = MemoryAdmission(int(1.5 * tuile))
+        with Pool(3, initializer=GEMOExecutor.init_worker) as pool:
+            results, _ = GEMOExecutor.run_tiles(pool, tasks, 3, admission=admission)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(len(results), 6)
+        self.assertEqual((admission.used, admission.peak), (0, tuile))
+        intervalles = self.intervalles()
+        for (_, fin), (debut, _) in zip(intervalles, intervalles[1:]):
+            self.assertLessEqual(fin, debut)
+
+    def test_politique_du_chantier(self):
+        results = GEMOExecutor.run_gemo_parallel(self.rep, 3, 2, self.gemo_params, 3, has_data=self.has_data,
+                                                 memory_policy={'fraction': 0.5, 'worker_rlimit': True})
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(r.ok for r in results))
+        # Large budget : les tuiles se recouvrent dans le temps
+        intervalles = self.intervalles()
+        self.assertTrue(any(fin > debut for (_, fin), (debut, _) in zip(intervalles, intervalles[1:])))
+        # Moteur natif : commandes lancées par le processus principal, pas par des workers
+        with open(os.path.join(self.temp_dir, "parents")) as f:
+            self.assertEqual(set(f.read().split()), {str(os.getpid())})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
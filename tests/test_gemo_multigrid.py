@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le moteur GEMO multigrille (V-cycles sur tableaux NumPy)."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemo_multigrid import MultigridGEMOSolver, coarse_validity, prolong, restrict
+from gemaut.gemo_sparse import SparseGEMOSolver, regularization_matrix
+
+NODATA = -32768
+
+
+def terrain_avec_batiment(taille=40, seed=1):
+    """Plan incliné bruité, et le même avec un bâtiment de 10 m non masqué"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:taille, 0:taille]
+    terrain = 100 + 0.3 * xx + 0.2 * yy
+    mne = terrain + rng.normal(0, 0.1, terrain.shape)
+    mne[15:25, 15:25] += 10
+    return terrain, mne.astype(np.float32)
+
+
+class TestTransferts(unittest.TestCase):
+    """Prolongement et restriction entre niveaux"""
+
+    def test_restriction_transposee_du_prolongement(self):
+        rng = np.random.default_rng(0)
+        for shape in ((9, 7), (8, 10), (2, 5)):
+            coarse_shape = ((shape[0] + 1) // 2, (shape[1] + 1) // 2)
+            c = rng.random(coarse_shape)
+            f = rng.random(shape)
+            self.assertAlmostEqual(float(np.sum(prolong(c, shape) * f)), float(np.sum(c * restrict(f))))
+
+    def test_prolongement_conserve_les_plans(self):
+        for shape in ((9, 7), (8, 10)):
+            yy, xx = np.mgrid[0:shape[0], 0:shape[1]]
+            plan = 2. * xx - 0.5 * yy + 3
+            np.testing.assert_allclose(prolong(plan[::2, ::2], shape), plan)
+
+    def test_niveau_grossier_couvre_les_pixels_valides(self):
+        valide = np.zeros((9, 9), bool)
+        valide[3, 3] = True
+        grossier = coarse_validity(valide)
+        # Pixel fin impair : ses quatre voisins grossiers sont retenus
+        self.assertEqual(grossier.sum(), 4)
+        self.assertTrue(grossier[1:3, 1:3].all())
+
+
+class TestMoteurMultigrille(unittest.TestCase):
+    """Minimisation IRLS multigrille"""
+
+    def test_regularisation_sans_matrice(self):
+        masque = np.zeros((23, 30), np.uint8)
+        masque[5:9, 10:20] = 11
+        solver = MultigridGEMOSolver(0.5, 0.01)
+        levels = solver._operators(masque)
+        d_op, reg = regularization_matrix(masque)
+        z = np.random.default_rng(3).random(masque.size)
+        energie, gradient = solver._regularization(levels, z)
+        self.assertAlmostEqual(energie, float(np.sum((d_op @ z) ** 2)))
+        np.testing.assert_allclose(gradient, reg @ z, atol=1e-12)
+        np.testing.assert_allclose(levels[0].diagonal.ravel(), reg.diagonal())
+
+    def test_meme_solution_que_le_moteur_creux(self):
+        _, mne = terrain_avec_batiment(taille=61)
+        masque = np.zeros(mne.shape, np.uint8)
+        masque[20:30, 35:50] = 11
+        masque[40:, 5:15] = 255
+        self.assertEqual(len(MultigridGEMOSolver(0.5, 0.01)._operators(masque)), 3)
+        for norme in ('L2', 'hubertukey'):
+            mnt, stats = MultigridGEMOSolver(0.5, 0.01, norme, tol_grad=1e-8).solve(mne, masque, mne)
+            mnt_creux, _ = SparseGEMOSolver(0.5, 0.01, norme, method='direct', tol_grad=1e-8).solve(mne, masque, mne)
+            self.assertEqual(stats['engine'], 'multigrid')
+            np.testing.assert_allclose(mnt, mnt_creux, atol=1e-3)
+
+    def test_convergence_independante_de_la_taille(self):
+        cycles = []
+        for taille in (49, 197):
+            _, mne = terrain_avec_batiment(taille=taille)
+            masque = np.zeros(mne.shape, np.uint8)
+            _, stats = MultigridGEMOSolver(0.5, 0.01, 'L2', tol_grad=1e-8).solve(mne, masque, mne)
+            self.assertEqual(stats['stop'], 'gradient')
+            cycles.append(stats['cycles'])
+        self.assertLess(cycles[1], 2 * cycles[0])
+
+    def test_pixels_hors_zone_conserves(self):
+        _, mne = terrain_avec_batiment()
+        masque = np.zeros(mne.shape, np.uint8)
+        masque[:, 30:] = 11
+        mne[:, 30:] = NODATA
+        mnt, _ = MultigridGEMOSolver(0.5, 0.01, 'hubertukey').solve(mne, masque, mne.copy())
+        np.testing.assert_allclose(mnt[:, 30:], NODATA)
+        self.assertTrue(np.all(np.abs(mnt[:, :30] - 105) < 20))
+
+    def test_norme_robuste_ignore_le_sursol(self):
+        terrain, mne = terrain_avec_batiment()
+        masque = np.zeros(mne.shape, np.uint8)
+        mnt, _ = MultigridGEMOSolver(0.5, 0.01, 'hubertukey', tol_grad=1e-8).solve(mne, masque, mne)
+        self.assertLess(np.abs(mnt - terrain)[15:25, 15:25].max(), 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le moteur GEMO natif en processus (module d'extension _gemo)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut import gemo_native
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.gemo_native import NativeGEMOSolver
+from gemaut.gemo_sparse import GEMOInterrupted, SparseGEMOSolver
+from gemaut.tile_processor import TileCutter
+
+NODATA = -32768
+
+
+class FauxModuleGEMO:
+    """Remplaçant de _gemo : renvoie l'init en float64 et note les appels"""
+
+    def __init__(self):
+        self.appels = []
+
+    def gea(self, mne, masque, init, norme, sigma, lambda_val, no_data_ext, max_iter, tol_grad,
+            step, tol_line, timeout, cancel_file):
+        self.appels.append({'dtypes': (mne.dtype, masque.dtype, init.dtype), 'max_iter': max_iter,
+                            'timeout': timeout, 'thread': threading.current_thread().name})
+        if cancel_file and os.path.exists(cancel_file):
+            return init.astype(np.float64), {'iterations': 50, 'stop': 'interrupted', 'reason': 'annulée'}
+        stats = {'iterations': 12, 'stop': 'gradient', 'gsl_status': 0, 'energy': 1.,
+                 'gradient_norm': 1e-4, 'size': (mne.shape[1], mne.shape[0])}
+        return init.astype(np.float64), stats
+
+
+class TestMoteurNatifEnProcessus(unittest.TestCase):
+    """Enveloppe Python de _gemo et exécution des tuiles dans des threads"""
+
+    def setUp(self):
+        self.module = gemo_native._gemo
+        self.faux = FauxModuleGEMO()
+        gemo_native._gemo = self.faux
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        gemo_native._gemo = self.module
+        shutil.rmtree(self.temp_dir)
+
+    def test_solve(self):
+        mne = np.arange(12, dtype=np.float32).reshape(3, 4)
+        masque = np.zeros((3, 4), np.uint8)
+        solver = NativeGEMOSolver(0.5, 0.01, 'L2', NODATA, {'max_iter': 500, 'tol_grad': 1e-2})
+        mnt, stats = solver.solve(mne, masque, mne, timeout=30)
+        self.assertEqual(mnt.dtype, np.float64)
+        self.assertEqual(stats['engine'], 'extension')
+        self.assertEqual(stats['size'], [4, 3])
+        self.assertEqual(self.faux.appels[0]['dtypes'], (np.float32, np.uint8, np.float32))
+        self.assertEqual(self.faux.appels[0]['max_iter'], 500)
+
+    def test_interruption(self):
+        cancel = os.path.join(self.temp_dir, "ANNULER")
+        open(cancel, 'w').close()
+        mne = np.zeros((3, 4), np.float32)
+        with self.assertRaises(GEMOInterrupted) as ctx:
+            NativeGEMOSolver(0.5, 0.01).solve(mne, np.zeros((3, 4), np.uint8), mne, cancel_file=cancel)
+        self.assertEqual(ctx.exception.reason, 'annulée')
+
+    def test_module_absent(self):
+        gemo_native._gemo = None
+        self.assertFalse(gemo_native.is_available())
+        with self.assertRaises(ImportError):
+            NativeGEMOSolver(0.5, 0.01)
+
+    def test_tuiles_dans_des_threads(self):
+        data = np.random.default_rng(0).random((40, 40)).astype(np.float32) * 10 + 100
+        profile = {'driver': 'GTiff', 'height': 40, 'width': 40, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': NODATA}
+        mns = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(mns, 'w', **profile) as dst:
+            dst.write(data, 1)
+        masque = os.path.join(self.temp_dir, "masque.tif")
+        with rasterio.open(masque, 'w', **dict(profile, dtype='uint8', nodata=11)) as dst:
+            dst.write(np.zeros((40, 40), np.uint8), 1)
+        rep = os.path.join(self.temp_dir, "tmp")
+        os.makedirs(rep)
+        has_data = TileCutter.cut_workspace(mns, masque, mns, 25, 10, NODATA, rep, 1)
+
+        gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA,
+                       'engine': 'extension'}
+        results = GEMOExecutor.run_gemo_parallel(rep, 2, 2, gemo_params, 2, has_data=has_data)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r.status == 'succès' and r.stats['engine'] == 'extension' for r in results))
+        # Pas de worker : les tuiles sont traitées par des threads du processus courant
+        self.assertEqual(len(self.faux.appels), 4)
+        self.assertTrue(all(a['thread'] != 'MainThread' for a in self.faux.appels))
+        with rasterio.open(os.path.join(rep, "Dalle_1_1", "Out_MNT_1_1.tif")) as src:
+            self.assertEqual(src.dtypes[0], 'float64')
+            self.assertEqual(src.crs.to_epsg(), 2154)
+
+
+@unittest.skipUnless(gemo_native.is_available(), "module _gemo non compilé")
+class TestModuleGEMO(unittest.TestCase):
+    """GEA() compilé : même minimum que le moteur creux"""
+
+    def test_norme_l2(self):
+        rng = np.random.default_rng(1)
+        yy, xx = np.mgrid[0:30, 0:30]
+        mne = (100 + 0.3 * xx + 0.2 * yy + rng.normal(0, 0.1, xx.shape)).astype(np.float32)
+        masque = np.zeros(mne.shape, np.uint8)
+        budget = {'max_iter': 30000, 'tol_grad': 1e-6}
+        mnt, stats = NativeGEMOSolver(0.5, 0.01, 'L2', NODATA, budget).solve(mne, masque, mne)
+        mnt_creux, _ = SparseGEMOSolver(0.5, 0.01, 'L2', tol_grad=1e-8).solve(mne, masque, mne)
+        self.assertEqual(stats['stop'], 'gradient')
+        np.testing.assert_allclose(mnt, mnt_creux, atol=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le budget du solveur GEMO (itérations, tolérances, pas, mode adaptatif)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut import config
+from gemaut.config_manager import ConfigManager
+from gemaut.gemo_executor import GEMOExecutor
+
+
+class TestBudgetSolveur(unittest.TestCase):
+    """Budget du solveur transmis à main_GEMAUT_unit"""
+
+    def setUp(self):
+        self.gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': -32768,
+                            'max_iter': 20000, 'tol_grad': 1e-3, 'step': 0.02, 'tol_line': 1e-4}
+
+    def test_budget_fixe(self):
+        budget = GEMOExecutor.solver_budget(dict(self.gemo_params, budget='fixed'), valid_pixels=100)
+        self.assertEqual(budget, {'max_iter': 20000, 'tol_grad': 1e-3, 'step': 0.02, 'tol_line': 1e-4})
+
+    def test_budget_par_defaut(self):
+        budget = GEMOExecutor.solver_budget({'sigma': 0.5})
+        self.assertEqual(budget['max_iter'], config.DEFAULT_GEMO_MAX_ITER)
+        self.assertEqual(budget['tol_grad'], config.DEFAULT_GEMO_TOL_GRAD)
+
+    def test_budget_adaptatif(self):
+        params = dict(self.gemo_params, budget='adaptive')
+        # Tuile presque vide : plancher d'itérations, seuil inchangé
+        petite = GEMOExecutor.solver_budget(params, valid_pixels=16)
+        self.assertEqual(petite['max_iter'], config.GEMO_ADAPTIVE_MIN_ITER)
+        self.assertEqual(petite['tol_grad'], 1e-3)
+        # Tuile de 200 x 200 pixels valides
+        moyenne = GEMOExecutor.solver_budget(params, valid_pixels=200 * 200)
+        self.assertEqual(moyenne['max_iter'], config.GEMO_ADAPTIVE_ITER_PER_SIDE * 200)
+        # Très grande tuile : plafond configuré, seuil ramené au nombre de pixels
+        grande = GEMOExecutor.solver_budget(params, valid_pixels=4 * config.GEMO_ADAPTIVE_REF_PIXELS)
+        self.assertEqual(grande['max_iter'], 20000)
+        self.assertAlmostEqual(grande['tol_grad'], 2e-3)
+        self.assertEqual(grande['step'], 0.02)
+
+    def test_commande(self):
+        budget = GEMOExecutor.solver_budget(self.gemo_params)
+        cmd = GEMOExecutor.build_gemo_command('mns.tif', 'masque.tif', 'init.tif', 'mnt.tif',
+                                              0.5, 0.01, -32768, 'L2', budget)
+        self.assertEqual(cmd[-5:], ['L2', '20000', '0.001', '0.02', '0.0001'])
+        # Sans budget : ligne de commande historique
+        cmd = GEMOExecutor.build_gemo_command('mns.tif', 'masque.tif', 'init.tif', 'mnt.tif',
+                                              0.5, 0.01, -32768, 'L2')
+        self.assertEqual(cmd[-4:], ['0.50000', '0.01000', '-32768.00000', 'L2'])
+
+
+class TestBudgetSolveurYAML(unittest.TestCase):
+    """Section gemo du fichier de configuration"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_lecture_et_validation(self):
+        chemin = os.path.join(self.temp_dir, "config.yaml")
+        with open(chemin, 'w') as f:
+            f.write("input:\n  mns_file: mns.tif\n  output_file: mnt.tif\n  work_dir: rep\n"
+                    "gemo:\n  max_iter: 5000\n  tol_grad: 1e-2\n  solver_budget: adaptive\n")
+        yaml_config = ConfigManager.load_config(chemin)
+        self.assertEqual(yaml_config.max_iter, 5000)
+        self.assertEqual(yaml_config.tol_grad, 0.01)
+        self.assertEqual(yaml_config.step, 0.01)
+        self.assertEqual(yaml_config.solver_budget, 'adaptive')
+
+        yaml_config.solver_budget = 'rapide'
+        with self.assertRaises(ValueError):
+            ConfigManager.validate_config(yaml_config)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
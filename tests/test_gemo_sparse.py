@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le moteur GEMO creux (IRLS sur systèmes creux SciPy)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.gemo_sparse import (GEMOInterrupted, SparseGEMOSolver, norm_derivative, norm_distance,
+                                regularization_matrix)
+from gemaut.tile_processor import TileCutter
+
+NODATA = -32768
+
+
+def terrain_avec_batiment(taille=40, seed=1):
+    """Plan incliné bruité, et le même avec un bâtiment de 10 m non masqué"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:taille, 0:taille]
+    terrain = 100 + 0.3 * xx + 0.2 * yy
+    mne = terrain + rng.normal(0, 0.1, terrain.shape)
+    mne[15:25, 15:25] += 10
+    return terrain, mne.astype(np.float32)
+
+
+class TestMoteurCreux(unittest.TestCase):
+    """Énergie GEMO et minimisation IRLS"""
+
+    def test_gradient_de_l_energie(self):
+        _, mne = terrain_avec_batiment()
+        masque = np.zeros(mne.shape, np.uint8)
+        masque[5:8, :] = 11
+        d_op, reg = regularization_matrix(masque)
+        attache = (masque == 0).ravel()
+        m = ((mne - mne.min()) / (mne.max() - mne.min())).astype(np.float64).ravel()
+        z = m + np.random.default_rng(0).normal(0, 0.01, m.size)
+        for norme in ('huber', 'tukey', 'hubertukey', 'L2'):
+            solver = SparseGEMOSolver(0.5, 0.01, norme)
+            energie, gradient = solver.energy_and_gradient(z, m, attache, (d_op, reg), 13)
+            for i in (3, 250, 700, 1234):
+                zz = z.copy()
+                zz[i] += 1e-6
+                energie2, _ = solver.energy_and_gradient(zz, m, attache, (d_op, reg), 13)
+                self.assertAlmostEqual((energie2 - energie) / 1e-6, gradient[i], places=3)
+
+    def test_normes(self):
+        u = np.array([-6., -2., -0.5, 0., 0.5, 2., 6.])
+        # Huber/Tukey : Tukey pour les résidus négatifs (sursol), Huber pour les positifs
+        np.testing.assert_allclose(norm_distance(u, 'hubertukey')[:3], norm_distance(u, 'tukey')[:3])
+        np.testing.assert_allclose(norm_distance(u, 'hubertukey')[4:], norm_distance(u, 'huber')[4:])
+        self.assertEqual(norm_derivative(np.array([-6.]), 'tukey')[0], 0.)
+        self.assertAlmostEqual(norm_derivative(np.array([6.]), 'huber')[0], 1.2107)
+
+    def test_l2_une_seule_resolution(self):
+        _, mne = terrain_avec_batiment()
+        masque = np.zeros(mne.shape, np.uint8)
+        for method in ('direct', 'cg'):
+            _, stats = SparseGEMOSolver(0.5, 0.01, 'L2', method=method, tol_grad=1e-6).solve(mne, masque, mne)
+            self.assertEqual(stats['iterations'], 1)
+            self.assertEqual(stats['engine'], 'sparse')
+            self.assertLess(stats['gradient_norm'], 1e-6)
+
+    def test_norme_robuste_ignore_le_sursol(self):
+        terrain, mne = terrain_avec_batiment()
+        masque = np.zeros(mne.shape, np.uint8)
+        mnt_l2, _ = SparseGEMOSolver(0.5, 0.01, 'L2').solve(mne, masque, mne)
+        mnt, stats = SparseGEMOSolver(0.5, 0.01, 'hubertukey', tol_grad=1e-8).solve(mne, masque, mne)
+        self.assertLess(stats['iterations'], 10)
+        self.assertLess(np.abs(mnt - terrain)[15:25, 15:25].max(), 0.1)
+        self.assertGreater(np.abs(mnt_l2 - terrain)[15:25, 15:25].max(), 0.5)
+
+    def test_pixels_hors_zone_conserves(self):
+        _, mne = terrain_avec_batiment()
+        masque = np.zeros(mne.shape, np.uint8)
+        masque[:, 30:] = 11
+        mne[:, 30:] = NODATA
+        init = mne.copy()
+        mnt, _ = SparseGEMOSolver(0.5, 0.01, 'hubertukey').solve(mne, masque, init)
+        np.testing.assert_allclose(mnt[:, 30:], NODATA)
+        self.assertTrue(np.all(np.abs(mnt[:, :30] - 105) < 20))
+
+    def test_interruption(self):
+        _, mne = terrain_avec_batiment()
+        masque = np.zeros(mne.shape, np.uint8)
+        with self.assertRaises(GEMOInterrupted) as ctx:
+            SparseGEMOSolver(0.5, 0.01).solve(mne, masque, mne, deadline=time.monotonic() - 1)
+        self.assertEqual(ctx.exception.reason, 'timeout')
+
+
+class TestMoteurCreuxExecuteur(unittest.TestCase):
+    """Moteur creux choisi par les paramètres GEMO du chantier"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        _, mne = terrain_avec_batiment(taille=50)
+        masque = np.zeros(mne.shape, np.uint8)
+        profile = {'driver': 'GTiff', 'height': 50, 'width': 50, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': NODATA}
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(mne, 1)
+        self.masque = os.path.join(self.temp_dir, "masque.tif")
+        with rasterio.open(self.masque, 'w', **dict(profile, dtype='uint8', nodata=11)) as dst:
+            dst.write(masque, 1)
+        self.rep = os.path.join(self.temp_dir, "tmp")
+        os.makedirs(self.rep)
+        self.has_data = TileCutter.cut_workspace(self.mns, self.masque, self.mns, 30, 10, NODATA, self.rep, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_tuiles_avec_moteur_creux(self):
+        gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA,
+                       'engine': 'sparse'}
+        results = GEMOExecutor.run_gemo_parallel(self.rep, 2, 2, gemo_params, 1, has_data=self.has_data)
+        self.assertEqual(len(results), 4)
+        for result in results:
+            self.assertEqual(result.status, 'succès')
+            self.assertEqual(result.stats['engine'], 'sparse')
+            sortie = os.path.join(self.rep, f"Dalle_{result.x}_{result.y}", f"Out_MNT_{result.x}_{result.y}.tif")
+            with rasterio.open(sortie) as src:
+                self.assertEqual(src.dtypes[0], 'float64')
+                self.assertEqual(src.crs.to_epsg(), 2154)
+                self.assertTrue(np.all(np.isfinite(src.read(1))))
+
+    def test_tuiles_avec_moteur_multigrille(self):
+        gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'L2', 'no_data_value': NODATA,
+                       'engine': 'multigrid'}
+        results = GEMOExecutor.run_gemo_parallel(self.rep, 2, 2, gemo_params, 1, has_data=self.has_data)
+        self.assertTrue(all(r.status == 'succès' for r in results))
+        self.assertTrue(all(r.stats['engine'] == 'multigrid' and r.stats['cycles'] > 0 for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
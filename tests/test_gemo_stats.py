@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour la télémétrie de convergence GEMO (ligne GEMO_STATS, CSV et raster par tuile)."""
+
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.gemo_stats import GemoTelemetry
+from gemaut.tile_processor import TileCutter
+
+NODATA = -32768
+
+# Remplaçant de main_GEMAUT_unit : copie l'INIT et écrit la ligne de télémétrie
+FAUX_GEMO = '''
+import json, shutil, sys
+mns, masque, init, out = sys.argv[1:5]
+shutil.copyfile(init, out)
+print("GEMO : 12 lignes / 20 colonnes")
+x, y = (int(v) for v in out.split('Out_MNT_')[1].split('.')[0].split('_'))
+stats = {"iterations": 100 * (x + 1) + y, "stop": "max_iter" if x == 2 else "gradient",
+         "gsl_status": 27 if x == 2 else 0, "energy": 1.5, "gradient_norm": 0.0008, "size": [20, 20]}
+print("GEMO_STATS " + json.dumps(stats))
+'''
+
+
+class TestTelemetrieGEMO(unittest.TestCase):
+    """Récupération et écriture de la télémétrie GEMO"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.gemo_cmd = GEMOExecutor.GEMO_UNIT_CMD
+        script = os.path.join(self.temp_dir, "faux_gemo.py")
+        with open(script, 'w') as f:
+            f.write(FAUX_GEMO)
+        GEMOExecutor.GEMO_UNIT_CMD = f"{sys.executable} {script}"
+
+        # 35 x 50 pixels, dalles de 20 avec 5 de recouvrement : 3 x 2 dalles, dalle 0_1 vide
+        data = np.random.default_rng(2).random((35, 50)).astype(np.float32) * 100
+        data[10:, :25] = NODATA
+        profile = {'driver': 'GTiff', 'height': 35, 'width': 50, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(1000, 2000, 2, 2), 'nodata': NODATA}
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(data, 1)
+        self.rep = os.path.join(self.temp_dir, "tmp")
+        os.makedirs(self.rep)
+        self.has_data = TileCutter.cut_workspace(self.mns, self.mns, self.mns, 20, 5, NODATA, self.rep, 2)
+        self.gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA}
+        self.telemetry = GemoTelemetry(self.mns, 20, 5, self.gemo_params,
+                                       os.path.join(self.temp_dir, "GEMO_STATS.csv"),
+                                       os.path.join(self.temp_dir, "GEMO_STATS.tif"))
+
+    def tearDown(self):
+        GEMOExecutor.GEMO_UNIT_CMD = self.gemo_cmd
+        shutil.rmtree(self.temp_dir)
+
+    def test_lecture_ligne_stats(self):
+        sortie = 'GEMO : 3 lignes\nGEMO_STATS {"iterations": 30000, "stop": "max_iter", "energy": 2.5}\n'
+        stats = GEMOExecutor.parse_gemo_stats(sortie)
+        self.assertEqual(stats['iterations'], 30000)
+        self.assertEqual(stats['stop'], 'max_iter')
+        # Binaire sans télémétrie ou ligne tronquée
+        self.assertEqual(GEMOExecutor.parse_gemo_stats("GEMO : 3 lignes\n"), {})
+        self.assertEqual(GEMOExecutor.parse_gemo_stats('GEMO_STATS {"iterations": '), {})
+
+    def test_csv_et_raster_par_tuile(self):
+        results = GEMOExecutor.run_gemo_parallel(self.rep, 3, 2, self.gemo_params, 2, has_data=self.has_data,
+                                                 telemetry=self.telemetry)
+        par_tuile = {(r.x, r.y): r for r in results}
+        self.assertEqual(len(par_tuile), 6)
+        self.assertEqual(par_tuile[(0, 0)].stats['iterations'], 100)
+        self.assertEqual(par_tuile[(0, 1)].stats, {})
+
+        with open(self.telemetry.csv_file, newline='') as f:
+            lignes = {(int(r['x']), int(r['y'])): r for r in csv.DictReader(f)}
+        self.assertEqual(len(lignes), 6)
+        self.assertEqual(lignes[(2, 1)]['iterations'], '301')
+        self.assertEqual(lignes[(2, 1)]['stop'], 'max_iter')
+        self.assertEqual((lignes[(2, 1)]['col_off'], lignes[(2, 1)]['width']), ('30', '20'))
+        self.assertEqual(lignes[(2, 1)]['height'], '20')
+        self.assertEqual(lignes[(0, 1)]['status'], 'copiée')
+        self.assertEqual(lignes[(0, 1)]['iterations'], '')
+        self.assertEqual(lignes[(1, 0)]['norme'], 'hubertukey')
+
+        with rasterio.open(self.telemetry.raster_file) as src:
+            self.assertEqual((src.count, src.width, src.height), (5, 3, 2))
+            self.assertEqual(src.descriptions, ('iterations', 'energy', 'gradient_norm', 'runtime', 'stop'))
+            # Un pixel par pas de tuile (15 pixels de 2 m)
+            self.assertEqual((src.transform.a, src.transform.c, src.transform.f), (30.0, 1000.0, 2000.0))
+            iterations = src.read(1)
+            stop = src.read(5)
+        self.assertEqual(iterations[1, 2], 301)
+        self.assertTrue(np.isnan(iterations[1, 0]))
+        self.assertEqual(stop[0, 0], 1)
+        self.assertEqual(stop[0, 2], 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests du temps de démarrage : la CLI ne doit pas importer la pile scientifique."""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Modules lourds réservés aux étapes de traitement
+MODULES_LOURDS = ['numpy', 'rasterio', 'scipy', 'tqdm', 'SAGA']
+
+# Budget de démarrage (import cumulé du package, en secondes) : large pour les machines chargées
+BUDGET_IMPORT = 0.5
+
+
+def executer(code):
+    """Exécute du code dans un interpréteur neuf (aucun module déjà en cache)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=RACINE,
+                            capture_output=True, text=True, timeout=60)
+    return result
+
+
+def modules_charges(stdout):
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+CODE_MODULES = (
+    "import sys, json\n"
+    "{action}\n"
+    f"print(json.dumps([m for m in {MODULES_LOURDS!r} if m in sys.modules]))\n"
+)
+
+
+class TestDemarrageCLI(unittest.TestCase):
+    """Vérifie les imports paresseux du package gemaut."""
+
+    def test_import_package(self):
+        result = executer(CODE_MODULES.format(action="import gemaut, gemaut.script_gemaut"))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(modules_charges(result.stdout), [])
+
+    def test_creation_template(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            chem_config = os.path.join(temp_dir, 'config.yaml')
+            action = ("sys.argv = ['gemaut', '--create-config', %r]\n"
+                      "from gemaut.script_gemaut import main\n"
+                      "main()" % chem_config)
+            result = executer(CODE_MODULES.format(action=action))
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertTrue(os.path.exists(chem_config))
+        self.assertEqual(modules_charges(result.stdout), [])
+
+    def test_acces_paresseux(self):
+        result = executer(CODE_MODULES.format(action="import gemaut; gemaut.GEMAUTPipeline"))
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_budget_import(self):
+        result = executer("import gemaut.script_gemaut")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        # ligne -X importtime : "import time: self [us] | cumulative | nom"
+        lignes = [l.split('|') for l in result.stderr.splitlines() if l.startswith('import time:')]
+        cumul = [int(l[1]) for l in lignes if l[2].strip() == 'gemaut']
+        self.assertTrue(cumul)
+        self.assertLess(cumul[0] / 1e6, BUDGET_IMPORT)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
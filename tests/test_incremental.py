@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour la mise à jour incrémentale (empreintes par bloc et refonte des dalles)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemaut_config import GEMAUTConfig
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.incremental import IncrementalUpdater
+from gemaut.script_gemaut import GEMAUTPipeline
+from gemaut.tile_processor import TileAssembler, TileCalculator, TileCutter
+
+# Remplaçant de main_GEMAUT_unit : MNT de la dalle = INIT
+FAUX_GEMO = '''
+import shutil, sys
+shutil.copyfile(sys.argv[3], sys.argv[4])
+'''
+
+
+def ecrire_raster(chemin, data, x0=0, y0=1000):
+    profile = {
+        'driver': 'GTiff', 'height': data.shape[0], 'width': data.shape[1], 'count': 1,
+        'dtype': 'float32', 'crs': 'EPSG:2154', 'transform': from_origin(x0, y0, 1, 1),
+    }
+    with rasterio.open(chemin, 'w', **profile) as dst:
+        dst.write(data.astype(np.float32), 1)
+
+
+class TestEmpreintesBlocs(unittest.TestCase):
+    """Détection des blocs modifiés et des dalles touchées."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_un_pixel_modifie(self):
+        data = np.random.default_rng(0).random((50, 70))
+        chemin = os.path.join(self.temp_dir, "mns.tif")
+        ecrire_raster(chemin, data)
+        avant = IncrementalUpdater.compute_block_hashes([chemin], 16)
+
+        data[40, 35] += 1
+        ecrire_raster(chemin, data)
+        apres = IncrementalUpdater.compute_block_hashes([chemin], 16)
+
+        self.assertEqual(len(avant), 4 * 5)
+        self.assertEqual(IncrementalUpdater.changed_blocks(avant, apres), {(2, 2)})
+
+    def test_dalles_touchees(self):
+        # dalles de 30 px, recouvrement 10 : pas de 20, chantier 90 x 70 -> 4 x 3 dalles
+        tiles = IncrementalUpdater.affected_tiles({(0, 0)}, 10, 4, 3, 30, 10, 90, 70)
+        # la dalle 1 commence à 20 : élargie du recouvrement, elle s'arrête juste au bord du bloc [0, 10)
+        self.assertEqual(tiles, {(0, 0)})
+
+        tiles = IncrementalUpdater.affected_tiles({(3, 4)}, 10, 4, 3, 30, 10, 90, 70)
+        self.assertEqual(tiles, {(1, 0), (2, 0), (1, 1), (2, 1), (1, 2), (2, 2)})
+
+    def test_regions_du_mns(self):
+        # MNS 100 x 90, blocs de 10 px, halo de 7 px, bornes alignées sur 4 px
+        regions = IncrementalUpdater.source_regions({(1, 1), (2, 2), (8, 7)}, 10, 7, 4, 90, 100)
+        # Les deux premiers blocs, voisins, forment une seule région
+        self.assertEqual(sorted(regions), [((10, 10, 30, 30), (0, 0, 40, 40)),
+                                           ((80, 70, 90, 80), (72, 60, 100, 88))])
+        self.assertEqual(IncrementalUpdater.source_regions(set(), 10, 7, 4, 90, 100), [])
+
+
+class TestAssemblageFenetre(unittest.TestCase):
+    """assemble_window doit reproduire exactement assemble_tiles."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.largeur, self.hauteur, self.tile, self.pad = 83, 71, 30, 9
+        pas = self.tile - self.pad
+        self.nx = (self.largeur - self.pad + pas - 1) // pas
+        self.ny = (self.hauteur - self.pad + pas - 1) // pas
+
+        rng = np.random.default_rng(1)
+        for x in range(self.nx):
+            for y in range(self.ny):
+                ox, oy = x * pas, y * pas
+                dalle = rng.random((min(self.tile, self.hauteur - oy), min(self.tile, self.largeur - ox))) * 100
+                os.makedirs(os.path.join(self.temp_dir, f"Dalle_{x}_{y}"))
+                ecrire_raster(self.tile_path(x, y), dalle, ox, 1000 - oy)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def tile_path(self, x, y):
+        return os.path.join(self.temp_dir, f"Dalle_{x}_{y}", f"Out_MNT_{x}_{y}.tif")
+
+    def test_fenetres_identiques_a_l_assemblage_complet(self):
+        chem_out = os.path.join(self.temp_dir, "mnt.tif")
+        TileAssembler.assemble_tiles(self.temp_dir, self.nx, self.ny, chem_out)
+        with rasterio.open(chem_out) as src:
+            reference = src.read(1)
+
+        for window in (Window(0, 0, self.largeur, self.hauteur), Window(17, 23, 40, 30), Window(80, 60, 3, 11)):
+            resultat = TileAssembler.assemble_window(self.tile_path, self.nx, self.ny, self.tile, self.pad,
+                                                     self.largeur, self.hauteur, window)
+            r0, c0 = window.row_off, window.col_off
+            np.testing.assert_array_equal(resultat, reference[r0:r0 + window.height, c0:c0 + window.width])
+
+
+class ChantierPrecedent(unittest.TestCase):
+    """Exécution précédente (entrées GEMO, dalles et MNT), puis un pixel du MNS modifié."""
+
+    hauteur, largeur, tile, pad = 35, 50, 20, 5
+    pixel = (30, 45)
+    options = {}
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.gemo_cmd = GEMOExecutor.GEMO_UNIT_CMD
+        script = os.path.join(self.temp_dir, "faux_gemo.py")
+        with open(script, 'w') as f:
+            f.write(FAUX_GEMO)
+        GEMOExecutor.GEMO_UNIT_CMD = f"{sys.executable} {script}"
+
+        self.data = np.random.default_rng(2).random((self.hauteur, self.largeur)) * 100
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        ecrire_raster(self.mns, self.data)
+        self.config = GEMAUTConfig(mns_input=self.mns, mnt_output=os.path.join(self.temp_dir, "mnt.tif"),
+                                   resolution=1.0, cpu_count=2, work_dir=os.path.join(self.temp_dir, "RepTra"),
+                                   tile_size=self.tile, pad_size=self.pad, memory_fraction=0, **self.options)
+        self.config.create_directories()
+
+        # Exécution précédente : entrées GEMO, dalles et MNT
+        for name in GEMAUTPipeline.GEMO_INPUTS:
+            shutil.copyfile(self.mns, self.config.temp_files[name])
+        entrees = [self.config.temp_files[name] for name in GEMAUTPipeline.GEMO_INPUTS]
+        self.nx, self.ny = TileCalculator.get_tile_dimensions(entrees[0], self.tile, self.pad)
+        has_data = TileCutter.cut_workspace(*entrees, self.tile, self.pad, -32768, self.config.tmp_dir, 2)
+        GEMOExecutor.run_gemo_parallel(self.config.tmp_dir, self.nx, self.ny, self.config.get_gemo_params(), 2,
+                                       has_data=has_data)
+        TileAssembler.assemble_tiles(self.config.tmp_dir, self.nx, self.ny, self.config.mnt_output)
+        self.enregistrer_empreintes()
+
+        # Nouveau MNS : un pixel modifié
+        self.data[self.pixel] += 50
+        ecrire_raster(self.mns, self.data)
+        self.prepares = []
+
+    def tearDown(self):
+        GEMOExecutor.GEMO_UNIT_CMD = self.gemo_cmd
+        shutil.rmtree(self.temp_dir)
+
+    def enregistrer_empreintes(self):
+        """Sans empreintes du MNS précédent, la mise à jour prépare tout le chantier"""
+
+    def lire(self, chemin):
+        with rasterio.open(chemin) as src:
+            return src.read(1)
+
+    def preparer(self):
+        """Entrées GEMO sous-échantillonnées du MNS préparé (sans gdalwarp ni masque)"""
+        prepares = self.prepares
+
+        def preparer(pipeline):
+            with rasterio.open(pipeline.config.mns_input) as src:
+                prepares.append((pipeline.config.mns_input, src.shape))
+            for name in GEMAUTPipeline.GEMO_INPUTS:
+                shutil.copyfile(pipeline.config.mns_input, pipeline.config.temp_files[name])
+            pipeline._count_tiles()
+            return pipeline.tile_dims
+
+        return mock.patch.object(GEMAUTPipeline, 'prepare', preparer)
+
+
+class TestMiseAJourApresEchec(ChantierPrecedent):
+    """Un échec de GEMO après prepare() ne doit pas faire passer le MNT pour à jour."""
+
+    def test_echec_gemo_puis_reprise(self):
+        mnt_avant = self.lire(self.config.mnt_output)
+        ancien_mns = self.lire(self.config.temp_files['mns_sous_ech'])
+        echec = mock.Mock(side_effect=RuntimeError("1 tuiles GEMO en échec"))
+        with self.preparer():
+            for _ in range(2):
+                with mock.patch.object(GEMAUTPipeline, '_run_gemo_parallel', echec):
+                    with self.assertRaises(RuntimeError):
+                        IncrementalUpdater(self.config, block_size=8).run()
+                # Entrées et MNT de l'exécution précédente intacts : l'échec est repris ensuite
+                np.testing.assert_array_equal(self.lire(self.config.temp_files['mns_sous_ech']), ancien_mns)
+                np.testing.assert_array_equal(self.lire(self.config.mnt_output), mnt_avant)
+            self.assertEqual(echec.call_args_list[0], echec.call_args_list[1])
+
+            tiles = IncrementalUpdater(self.config, block_size=8).run()
+            self.assertEqual(tiles, echec.call_args.kwargs['tiles'])
+            self.assertEqual(self.lire(self.config.mnt_output)[30, 45], np.float32(self.data[30, 45]))
+            np.testing.assert_array_equal(self.lire(self.config.temp_files['mns_sous_ech']),
+                                          self.data.astype(np.float32))
+            self.assertFalse(os.path.exists(os.path.dirname(IncrementalUpdater(self.config).staging_path('mns_sous_ech'))))
+
+            # Entrées validées : plus rien à recalculer
+            self.assertEqual(IncrementalUpdater(self.config, block_size=8).run(), set())
+        self.assertEqual(self.prepares, [(self.mns, self.data.shape)] * 3)
+
+
+class TestPreparationRegions(ChantierPrecedent):
+    """Seule la région modifiée du MNS, élargie du halo, est préparée de nouveau."""
+
+    hauteur, largeur, tile, pad = 120, 160, 40, 10
+    pixel = (100, 130)
+    options = {'radius_saga': 4, 'tile_saga': 4}
+
+    def enregistrer_empreintes(self):
+        IncrementalUpdater.write_source_hashes(
+            self.config, IncrementalUpdater.compute_block_hashes([self.mns], 16), 16, None, None)
+
+    def test_region_modifiee(self):
+        mnt_avant = self.lire(self.config.mnt_output)
+        with self.preparer():
+            tiles = IncrementalUpdater(self.config, block_size=8, source_block_size=16).run()
+
+        # Bloc (6, 8) du MNS, halo de 2 x 4 + 4 px : lignes 84 à 120, colonnes 116 à 156
+        self.assertEqual([shape for _, shape in self.prepares], [(36, 40)])
+        np.testing.assert_array_equal(self.lire(self.config.temp_files['mns_sous_ech']),
+                                      self.data.astype(np.float32))
+        mnt = self.lire(self.config.mnt_output)
+        self.assertEqual(mnt[self.pixel], np.float32(self.data[self.pixel]))
+        self.assertLess(len(tiles), self.nx * self.ny)
+        self.assertIn((4, 3), tiles)
+        self.assertEqual(mnt[:40, :40].tolist(), mnt_avant[:40, :40].tolist())
+
+        # Empreintes du nouveau MNS enregistrées : plus rien à préparer
+        with self.preparer():
+            self.assertEqual(IncrementalUpdater(self.config, block_size=8, source_block_size=16).run(), set())
+        self.assertEqual(len(self.prepares), 1)
+
+    def test_parametres_modifies(self):
+        self.config.radius_saga = 5
+        with self.preparer():
+            IncrementalUpdater(self.config, block_size=8, source_block_size=16).run()
+        self.assertEqual(self.prepares, [(self.mns, self.data.shape)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
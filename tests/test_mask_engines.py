@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le registre des moteurs de masque et son cache de sondes."""
+
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut import mask_engines
+from gemaut.mask_computer import MaskComputer
+
+
+class TestCacheSondes(unittest.TestCase):
+    """La sonde d'un binaire n'est relancée que si le binaire change."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.env = {k: os.environ.get(k) for k in ('GEMAUT_CACHE_DIR', 'PATH')}
+        os.environ['GEMAUT_CACHE_DIR'] = os.path.join(self.temp_dir, 'cache')
+        os.environ['PATH'] = self.temp_dir + os.pathsep + os.environ.get('PATH', '')
+        mask_engines._probes.clear()
+
+        # faux binaire qui compte ses appels
+        self.compteur = os.path.join(self.temp_dir, 'appels')
+        self.binaire = os.path.join(self.temp_dir, 'faux_moteur')
+        self.ecrire_binaire('1.0')
+
+    def tearDown(self):
+        for k, v in self.env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        mask_engines._probes.clear()
+        mask_engines._ENGINES.pop('faux', None)
+        shutil.rmtree(self.temp_dir)
+
+    def ecrire_binaire(self, version):
+        with open(self.binaire, 'w') as f:
+            f.write(f"#!/bin/sh\necho x >> {self.compteur}\necho {version}\n")
+        os.chmod(self.binaire, os.stat(self.binaire).st_mode | stat.S_IEXEC)
+
+    def nombre_appels(self):
+        if not os.path.exists(self.compteur):
+            return 0
+        with open(self.compteur) as f:
+            return len(f.readlines())
+
+    def test_sonde_une_seule_fois(self):
+        probe = mask_engines.probe_binary('faux_moteur')
+        self.assertTrue(probe['available'])
+        self.assertEqual(probe['version'], '1.0')
+
+        # nouveau processus simulé : seul le cache disque reste
+        mask_engines._probes.clear()
+        mask_engines.probe_binary('faux_moteur')
+        self.assertEqual(self.nombre_appels(), 1)
+
+        with open(mask_engines.get_cache_path()) as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_binaire_modifie(self):
+        mask_engines.probe_binary('faux_moteur')
+        self.ecrire_binaire('2.0')
+        st = os.stat(self.binaire)
+        os.utime(self.binaire, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+        probe = mask_engines.probe_binary('faux_moteur')
+        self.assertEqual(probe['version'], '2.0')
+        self.assertEqual(self.nombre_appels(), 2)
+
+    def test_echec_non_enregistre(self):
+        # binaire présent mais non fonctionnel (bibliothèque manquante)
+        with open(self.binaire, 'w') as f:
+            f.write(f"#!/bin/sh\necho x >> {self.compteur}\nexit 127\n")
+        self.assertFalse(mask_engines.probe_binary('faux_moteur')['available'])
+        self.assertFalse(os.path.exists(mask_engines.get_cache_path()))
+
+        # environnement réparé, binaire inchangé : détecté au processus suivant
+        st = os.stat(self.binaire)
+        self.ecrire_binaire('1.0')
+        os.utime(self.binaire, ns=(st.st_atime_ns, st.st_mtime_ns))
+        mask_engines._probes.clear()
+        self.assertTrue(mask_engines.probe_binary('faux_moteur')['available'])
+        self.assertEqual(self.nombre_appels(), 2)
+
+    def test_binaire_absent(self):
+        self.assertFalse(mask_engines.probe_binary('binaire_inexistant_gemaut')['available'])
+
+    def test_enregistrement_moteur(self):
+        mask_engines.register_engine('faux', 'gemaut.numpy_ground_filter:NumpyGroundFilter',
+                                     binary='faux_moteur', default_params={'radius': 3})
+
+        computer = MaskComputer()
+        self.assertIn('faux', computer.available_methods)
+        self.assertEqual(computer._get_default_params('faux'), {'radius': 3})
+        self.assertEqual(type(mask_engines.create_engine('faux')).__name__, 'NumpyGroundFilter')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
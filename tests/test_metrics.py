@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour les métriques d'avancement au format Prometheus."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import urllib.request
+from multiprocessing.pool import ThreadPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemo_executor import GEMOExecutor, TileResult
+from gemaut.metrics import ProductionMetrics
+from gemaut.stage_graph import Stage, StageGraph
+
+
+def lire_metriques(texte):
+    """Échantillons sans commentaires : {nom avec étiquettes: valeur}"""
+    valeurs = {}
+    for ligne in texte.splitlines():
+        if ligne and not ligne.startswith('#'):
+            nom, valeur = ligne.rsplit(' ', 1)
+            valeurs[nom] = float(valeur)
+    return valeurs
+
+
+class TestMetriques(unittest.TestCase):
+    """Avancement, mesures du nœud et export"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_avancement(self):
+        metrics = ProductionMetrics(self.temp_dir)
+        StageGraph([Stage('préparation', lambda: None, outputs=('mns',)),
+                    Stage('gemo', lambda: time.sleep(0.01), inputs=('mns',))], 2, metrics).run()
+        metrics.tiles_started(10)
+        metrics.tiles_progress(4, 1, 3, 4)
+        valeurs = lire_metriques(metrics.render())
+        self.assertEqual(valeurs['gemaut_stage_running{stage="gemo"}'], 0)
+        self.assertGreaterEqual(valeurs['gemaut_stage_duration_seconds{stage="gemo"}'], 0.01)
+        self.assertEqual((valeurs['gemaut_tiles_total'], valeurs['gemaut_tiles_done'],
+                          valeurs['gemaut_tiles_failed']), (10, 4, 1))
+        self.assertEqual(valeurs['gemaut_workers_busy_ratio'], 0.75)
+        self.assertGreater(valeurs['gemaut_tiles_per_second'], 0)
+        self.assertGreater(valeurs['gemaut_eta_seconds'], 0)
+
+        # Vague de reprises : s'ajoute à la première
+        metrics.tiles_started(2)
+        metrics.tiles_progress(2, 0, 0, 4)
+        valeurs = lire_metriques(metrics.render())
+        self.assertEqual((valeurs['gemaut_tiles_total'], valeurs['gemaut_tiles_done']), (12, 6))
+
+    def test_etape_en_cours(self):
+        metrics = ProductionMetrics(self.temp_dir)
+        metrics.stage_started('masque "saga"')
+        valeurs = lire_metriques(metrics.render())
+        self.assertEqual(valeurs['gemaut_stage_running{stage="masque \\"saga\\""}'], 1)
+        self.assertEqual(valeurs['gemaut_eta_seconds'], 0)
+
+    def test_mesures_du_noeud(self):
+        with open(os.path.join(self.temp_dir, 'tuile.tif'), 'wb') as f:
+            f.write(b'\0' * 5000)
+        enfant = subprocess.Popen([sys.executable, '-c', 'import time; x = bytearray(50 * 2**20); time.sleep(5)'])
+        try:
+            time.sleep(0.5)
+            seul = ProductionMetrics.process_tree_rss(enfant.pid)
+            self.assertGreater(seul, 50 * 2**20)
+            self.assertGreaterEqual(ProductionMetrics.process_tree_rss(), seul)
+        finally:
+            enfant.kill()
+            enfant.wait()
+        metrics = ProductionMetrics(self.temp_dir)
+        metrics.sample()
+        valeurs = lire_metriques(metrics.render())
+        self.assertEqual(valeurs['gemaut_scratch_bytes'], 5000)
+        self.assertGreater(valeurs['gemaut_scratch_free_bytes'], 0)
+        self.assertGreater(valeurs['gemaut_rss_bytes'], 0)
+
+    def test_fichier_et_http(self):
+        fichier = os.path.join(self.temp_dir, 'gemaut.prom')
+        with ProductionMetrics(self.temp_dir, fichier, port=0, interval=0.05) as metrics:
+            metrics.tiles_started(3)
+            with urllib.request.urlopen(f"http://127.0.0.1:{metrics.port}/metrics") as reponse:
+                self.assertIn('text/plain', reponse.headers['Content-Type'])
+                self.assertEqual(lire_metriques(reponse.read().decode())['gemaut_tiles_total'], 3)
+            metrics.tiles_progress(3, 0, 0, 2)
+        # État final écrit à l'arrêt, sans fichier temporaire restant
+        with open(fichier) as f:
+            self.assertEqual(lire_metriques(f.read())['gemaut_tiles_done'], 3)
+        self.assertEqual(os.listdir(self.temp_dir), ['gemaut.prom'])
+
+
+class TestTuilesGEMO(unittest.TestCase):
+    """Avancement publié par run_tiles"""
+
+    def test_run_tiles(self):
+        metrics = ProductionMetrics(tempfile.gettempdir())
+        taches = [(x, 0, '/inexistant', {'no_data_value': -32768}, False) for x in range(5)]
+        with ThreadPool(2) as pool:
+            resultats, _ = GEMOExecutor.run_tiles(pool, taches, 2, metrics=metrics)
+        self.assertEqual(len(resultats), 5)
+        self.assertTrue(all(isinstance(r, TileResult) for r in resultats))
+        valeurs = lire_metriques(metrics.render())
+        self.assertEqual((valeurs['gemaut_tiles_total'], valeurs['gemaut_tiles_done']), (5, 5))
+        self.assertEqual(valeurs['gemaut_tiles_failed'], sum(not r.ok for r in resultats))
+        self.assertEqual(valeurs['gemaut_workers_busy_ratio'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le filtre morphologique progressif NumPy (calcul de masque)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.numpy_ground_filter import NumpyGroundFilter, seuils_hauteur, tailles_fenetres
+
+
+class TestParametresFiltre(unittest.TestCase):
+    """Vérifie les fenêtres et seuils du filtre."""
+
+    def test_tailles_fenetres(self):
+        self.assertEqual(tailles_fenetres(10), [3, 5, 9, 17, 21])
+        self.assertEqual(tailles_fenetres(1), [3])
+
+    def test_seuils_bornes(self):
+        seuils = seuils_hauteur([3, 5, 9, 17], 1.0, 45.0, 0.3, 2.5)
+        np.testing.assert_allclose(seuils, [0.3, 2.3, 2.5, 2.5])
+
+
+class TestNumpyGroundFilter(unittest.TestCase):
+    """Classe un terrain incliné portant un bâtiment, par blocs et en un seul bloc."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mns_path = os.path.join(self.temp_dir, "mns.tif")
+        self.no_data = 32768
+
+        lignes, colonnes = np.mgrid[0:60, 0:70]
+        self.mns = (100 + 0.05 * colonnes + 0.02 * lignes).astype(np.float32)
+        self.mns[20:30, 30:42] += 8.0    # bâtiment
+        self.mns[0:3, 0:5] = self.no_data
+        profile = {
+            'driver': 'GTiff',
+            'height': 60,
+            'width': 70,
+            'count': 1,
+            'dtype': 'float32',
+            'crs': 'EPSG:2154',
+            'transform': from_origin(0, 60, 1, 1),
+            'nodata': self.no_data,
+        }
+        with rasterio.open(self.mns_path, 'w', **profile) as dst:
+            dst.write(self.mns, 1)
+
+        self.params = {'radius': 10, 'pente': 15.0, 'no_data_max': self.no_data}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def calculer(self, nom, cpu_count, block_size):
+        chem_masque = os.path.join(self.temp_dir, nom)
+        params = dict(self.params, block_size=block_size)
+        NumpyGroundFilter().compute_mask(self.mns_path, chem_masque, self.temp_dir, cpu_count, params)
+        with rasterio.open(chem_masque) as src:
+            self.assertEqual(src.dtypes[0], 'uint8')
+            # Masque binaire, comme ceux de SAGA et PDAL : aucune valeur de nodata déclarée
+            self.assertIsNone(src.nodata)
+            return src.read(1)
+
+    def test_batiment_et_sol(self):
+        masque = self.calculer("masque.tif", 1, 1024)
+
+        self.assertTrue(np.all(masque[20:30, 30:42] == 1))
+        self.assertTrue(np.all(masque[0:3, 0:5] == 1))
+        sol = np.ones(masque.shape, dtype=bool)
+        sol[20:30, 30:42] = False
+        sol[0:3, 0:5] = False
+        self.assertTrue(np.all(masque[sol] == 0))
+
+    def test_blocs_equivalents_au_calcul_global(self):
+        global_ = self.calculer("masque_global.tif", 1, 1024)
+        blocs = self.calculer("masque_blocs.tif", 2, 16)
+
+        np.testing.assert_array_equal(blocs, global_)
+
+    def test_parametre_manquant(self):
+        with self.assertRaises(ValueError):
+            NumpyGroundFilter().compute_mask(self.mns_path, os.path.join(self.temp_dir, "m.tif"),
+                                             self.temp_dir, 1, {'radius': 10})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
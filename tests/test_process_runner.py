@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour l'exécution asyncio des commandes externes."""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from multiprocessing.pool import ThreadPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut import config
+from gemaut.process_runner import ProcessRunner
+
+# Commande qui note son intervalle d'exécution puis écrit sur stderr
+DORMEUR = '''
+import sys, time
+debut = time.time()
+time.sleep(float(sys.argv[2]))
+with open(sys.argv[1], 'a') as f:
+    f.write(f"{debut} {time.time()}\\n")
+sys.stderr.write("x" * 100000 + "fin de stderr")
+sys.exit(int(sys.argv[3]))
+'''
+
+
+class TestProcessRunner(unittest.TestCase):
+    """Concurrence, timeouts, annulation et sortie d'erreur"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.script = os.path.join(self.temp_dir, "dormeur.py")
+        with open(self.script, 'w') as f:
+            f.write(DORMEUR)
+        self.journal = os.path.join(self.temp_dir, "intervalles")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def commande(self, duree=0.3, code=0):
+        return [sys.executable, self.script, self.journal, duree, code]
+
+    def test_concurrence_bornee(self):
+        resultats = ProcessRunner(2).run_all([self.commande(code=i % 2) for i in range(5)])
+        self.assertEqual([r.returncode for r in resultats], [0, 1, 0, 1, 0])
+        self.assertEqual(ProcessRunner.log_failures(resultats, "Test"), 2)
+        with open(self.journal) as f:
+            intervalles = [tuple(map(float, line.split())) for line in f]
+        # Jamais plus de 2 commandes simultanées
+        for debut, _ in intervalles:
+            self.assertLessEqual(sum(d <= debut < fin for d, fin in intervalles), 2)
+        # Sortie d'erreur bornée, fin conservée
+        self.assertEqual(len(resultats[0].stderr), config.PROCESS_STDERR_MAX_BYTES)
+        self.assertTrue(resultats[0].stderr.endswith("fin de stderr"))
+
+    def test_timeout(self):
+        debut = time.monotonic()
+        resultat = ProcessRunner.run_command(self.commande(duree=30), timeout=0.5)
+        self.assertLess(time.monotonic() - debut, 5)
+        self.assertEqual(resultat.reason, 'timeout')
+        self.assertFalse(resultat.ok)
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_annulation_et_sortie(self):
+        annuler = os.path.join(self.temp_dir, "ANNULER")
+        open(annuler, 'w').close()
+        self.assertEqual(ProcessRunner.run_command(self.commande(duree=30), cancel_file=annuler).reason, 'annulée')
+        os.remove(annuler)
+        sortie = os.path.join(self.temp_dir, "stdout.txt")
+        resultat = ProcessRunner.run_command([sys.executable, '-c', 'print("bonjour")'], stdout_file=sortie)
+        self.assertTrue(resultat.ok)
+        with open(sortie) as f:
+            self.assertEqual(f.read(), "bonjour\n")
+
+    def test_sans_shell(self):
+        # Les métacaractères sont des arguments, pas des redirections
+        resultat = ProcessRunner.run_command([sys.executable, '-c', 'import sys; print(sys.argv[1])', '> /dev/null'],
+                                             stdout_file=os.path.join(self.temp_dir, "out"))
+        self.assertTrue(resultat.ok)
+        with open(os.path.join(self.temp_dir, "out")) as f:
+            self.assertEqual(f.read(), "> /dev/null\n")
+        absent = ProcessRunner.run_command(['commande_introuvable_gemaut'])
+        self.assertEqual(absent.returncode, 127)
+        self.assertEqual(ProcessRunner.default_timeout(['/usr/bin/saga_cmd', 'grid_filter']),
+                         config.COMMAND_TIMEOUTS['saga_cmd'])
+
+    def test_soumission_depuis_threads(self):
+        with ProcessRunner(2) as runner, ThreadPool(5) as threads:
+            resultats = threads.map(lambda i: runner.submit(self.commande(code=i % 2), 0).result(), range(5))
+        self.assertEqual([r.returncode for r in resultats], [0, 1, 0, 1, 0])
+        with open(self.journal) as f:
+            intervalles = [tuple(map(float, line.split())) for line in f]
+        # Sémaphore commun aux threads : jamais plus de 2 commandes simultanées
+        for debut, _ in intervalles:
+            self.assertLessEqual(sum(d <= debut < fin for d, fin in intervalles), 2)
+        with self.assertRaises(RuntimeError):
+            runner.submit(self.commande())
+
+    def test_arret_et_plafond_memoire(self):
+        runner = ProcessRunner(1).start()
+        future = runner.submit(self.commande(duree=30), 0)
+        time.sleep(0.5)
+        debut = time.monotonic()
+        runner.close()
+        # La commande en cours est tuée avec la boucle
+        self.assertLess(time.monotonic() - debut, 5)
+        self.assertTrue(future.cancelled())
+        self.assertFalse(os.path.exists(self.journal))
+
+        # Plafond appliqué à la commande, pas au processus courant
+        limite = 256 * 2**20
+        code = 'import resource; print(resource.getrlimit(resource.RLIMIT_DATA)[0])'
+        sortie = os.path.join(self.temp_dir, "limite")
+        with ProcessRunner(1, data_limit=limite) as runner:
+            self.assertTrue(runner.submit([sys.executable, '-c', code], stdout_file=sortie).result().ok)
+        with open(sortie) as f:
+            self.assertEqual(int(f.read()), limite)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour l'assemblage natif des dalles ground.sdat de SAGA."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from SAGA.script_saga_ground_extraction import Assembler_dalles_SAGA
+
+
+class TestAssemblerDallesSAGA(unittest.TestCase):
+    """Vérifie le placement par indice de dalle et la binarisation à la lecture."""
+
+    NO_DATA_EXT = 32768
+    TAILLE = 4
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.rep_saga = os.path.join(self.temp_dir, "OUT_SAGA_tmp")
+        os.makedirs(self.rep_saga)
+        self.mns_path = os.path.join(self.temp_dir, "mns.tif")
+        self.out_path = os.path.join(self.temp_dir, "masque.tif")
+
+        # MNS 6x7 : dalles de 4 px -> grille de 2x2 dalles, bordures incomplètes
+        self.profile = {
+            'driver': 'GTiff',
+            'height': 6,
+            'width': 7,
+            'count': 1,
+            'dtype': 'float32',
+            'crs': 'EPSG:2154',
+            'transform': from_origin(100, 200, 1, 1),
+        }
+        with rasterio.open(self.mns_path, 'w', **self.profile) as dst:
+            dst.write(np.zeros((6, 7), dtype=np.float32), 1)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def ecrire_ground(self, ligne, colonne, data):
+        rep = os.path.join(self.rep_saga, f"DALLAGE_{ligne}_{colonne}")
+        os.makedirs(rep)
+        profile = {
+            'driver': 'SAGA',
+            'height': data.shape[0],
+            'width': data.shape[1],
+            'count': 1,
+            'dtype': 'float32',
+            'nodata': -99999,
+            'transform': from_origin(100 + (colonne - 1) * self.TAILLE, 200 - (ligne - 1) * self.TAILLE, 1, 1),
+        }
+        with rasterio.open(os.path.join(rep, 'ground.sdat'), 'w', **profile) as dst:
+            dst.write(data.astype(np.float32), 1)
+
+    def test_placement_et_binarisation(self):
+        dalle_1_1 = np.full((4, 4), 10.0)
+        dalle_1_1[0, 0] = -99999           # non-sol SAGA
+        dalle_1_2 = np.full((4, 3), 12.0)
+        dalle_1_2[1, 2] = self.NO_DATA_EXT  # bord de chantier
+        dalle_2_1 = np.full((2, 4), 8.0)
+        self.ecrire_ground(1, 1, dalle_1_1)
+        self.ecrire_ground(1, 2, dalle_1_2)
+        self.ecrire_ground(2, 1, dalle_2_1)
+        # DALLAGE_2_2 absente (dalle vide) -> reste non-sol
+
+        Assembler_dalles_SAGA(self.rep_saga, self.mns_path, self.TAILLE, self.out_path, self.NO_DATA_EXT, 2)
+
+        with rasterio.open(self.out_path) as src:
+            masque = src.read(1)
+            self.assertEqual(src.transform, self.profile['transform'])
+
+        attendu = np.zeros((6, 7), dtype=np.uint8)
+        attendu[0, 0] = 1
+        attendu[1, 6] = 1
+        attendu[4:6, 4:7] = 1
+        np.testing.assert_array_equal(masque, attendu)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
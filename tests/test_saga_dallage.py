@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le découpage parallèle du MNS en dalles (chaîne SAGA)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from SAGA.script_saga_ground_extraction import Decouper_image_en_dalles, lister_dalles_saga
+
+
+class TestDecouperImageEnDalles(unittest.TestCase):
+    """Vérifie le contenu, le géoréférencement et le format des dalles écrites."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mns_path = os.path.join(self.temp_dir, "mns.tif")
+        self.no_data = -9999
+
+        self.mns = np.arange(23 * 17, dtype=np.float32).reshape(23, 17)
+        # la dalle (1, 2) ne contient que du no_data
+        self.mns[0:10, 10:17] = self.no_data
+        profile = {
+            'driver': 'GTiff',
+            'height': 23,
+            'width': 17,
+            'count': 1,
+            'dtype': 'float32',
+            'crs': 'EPSG:2154',
+            'transform': from_origin(1000, 2000, 0.5, 0.5),
+            'nodata': self.no_data,
+            'compress': 'lzw',
+        }
+        with rasterio.open(self.mns_path, 'w', **profile) as dst:
+            dst.write(self.mns, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_dalles_geotiff(self):
+        rep_dalles = os.path.join(self.temp_dir, "DALLAGE")
+
+        nbre = Decouper_image_en_dalles(self.mns_path, 10, rep_dalles, 'DALLAGE_', iNbreCPU=2, no_data=self.no_data)
+
+        # 3 x 2 dalles dont une vide
+        self.assertEqual(nbre, 5)
+        self.assertFalse(os.path.exists(os.path.join(rep_dalles, "DALLAGE_1_2.tif")))
+
+        with rasterio.open(os.path.join(rep_dalles, "DALLAGE_3_2.tif")) as src:
+            self.assertEqual((src.height, src.width), (3, 7))
+            np.testing.assert_array_equal(src.read(1), self.mns[20:23, 10:17])
+            self.assertEqual(src.transform.c, 1000 + 10 * 0.5)
+            self.assertEqual(src.transform.f, 2000 - 20 * 0.5)
+            self.assertIsNone(src.compression)
+
+    def test_dalles_saga(self):
+        rep_dalles = os.path.join(self.temp_dir, "DALLAGE")
+
+        Decouper_image_en_dalles(self.mns_path, 10, rep_dalles, 'DALLAGE_', iNbreCPU=2, format_dalle='SAGA')
+
+        dalles = dict(lister_dalles_saga(rep_dalles))
+        self.assertEqual(sorted(dalles), ['DALLAGE_1_1', 'DALLAGE_2_1', 'DALLAGE_2_2', 'DALLAGE_3_1', 'DALLAGE_3_2'])
+        self.assertTrue(dalles['DALLAGE_2_2'].endswith('.sgrd'))
+        with rasterio.open(os.path.join(rep_dalles, "DALLAGE_2_2.sdat")) as src:
+            np.testing.assert_array_equal(src.read(1), self.mns[10:20, 10:17])
+
+    def test_format_inconnu(self):
+        with self.assertRaises(ValueError):
+            Decouper_image_en_dalles(self.mns_path, 10, self.temp_dir, format_dalle='HFA')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
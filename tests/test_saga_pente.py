@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le calcul en mémoire des pentes par dalle (chaîne SAGA)."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from scipy.ndimage import generic_filter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from SAGA import script_saga_ground_extraction
+from SAGA.script_saga_ground_extraction import (
+    Calculer_pente_par_dalle,
+    Decouper_image_en_dalles,
+    percentile_fenetre_glissante,
+    pente_zevenbergen_thorne,
+    reduire_par_dalle,
+)
+
+
+class TestPenteZevenbergenThorne(unittest.TestCase):
+    """Vérifie le noyau de pente sur des surfaces connues."""
+
+    def test_plan_incline(self):
+        x = np.arange(6, dtype=np.float64)
+        z = np.tile(x * np.tan(np.radians(30)) * 2.0, (5, 1))  # résolution 2 m
+
+        pente = pente_zevenbergen_thorne(z, 2.0, 2.0)
+
+        np.testing.assert_allclose(pente[1:-1, 1:-1], 30.0, atol=1e-4)
+        self.assertTrue(np.all(np.isnan(pente[0, :])))
+        self.assertTrue(np.all(np.isnan(pente[:, -1])))
+
+    def test_no_data_propage_aux_voisins(self):
+        z = np.zeros((5, 5))
+        z[2, 2] = -9999
+
+        pente = pente_zevenbergen_thorne(z, 1.0, 1.0, no_data=-9999)
+
+        self.assertTrue(np.isnan(pente[2, 2]))
+        self.assertTrue(np.isnan(pente[1, 2]))
+        self.assertTrue(np.isnan(pente[2, 1]))
+        self.assertEqual(pente[1, 1], 0.0)
+
+
+class TestReductionParDalle(unittest.TestCase):
+    """Compare la réduction vectorisée à une double boucle sur les carrés."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = rng.random((23, 17)).astype(np.float32) * 40
+        self.data[0:3, 0:4] = np.nan
+
+    def reference(self, fonction, taille):
+        lignes = []
+        for i in range(0, self.data.shape[0], taille):
+            ligne = []
+            for j in range(0, self.data.shape[1], taille):
+                ligne.append(fonction(self.data[i:i + taille, j:j + taille]))
+            lignes.append(ligne)
+        return np.array(lignes, dtype=np.float32)
+
+    def test_max(self):
+        resultat = reduire_par_dalle(self.data, 5, 'max')
+        np.testing.assert_allclose(resultat, self.reference(np.nanmax, 5))
+
+    def test_median(self):
+        resultat = reduire_par_dalle(self.data, 5, 'median')
+        np.testing.assert_allclose(resultat, self.reference(np.nanmedian, 5), rtol=1e-6)
+
+    def test_quantile(self):
+        resultat = reduire_par_dalle(self.data, 6, 'quantile', 80)
+        attendu = self.reference(lambda carre: np.nanpercentile(carre, 80), 6)
+        np.testing.assert_allclose(resultat, attendu, rtol=1e-5)
+
+    def test_statistique_inconnue(self):
+        with self.assertRaises(ValueError):
+            reduire_par_dalle(self.data, 5, 'moyenne')
+
+
+class TestPercentileFenetre(unittest.TestCase):
+    """Le percentile vectorisé doit reproduire l'ancien generic_filter."""
+
+    def test_equivalent_generic_filter(self):
+        rng = np.random.default_rng(1)
+        data = rng.random((12, 9)).astype(np.float32)
+        data[4, 4] = np.nan
+
+        def percentile_ancien(values):
+            values = values[~np.isnan(values)]
+            return np.percentile(values, 5) if values.size else np.nan
+
+        attendu = generic_filter(data, percentile_ancien, size=(5, 5), mode='constant', cval=np.nan)
+        resultat = percentile_fenetre_glissante(data, 5, 5, colonnes_par_paquet=4)
+
+        np.testing.assert_allclose(resultat, attendu, rtol=1e-5)
+
+
+class TestCalculerPenteParDalle(unittest.TestCase):
+    """Le traitement par bandes doit donner le même résultat qu'un traitement global."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mns_path = os.path.join(self.temp_dir, "mns.tif")
+
+        rng = np.random.default_rng(2)
+        self.mns = (rng.random((37, 29)) * 20).astype(np.float32)
+        profile = {
+            'driver': 'GTiff',
+            'height': 37,
+            'width': 29,
+            'count': 1,
+            'dtype': 'float32',
+            'crs': 'EPSG:2154',
+            'transform': from_origin(0, 37, 1, 1),
+        }
+        with rasterio.open(self.mns_path, 'w', **profile) as dst:
+            dst.write(self.mns, 1)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_bandes_equivalentes_au_calcul_global(self):
+        chem_bandes = os.path.join(self.temp_dir, "pente_bandes.tif")
+        chem_global = os.path.join(self.temp_dir, "pente_global.tif")
+
+        Calculer_pente_par_dalle(self.mns_path, chem_bandes, 5, lignes_par_bloc=5)
+        Calculer_pente_par_dalle(self.mns_path, chem_global, 5, lignes_par_bloc=100)
+
+        with rasterio.open(chem_bandes) as a, rasterio.open(chem_global) as b:
+            bandes = a.read(1)
+            global_ = b.read(1)
+
+        self.assertEqual(bandes.shape, self.mns.shape)
+        np.testing.assert_allclose(bandes, global_)
+        # une seule valeur par dalle
+        self.assertEqual(len(np.unique(bandes[0:5, 0:5])), 1)
+
+    def test_commande_saga_inchangee(self):
+        chem_pente = os.path.join(self.temp_dir, "pente.tif")
+        rep_dalles = os.path.join(self.temp_dir, "DALLAGE")
+        rep_out = os.path.join(self.temp_dir, "OUT")
+        os.makedirs(rep_out)
+        Calculer_pente_par_dalle(self.mns_path, chem_pente, 10)
+        Decouper_image_en_dalles(self.mns_path, 10, rep_dalles, 'DALLAGE_')
+
+        with mock.patch.object(script_saga_ground_extraction, 'lancer_saga_en_parallele') as lancer:
+            script_saga_ground_extraction.run_saga_par_dalle_parallel_avec_carte_pentes(
+                rep_dalles, rep_out, chem_pente, 10, 3, None, 1)
+        commandes = lancer.call_args[0][0]
+        self.assertEqual(len(commandes), 12)
+        # Pente fixe de l'algorithme, quelle que soit la carte des pentes
+        for cmd in commandes:
+            self.assertEqual(cmd[cmd.index('-TERRAINSLOPE') + 1], '15')
+            self.assertEqual(cmd[cmd.index('-RADIUS') + 1], '3')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
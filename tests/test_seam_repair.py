@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour la reprise des raccords entre tuiles après l'assemblage."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from functools import partial
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemo_sparse import SparseGEMOSolver
+from gemaut.seam_repair import SeamRepairer
+from gemaut.tile_processor import TileAssembler, TileCutter
+
+NODATA = -32768
+TILE, PAD = 40, 8
+
+
+class TestBordFixe(unittest.TestCase):
+    """Condition aux limites du moteur creux"""
+
+    def test_pixels_fixes(self):
+        rng = np.random.default_rng(0)
+        mne = (100 + rng.normal(0, 0.5, (20, 20))).astype(np.float32)
+        init = np.full(mne.shape, 90.)
+        fixe = np.zeros(mne.shape, bool)
+        fixe[:2] = True
+        mnt, stats = SparseGEMOSolver(0.5, 0.01, 'L2').solve(mne, np.zeros(mne.shape, np.uint8), init, fixed=fixe)
+        np.testing.assert_allclose(mnt[fixe], 90., atol=1e-4)
+        # Loin du bord fixé, l'attache aux données reprend le dessus
+        self.assertLess(abs(mnt[-5:].mean() - 100), 1.)
+        self.assertIn(stats['stop'], ('gradient', 'converged'))
+
+
+class TestRepriseDesRaccords(unittest.TestCase):
+    """Détection et reprise sur une mosaïque dont une tuile est décalée"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(1)
+        yy, xx = np.mgrid[0:72, 0:72]
+        self.mne = (100 + 0.1 * xx + 0.05 * yy + rng.normal(0, 0.05, xx.shape)).astype(np.float32)
+        profile = {'driver': 'GTiff', 'height': 72, 'width': 72, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': NODATA}
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(self.mne, 1)
+        self.masque = os.path.join(self.temp_dir, "masque.tif")
+        with rasterio.open(self.masque, 'w', **dict(profile, dtype='uint8', nodata=11)) as dst:
+            dst.write(np.zeros((72, 72), np.uint8), 1)
+        self.rep = os.path.join(self.temp_dir, "tmp")
+        os.makedirs(self.rep)
+        TileCutter.cut_workspace(self.mns, self.masque, self.mns, TILE, PAD, NODATA, self.rep, 1)
+
+        # MNT des tuiles : le MNS, la tuile 1_0 décalée de 2 m
+        for x in range(2):
+            for y in range(2):
+                src_path = os.path.join(self.rep, f"Dalle_{x}_{y}", f"Out_MNS_{x}_{y}.tif")
+                with rasterio.open(src_path) as src:
+                    dalle, tile_profile = src.read(1).astype(np.float64), src.profile
+                if (x, y) == (1, 0):
+                    dalle += 2
+                with rasterio.open(TileAssembler.tile_mnt_path(self.rep, x, y), 'w',
+                                   **dict(tile_profile, dtype='float64')) as dst:
+                    dst.write(dalle, 1)
+        self.mosaique = os.path.join(self.temp_dir, "mosaique.tif")
+        TileAssembler.assemble_tiles(self.rep, 2, 2, self.mosaique)
+        self.tile_path = partial(TileAssembler.tile_mnt_path, self.rep)
+        self.gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_detection(self):
+        seams = SeamRepairer.find_seams(self.tile_path, 2, 2, TILE, PAD, 72, 72, 0.5, NODATA)
+        self.assertEqual(sorted(s['tiles'] for s in seams), [((0, 0), (1, 0)), ((1, 0), (1, 1))])
+        for seam in seams:
+            self.assertAlmostEqual(seam['discrepancy'], 2., places=4)
+        vertical = [s for s in seams if s['axis'] == 1][0]['window']
+        # Recouvrement [32, 40) élargi de la marge, le long des lignes de la dalle 1_0
+        self.assertEqual((vertical.col_off, vertical.width), (16, 40))
+        self.assertEqual((vertical.row_off, vertical.height), (0, 56))
+        self.assertEqual(SeamRepairer.find_seams(self.tile_path, 2, 2, TILE, PAD, 72, 72, 3., NODATA), [])
+        self.assertEqual(SeamRepairer.find_seams(self.tile_path, 2, 2, TILE, PAD, 72, 72, 0.5, NODATA,
+                                                 tiles={(0, 1)}), [])
+
+    def test_vagues_disjointes(self):
+        windows = [Window(0, 0, 10, 10), Window(5, 5, 10, 10), Window(20, 0, 10, 10)]
+        self.assertEqual(SeamRepairer.waves(windows), [[0, 2], [1]])
+
+    def test_reprise(self):
+        with rasterio.open(self.mosaique) as src:
+            avant = src.read(1).astype(np.float64)
+        seams = SeamRepairer.repair(self.tile_path, 2, 2, TILE, PAD, self.mosaique, self.mns, self.masque,
+                                    self.gemo_params, 0.5, 1)
+        self.assertEqual(len(seams), 2)
+        with rasterio.open(self.mosaique) as src:
+            apres = src.read(1).astype(np.float64)
+
+        # Hors des fenêtres reprises et sur leur bord fixé (sauf au bord du chantier), la mosaïque est inchangée
+        touche = np.zeros(avant.shape, bool)
+        for seam in seams:
+            w = seam['window']
+            r0, c0 = w.row_off + (2 if w.row_off > 0 else 0), w.col_off + (2 if w.col_off > 0 else 0)
+            r1 = w.row_off + w.height - (2 if w.row_off + w.height < 72 else 0)
+            c1 = w.col_off + w.width - (2 if w.col_off + w.width < 72 else 0)
+            touche[r0:r1, c0:c1] = True
+        np.testing.assert_allclose(apres[~touche], avant[~touche], atol=1e-3)
+
+        # Le raccord est ramené vers le MNS : moindre écart et moindre courbure
+        ligne = slice(5, 20)
+        ecart_avant = np.abs(avant[ligne, 25:45] - self.mne[ligne, 25:45]).mean()
+        ecart_apres = np.abs(apres[ligne, 25:45] - self.mne[ligne, 25:45]).mean()
+        self.assertLess(ecart_apres, ecart_avant)
+        courbure = lambda z: np.abs(np.diff(z[ligne, 16:56], 2, axis=1)).max()
+        self.assertLess(courbure(apres), courbure(avant))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
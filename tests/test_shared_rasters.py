@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le découpage depuis la mémoire partagée."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.shared_rasters import SharedRasterSet, SharedRasterView
+from gemaut.tile_processor import TileCutter
+
+NODATA = -32768
+
+
+def ecrire_raster(chemin, data, dtype='float32', nodata=NODATA):
+    profile = {
+        'driver': 'GTiff', 'height': data.shape[0], 'width': data.shape[1], 'count': 1,
+        'dtype': dtype, 'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': nodata,
+    }
+    with rasterio.open(chemin, 'w', **profile) as dst:
+        dst.write(data.astype(dtype), 1)
+
+
+class TestSharedRasters(unittest.TestCase):
+    """Découpage identique depuis les fichiers et depuis la mémoire partagée"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(3)
+        mns = rng.random((50, 60)) * 100
+        mns[:, 40:] = NODATA                      # dernière colonne de dalles sans données
+        self.chemins = []
+        for nom, data, dtype, nodata in (("mns", mns, 'float32', NODATA),
+                                         ("masque", rng.integers(0, 2, (50, 60)), 'uint8', 11),
+                                         ("init", mns, 'float32', NODATA)):
+            chemin = os.path.join(self.temp_dir, f"{nom}.tif")
+            ecrire_raster(chemin, data, dtype, nodata)
+            self.chemins.append(chemin)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def lire_dalles(self, rep):
+        dalles = {}
+        for racine, _, fichiers in os.walk(rep):
+            for fichier in fichiers:
+                with rasterio.open(os.path.join(racine, fichier)) as src:
+                    dalles[fichier] = (src.read(1), src.transform, src.dtypes[0])
+        return dalles
+
+    def test_decoupage_identique(self):
+        rep_fichiers = os.path.join(self.temp_dir, "fichiers")
+        rep_partage = os.path.join(self.temp_dir, "partage")
+        os.makedirs(rep_fichiers)
+        os.makedirs(rep_partage)
+
+        has_data_fichiers = TileCutter.cut_workspace(*self.chemins, 20, 5, NODATA, rep_fichiers, 2)
+        with SharedRasterSet() as shared:
+            specs = [shared.load(nom, chemin) for nom, chemin in zip(("mns", "masque", "init"), self.chemins)]
+            has_data_partage = TileCutter.cut_workspace(*specs, 20, 5, NODATA, rep_partage, 2)
+
+        self.assertEqual(has_data_partage, has_data_fichiers)
+        self.assertTrue(has_data_partage[(0, 0)])
+        self.assertFalse(has_data_partage[(3, 0)])
+
+        fichiers, partage = self.lire_dalles(rep_fichiers), self.lire_dalles(rep_partage)
+        self.assertEqual(sorted(partage), sorted(fichiers))
+        for nom, (data, transform, dtype) in fichiers.items():
+            np.testing.assert_array_equal(partage[nom][0], data)
+            self.assertEqual(partage[nom][1], transform)
+            self.assertEqual(partage[nom][2], dtype)
+
+    def test_vue_sans_copie_en_lecture_seule(self):
+        with SharedRasterSet() as shared:
+            view = SharedRasterView(shared.load("mns", self.chemins[0]))
+            fenetre = view.read(1, window=Window(10, 5, 8, 4))
+            self.assertTrue(np.shares_memory(fenetre, view.read(1)))
+            self.assertFalse(fenetre.flags.writeable)
+            with rasterio.open(self.chemins[0]) as src:
+                np.testing.assert_array_equal(fenetre, src.read(1, window=Window(10, 5, 8, 4)))
+            del fenetre, view
+
+    def test_tuile_sans_donnees_connue_du_decoupage(self):
+        TileCutter.cut_workspace(*self.chemins, 20, 5, NODATA, self.temp_dir, 1)
+        gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA}
+        result = GEMOExecutor.process_tile((3, 0, self.temp_dir, gemo_params, False))
+        self.assertEqual(result.status, "copiée")
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "Dalle_3_0", "Out_MNT_3_0.tif")))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le graphe d'étapes du pipeline (dépendances, budget de CPU, chemin critique)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemaut_config import GEMAUTConfig
+from gemaut.script_gemaut import GEMAUTPipeline
+from gemaut.stage_graph import Stage, StageGraph
+
+
+class TestOrdonnancement(unittest.TestCase):
+    """Exécution des étapes prêtes dans le budget de CPU"""
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.actives = 0
+        self.max_actives = 0
+        self.journal = []
+
+    def etape(self, name, duree=0.2, echec=False):
+        def func():
+            with self.lock:
+                self.actives += 1
+                self.max_actives = max(self.max_actives, self.actives)
+                self.journal.append(('début', name))
+            time.sleep(duree)
+            with self.lock:
+                self.actives -= 1
+                self.journal.append(('fin', name))
+            if echec:
+                raise RuntimeError(f"{name} en panne")
+        return func
+
+    def test_etapes_independantes_en_parallele(self):
+        stages = [Stage('a', self.etape('a'), outputs=('x',)),
+                  Stage('b', self.etape('b'), ('x',), ('y',)),
+                  Stage('c', self.etape('c', 0.5), outputs=('z',)),
+                  Stage('d', self.etape('d', 0.05), ('y', 'z'))]
+        debut = time.time()
+        graph = StageGraph(stages, 2)
+        graph.run()
+        # a puis b pendant c : environ 0,5 s au lieu de 0,95 s en séquence
+        self.assertLess(time.time() - debut, 0.85)
+        self.assertEqual(self.max_actives, 2)
+        self.assertLess(self.journal.index(('fin', 'a')), self.journal.index(('début', 'b')))
+        self.assertEqual(self.journal[-1], ('fin', 'd'))
+        self.assertEqual([s.name for s in graph.critical_path()], ['c', 'd'])
+
+    def test_budget_de_cpu(self):
+        stages = [Stage(name, self.etape(name, 0.1), outputs=(name,), cpus=cpus)
+                  for name, cpus in (('a', 2), ('b', 1), ('c', 1), ('d', 8))]
+        StageGraph(stages, 3).run()
+        self.assertEqual(self.max_actives, 2)
+        # L'étape qui demande plus que le budget tourne seule
+        i = self.journal.index(('début', 'd'))
+        self.assertEqual(self.journal[i + 1], ('fin', 'd'))
+
+    def test_echec(self):
+        stages = [Stage('a', self.etape('a', echec=True), outputs=('x',)),
+                  Stage('b', self.etape('b', 0.4)),
+                  Stage('c', self.etape('c'), ('x',))]
+        with self.assertRaises(RuntimeError) as ctx:
+            StageGraph(stages, 2).run()
+        self.assertIn("a en panne", str(ctx.exception))
+        # L'étape en cours se termine, la dépendante n'est jamais lancée
+        self.assertIn(('fin', 'b'), self.journal)
+        self.assertNotIn(('début', 'c'), self.journal)
+
+    def test_graphe_invalide(self):
+        with self.assertRaises(ValueError):
+            StageGraph([Stage('a', None, ('y',), ('x',)), Stage('b', None, ('x',), ('y',))], 1)
+        with self.assertRaises(ValueError):
+            StageGraph([Stage('a', None, outputs=('x',)), Stage('b', None, outputs=('x',))], 1)
+
+
+class TestEtapesDuPipeline(unittest.TestCase):
+    """Dépendances déclarées par GEMAUTPipeline"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        profile = {'driver': 'GTiff', 'height': 10, 'width': 10, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1)}
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(np.zeros((10, 10), np.float32), 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def graphe(self, **options):
+        cfg = GEMAUTConfig(mns_input=self.mns, mnt_output=os.path.join(self.temp_dir, "mnt.tif"), resolution=4,
+                           cpu_count=4, work_dir=os.path.join(self.temp_dir, "travail"), **options)
+        pipeline = GEMAUTPipeline(cfg, configure_logging=False)
+        return StageGraph(pipeline._preparation_stages() + pipeline._processing_stages()
+                          + pipeline._finalization_stages(), cfg.cpu_count)
+
+    def test_masque_calcule(self):
+        graph = self.graphe(seam_repair=True, clean_temp=True)
+        deps = graph.dependencies
+        # Le sous-échantillonnage du MNS n'attend pas le calcul du masque
+        self.assertEqual(deps['sous_ech_mns'], {'trous_mns'})
+        self.assertEqual(deps['masque'], {'nodata_max', 'compatibilite'})
+        self.assertEqual(deps['init'], {'sous_ech_mns'})
+        self.assertEqual(deps['dalles'], {'sous_ech_mns', 'sous_ech_masque'})
+        self.assertEqual(deps['nodata_final'], {'raccords'})
+        self.assertEqual(graph.order[-1], 'nettoyage')
+        self.assertEqual([s.cpus for s in graph.stages if s.name == 'masque'], [3])
+
+    def test_masque_et_init_fournis(self):
+        graph = self.graphe(mask_file=self.mns, init_file=self.mns, scratch_backend='chunks')
+        deps = graph.dependencies
+        self.assertEqual(deps['masque'], {'compatibilite'})
+        self.assertEqual(deps['init'], set())
+        self.assertEqual(deps['blocs'], {'sous_ech_mns', 'sous_ech_masque', 'init'})
+        self.assertIn('blocs', deps['decoupage'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
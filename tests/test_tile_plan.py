@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour le plan de tuilage adaptatif (quadtree)."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from functools import partial
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.gemo_executor import GEMOExecutor
+from gemaut.tile_plan import TilePlan, TilePlanner
+from gemaut.tile_processor import TileAssembler, TileCutter
+
+NODATA = -32768
+
+
+class TestPlan(unittest.TestCase):
+    """Géométrie des dalles et quadtree"""
+
+    def test_grille_uniforme(self):
+        plan = TilePlan.grid(250, 130, 60, 20)
+        self.assertEqual((plan.nx, plan.ny), (6, 3))
+        self.assertEqual(len(plan), 18)
+        self.assertEqual(plan.window(5, 2), (200, 80, 50, 50))
+        self.assertEqual(plan.window(1, 0), (40, 0, 60, 60))
+        voisins = plan.neighbours()
+        self.assertEqual(len(voisins), 5 * 3 + 6 * 2)
+        self.assertIn(((0, 0), (1, 0), 1), voisins)
+        self.assertIn(((0, 0), (0, 1), 0), voisins)
+
+    def test_quadtree(self):
+        costs = np.zeros((8, 10))
+        costs[5, 1] = 100.
+        plan = TilePlanner.quadtree(costs, 10 * 10 + 4, 8 * 10 + 4, 10, 4, max_span=4, target=20.)
+        # Région vide : dalles de 4 x 4 cellules ; cellule coûteuse isolée jusqu'au niveau 1
+        self.assertEqual(plan.spans[(0, 0)], 4)
+        self.assertEqual(plan.spans[(8, 0)], 4)
+        self.assertEqual(plan.spans[(1, 5)], 1)
+        self.assertEqual(plan.spans[(2, 4)], 2)
+        # Chaque cellule est couverte par exactement une dalle
+        couverture = np.zeros(costs.shape, int)
+        for key in plan:
+            x0, x1, y0, y1 = plan.cells(*key)
+            couverture[y0:y1, x0:x1] += 1
+        self.assertTrue(np.all(couverture == 1))
+        self.assertEqual(plan.window(8, 0), (80, 0, 24, 44))
+        # Voisins de tailles différentes
+        self.assertIn(((1, 5), (2, 4), 1), plan.neighbours())
+        self.assertIn(((0, 0), (2, 4), 0), plan.neighbours())
+
+    def test_enregistrement(self):
+        plan = TilePlanner.quadtree(np.ones((4, 4)), 44, 44, 10, 4, max_span=4, target=4.)
+        path = os.path.join(tempfile.mkdtemp(), "plan.json")
+        plan.save(path)
+        relu = TilePlan.load(path)
+        self.assertEqual(relu.spans, plan.spans)
+        self.assertEqual((relu.nx, relu.ny, relu.step), (plan.nx, plan.ny, plan.step))
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_poids_complementaires(self):
+        # Deux dalles voisines : [0, 30) et [20, 50), recouvrement de 10 px
+        gauche = TileAssembler.ramp_weights(0, 30, 50, 10, 20, 30)
+        droite = TileAssembler.ramp_weights(20, 50, 50, 10, 20, 30)
+        np.testing.assert_allclose(gauche + droite, 1.)
+        self.assertTrue(np.all(gauche > 0) and np.all(droite > 0))
+        np.testing.assert_allclose(TileAssembler.ramp_weights(0, 30, 30, 10, 0, 30), 1.)
+
+
+class TestChantierQuadtree(unittest.TestCase):
+    """Découpage, GEMO et assemblage d'un chantier à moitié hors zone"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(2)
+        yy, xx = np.mgrid[0:124, 0:124]
+        self.mne = (100 + 0.2 * xx + 0.1 * yy + rng.normal(0, 0.05, xx.shape)).astype(np.float32)
+        masque = np.zeros(self.mne.shape, np.uint8)
+        # Bâtiment dans une seule cellule de 20 px : demi-dalles autour
+        masque[62:78, 22:38] = 255
+        self.mne[62:78, 22:38] += 15
+        # Moitié droite hors chantier
+        self.mne[:, 64:] = NODATA
+        masque[:, 64:] = 11
+        profile = {'driver': 'GTiff', 'height': 124, 'width': 124, 'count': 1, 'dtype': 'float32',
+                   'crs': 'EPSG:2154', 'transform': from_origin(0, 1000, 1, 1), 'nodata': NODATA}
+        self.mns = os.path.join(self.temp_dir, "mns.tif")
+        with rasterio.open(self.mns, 'w', **profile) as dst:
+            dst.write(self.mne, 1)
+        self.masque = os.path.join(self.temp_dir, "masque.tif")
+        with rasterio.open(self.masque, 'w', **dict(profile, dtype='uint8', nodata=11)) as dst:
+            dst.write(masque, 1)
+        self.rep = os.path.join(self.temp_dir, "tmp")
+        os.makedirs(self.rep)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_plan_et_assemblage(self):
+        plan = TilePlanner.build(self.mns, self.masque, 44, 4, NODATA)
+        self.assertEqual(plan.step, 20)
+        # Moitié hors zone fusionnée, cellule du bâtiment en demi-dalles
+        self.assertEqual((plan.spans[(4, 0)], plan.spans[(4, 4)]), (4, 4))
+        self.assertEqual(plan.spans[(1, 3)], 1)
+        self.assertEqual(plan.spans[(0, 0)], 2)
+        self.assertLess(len(plan), plan.nx * plan.ny)
+
+        has_data = TileCutter.cut_workspace(self.mns, self.masque, self.mns, 44, 4, NODATA, self.rep, 1, plan=plan)
+        self.assertEqual(set(has_data), set(plan))
+        for key in plan:
+            with rasterio.open(os.path.join(self.rep, f"Dalle_{key[0]}_{key[1]}",
+                                            f"Out_MNS_{key[0]}_{key[1]}.tif")) as src:
+                self.assertEqual((src.width, src.height), plan.window(*key)[2:])
+
+        gemo_params = {'sigma': 0.5, 'lambda': 0.01, 'norme': 'hubertukey', 'no_data_value': NODATA,
+                       'engine': 'sparse'}
+        results = GEMOExecutor.run_gemo_parallel(self.rep, plan.nx, plan.ny, gemo_params, 1,
+                                                 tiles=set(plan), has_data=has_data)
+        self.assertEqual(len(results), len(plan))
+        self.assertTrue(all(r.ok for r in results))
+
+        out = os.path.join(self.temp_dir, "mnt.tif")
+        TileAssembler.assemble_plan(self.rep, plan, self.mns, out, 50)
+        with rasterio.open(out) as src:
+            mnt = src.read(1)
+            self.assertEqual((src.width, src.height), (124, 124))
+            self.assertEqual(src.transform, from_origin(0, 1000, 1, 1))
+        sol = np.ones(mnt.shape, bool)
+        sol[:, 60:] = False
+        sol[58:82, 18:42] = False
+        self.assertLess(np.abs(mnt - self.mne)[sol].max(), 0.5)
+        # Sous le bâtiment, le MNT passe sous le sursol
+        self.assertLess(mnt[70, 30], self.mne[70, 30] - 10)
+
+        # Assemblage par bandes identique
+        bande = TileAssembler.assemble_plan_window(partial(TileAssembler.tile_mnt_path, self.rep), plan,
+                                                   Window(10, 30, 50, 40))
+        np.testing.assert_array_equal(bande, mnt[30:70, 10:60])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
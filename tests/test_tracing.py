@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Tests unitaires pour la trace d'exécution au format Chrome trace."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from gemaut.executor_service import ExecutorService
+from gemaut.process_runner import ProcessRunner
+from gemaut.stage_graph import Stage, StageGraph
+from gemaut.tracing import Tracer
+
+
+def tache_tracee(i):
+    with Tracer.span('tâche', 'test', i=i) as args:
+        time.sleep(0.01)
+        args['statut'] = 'ok'
+    return os.getpid()
+
+
+class TestTracer(unittest.TestCase):
+    """Intervalles des processus et export"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.spans_dir = os.path.join(self.temp_dir, "spans")
+        self.sortie = os.path.join(self.temp_dir, "trace.json")
+
+    def tearDown(self):
+        Tracer.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def exporter(self):
+        Tracer.stop()
+        n = Tracer.export(self.spans_dir, self.sortie)
+        with open(self.sortie) as f:
+            trace = json.load(f)
+        return n, trace['traceEvents']
+
+    def test_desactive(self):
+        self.assertFalse(Tracer.enabled())
+        with Tracer.span('rien', 'test') as args:
+            args['statut'] = 'ok'
+        Tracer.record('rien', 'test', 0.0, 1.0)
+        self.assertFalse(os.path.exists(self.spans_dir))
+
+    def test_workers(self):
+        # Activée avant la création des workers, qui héritent du répertoire de trace
+        Tracer.start(self.spans_dir)
+        with ExecutorService(2) as service:
+            pids = set(service.cpu.map(tache_tracee, range(6)))
+        n, events = self.exporter()
+        self.assertEqual(n, 6)
+
+        spans = [e for e in events if e['ph'] == 'X']
+        self.assertEqual({e['pid'] for e in spans}, pids)
+        self.assertEqual(sorted(e['args']['i'] for e in spans), list(range(6)))
+        for e in spans:
+            self.assertEqual((e['name'], e['cat'], e['args']['statut']), ('tâche', 'test', 'ok'))
+            self.assertGreaterEqual(e['dur'], 10000)
+        noms = {e['pid']: e['args']['name'] for e in events if e['name'] == 'process_name'}
+        self.assertEqual(set(noms), pids)
+        self.assertTrue(all(nom.startswith('worker') for nom in noms.values()))
+
+    def test_etapes_et_commandes(self):
+        Tracer.start(self.spans_dir)
+        runner = ProcessRunner(2)
+        StageGraph([
+            Stage('commandes', lambda: runner.run_all([['true'], ['sh', '-c', 'exit 3']]), outputs=('a',)),
+            Stage('suite', lambda: None, inputs=('a',)),
+        ], 2).run()
+        _, events = self.exporter()
+
+        etapes = {e['name']: e for e in events if e.get('cat') == 'étape'}
+        self.assertEqual(set(etapes), {'commandes', 'suite'})
+        self.assertLessEqual(etapes['commandes']['ts'] + etapes['commandes']['dur'], etapes['suite']['ts'] + 1)
+        commandes = {e['name']: e for e in events if e.get('cat') == 'commande'}
+        self.assertEqual(commandes['sh']['args']['returncode'], 3)
+        self.assertEqual(commandes['true']['args']['returncode'], 0)
+        # Une ligne par commande
+        self.assertNotEqual(commandes['sh']['tid'], commandes['true']['tid'])
+        self.assertEqual({e['args']['name'] for e in events if e['name'] == 'process_name'}, {'GEMAUT'})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)